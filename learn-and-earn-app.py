@@ -16,34 +16,126 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objs as go
-import random
 from datetime import datetime, timedelta
 import google.generativeai as genai
 import uuid
 import io
 import base64
 from PIL import Image, ImageDraw, ImageFont
-import sqlite3
-import hashlib
 import re
-import json
+import os
+
+from learn_and_earn.batch import PRECOMPUTED_MAX_AGE
+from learn_and_earn.catalog import COURSE_CATALOG, SKILL_ECOSYSTEM, iter_catalog_courses
+from learn_and_earn.db import DB_PATH, connect
+from learn_and_earn.enrollment_cache import shared_enrollment_cache
+from learn_and_earn.instrumentation import recorder
+from learn_and_earn.ledger import credits_for_price
+from learn_and_earn.maintenance import shared_maintenance
+from learn_and_earn.profiling import profiler
+from learn_and_earn.replica import shared_replica
+from learn_and_earn.sharding import initialize_storage, shared_storage
+from learn_and_earn.services import ALREADY_EXISTS, PlatformService
+from learn_and_earn.uploads import UploadError, process_upload
+
+# Dashboard sections read through st.cache_data; per-user entries are keyed by the
+# session's dashboard version (bumped on this session's writes) and expire after
+# the TTL, which picks up changes made elsewhere (batch jobs, grading, other tabs)
+DASHBOARD_CACHE_TTL = 30
+LEADERBOARD_CACHE_TTL = 60
+
+
+def dashboard_version():
+    return st.session_state.get('dashboard_version', 0)
+
+
+def session_connection(storage):
+    # One connection per browser session, reused across reruns; with sharded storage it
+    # is the logged-in user's shard, reopened (and the old one closed) when that changes
+    shard = storage.shard_for(st.session_state.get('user_id')) if storage is not None else None
+    cached = st.session_state.get('db_connection')
+    if cached is not None and cached[0] == shard:
+        return cached[1]
+    if cached is not None:
+        cached[1].close()
+    conn = storage.connect_shard(shard) if storage is not None else connect(DB_PATH)
+    st.session_state['db_connection'] = (shard, conn)
+    return conn
+
+
+# The leading underscore keeps the service out of the cache key
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_dashboard_metrics(_service, user_id, version):
+    # Course counts come from the event-sourced summary
+    return _service.get_user_metrics(user_id), _service.get_progress_summary(user_id)
+
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_dashboard_progress(_service, user_id, version):
+    return pd.DataFrame(_service.get_course_progress(user_id), columns=['Course', 'Progress'])
+
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_dashboard_badges(_service, user_id, version):
+    return [(skill.skill_name, skill.proficiency_level) for skill in _service.get_user_skills(user_id)]
+
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_dashboard_deadlines(_service, user_id, version):
+    return [{'Task': deadline.task, 'DueDate': deadline.due_date}
+            for deadline in _service.get_upcoming_deadlines(user_id)]
+
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_dashboard_recommendations(_service, user_id, version):
+    # Prefer the batch job's result; otherwise catalog courses sharing a skill with the user
+    precomputed = _service.get_precomputed(user_id, 'recommendations', PRECOMPUTED_MAX_AGE)
+    if precomputed is not None:
+        recommended_ids = set(precomputed)
+        return [course for course in iter_catalog_courses(COURSE_CATALOG) if course['id'] in recommended_ids]
+    skills = [skill.skill_name for skill in _service.get_user_skills(user_id)]
+    return _service.recommend_courses(skills) if skills else []
+
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_dashboard_notifications(_service, user_id, version):
+    precomputed = _service.get_precomputed(user_id, 'notifications', PRECOMPUTED_MAX_AGE)
+    return precomputed if precomputed is not None else _service.get_notifications(user_id)
+
+
+@st.cache_data(ttl=LEADERBOARD_CACHE_TTL, show_spinner=False)
+def load_leaderboard(_service, limit=10):
+    # Shared by every session: the top of the board is the same for everyone
+    return pd.DataFrame([
+        {'Rank': entry.rank, 'Username': entry.username, 'Skill Points': entry.skill_points}
+        for entry in _service.get_leaderboard(limit=limit)
+    ], columns=['Rank', 'Username', 'Skill Points'])
+
 
 class AdvancedLearnAndEarnPlatform:
     def __init__(self):
         # Enhanced Configuration
         self.SECRET_KEY = "your_secure_secret_key_here"
         
-        # Database Connection
-        self.conn = sqlite3.connect('learn_and_earn_pro.db', check_same_thread=False)
+        # Create tables and seed data once per process, not on every rerun
+        self.initialize_comprehensive_database()
+
+        # Database Connection and headless service layer; with sharded storage the
+        # connection is the logged-in user's shard with the common database attached
+        self.storage = shared_storage(DB_PATH)
+        self.conn = session_connection(self.storage)
+        if self.storage is not None:
+            self.service = PlatformService(self.conn)
+        else:
+            self.service = PlatformService(self.conn, replica=shared_replica(DB_PATH))
         self.cursor = self.conn.cursor()
         
-        # Initialize Database and Core Components
-        self.initialize_comprehensive_database()
+        # Idle-time ANALYZE / WAL checkpoint / incremental vacuum (one thread per process)
+        shared_maintenance(DB_PATH)
         self.initialize_session_state()
         
         # Load Comprehensive Catalogs
         self.course_catalog = self.create_comprehensive_course_catalog()
-        self.job_marketplace = self.create_advanced_job_marketplace()
         self.skill_ecosystem = self.create_skill_ecosystem()
 
     def initialize_session_state(self):
@@ -58,223 +150,28 @@ class AdvancedLearnAndEarnPlatform:
             st.session_state['current_page'] = 'Login'
 
     def initialize_comprehensive_database(self):
-        # Expanded Database Schema
-        tables = {
-            'users': '''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    email TEXT UNIQUE NOT NULL,
-                    password TEXT NOT NULL,
-                    profile_image BLOB,
-                    primary_skill TEXT,
-                    total_earnings REAL DEFAULT 0,
-                    skill_points INTEGER DEFAULT 0,
-                    subscription_tier TEXT DEFAULT 'Basic',
-                    learning_credits REAL DEFAULT 100.0,
-                    account_created DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    last_login DATETIME
-                )
-            ''',
-            'courses': '''
-                CREATE TABLE IF NOT EXISTS courses (
-                    id TEXT PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    category TEXT,
-                    difficulty TEXT,
-                    price REAL,
-                    duration_weeks INTEGER,
-                    total_modules INTEGER,
-                    skill_points_reward INTEGER
-                )
-            ''',
-            'user_courses': '''
-                CREATE TABLE IF NOT EXISTS user_courses (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    course_id TEXT,
-                    enrollment_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    completion_status TEXT DEFAULT 'In Progress',
-                    progress_percentage REAL DEFAULT 0,
-                    completed_date DATETIME,
-                    FOREIGN KEY (user_id) REFERENCES users(id),
-                    FOREIGN KEY (course_id) REFERENCES courses(id)
-                )
-            ''',
-            'course_modules': '''
-                CREATE TABLE IF NOT EXISTS course_modules (
-                    id TEXT PRIMARY KEY,
-                    course_id TEXT,
-                    title TEXT,
-                    content TEXT,
-                    video_lecture_url TEXT,
-                    assignment_details TEXT,
-                    quiz_data TEXT,
-                    FOREIGN KEY (course_id) REFERENCES courses(id)
-                )
-            ''',
-            'user_skills': '''
-                CREATE TABLE IF NOT EXISTS user_skills (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    skill_name TEXT,
-                    proficiency_level TEXT,
-                    experience_points INTEGER DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            ''',
-            'job_opportunities': '''
-                CREATE TABLE IF NOT EXISTS job_opportunities (
-                    id TEXT PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    company TEXT,
-                    description TEXT,
-                    required_skills TEXT,
-                    salary_range TEXT,
-                    location TEXT,
-                    remote_friendly BOOLEAN
-                )
-            ''',
-            'user_job_applications': '''
-                CREATE TABLE IF NOT EXISTS user_job_applications (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    job_id TEXT,
-                    application_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    status TEXT DEFAULT 'Pending',
-                    FOREIGN KEY (user_id) REFERENCES users(id),
-                    FOREIGN KEY (job_id) REFERENCES job_opportunities(id)
-                )
-            ''',
-            'user_assignments': '''
-                CREATE TABLE IF NOT EXISTS user_assignments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    course_id TEXT,
-                    module_id TEXT,
-                    submission_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(id),
-                    FOREIGN KEY (course_id) REFERENCES courses(id),
-                    FOREIGN KEY (module_id) REFERENCES course_modules(id)
-                )
-            '''
-        }
-
-        # Create Tables
-        for table_name, table_schema in tables.items():
-            try:
-                self.cursor.execute(table_schema.strip())
-            except sqlite3.OperationalError as e:
-                st.error(f"Error creating table {table_name}: {e}")
-        self.conn.commit()
-
-        # Populate Initial Data if Not Exists
-        self.populate_initial_data()
-
-    def populate_initial_data(self):
-        # Populate Courses
-        courses_data = [
-            # Technology
-            ('cloud001', 'Cloud Computing Essentials', 'Technology', 'Intermediate', 299.99, 10, 15, 400),
-            ('cyber001', 'Cybersecurity Fundamentals', 'Technology', 'Beginner', 199.99, 8, 12, 300),
-            ('block001', 'Blockchain Basics', 'Technology', 'Advanced', 399.99, 12, 20, 500),
-            
-            # Business
-            ('fin001', 'Finance for Non-Finance Professionals', 'Business', 'Beginner', 149.99, 6, 10, 200),
-            ('ent001', 'Entrepreneurship 101', 'Business', 'Intermediate', 249.99, 8, 12, 300),
-            
-            # Creative
-            ('design001', 'Graphic Design Mastery', 'Creative', 'Advanced', 349.99, 10, 15, 400),
-            ('video001', 'Video Editing for Beginners', 'Creative', 'Beginner', 199.99, 6, 10, 200),
-            
-            # Personal Development
-            ('speak001', 'Public Speaking Confidence', 'Personal Development', 'Beginner', 99.99, 4, 8, 150),
-            ('lead001', 'Leadership Skills for Managers', 'Personal Development', 'Intermediate', 249.99, 8, 12, 300)
-        ]
-
-        # Insert courses into the database if they don't already exist
-        for course in courses_data:
-            self.cursor.execute('''
-                INSERT OR IGNORE INTO courses 
-                (id, title, category, difficulty, price, duration_weeks, total_modules, skill_points_reward) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', course)
-
-        self.conn.commit()
-
-        # Populate Modules for Courses
-        modules_data = [
-            # Modules for "Advanced Digital Marketing Mastery"
-            ('mod001', 'ds001', 'SEO Fundamentals', 'Learn the basics of SEO, including on-page and off-page optimization.', 'https://example.com/seo-video', 'Perform an SEO audit for a website.'),
-            ('mod002', 'ds001', 'Social Media Strategy', 'Understand how to create effective social media campaigns.', 'https://example.com/social-media-video', 'Design a social media campaign for a product.'),
-            
-            # Modules for "Professional Machine Learning Engineer"
-            ('mod003', 'ai001', 'Python for Machine Learning', 'Learn Python libraries like NumPy, Pandas, and Scikit-learn for ML.', 'https://example.com/python-ml-video', 'Build a simple machine learning model.'),
-            ('mod004', 'ai001', 'Deep Learning Techniques', 'Explore neural networks and deep learning frameworks.', 'https://example.com/deep-learning-video', 'Implement a neural network for image classification.')
-        ]
-
-        # Insert modules into the database if they don't already exist
-        for module in modules_data:
-            self.cursor.execute('''
-                INSERT OR IGNORE INTO course_modules 
-                (id, course_id, title, content, video_lecture_url, assignment_details) 
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', module)
-
-        self.conn.commit()
-
-        # Populate Job Opportunities
-        jobs_data = [
-            ('job001', 'Senior AI Engineer', 'TechCorp', 
-            'Develop advanced AI solutions and machine learning models', 
-            'Machine Learning,Python,AI', '$120,000 - $180,000', 'San Francisco, CA', True),
-            ('job002', 'Digital Marketing Specialist', 'MarketingPro', 
-            'Create and manage digital marketing campaigns', 
-            'Digital Marketing,SEO,Social Media', '$70,000 - $100,000', 'New York, NY', True),
-            ('job003', 'Full Stack Web Developer', 'WebInnovate', 
-            'Build scalable web applications', 
-            'JavaScript,React,Node.js,Python', '$90,000 - $140,000', 'Remote', True)
-        ]
-
-        # Insert job opportunities into the database if they don't already exist
-        for job in jobs_data:
-            self.cursor.execute('''
-                INSERT OR IGNORE INTO job_opportunities 
-                (id, title, company, description, required_skills, salary_range, location, remote_friendly) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', job)
+        # Create tables and populate initial data if not exists; only the first call in
+        # the process touches the database, later reruns get the recorded errors back
+        errors = initialize_storage(DB_PATH)
+        for table_name, error in errors:
+            st.error(f"Error creating table {table_name}: {error}")
 
-        self.conn.commit()
-    
     def enroll_in_course(self, user_id, course_id):
-        # Check if the user is already enrolled
-        self.cursor.execute('''
-            SELECT * FROM user_courses WHERE user_id = ? AND course_id = ?
-        ''', (user_id, course_id))
-        if self.cursor.fetchone():
-            st.warning("You are already enrolled in this course!")
-            return
-        
-        # Enroll the user in the course
-        self.cursor.execute('''
-            INSERT INTO user_courses (user_id, course_id, enrollment_date, completion_status, progress_percentage)
-            VALUES (?, ?, CURRENT_TIMESTAMP, 'In Progress', 0)
-        ''', (user_id, course_id))
-        self.conn.commit()
-        st.success("Successfully enrolled in the course!")
+        result = self.service.enroll_in_course(user_id, course_id)
+        if result.ok:
+            self.invalidate_dashboard()
+            st.success(result.message)
+        else:
+            st.warning(result.message)
+        return result
 
     def enrolled_courses(self):
         st.title("📘 Enrolled Courses")
         
         # Fetch enrolled courses for the user
         user_id = st.session_state['user_id']
-        self.cursor.execute('''
-            SELECT c.id, c.title, c.category, c.difficulty, uc.progress_percentage, uc.completion_status, c.duration_weeks
-            FROM user_courses uc
-            JOIN courses c ON uc.course_id = c.id
-            WHERE uc.user_id = ?
-        ''', (user_id,))
-        enrolled_courses = self.cursor.fetchall()
+        with profiler.phase('data'):
+            enrolled_courses = self.service.list_enrolled_courses(user_id)
         
         if not enrolled_courses:
             st.info("You have not enrolled in any courses yet. Explore courses to get started!")
@@ -282,78 +179,93 @@ class AdvancedLearnAndEarnPlatform:
         
         # Display enrolled courses
         for course in enrolled_courses:
-            course_id, title, category, difficulty, progress, status, duration = course
-            with st.expander(f"{title} ({difficulty}) - {status}"):
-                st.write(f"**Category:** {category}")
-                st.write(f"**Duration:** {duration} weeks")
-                st.write(f"**Progress:** {progress}%")
+            with st.expander(f"{course.title} ({course.difficulty}) - {course.status}"):
+                st.write(f"**Category:** {course.category}")
+                st.write(f"**Duration:** {course.duration_weeks} weeks")
+                st.write(f"**Progress:** {course.progress}%")
                 
-                if status == "In Progress":
-                    if st.button(f"Learn {title}", key=f"learn_{course_id}"):
-                        self.learn_course(user_id, course_id)
+                if course.status == "In Progress":
+                    # Remembered in session state, so opening a module (a rerun) keeps the course open
+                    if st.button(f"Learn {course.title}", key=f"learn_{course.course_id}"):
+                        st.session_state['learning_course'] = course.course_id
+                    if st.session_state.get('learning_course') == course.course_id:
+                        self.learn_course(user_id, course.course_id)
                     # Allow exam registration when progress is at least 20%
-                    if progress >= 20 and st.button(f"Register for Exam for {title}", key=f"exam_{course_id}"):
-                        self.register_for_exam(user_id, course_id)
-                elif status == "Exam Registered":
+                    if course.progress >= 20 and st.button(f"Register for Exam for {course.title}", key=f"exam_{course.course_id}"):
+                        self.register_for_exam(user_id, course.course_id)
+                elif course.status == "Exam Registered":
                     st.success("Exam Registered! 🎉")
-                elif status == "Completed":
+                elif course.status == "Completed":
                     st.success("Course Completed! 🎉")
+                    # Usually issued by the nightly batch; otherwise rendered once here and reused
+                    certificate = self.service.issue_certificate(user_id, course.course_id)
+                    if certificate:
+                        st.download_button("Download Certificate", self.service.get_certificate_bytes(certificate),
+                                           file_name=f"certificate_{certificate.certificate_id}.png",
+                                           mime="image/png", key=f"certificate_{course.course_id}")
 
     def learn_course(self, user_id, course_id):
         st.title("📖 Learn Course")
         
-        # Fetch course modules
-        self.cursor.execute('''
-            SELECT id, title, content, video_lecture_url, assignment_details 
-            FROM course_modules 
-            WHERE course_id = ?
-        ''', (course_id,))
-        modules = self.cursor.fetchall()
+        # Fetch module headers; notes and assignments stay compressed until a module is opened
+        modules = self.service.list_course_modules(course_id)
         
         if not modules:
             st.info("No modules available for this course.")
             return
         
+        # Quizzes come pre-parsed from the process-wide cache
+        quizzes = self.service.list_course_quizzes(course_id)
+
         # Display modules
         for i, module in enumerate(modules, 1):
-            module_id, title, content, video_url, assignment = module
-            st.subheader(f"Module {i}: {title}")
-            st.write(f"**Notes:** {content}")
-            if video_url:
-                st.video(video_url)
-            if assignment:
-                st.write(f"**Assignment:** {assignment}")
-                if st.button(f"Submit Assignment for {title}", key=f"submit_{module_id}"):
-                    self.submit_assignment(user_id, course_id, module_id)
-                    st.success(f"Assignment for '{title}' has been successfully submitted!")  # Success message
-            
-        # Check if all modules are completed
-        self.cursor.execute('''
-            SELECT COUNT(*) FROM course_modules 
-            WHERE course_id = ? AND id NOT IN (
-                SELECT module_id FROM user_assignments WHERE user_id = ? AND course_id = ?
-            )
-        ''', (course_id, user_id, course_id))
-        remaining_modules = self.cursor.fetchone()[0]
+            st.subheader(f"Module {i}: {module.title}")
+            if st.toggle("Open module", key=f"module_open_{module.id}"):
+                body = self.service.get_module_body(module)
+                st.write(f"**Notes:** {body.content}")
+                if body.video_url:
+                    st.video(body.video_url)
+                if body.assignment:
+                    st.write(f"**Assignment:** {body.assignment}")
+                    if st.button(f"Submit Assignment for {module.title}", key=f"submit_{module.id}"):
+                        self.submit_assignment(user_id, course_id, module.id)
+            if module.id in quizzes:
+                self.module_quiz(user_id, course_id, quizzes[module.id])
+
+        # Check if all modules are completed (progress is awarded on the final submission)
+        remaining_modules = self.service.count_remaining_modules(user_id, course_id)
         
         if remaining_modules == 0:
             st.success("All modules completed! You can now register for the exam.")
-            self.update_course_progress(user_id, course_id, 20)  # Add 20% progress for completing modules
         else:
             st.info(f"{remaining_modules} module(s) remaining to complete the course.")
 
+    def module_quiz(self, user_id, course_id, quiz):
+        with st.form(key=f"quiz_{quiz.module_id}"):
+            st.write("**Quiz**")
+            answers = []
+            for index, question in enumerate(quiz.questions):
+                choice = st.radio(question.prompt, range(len(question.options)), index=None,
+                                  format_func=lambda option, options=question.options: options[option],
+                                  key=f"quiz_{quiz.module_id}_{index}")
+                answers.append(choice)
+            submitted = st.form_submit_button("Check Answers")
+
+        if submitted:
+            result = self.service.submit_quiz(user_id, course_id, quiz.module_id, answers)
+            if result.ok:
+                self.invalidate_dashboard()
+                st.success(f"{result.message} Score: {result.score:g}%")
+            else:
+                st.warning(result.message)
+
     def register_for_exam(self, user_id, course_id):
         st.title("📋 Exam Registration")
         
         # Check if the user is eligible for the exam
-        self.cursor.execute('''
-            SELECT progress_percentage FROM user_courses 
-            WHERE user_id = ? AND course_id = ?
-        ''', (user_id, course_id))
-        progress = self.cursor.fetchone()[0]
-        
-        if progress < 20:  # Double-check eligibility
-            st.warning("You must complete all modules and assignments to register for the exam.")
+        eligibility = self.service.check_exam_eligibility(user_id, course_id)
+        if not eligibility.ok:
+            st.warning(eligibility.message)
             return
         
         # Display exam guidelines
@@ -371,70 +283,42 @@ class AdvancedLearnAndEarnPlatform:
         
         if accept_guidelines:
             if st.button("Register for Exam"):
-                # Register the user for the exam without updating the progress further.
-                self.cursor.execute('''
-                    UPDATE user_courses 
-                    SET completion_status = 'Exam Registered'
-                    WHERE user_id = ? AND course_id = ?
-                ''', (user_id, course_id))
-                self.conn.commit()
-                st.success("You have successfully registered for the exam!")
+                result = self.service.register_for_exam(user_id, course_id)
+                if result.ok:
+                    self.invalidate_dashboard()
+                    st.success(result.message)
+                else:
+                    st.warning(result.message)
         else:
             st.info("Please accept the guidelines to proceed with exam registration.")
         
     def submit_assignment(self, user_id, course_id, module_id):
-        st.info(f"Submitting assignment for User ID: {user_id}, Course ID: {course_id}, Module ID: {module_id}")
-        
-        # Check if the assignment is already submitted
-        self.cursor.execute('''
-            SELECT * FROM user_assignments 
-            WHERE user_id = ? AND course_id = ? AND module_id = ?
-        ''', (user_id, course_id, module_id))
-        if self.cursor.fetchone():
-            st.warning("You have already submitted this assignment.")
-            return
-        
-        # Submit the assignment
-        try:
-            self.cursor.execute('''
-                INSERT INTO user_assignments (user_id, course_id, module_id, submission_date)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (user_id, course_id, module_id))
-            self.conn.commit()
-            st.success(f"Assignment for module '{module_id}' submitted successfully!")
-            
-            # Debugging: Check remaining modules
-            self.cursor.execute('''
-                SELECT COUNT(*) FROM course_modules 
-                WHERE course_id = ? AND id NOT IN (
-                    SELECT module_id FROM user_assignments WHERE user_id = ? AND course_id = ?
-                )
-            ''', (course_id, user_id, course_id))
-            remaining_modules = self.cursor.fetchone()[0]
-            st.info(f"Remaining modules: {remaining_modules}")
-            
-            if remaining_modules == 0:
-                st.success("All modules completed! You have earned 20% progress. You can now register for the exam.")
-                self.update_course_progress(user_id, course_id, 20)  # Add 20% progress for completing modules
-            else:
-                st.info(f"{remaining_modules} module(s) remaining to complete the course.")
-        except sqlite3.Error as e:
-            st.error(f"Error submitting assignment: {e}")
+        result = self.service.submit_assignment(user_id, course_id, module_id)
+        if result.outcome == ALREADY_EXISTS:
+            st.warning(result.message)
+            return result
+        if not result.ok:
+            st.error(result.message)
+            return result
+
+        self.invalidate_dashboard()
+        st.success(result.message)
+        if result.remaining_modules == 0:
+            st.success("All modules completed! You have earned 20% progress. You can now register for the exam.")
+            if result.progress is not None and result.progress.ok:
+                st.success(result.progress.message)
+        else:
+            st.info(f"{result.remaining_modules} module(s) remaining to complete the course.")
+        return result
 
     def evaluate_performance(self, user_id, course_id):
-        # Mock performance evaluation logic
-        performance_score = random.randint(70, 100)  # Example: Random score between 70 and 100
-        
-        # Assign achievements based on performance
-        if performance_score >= 90:
-            badge_type = "Gold"
-        elif performance_score >= 75:
-            badge_type = "Silver"
+        result = self.service.evaluate_performance(user_id, course_id)
+        if result.ok:
+            self.invalidate_dashboard()
+            st.success(result.message)
         else:
-            badge_type = "Bronze"
-        
-        self.update_user_achievements(user_id, course_id, badge_type)
-        st.success(f"Congratulations! You earned a {badge_type} badge for this course.")
+            st.warning(result.message)
+        return result
 
     def search_and_filter_courses(self):
         st.title("🔍 Search and Filter Courses")
@@ -447,76 +331,23 @@ class AdvancedLearnAndEarnPlatform:
         difficulty_filter = st.selectbox("Filter by Difficulty", ['All', 'Beginner', 'Intermediate', 'Advanced'])
         
         # Fetch courses based on filters
-        query = '''
-            SELECT id, title, category, difficulty, price 
-            FROM courses 
-            WHERE title LIKE ? AND (category = ? OR ? = 'All') AND (difficulty = ? OR ? = 'All')
-        '''
-        self.cursor.execute(query, (f"%{search_query}%", category_filter, category_filter, difficulty_filter, difficulty_filter))
-        courses = self.cursor.fetchall()
+        courses = self.service.search_courses(search_query, category_filter, difficulty_filter)
         
         # Display filtered courses
         for course in courses:
-            course_id, title, category, difficulty, price = course
-            with st.expander(f"{title} ({difficulty}) - ${price:.2f}"):
-                if st.button(f"Enroll in {title}", key=course_id):
-                    self.enroll_in_course(st.session_state['user_id'], course_id)
-                    st.success(f"Enrolled in {title}!")
+            with st.expander(f"{course.title} ({course.difficulty}) - ${course.price:.2f}"):
+                artwork = self.service.get_course_image(course.id, 'thumb')
+                if artwork:
+                    st.image(artwork, width=120)
+                st.caption(f"Enrolling costs {credits_for_price(course.price):g} learning credits")
+                if st.button(f"Enroll in {course.title}", key=course.id):
+                    self.enroll_in_course(st.session_state['user_id'], course.id)
 
     def create_comprehensive_course_catalog(self):
-        return {
-            'Digital Marketing': [
-                {
-                    'id': 'ds001',
-                    'name': 'Advanced Digital Marketing Mastery',
-                    'modules': [
-                        {'title': 'SEO Fundamentals', 'video_url': '', 'assignment': 'SEO Audit Project'},
-                        {'title': 'Social Media Strategy', 'video_url': '', 'assignment': 'Campaign Design'}
-                    ],
-                    'skills_gained': ['SEO', 'Social Media Marketing', 'Analytics'],
-                    'certification_potential': True
-                }
-            ],
-            'Artificial Intelligence': [
-                {
-                    'id': 'ai001',
-                    'name': 'Professional Machine Learning Engineer',
-                    'modules': [
-                        {'title': 'Python for Machine Learning', 'video_url': '', 'assignment': 'ML Model Development'},
-                        {'title': 'Deep Learning Techniques', 'video_url': '', 'assignment': 'Neural Network Project'}
-                    ],
-                    'skills_gained': ['Machine Learning', 'Python', 'Deep Learning'],
-                    'certification_potential': True
-                }
-            ]
-        }
-
-    def create_advanced_job_marketplace(self):
-        return [
-            {
-                'id': 'job001',
-                'title': 'Senior AI Engineer',
-                'company': 'TechCorp',
-                'skills_required': ['Machine Learning', 'Python', 'AI'],
-                'salary_range': '$120,000 - $180,000',
-                'location': 'San Francisco, CA',
-                'remote': True
-            }
-        ]
+        return COURSE_CATALOG
 
     def create_skill_ecosystem(self):
-        return {
-            'Digital Marketing': {
-                'entry_level_jobs': ['Social Media Coordinator', 'Digital Marketing Assistant'],
-                'mid_level_jobs': ['Digital Marketing Specialist', 'SEO Strategist'],
-                'advanced_jobs': ['Digital Marketing Manager', 'Head of Digital Strategy']
-            },
-            'Artificial Intelligence': {
-                'entry_level_jobs': ['AI Research Assistant', 'Machine Learning Intern'],
-                'mid_level_jobs': ['Machine Learning Engineer', 'AI Developer'],
-                'advanced_jobs': ['Senior AI Scientist', 'AI Research Lead']
-            }
-        }
+        return SKILL_ECOSYSTEM
 
     def user_registration(self):
         st.title("Learn & Earn Pro - Registration")
@@ -535,104 +366,63 @@ class AdvancedLearnAndEarnPlatform:
                 self.register_new_user(username, email, password, primary_skill)
 
     def register_new_user(self, username, email, password, primary_skill):
-        # Implement secure registration
-        hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        
-        try:
-            self.cursor.execute('''
-                INSERT INTO users 
-                (username, email, password, primary_skill, learning_credits, skill_points, total_earnings) 
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (username, email, hashed_password, primary_skill, 100.0, 0, 0.0))
-            self.conn.commit()
-            st.success("Registration Successful!")
-        except sqlite3.IntegrityError:
-            st.error("Username or Email already exists")
+        result = self.service.register_user(username, email, password, primary_skill)
+        if result.ok:
+            st.success(result.message)
+        else:
+            st.error(result.message)
 
     def get_user_metrics(self, user_id):
-        self.cursor.execute('''
-            SELECT learning_credits, skill_points, total_earnings, 
-                (SELECT COUNT(*) FROM user_courses WHERE user_id = ? AND completion_status = 'Completed') AS completed_courses,
-                (SELECT COUNT(*) FROM user_courses WHERE user_id = ? AND completion_status = 'In Progress') AS in_progress_courses
-            FROM users WHERE id = ?
-        ''', (user_id, user_id, user_id))
-        return self.cursor.fetchone()
+        return self.service.get_user_metrics(user_id)
 
     def course_recommendation_engine(self, user_skills):
-        # AI-powered course recommendations
-        recommended_courses = []
-        for category, courses in self.course_catalog.items():
-            for course in courses:
-                # Match courses based on overlapping skills
-                matching_skills = set(course['skills_gained']) & set(user_skills)
-                if matching_skills:
-                    recommended_courses.append(course)
-        return recommended_courses
+        # Semantic recommendations from the local course index
+        return self.service.match_courses(user_skills, self.course_catalog)
 
     def update_user_skills(self, user_id, skills_gained):
-        for skill in skills_gained:
-            # Check if the skill already exists for the user
-            self.cursor.execute('''
-                SELECT * FROM user_skills WHERE user_id = ? AND skill_name = ?
-            ''', (user_id, skill))
-            existing_skill = self.cursor.fetchone()
-            
-            if existing_skill:
-                # Update experience points for the existing skill
-                self.cursor.execute('''
-                    UPDATE user_skills 
-                    SET experience_points = experience_points + 10 
-                    WHERE user_id = ? AND skill_name = ?
-                ''', (user_id, skill))
-            else:
-                # Insert a new skill
-                self.cursor.execute('''
-                    INSERT INTO user_skills (user_id, skill_name, proficiency_level, experience_points)
-                    VALUES (?, ?, ?, ?)
-                ''', (user_id, skill, 'Beginner', 10))
-        
-        self.conn.commit()
+        self.service.update_user_skills(user_id, skills_gained)
 
     def skill_progression_dashboard(self):
         st.title("Skill Progression & Recommendations")
         
         # Fetch user skills
         user_id = st.session_state['user_id']
-        self.cursor.execute('''
-            SELECT skill_name, experience_points 
-            FROM user_skills 
-            WHERE user_id = ?
-        ''', (user_id,))
-        skills_data = [{'Skill': row[0], 'Progress': row[1]} for row in self.cursor.fetchall()]
+        with profiler.phase('data'):
+            skills_data = [{'Skill': skill.skill_name, 'Progress': skill.experience_points}
+                           for skill in self.service.get_user_skills(user_id)]
         
         if not skills_data:
             # No skills found - guide the user to enroll in courses
             st.info("No skills found. Explore courses to start building your skills!")
             
             # Fetch all available courses
-            self.cursor.execute('SELECT id, title, category, difficulty, price FROM courses')
-            courses = self.cursor.fetchall()
+            with profiler.phase('data'):
+                courses = self.service.search_courses()
             
             # Display courses
             st.subheader("📚 Explore Courses")
             for course in courses:
-                course_id, title, category, difficulty, price = course
-                with st.expander(f"{title} ({difficulty}) - ${price:.2f}"):
-                    st.write(f"Category: {category}")
-                    st.write(f"Difficulty: {difficulty}")
-                    st.write(f"Price: ${price:.2f}")
-                    if st.button(f"Enroll in {title}", key=course_id):
-                        self.enroll_in_course(user_id, course_id)
-                        st.success(f"Enrolled in {title}!")
+                with st.expander(f"{course.title} ({course.difficulty}) - ${course.price:.2f}"):
+                    artwork = self.service.get_course_image(course.id, 'thumb')
+                    if artwork:
+                        st.image(artwork, width=120)
+                    st.write(f"Category: {course.category}")
+                    st.write(f"Difficulty: {course.difficulty}")
+                    st.write(f"Price: ${course.price:.2f}")
+                    st.write(f"Cost: {credits_for_price(course.price):g} learning credits")
+                    if st.button(f"Enroll in {course.title}", key=course.id):
+                        self.enroll_in_course(user_id, course.id)
             return  # Exit the method after showing courses
         
         # If skills are found, display skill progression
-        df = pd.DataFrame(skills_data)
+        with profiler.phase('dataframe'):
+            df = pd.DataFrame(skills_data)
         
         # Skill Progress Bar Chart
-        fig = px.bar(df, x='Skill', y='Progress', 
-                    title='Your Skill Progression',
-                    labels={'Progress': 'Skill Level (%)'})
+        with profiler.phase('figure'):
+            fig = px.bar(df, x='Skill', y='Progress', 
+                        title='Your Skill Progression',
+                        labels={'Progress': 'Skill Level (%)'})
         st.plotly_chart(fig)
 
         # Course Recommendations Section
@@ -640,7 +430,15 @@ class AdvancedLearnAndEarnPlatform:
         
         # Fetch user's skills and recommend courses
         user_skills = [skill['Skill'] for skill in skills_data]
-        recommended_courses = self.course_recommendation_engine(user_skills)
+        with profiler.phase('data'):
+            # Prefer the batch job's result; compute inline when it is missing or stale
+            precomputed = self.service.get_precomputed(user_id, 'recommendations', PRECOMPUTED_MAX_AGE)
+            if precomputed is not None:
+                recommended_ids = set(precomputed)
+                recommended_courses = [course for course in iter_catalog_courses(self.course_catalog)
+                                       if course['id'] in recommended_ids]
+            else:
+                recommended_courses = self.course_recommendation_engine(user_skills)
         
         if not recommended_courses:
             st.info("No course recommendations available. Try adding more skills!")
@@ -650,56 +448,29 @@ class AdvancedLearnAndEarnPlatform:
                     st.write(f"Skills Gained: {', '.join(course['skills_gained'])}")
                     if st.button(f"Enroll in {course['name']}", key=course['id']):
                         self.enroll_in_course(user_id, course['id'])
-                        st.success(f"Enrolled in {course['name']}!")
 
     def job_matching_system(self):
         st.title("Job Matching & Opportunities")
         
-        # Fetch user badges
+        # Filter jobs based on the user's skills and badges
         user_id = st.session_state['user_id']
-        self.cursor.execute('''
-            SELECT skill_name FROM user_skills WHERE user_id = ?
-        ''', (user_id,))
-        user_badges = [row[0] for row in self.cursor.fetchall()]
-
-        # Filter jobs based on badges
-        matching_jobs = []
-        for job in self.job_marketplace:
-            if any(badge.split(' ')[0] in job['skills_required'] for badge in user_badges):
-                matching_jobs.append(job)
+        with profiler.phase('data'):
+            matching_jobs = self.service.search_jobs_for_user(user_id)
         
         st.subheader("Recommended Jobs")
         for job in matching_jobs:
-            with st.expander(job['title']):
-                st.write(f"Company: {job.get('company', 'N/A')}")
-                st.write(f"Skills Required: {', '.join(job['skills_required'])}")
-                st.write(f"Salary Range: {job['salary_range']}")
+            with st.expander(job.title):
+                st.write(f"Company: {job.company or 'N/A'}")
+                st.write(f"Skills Required: {', '.join(job.skills_required)}")
+                st.write(f"Salary Range: {job.salary_range}")
                 
-                if st.button(f"Apply to {job['title']}"):
-                    st.success(f"Application for {job['title']} submitted!")
+                if st.button(f"Apply to {job.title}", key=f"jobs_apply_{job.id}"):
+                    if self.apply_to_job(user_id, job.id).ok:
+                        st.success(f"Application for {job.title} submitted!")
     
     def get_upcoming_deadlines(self, user_id):
-        # Fetch deadlines for enrolled courses
-        self.cursor.execute('''
-            SELECT c.title AS Task, uc.enrollment_date + c.duration_weeks * 7 AS DueDate
-            FROM user_courses uc
-            JOIN courses c ON uc.course_id = c.id
-            WHERE uc.user_id = ? AND uc.completion_status = 'In Progress'
-        ''', (user_id,))
-        course_deadlines = [{'Task': row[0], 'DueDate': row[1]} for row in self.cursor.fetchall()]
-
-        # Fetch deadlines for job applications
-        self.cursor.execute('''
-            SELECT j.title AS Task, uja.application_date + 7 AS DueDate
-            FROM user_job_applications uja
-            JOIN job_opportunities j ON uja.job_id = j.id
-            WHERE uja.user_id = ? AND uja.status = 'Pending'
-        ''', (user_id,))
-        job_deadlines = [{'Task': row[0], 'DueDate': row[1]} for row in self.cursor.fetchall()]
-
-        # Combine all deadlines
-        deadlines = course_deadlines + job_deadlines
-        return deadlines
+        return [{'Task': deadline.task, 'DueDate': deadline.due_date}
+                for deadline in self.service.get_upcoming_deadlines(user_id)]
 
     def display_deadline_graph(self, deadlines):
         if not deadlines:
@@ -707,36 +478,25 @@ class AdvancedLearnAndEarnPlatform:
             return
 
         # Convert deadlines to a DataFrame
-        df = pd.DataFrame(deadlines)
-        df['DueDate'] = pd.to_datetime(df['DueDate']).dt.floor('s')  # Remove nanoseconds
+        with profiler.phase('dataframe'):
+            df = pd.DataFrame(deadlines)
+            df['DueDate'] = pd.to_datetime(df['DueDate']).dt.floor('s')  # Remove nanoseconds
 
         # Create a bar chart for deadlines
-        fig = px.bar(
-            df,
-            x='DueDate',
-            y='Task',
-            title="Upcoming Deadlines",
-            labels={'DueDate': 'Deadline', 'Task': 'Task'},
-            color='DueDate',
-            color_continuous_scale=px.colors.sequential.Viridis
-        )
+        with profiler.phase('figure'):
+            fig = px.bar(
+                df,
+                x='DueDate',
+                y='Task',
+                title="Upcoming Deadlines",
+                labels={'DueDate': 'Deadline', 'Task': 'Task'},
+                color='DueDate',
+                color_continuous_scale=px.colors.sequential.Viridis
+            )
         st.plotly_chart(fig, use_container_width=True)
 
     def get_notifications(self, user_id):
-        notifications = []
-
-        # Fetch upcoming deadlines
-        deadlines = self.get_upcoming_deadlines(user_id)
-        for deadline in deadlines:
-            days_left = (pd.to_datetime(deadline['DueDate']) - pd.Timestamp.now()).days
-            if days_left <= 3:  # Notify if the deadline is within 3 days
-                notifications.append(f"⏳ Reminder: '{deadline['Task']}' is due in {days_left} days!")
-
-        # Add other notifications (e.g., achievements, job opportunities)
-        notifications.append("🎉 You earned 50 skill points for completing a module!")
-        notifications.append("💼 New job opportunity: Senior AI Engineer at TechCorp")
-
-        return notifications
+        return self.service.get_notifications(user_id)
 
     def interactive_learning_path(self):
         st.title("🛤️ Interactive Learning Path")
@@ -753,11 +513,7 @@ class AdvancedLearnAndEarnPlatform:
         
         # Fetch user progress dynamically (replace with actual database logic)
         user_id = st.session_state['user_id']
-        self.cursor.execute('''
-            SELECT COUNT(*) FROM user_courses 
-            WHERE user_id = ? AND completion_status = 'Completed'
-        ''', (user_id,))
-        user_progress = self.cursor.fetchone()[0]  # Number of completed stages
+        user_progress = self.service.count_completed_courses(user_id)  # Number of completed stages
 
         # Display the learning path
         for i, stage in enumerate(learning_stages, 1):
@@ -774,117 +530,29 @@ class AdvancedLearnAndEarnPlatform:
             if i < len(learning_stages):
                 st.markdown("↓")
 
+    def invalidate_dashboard(self):
+        # Writes made from this session change the dashboard cache keys, so every
+        # section recomputes on its next run instead of waiting out the TTL
+        st.session_state['dashboard_version'] = st.session_state.get('dashboard_version', 0) + 1
+
     def main_dashboard(self):
         # Dashboard Title
         st.title("🌟 Learn & Earn Pro Dashboard 🚀")
-        
-        # Notification Icon at the Top
-        with st.container():
-            col1, col2 = st.columns([9, 1])  # Adjust column widths
-            with col1:
-                st.markdown("---")  # Add a horizontal line for better separation
-            with col2:
-                if st.button("🔔"):  # Notification button
-                    st.session_state['show_notifications'] = not st.session_state.get('show_notifications', False)
-        
-        # Show Notifications if the button is clicked
-        if st.session_state.get('show_notifications', False):
-            st.subheader("🔔 Notifications")
-            notifications = [
-                "New job opportunity: Senior AI Engineer at TechCorp",
-                "You earned 50 skill points for completing a module!",
-                "Upcoming deadline: Complete 'Social Media Strategy' by March 30."
-            ]
-            for notification in notifications:
-                st.write(f"✅ {notification}")
-            st.markdown("---")  # Add a horizontal line for better separation
-
-        # Fetch user metrics
-        user_id = st.session_state['user_id']
-        metrics = self.get_user_metrics(user_id)
-        learning_credits, skill_points, total_earnings, completed_courses, in_progress_courses = metrics
-
-        # Key Metrics Section
-        st.subheader("📊 Key Metrics")
-        with st.container():
-            col1, col2, col3 = st.columns(3, gap="large")
-            with col1:
-                st.metric("Completed Courses", completed_courses)
-                st.metric("Skill Points", skill_points)
-            with col2:
-                st.metric("In Progress Courses", in_progress_courses)
-                st.metric("Learning Credits", learning_credits)
-            with col3:
-                st.metric("Total Earnings", f"${total_earnings:.2f}")
-                st.metric("Potential Job Matches", 5)  # Example static value
 
+        # Each section is a fragment: a click inside one reruns only that section,
+        # and every section reads through its own cached loader
+        user_id = st.session_state['user_id']
+        self.dashboard_notifications(user_id)
+        self.dashboard_metrics(user_id)
         st.markdown("---")  # Add a horizontal line for better separation
-
-        # Real-Time Progress Tracking Section
-        st.subheader("📈 Real-Time Progress Tracking")
-        progress_data = self.get_course_progress(user_id)
-        progress_df = pd.DataFrame(progress_data, columns=['Course', 'Progress'])
-
-        if progress_df.empty:
-            st.info("No course progress data available. Enroll in a course to start tracking your progress!")
-        else:
-            progress_chart = px.bar(
-                progress_df,
-                x='Course',
-                y='Progress',
-                title="Course Progress",
-                labels={'Progress': 'Completion (%)'},
-                color='Progress',
-                color_continuous_scale=px.colors.sequential.Viridis
-            )
-            st.plotly_chart(progress_chart, use_container_width=True)
-
+        self.dashboard_progress(user_id)
         st.markdown("---")  # Add a horizontal line for better separation
-
-        # Achievements Section
-        st.subheader("🏅 Your Achievements")
-        self.cursor.execute('''
-            SELECT skill_name, proficiency_level FROM user_skills WHERE user_id = ?
-        ''', (user_id,))
-        badges = self.cursor.fetchall()
-
-        if badges:
-            with st.container():
-                cols = st.columns(len(badges))
-                for i, (badge_name, badge_type) in enumerate(badges):
-                    with cols[i]:
-                        st.markdown(f"🏆 **{badge_name}** ({badge_type})")
-        else:
-            st.info("No achievements yet. Complete courses to earn badges!")
-
-        # Leaderboard Section
-        st.subheader("📋 Leaderboard")
-        leaderboard_data = [
-            {'Rank': 1, 'Username': 'pro_learner', 'Skill Points': 1200},
-            {'Rank': 2, 'Username': 'ai_master', 'Skill Points': 1100},
-            {'Rank': 3, 'Username': 'web_dev', 'Skill Points': 950}
-        ]
-        leaderboard_df = pd.DataFrame(leaderboard_data)
-        st.table(leaderboard_df)
-
+        self.dashboard_achievements(user_id)
+        self.dashboard_leaderboard()
         st.markdown("---")  # Add a horizontal line for better separation
-
-        # Personalized Recommendations Section
-        st.subheader("🎯 Personalized Recommendations")
-        recommended_courses = self.course_recommendation_engine(['Digital Marketing', 'SEO'])
-        for course in recommended_courses:
-            with st.expander(course['name']):
-                st.write(f"Skills Gained: {', '.join(course['skills_gained'])}")
-                if st.button(f"Enroll in {course['name']}"):
-                    st.success(f"Enrolled in {course['name']}!")
-
+        self.dashboard_recommendations(user_id)
         st.markdown("---")  # Add a horizontal line for better separation
-
-        # Upcoming Deadlines Section
-        st.subheader("⏳ Upcoming Deadlines")
-        deadlines = self.get_upcoming_deadlines(user_id)
-        self.display_deadline_graph(deadlines)
-
+        self.dashboard_deadlines(user_id)
         st.markdown("---")  # Add a horizontal line for better separation
 
         # Interactive Learning Path Section
@@ -901,151 +569,223 @@ class AdvancedLearnAndEarnPlatform:
             st.markdown(f"{i}. **{stage}**")
             if i < len(learning_stages):
                 st.markdown("↓")
+
+    @st.fragment
+    def dashboard_notifications(self, user_id):
+        # Fragment reruns happen outside run()'s page, so each section profiles under its own name
+        with profiler.page("Dashboard: Notifications"):
+            # Notification Icon at the Top
+            with st.container():
+                col1, col2 = st.columns([9, 1])  # Adjust column widths
+                with col1:
+                    st.markdown("---")  # Add a horizontal line for better separation
+                with col2:
+                    if st.button("🔔"):  # Notification button
+                        st.session_state['show_notifications'] = not st.session_state.get('show_notifications', False)
+
+            # Show Notifications if the button is clicked
+            if st.session_state.get('show_notifications', False):
+                st.subheader("🔔 Notifications")
+                with profiler.phase('data'):
+                    notifications = load_dashboard_notifications(self.service, user_id, dashboard_version())
+                for notification in notifications:
+                    st.write(notification)
+                st.markdown("---")  # Add a horizontal line for better separation
+
+    @st.fragment
+    def dashboard_metrics(self, user_id):
+        with profiler.page("Dashboard: Metrics"):
+            with profiler.phase('data'):
+                metrics, summary = load_dashboard_metrics(self.service, user_id, dashboard_version())
+
+            # Key Metrics Section
+            st.subheader("📊 Key Metrics")
+            with st.container():
+                col1, col2, col3 = st.columns(3, gap="large")
+                with col1:
+                    st.metric("Completed Courses", summary.completed_courses)
+                    st.metric("Skill Points", metrics.skill_points)
+                with col2:
+                    st.metric("In Progress Courses", summary.in_progress_courses)
+                    st.metric("Learning Credits", metrics.learning_credits)
+                with col3:
+                    st.metric("Total Earnings", f"${metrics.total_earnings:.2f}")
+                    st.metric("Potential Job Matches", 5)  # Example static value
+
+    @st.fragment
+    def dashboard_progress(self, user_id):
+        with profiler.page("Dashboard: Progress"):
+            # Real-Time Progress Tracking Section
+            st.subheader("📈 Real-Time Progress Tracking")
+            with profiler.phase('data'):
+                progress_df = load_dashboard_progress(self.service, user_id, dashboard_version())
+
+            if progress_df.empty:
+                st.info("No course progress data available. Enroll in a course to start tracking your progress!")
+            else:
+                with profiler.phase('figure'):
+                    progress_chart = px.bar(
+                        progress_df,
+                        x='Course',
+                        y='Progress',
+                        title="Course Progress",
+                        labels={'Progress': 'Completion (%)'},
+                        color='Progress',
+                        color_continuous_scale=px.colors.sequential.Viridis
+                    )
+                st.plotly_chart(progress_chart, use_container_width=True)
+
+    @st.fragment
+    def dashboard_achievements(self, user_id):
+        with profiler.page("Dashboard: Achievements"):
+            # Achievements Section
+            st.subheader("🏅 Your Achievements")
+            with profiler.phase('data'):
+                badges = load_dashboard_badges(self.service, user_id, dashboard_version())
+
+            if badges:
+                with st.container():
+                    cols = st.columns(len(badges))
+                    for i, (badge_name, badge_type) in enumerate(badges):
+                        with cols[i]:
+                            st.markdown(f"🏆 **{badge_name}** ({badge_type})")
+            else:
+                st.info("No achievements yet. Complete courses to earn badges!")
+
+    @st.fragment
+    def dashboard_leaderboard(self):
+        with profiler.page("Dashboard: Leaderboard"):
+            # Leaderboard Section
+            st.subheader("📋 Leaderboard")
+            with profiler.phase('data'):
+                leaderboard_df = load_leaderboard(self.service)
+            st.table(leaderboard_df)
+
+    @st.fragment
+    def dashboard_recommendations(self, user_id):
+        with profiler.page("Dashboard: Recommendations"):
+            # Personalized Recommendations Section
+            st.subheader("🎯 Personalized Recommendations")
+            with profiler.phase('data'):
+                recommended_courses = load_dashboard_recommendations(self.service, user_id, dashboard_version())
+            if not recommended_courses:
+                st.info("No course recommendations yet. Complete courses or upload your skills to get some!")
+            for course in recommended_courses:
+                with st.expander(course['name']):
+                    st.write(f"Skills Gained: {', '.join(course['skills_gained'])}")
+                    # Only this fragment reruns; the other sections pick the enrollment up on their next run
+                    if st.button(f"Enroll in {course['name']}", key=f"dashboard_enroll_{course['id']}"):
+                        self.enroll_in_course(user_id, course['id'])
+
+    @st.fragment
+    def dashboard_deadlines(self, user_id):
+        with profiler.page("Dashboard: Deadlines"):
+            # Upcoming Deadlines Section
+            st.subheader("⏳ Upcoming Deadlines")
+            with profiler.phase('data'):
+                deadlines = load_dashboard_deadlines(self.service, user_id, dashboard_version())
+            self.display_deadline_graph(deadlines)
     
     def update_user_metrics(self, user_id, skill_points=0, earnings=0.0, course_id=None):
-        # Update skill points and earnings
-        self.cursor.execute('''
-            UPDATE users 
-            SET skill_points = skill_points + ?, 
-                total_earnings = total_earnings + ?
-            WHERE id = ?
-        ''', (skill_points, earnings, user_id))
-        
-        # Mark course as completed if course_id is provided
-        if course_id:
-            self.cursor.execute('''
-                UPDATE user_courses 
-                SET completion_status = 'Completed', progress_percentage = 100, completed_date = CURRENT_TIMESTAMP
-                WHERE user_id = ? AND course_id = ?
-            ''', (user_id, course_id))
-
-            # Assign badge based on course difficulty
-            self.cursor.execute('SELECT difficulty FROM courses WHERE id = ?', (course_id,))
-            course_difficulty = self.cursor.fetchone()[0]
-            badge_type = 'Gold' if course_difficulty == 'Advanced' else 'Silver' if course_difficulty == 'Intermediate' else 'Bronze'
-            self.update_user_achievements(user_id, course_id, badge_type)
-
-        self.conn.commit()
+        return self.service.update_user_metrics(user_id, skill_points, earnings, course_id)
     
     def update_user_achievements(self, user_id, course_id, badge_type):
-        # Define earnings based on badge type
-        badge_earnings = {
-            'Gold': 500,
-            'Silver': 300,
-            'Bronze': 100
-        }
-        earnings = badge_earnings.get(badge_type, 0)
-
-        # Update user earnings and assign badge
-        self.cursor.execute('''
-            UPDATE users 
-            SET total_earnings = total_earnings + ?
-            WHERE id = ?
-        ''', (earnings, user_id))
-
-        # Insert badge into achievements table
-        self.cursor.execute('''
-            INSERT INTO user_skills (user_id, skill_name, proficiency_level, experience_points)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, f"{badge_type} Badge for {course_id}", badge_type, earnings))
-
-        self.conn.commit()
+        return self.service.update_user_achievements(user_id, course_id, badge_type)
 
     def get_course_progress(self, user_id):
-        self.cursor.execute('''
-            SELECT c.title AS Course, uc.progress_percentage AS Progress
-            FROM user_courses uc
-            JOIN courses c ON uc.course_id = c.id
-            WHERE uc.user_id = ?
-        ''', (user_id,))
-        result = self.cursor.fetchall()
-        if not result:
-            return []  # Return an empty list if no data is found
-        return result
+        return self.service.get_course_progress(user_id)
     
     def update_course_progress(self, user_id, course_id, progress_increment):
-        # Fetch current progress and status
-        self.cursor.execute('''
-            SELECT progress_percentage, completion_status FROM user_courses 
-            WHERE user_id = ? AND course_id = ?
-        ''', (user_id, course_id))
-        row = self.cursor.fetchone()
-        current_progress = row[0]
-        current_status = row[1]
-        
-        # Update progress
-        new_progress = min(current_progress + progress_increment, 100)  # Cap progress at 100%
-        if current_status == "Exam Registered":
-            new_status = "Exam Registered"
+        result = self.service.update_course_progress(user_id, course_id, progress_increment)
+        if result.ok:
+            self.invalidate_dashboard()
+            st.success(result.message)
         else:
-            new_status = 'Completed' if new_progress == 100 else 'In Progress'
-        
-        self.cursor.execute('''
-            UPDATE user_courses 
-            SET progress_percentage = ?, completion_status = ?
-            WHERE user_id = ? AND course_id = ?
-        ''', (new_progress, new_status, user_id, course_id))
-        self.conn.commit()
-        st.success(f"Progress updated to {new_progress}%!")
+            st.warning(result.message)
+        return result
 
     def ai_based_job_matching(self):
         st.title("🤖 AI-Based Job Matching")
         
-        # Input space for uploading skills
-        uploaded_file = st.file_uploader("Upload your skills file (JSON format)", type=["json"])
+        # Input space for uploading skills (recruiters can upload many candidates at once)
+        uploaded_files = st.file_uploader("Upload your skills file (JSON or JSONL format)", type=["json", "jsonl"],
+                                          accept_multiple_files=True)
         
-        if uploaded_file:
+        if not uploaded_files:
+            return
+
+        # Parse uploads incrementally; repeated files are served from the hash cache
+        candidates = []
+        for uploaded_file in uploaded_files:
             try:
-                # Parse uploaded JSON file
-                skills_data = json.load(uploaded_file)
-                uploaded_skills = skills_data.get("skills", [])
-                
-                if not uploaded_skills:
-                    st.warning("No skills found in the uploaded file. Please ensure the file contains a 'skills' key.")
-                    return
-                
-                st.success(f"Skills uploaded successfully: {', '.join(uploaded_skills)}")
-                
-                # AI-based job matching
-                st.subheader("🔍 Matching Jobs")
-                matching_jobs = self.get_ai_matched_jobs(uploaded_skills)
-                
-                if not matching_jobs:
-                    st.info("No matching jobs found for the uploaded skills.")
-                else:
-                    for job in matching_jobs:
-                        with st.expander(job['title']):
-                            st.write(f"**Company:** {job['company']}")
-                            st.write(f"**Skills Required:** {', '.join(job['skills_required'])}")
-                            st.write(f"**Salary Range:** {job['salary_range']}")
-                            st.write(f"**Location:** {job['location']}")
-                            st.write(f"**Remote Friendly:** {'Yes' if job['remote'] else 'No'}")
-                            if st.button(f"Apply to {job['title']}", key=f"apply_{job['id']}"):
-                                self.apply_to_job(st.session_state['user_id'], job['id'])
-                                st.success(f"Application for '{job['title']}' submitted!")
-            except json.JSONDecodeError:
-                st.error("Invalid JSON file. Please upload a valid JSON file containing your skills.")
+                with st.spinner(f"Processing {uploaded_file.name}..."):
+                    result = process_upload(uploaded_file, self.service.skills, uploaded_file.name)
+            except UploadError as e:
+                st.error(f"{uploaded_file.name}: {e}. Please upload a valid JSON file containing your skills.")
+                continue
+            if result.invalid_records:
+                st.warning(f"{uploaded_file.name}: skipped {result.invalid_records} record(s) without skills.")
+            candidates.extend(result.candidates)
+
+        if not candidates:
+            st.warning("No skills found in the uploaded file. Please ensure the file contains a 'skills' key.")
+            return
+
+        if len(candidates) > 1:
+            self.display_batch_job_matches(candidates)
+            return
+
+        uploaded_skills = list(candidates[0].skills)
+        st.success(f"Skills uploaded successfully: {', '.join(uploaded_skills)}")
+        
+        # AI-based job matching
+        st.subheader("🔍 Matching Jobs")
+        matching_jobs = self.get_ai_matched_jobs(uploaded_skills)
+        
+        if not matching_jobs:
+            st.info("No matching jobs found for the uploaded skills.")
+        else:
+            for job in matching_jobs:
+                with st.expander(job.title):
+                    st.write(f"**Company:** {job.company}")
+                    st.write(f"**Skills Required:** {', '.join(job.skills_required)}")
+                    st.write(f"**Salary Range:** {job.salary_range}")
+                    st.write(f"**Location:** {job.location}")
+                    st.write(f"**Remote Friendly:** {'Yes' if job.remote else 'No'}")
+                    if st.button(f"Apply to {job.title}", key=f"apply_{job.id}"):
+                        if self.apply_to_job(st.session_state['user_id'], job.id).ok:
+                            st.success(f"Application for '{job.title}' submitted!")
+
+    def display_batch_job_matches(self, candidates):
+        st.success(f"{len(candidates)} candidates uploaded successfully.")
+        st.subheader("🔍 Matching Jobs by Candidate")
+
+        # One pass over the job postings for all candidates
+        matches = self.service.match_jobs_batch([candidate.skill_ids for candidate in candidates])
+        summary_df = pd.DataFrame([
+            {'Candidate': candidate.name, 'Skills': ', '.join(candidate.skills), 'Matching Jobs': len(jobs)}
+            for candidate, jobs in zip(candidates, matches)
+        ])
+        st.dataframe(summary_df, use_container_width=True)
+
+        for candidate, jobs in zip(candidates, matches):
+            with st.expander(f"{candidate.name} - {len(jobs)} matching job(s)"):
+                if not jobs:
+                    st.info("No matching jobs found for this candidate.")
+                for job in jobs:
+                    st.write(f"**{job.title}** at {job.company} ({job.location}) - {job.salary_range}")
 
     def get_ai_matched_jobs(self, uploaded_skills):
-        # AI-based matching logic
-        matched_jobs = []
-        for job in self.job_marketplace:
-            # Match jobs based on overlapping skills
-            matching_skills = set(uploaded_skills) & set(job['skills_required'])
-            if matching_skills:
-                matched_jobs.append(job)
-        return matched_jobs
+        # Semantic matching over the local job index, ranked by similarity
+        return self.service.search_jobs(uploaded_skills)
 
     def apply_to_job(self, user_id, job_id):
-        # Insert job application into the database
-        try:
-            self.cursor.execute('''
-                INSERT INTO user_job_applications (user_id, job_id, application_date, status)
-                VALUES (?, ?, CURRENT_TIMESTAMP, 'Pending')
-            ''', (user_id, job_id))
-            self.conn.commit()
-        except sqlite3.IntegrityError:
-            st.warning("You have already applied for this job.")
+        result = self.service.apply_to_job(user_id, job_id)
+        if result.ok:
+            self.invalidate_dashboard()
+        else:
+            st.warning(result.message)
+        return result
 
     def ai_interview_preparation(self):
         st.title("🤖 AI-Based Interview Preparation")
@@ -1113,36 +853,164 @@ class AdvancedLearnAndEarnPlatform:
                     st.session_state['current_page'] = 'Login'
 
             # Render the appropriate page
-            if st.session_state['current_page'] == 'Register':
-                self.user_registration()
-            elif st.session_state['current_page'] == 'Login':
-                self.login_page()
+            with profiler.page(st.session_state['current_page']):
+                if st.session_state['current_page'] == 'Register':
+                    self.user_registration()
+                elif st.session_state['current_page'] == 'Login':
+                    self.login_page()
         else:
             # If logged in, show the full menu
             menu = ["Dashboard", "Courses", "Enrolled Courses", "Jobs", "AI Job Matching", "AI Interview Preparation", "Profile", "Logout"]
+            if self.is_admin():
+                menu.insert(-1, "Query Stats")
+                menu.insert(-1, "Course Analytics")
+                if profiler.enabled:
+                    menu.insert(-1, "Render Profile")
             choice = st.sidebar.selectbox("Navigation", menu)
             
-            if choice == "Dashboard":
-                self.main_dashboard()
-            elif choice == "Courses":
-                self.skill_progression_dashboard()
-            elif choice == "Enrolled Courses":
-                self.enrolled_courses()
-            elif choice == "Jobs":
-                self.job_matching_system()
-            elif choice == "AI Job Matching":
-                self.ai_based_job_matching()
-            elif choice == "AI Interview Preparation":
-                self.ai_interview_preparation()
-            elif choice == "Profile":
-                self.user_profile()
-            elif choice == "Logout":
-                # Logout logic
-                st.session_state['logged_in'] = False
-                st.session_state['user_id'] = None
-                st.session_state['username'] = None
-                st.session_state['current_page'] = 'Login'
-                st.success("You have been logged out.")
+            with profiler.page(choice):
+                if choice == "Dashboard":
+                    self.main_dashboard()
+                elif choice == "Courses":
+                    self.skill_progression_dashboard()
+                elif choice == "Enrolled Courses":
+                    self.enrolled_courses()
+                elif choice == "Jobs":
+                    self.job_matching_system()
+                elif choice == "AI Job Matching":
+                    self.ai_based_job_matching()
+                elif choice == "AI Interview Preparation":
+                    self.ai_interview_preparation()
+                elif choice == "Profile":
+                    self.user_profile()
+                elif choice == "Query Stats":
+                    self.query_stats_page()
+                elif choice == "Course Analytics":
+                    self.course_analytics_page()
+                elif choice == "Render Profile":
+                    self.render_profile_page()
+                elif choice == "Logout":
+                    # Logout logic
+                    st.session_state['logged_in'] = False
+                    st.session_state['user_id'] = None
+                    st.session_state['username'] = None
+                    st.session_state['current_page'] = 'Login'
+                    st.success("You have been logged out.")
+
+    def is_admin(self):
+        # Admin usernames come from LEARN_AND_EARN_ADMINS (comma-separated)
+        admins = {name.strip() for name in os.environ.get('LEARN_AND_EARN_ADMINS', '').split(',') if name.strip()}
+        return st.session_state.get('username') in admins
+
+    def query_stats_page(self):
+        st.title("Query Stats")
+        snapshot = recorder.snapshot()
+        st.caption(f"Collected since {snapshot['since']}; slow-query threshold {snapshot['slow_query_ms']:g} ms")
+
+        if not snapshot['statements']:
+            st.info("No queries recorded yet. Set LEARN_AND_EARN_QUERY_STATS=1 to record them.")
+            return
+
+        # Per-statement totals, most expensive first
+        stats_df = pd.DataFrame(snapshot['statements'])
+        st.dataframe(stats_df[['fingerprint', 'calls', 'total_ms', 'mean_ms', 'p99_ms', 'max_ms', 'rows']],
+                     use_container_width=True)
+
+        st.subheader("Slow Queries")
+        if snapshot['slow_log']:
+            for entry in reversed(snapshot['slow_log']):
+                with st.expander(f"{entry['at']} · {entry['elapsed_ms']:.1f} ms · {entry['fingerprint'][:80]}"):
+                    st.code(entry['fingerprint'], language='sql')
+                    st.write(f"Rows: {entry['rows']}")
+                    if entry['plan']:
+                        st.text("\n".join(entry['plan']))
+        else:
+            st.write("No statements over the threshold.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Download JSON", recorder.to_json(), file_name="query_stats.json",
+                               mime="application/json")
+        with col2:
+            if st.button("Reset Stats"):
+                recorder.reset()
+                st.rerun()
+
+    def course_analytics_page(self):
+        st.title("Course Analytics")
+        # Served from the in-memory enrollment arrays, not per-render SQL
+        cache = shared_enrollment_cache(DB_PATH)
+        with profiler.phase('data'):
+            stats = cache.all_course_stats()
+        st.caption(f"{cache.enrollments:,} enrollments in {cache.nbytes / 1024:,.1f} KiB")
+
+        if not stats:
+            st.info("No enrollments yet.")
+            return
+
+        with profiler.phase('dataframe'):
+            stats_df = pd.DataFrame([{
+                'Course': entry.course_id, 'Enrolled': entry.enrolled, 'In Progress': entry.in_progress,
+                'Exam Registered': entry.exam_registered, 'Completed': entry.completed,
+                'Mean Progress': entry.mean_progress, 'Median Progress': entry.median_progress,
+            } for entry in stats])
+        st.dataframe(stats_df, use_container_width=True)
+
+        selected = st.selectbox("Course", [entry.course_id for entry in stats])
+        distribution = cache.progress_distribution(selected)
+        with profiler.phase('figure'):
+            labels = [f"{low:g}-{high:g}%" for low, high in zip(distribution.bins, distribution.bins[1:])]
+            fig = px.bar(x=labels, y=distribution.counts, labels={'x': 'Progress', 'y': 'Learners'},
+                         title=f"{selected} progress distribution")
+        st.plotly_chart(fig, use_container_width=True)
+
+        threshold = st.slider("Near-completion threshold (%)", 50, 100, 80, step=5)
+        near = cache.near_completion(selected, threshold)
+        st.metric("Learners near completion", len(near))
+
+    def render_profile_page(self):
+        st.title("Render Profile")
+        snapshot = profiler.snapshot()
+        st.caption(f"Collected since {snapshot['since']}; cProfile on {snapshot['sample_rate']:.0%} of renders")
+
+        if not snapshot['pages']:
+            st.info("No page renders recorded yet.")
+            return
+
+        # One row per page, slowest overall first; phase columns are means
+        rows = []
+        for name, page in snapshot['pages'].items():
+            row = {'Page': name, 'Renders': page['total']['count'], 'Mean (ms)': page['total']['mean_ms'],
+                   'p95 (ms)': page['total']['p95_ms'], 'Max (ms)': page['total']['max_ms']}
+            for phase, hist in page['phases'].items():
+                row[f"{phase.title()} (ms)"] = hist['mean_ms']
+            rows.append(row)
+        st.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+        selected = st.selectbox("Page", list(snapshot['pages']))
+        page = snapshot['pages'][selected]
+        histogram_df = pd.DataFrame([
+            {'Phase': phase, 'Bucket': bucket, 'Renders': count}
+            for phase, hist in [('total', page['total'])] + list(page['phases'].items())
+            for bucket, count in hist['buckets'].items()
+        ])
+        fig = px.bar(histogram_df, x='Bucket', y='Renders', color='Phase', barmode='group',
+                     title=f"{selected} render latency")
+        st.plotly_chart(fig, use_container_width=True)
+
+        report = profiler.top_functions(selected)
+        if report:
+            st.subheader(f"cProfile ({page['profiled_renders']} sampled renders)")
+            st.text(report)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Download JSON", profiler.to_json(), file_name="render_profile.json",
+                               mime="application/json")
+        with col2:
+            if st.button("Reset Profile"):
+                profiler.reset()
+                st.rerun()
 
     def login_page(self):
         st.title("Login to Learn & Earn Pro")
@@ -1152,21 +1020,14 @@ class AdvancedLearnAndEarnPlatform:
         
         if st.button("Login"):
             # Implement login logic
-            hashed_password = hashlib.sha256(password.encode()).hexdigest()
-            
-            self.cursor.execute('''
-                SELECT id, username FROM users 
-                WHERE username = ? AND password = ?
-            ''', (username, hashed_password))
-            
-            user = self.cursor.fetchone()
+            user = self.service.authenticate(username, password)
             
             if user:
                 st.success("Login Successful!")
                 # Set session state variables
                 st.session_state['logged_in'] = True
-                st.session_state['user_id'] = user[0]
-                st.session_state['username'] = user[1]
+                st.session_state['user_id'] = user.id
+                st.session_state['username'] = user.username
                 st.session_state['current_page'] = 'Dashboard'
                 
                 # Rerun the app to navigate to the dashboard
@@ -1191,7 +1052,20 @@ class AdvancedLearnAndEarnPlatform:
         
         for key, value in profile_data.items():
             st.write(f"**{key}:** {value}")
-        
+
+        # Profile picture: variants are rendered once on upload, never per render
+        user_id = st.session_state['user_id']
+        picture = self.service.get_profile_image(user_id, 'small')
+        if picture:
+            st.image(picture, width=160)
+        uploaded_picture = st.file_uploader("Profile Picture", type=['png', 'jpg', 'jpeg', 'webp'])
+        if uploaded_picture is not None and st.button("Save Picture"):
+            result = self.service.set_profile_image(user_id, uploaded_picture)
+            if result.ok:
+                st.success(result.message)
+            else:
+                st.error(result.message)
+
         # Skill Badges
         st.subheader("Skill Badges")
         badges = ['Digital Marketing Fundamentals', 'SEO Certified', 'Social Media Marketing']
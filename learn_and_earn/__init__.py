@@ -0,0 +1,30 @@
+"""
+Learn & Earn AI - headless platform package.
+
+The Streamlit app (learn-and-earn-app.py) renders pages on top of this
+package; batch jobs, benchmarks and other frontends can import it directly.
+"""
+
+from .db import DB_PATH, connect, initialize_database
+from .services import (
+    ALREADY_EXISTS,
+    CONFLICT,
+    ERROR,
+    NOT_ELIGIBLE,
+    NOT_FOUND,
+    OK,
+    PlatformService,
+)
+
+__all__ = [
+    'ALREADY_EXISTS',
+    'CONFLICT',
+    'DB_PATH',
+    'ERROR',
+    'NOT_ELIGIBLE',
+    'NOT_FOUND',
+    'OK',
+    'PlatformService',
+    'connect',
+    'initialize_database',
+]
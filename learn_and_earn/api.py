@@ -0,0 +1,663 @@
+"""
+Lightweight asyncio HTTP/JSON API over the headless service layer.
+
+Mobile clients and partner integrations can read and update progress without
+paying for a full Streamlit rerun. SQLite calls are blocking, so every request
+borrows a PlatformService from a fixed-size pool and runs it on a worker
+thread, keeping the event loop free to accept connections.
+
+Run with:
+    python -m learn_and_earn.api --port 8080
+
+Endpoints (list endpoints accept ?limit=&offset=):
+    GET  /health
+    GET  /courses?q=&category=&difficulty=
+    GET  /courses/stats
+    GET  /courses/{id}/stats
+    GET  /courses/{id}/near-completion?threshold=80&limit=
+    GET  /courses/{id}/image?variant=thumb|small|large|large_jpeg
+    GET  /jobs
+    GET  /jobs/match?skills=Python,SQL
+    GET  /jobs/search?q=ML engineering&limit=20
+    GET  /leaderboard?limit=10
+    GET  /users/{id}/metrics
+    GET  /users/{id}/summary
+    GET  /users/{id}/avatar?variant=thumb|small|large|large_jpeg
+    GET  /media/{digest}
+    GET  /users/{id}/events?after=&limit=
+    GET  /users/{id}/enrollments
+    GET  /users/{id}/certificates/{course_id}
+    POST /users/{id}/enrollments       {"course_id": "...", "idempotency_key": "..."}
+    GET  /users/{id}/credits
+    GET  /users/{id}/progress
+    POST /users/{id}/progress          {"course_id": "...", "increment": 20}
+    GET  /users/{id}/jobs/matches
+    GET  /users/{id}/applications
+    POST /users/{id}/applications      {"job_id": "..."}
+    GET  /admin/query-stats?order_by=total_ms|p99_ms|calls|rows
+
+Writes (POST) are refused until LEARN_AND_EARN_API_KEY is set; once it is,
+every request must send it in X-API-Key. /admin endpoints need
+LEARN_AND_EARN_ADMIN_API_KEY in X-API-Key and are closed without it.
+
+Request bodies are framed by Content-Length (chunked encoding gets 411) and
+capped at MAX_BODY_BYTES. A request whose body can't be framed is answered
+and the connection closed. Unexpected errors are logged and returned as a
+generic 500.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import hmac
+import json
+import logging
+import os
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlsplit
+
+from .db import DB_PATH, connect, initialize_database
+from .enrollment_cache import shared_enrollment_cache
+from .instrumentation import recorder
+from .maintenance import shared_maintenance
+from .replica import shared_replica
+from .sharding import shared_storage
+from .certificates import CONTENT_TYPE as CERTIFICATE_CONTENT_TYPE
+from .media import COURSE, PROFILE, VARIANTS
+from .services import MODULES_COMPLETE_PROGRESS, NOT_FOUND, OK, PlatformService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BODY_BYTES = 64 * 1024
+ADMIN_PREFIX = '/admin/'
+STATS_ORDERS = ('total_ms', 'p99_ms', 'calls', 'rows')
+
+STATUS_TEXT = {
+    200: 'OK',
+    201: 'Created',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    403: 'Forbidden',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    411: 'Length Required',
+    413: 'Payload Too Large',
+    422: 'Unprocessable Entity',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+}
+
+# Result outcome -> HTTP status for write endpoints
+OUTCOME_STATUS = {
+    OK: 200,
+    NOT_FOUND: 404,
+}
+
+
+# Images are content-addressed, so a digest's bytes never change
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+@dataclasses.dataclass(frozen=True)
+class BinaryResponse:
+    content_type: str
+    body: bytes
+    etag: str
+    cache_control: str = IMMUTABLE_CACHE_CONTROL
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ServicePool:
+    """
+    Fixed pool of PlatformService instances, each with its own connection.
+
+    With sharded storage there is one pool per shard and per-user calls go
+    through run_for_user, which borrows a service from that user's shard.
+    """
+
+    def __init__(self, path=DB_PATH, size=4):
+        self.storage = shared_storage(path)
+        if self.storage is None:
+            conn = connect(path)
+            initialize_database(conn)
+            conn.close()
+
+        self.size = size
+        # Snapshot mode covers the single-file layout only
+        self.replica = shared_replica(path) if self.storage is None else None
+        self.enrollments = shared_enrollment_cache(path)
+        self._services = []
+        for shard in range(self.storage.shard_count if self.storage else 1):
+            services = queue.Queue()
+            for _ in range(size):
+                conn = self.storage.connect_shard(shard) if self.storage else connect(path)
+                services.put(PlatformService(conn, replica=self.replica))
+            self._services.append(services)
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='learn-and-earn-db')
+
+    @contextmanager
+    def _borrow(self, shard):
+        services = self._services[shard]
+        service = services.get()
+        try:
+            yield service
+        finally:
+            services.put(service)
+
+    def _call(self, shard, fn, args, kwargs):
+        with self._borrow(shard) as service:
+            return fn(service, *args, **kwargs)
+
+    async def run(self, fn, *args, **kwargs):
+        # Offload a blocking service call onto the pool's worker threads
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, 0, fn, args, kwargs)
+
+    async def run_for_user(self, user_id, fn, *args, **kwargs):
+        # fn(service, user_id, ...) on the shard holding the user's rows
+        shard = self.storage.shard_for(user_id) if self.storage else 0
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, shard, fn, (user_id,) + args, kwargs)
+
+    async def run_detached(self, fn, *args):
+        # Blocking work that needs no pooled service (e.g. an enrollment cache reload)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for services in self._services:
+            while not services.empty():
+                services.get_nowait().conn.close()
+        if self.replica is not None:
+            self.replica.close()
+
+
+def to_json(value):
+    if dataclasses.is_dataclass(value):
+        # Internal fields (repr=False, e.g. interned skill ids) stay out of the payload
+        return {f.name: to_json(getattr(value, f.name)) for f in dataclasses.fields(value) if f.repr}
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return value
+
+
+def parse_page(params):
+    try:
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+        offset = int(params.get('offset', 0))
+    except ValueError:
+        raise HTTPError(400, "limit and offset must be integers")
+    if limit < 1 or offset < 0:
+        raise HTTPError(400, "limit must be positive and offset non-negative")
+    return min(limit, MAX_PAGE_SIZE), offset
+
+
+def paged(items, limit, offset):
+    return {'items': to_json(items), 'limit': limit, 'offset': offset,
+            'next_offset': offset + limit if len(items) == limit else None}
+
+
+def require(body, key):
+    if key not in body:
+        raise HTTPError(422, f"Missing field '{key}'")
+    return body[key]
+
+
+def result_response(result, created_status=200):
+    status = created_status if result.ok else OUTCOME_STATUS.get(result.outcome, 409)
+    return status, to_json(result)
+
+
+# ---- Handlers ---------------------------------------------------------------
+# Each handler receives (pool, match, params, body) and returns (status, payload).
+
+async def health(pool, match, params, body):
+    return 200, {'status': 'ok'}
+
+
+async def list_courses(pool, match, params, body):
+    limit, offset = parse_page(params)
+    courses = await pool.run(PlatformService.search_courses, params.get('q', ''),
+                             params.get('category', 'All'), params.get('difficulty', 'All'),
+                             limit=limit, offset=offset)
+    return 200, paged(courses, limit, offset)
+
+
+async def course_stats_overview(pool, match, params, body):
+    stats = await pool.run_detached(pool.enrollments.all_course_stats)
+    return 200, {'items': to_json(stats)}
+
+
+async def course_stats(pool, match, params, body):
+    cache = pool.enrollments
+    stats = await pool.run_detached(cache.course_stats, match['course_id'])
+    if not stats.enrolled:
+        raise HTTPError(404, "No enrollments for this course")
+    distribution = await pool.run_detached(cache.progress_distribution, match['course_id'])
+    return 200, {**to_json(stats), 'distribution': to_json(distribution)}
+
+
+async def near_completion(pool, match, params, body):
+    limit, _ = parse_page(params)
+    try:
+        threshold = float(params.get('threshold', 80))
+    except ValueError:
+        raise HTTPError(400, "threshold must be a number")
+    user_ids = await pool.run_detached(pool.enrollments.near_completion, match['course_id'], threshold, limit)
+    return 200, {'items': user_ids, 'threshold': threshold}
+
+
+async def list_jobs(pool, match, params, body):
+    limit, offset = parse_page(params)
+    jobs = await pool.run(PlatformService.list_jobs, limit=limit, offset=offset)
+    return 200, paged(jobs, limit, offset)
+
+
+async def match_jobs(pool, match, params, body):
+    limit, offset = parse_page(params)
+    skills = [skill.strip() for skill in params.get('skills', '').split(',') if skill.strip()]
+    if not skills:
+        raise HTTPError(400, "Query parameter 'skills' is required")
+    jobs = await pool.run(PlatformService.match_jobs, skills)
+    return 200, paged(jobs[offset:offset + limit], limit, offset)
+
+
+async def search_jobs(pool, match, params, body):
+    limit, offset = parse_page(params)
+    query = params.get('q', '').strip()
+    if not query:
+        raise HTTPError(400, "Query parameter 'q' is required")
+    jobs = await pool.run(PlatformService.search_jobs, query, limit + offset)
+    return 200, paged(jobs[offset:offset + limit], limit, offset)
+
+
+async def leaderboard(pool, match, params, body):
+    limit, _ = parse_page(params)
+    entries = await pool.run(PlatformService.get_leaderboard, limit)
+    return 200, {'items': to_json(entries)}
+
+
+async def user_metrics(pool, match, params, body):
+    metrics = await pool.run_for_user(int(match['user_id']), PlatformService.get_user_metrics)
+    if metrics is None:
+        raise HTTPError(404, "User not found")
+    return 200, to_json(metrics)
+
+
+async def progress_summary(pool, match, params, body):
+    summary = await pool.run_for_user(int(match['user_id']), PlatformService.get_progress_summary)
+    return 200, to_json(summary)
+
+
+async def list_events(pool, match, params, body):
+    limit, _ = parse_page(params)
+    try:
+        after_id = int(params.get('after', 0))
+    except ValueError:
+        raise HTTPError(400, "after must be an integer")
+    events = await pool.run_for_user(int(match['user_id']), PlatformService.list_events, after_id, limit)
+    return 200, {'items': to_json(events), 'next_after': events[-1].id if len(events) == limit else None}
+
+
+def _read_owner_image(service, owner_type, owner_id, variant):
+    media = service.media.variant(owner_type, owner_id, variant)
+    if media is None:
+        return None
+    return BinaryResponse(media.content_type, service.media.read(media.digest, media.content_type), media.digest)
+
+
+def _read_media(service, digest):
+    content_type = service.media.content_type_for(digest)
+    if content_type is None:
+        return None
+    return BinaryResponse(content_type, service.media.read(digest, content_type), digest)
+
+
+def image_variant(params):
+    variant = params.get('variant', 'small')
+    if variant not in VARIANTS:
+        raise HTTPError(400, f"variant must be one of {', '.join(VARIANTS)}")
+    return variant
+
+
+async def avatar(pool, match, params, body):
+    response = await pool.run(_read_owner_image, PROFILE, int(match['user_id']), image_variant(params))
+    if response is None or response.body is None:
+        raise HTTPError(404, "No profile picture")
+    # The link can change when a new picture is uploaded, so revalidate with the ETag
+    return 200, dataclasses.replace(response, cache_control='no-cache')
+
+
+async def course_image(pool, match, params, body):
+    response = await pool.run(_read_owner_image, COURSE, match['course_id'], image_variant(params))
+    if response is None or response.body is None:
+        raise HTTPError(404, "No course image")
+    return 200, dataclasses.replace(response, cache_control='no-cache')
+
+
+def _read_certificate(service, user_id, course_id):
+    # Read-only: certificates the batch (or the app) has not issued yet are a 404, not rendered here
+    certificate = service.get_certificate(user_id, course_id)
+    if certificate is None:
+        return None
+    return BinaryResponse(CERTIFICATE_CONTENT_TYPE, service.get_certificate_bytes(certificate), certificate.digest)
+
+
+async def certificate(pool, match, params, body):
+    response = await pool.run_for_user(int(match['user_id']), _read_certificate, match['course_id'])
+    if response is None or response.body is None:
+        raise HTTPError(404, "No certificate for this course")
+    return 200, response
+
+
+async def media_file(pool, match, params, body):
+    response = await pool.run(_read_media, match['digest'])
+    if response is None or response.body is None:
+        raise HTTPError(404, "Not found")
+    return 200, response
+
+
+async def list_enrollments(pool, match, params, body):
+    limit, offset = parse_page(params)
+    courses = await pool.run_for_user(int(match['user_id']), PlatformService.list_enrolled_courses,
+                                      limit=limit, offset=offset)
+    return 200, paged(courses, limit, offset)
+
+
+async def enroll(pool, match, params, body):
+    # Clients retrying a POST send the same idempotency_key, so a retry is never charged twice
+    result = await pool.run_for_user(int(match['user_id']), PlatformService.enroll_in_course,
+                                     require(body, 'course_id'), body.get('idempotency_key'))
+    return result_response(result, created_status=201)
+
+
+async def credits(pool, match, params, body):
+    limit, offset = parse_page(params)
+    user_id = int(match['user_id'])
+    metrics = await pool.run_for_user(user_id, PlatformService.get_user_metrics)
+    if metrics is None:
+        raise HTTPError(404, "User not found")
+    transactions = await pool.run_for_user(user_id, PlatformService.list_credit_transactions,
+                                           limit=limit, offset=offset)
+    return 200, dict(paged(transactions, limit, offset), balance=metrics.learning_credits)
+
+
+async def list_progress(pool, match, params, body):
+    limit, offset = parse_page(params)
+    rows = await pool.run_for_user(int(match['user_id']), PlatformService.get_course_progress,
+                                   limit=limit, offset=offset)
+    items = [{'course': course, 'progress': progress} for course, progress in rows]
+    return 200, paged(items, limit, offset)
+
+
+async def update_progress(pool, match, params, body):
+    try:
+        increment = float(require(body, 'increment'))
+    except (TypeError, ValueError):
+        raise HTTPError(422, "'increment' must be a number")
+    # Same range the app's progress steps use
+    if not 0 < increment <= MODULES_COMPLETE_PROGRESS:
+        raise HTTPError(422, f"'increment' must be greater than 0 and at most {MODULES_COMPLETE_PROGRESS}")
+    result = await pool.run_for_user(int(match['user_id']), PlatformService.update_course_progress,
+                                     require(body, 'course_id'), increment)
+    return result_response(result)
+
+
+async def user_job_matches(pool, match, params, body):
+    limit, offset = parse_page(params)
+    jobs = await pool.run_for_user(int(match['user_id']), PlatformService.match_jobs_for_user)
+    return 200, paged(jobs[offset:offset + limit], limit, offset)
+
+
+async def list_applications(pool, match, params, body):
+    limit, offset = parse_page(params)
+    applications = await pool.run_for_user(int(match['user_id']), PlatformService.list_applications,
+                                           limit=limit, offset=offset)
+    return 200, paged(applications, limit, offset)
+
+
+async def apply(pool, match, params, body):
+    result = await pool.run_for_user(int(match['user_id']), PlatformService.apply_to_job, require(body, 'job_id'))
+    return result_response(result, created_status=201)
+
+
+async def query_stats(pool, match, params, body):
+    order_by = params.get('order_by', 'total_ms')
+    if order_by not in STATS_ORDERS:
+        raise HTTPError(400, f"order_by must be one of {', '.join(STATS_ORDERS)}")
+    return 200, recorder.snapshot(order_by)
+
+
+ROUTES = [
+    ('GET', r'/health', health),
+    ('GET', r'/courses', list_courses),
+    ('GET', r'/courses/stats', course_stats_overview),
+    ('GET', r'/courses/(?P<course_id>[^/]+)/stats', course_stats),
+    ('GET', r'/courses/(?P<course_id>[^/]+)/near-completion', near_completion),
+    ('GET', r'/courses/(?P<course_id>[^/]+)/image', course_image),
+    ('GET', r'/jobs', list_jobs),
+    ('GET', r'/jobs/match', match_jobs),
+    ('GET', r'/jobs/search', search_jobs),
+    ('GET', r'/leaderboard', leaderboard),
+    ('GET', r'/users/(?P<user_id>\d+)/metrics', user_metrics),
+    ('GET', r'/users/(?P<user_id>\d+)/summary', progress_summary),
+    ('GET', r'/users/(?P<user_id>\d+)/avatar', avatar),
+    ('GET', r'/media/(?P<digest>[0-9a-f]{64})', media_file),
+    ('GET', r'/users/(?P<user_id>\d+)/events', list_events),
+    ('GET', r'/users/(?P<user_id>\d+)/enrollments', list_enrollments),
+    ('POST', r'/users/(?P<user_id>\d+)/enrollments', enroll),
+    ('GET', r'/users/(?P<user_id>\d+)/credits', credits),
+    ('GET', r'/users/(?P<user_id>\d+)/certificates/(?P<course_id>[^/]+)', certificate),
+    ('GET', r'/users/(?P<user_id>\d+)/progress', list_progress),
+    ('POST', r'/users/(?P<user_id>\d+)/progress', update_progress),
+    ('GET', r'/users/(?P<user_id>\d+)/jobs/matches', user_job_matches),
+    ('GET', r'/users/(?P<user_id>\d+)/applications', list_applications),
+    ('POST', r'/users/(?P<user_id>\d+)/applications', apply),
+    ('GET', r'/admin/query-stats', query_stats),
+]
+COMPILED_ROUTES = [(method, re.compile(pattern + r'/?$'), handler) for method, pattern, handler in ROUTES]
+
+
+async def read_line(reader, status, message):
+    # StreamReader.readline raises ValueError for a line longer than the stream limit (64 KiB)
+    try:
+        return await reader.readline()
+    except ValueError:
+        raise HTTPError(status, message)
+
+
+def body_length(headers):
+    # Bodies are framed by Content-Length only; anything else would leave the stream unframed
+    if headers.get('transfer-encoding', 'identity').lower() != 'identity':
+        raise HTTPError(411, "Chunked bodies are not supported; send Content-Length")
+    value = headers.get('content-length', '0')
+    if not re.fullmatch(r'[0-9]+', value):
+        raise HTTPError(400, "Invalid Content-Length")
+    length = int(value)
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large")
+    return length
+
+
+def key_matches(sent, expected):
+    return bool(expected) and sent is not None and hmac.compare_digest(sent.encode(), expected.encode())
+
+
+def resolve(method, path):
+    path_matched = False
+    for route_method, pattern, handler in COMPILED_ROUTES:
+        match = pattern.match(path)
+        if match:
+            path_matched = True
+            if route_method == method:
+                return handler, match.groupdict()
+    raise HTTPError(405 if path_matched else 404, "Method not allowed" if path_matched else "Not found")
+
+
+class APIServer:
+    def __init__(self, path=DB_PATH, pool_size=4, api_key=None, admin_key=None):
+        self.pool = ServicePool(path, pool_size)
+        self.api_key = api_key if api_key is not None else os.environ.get('LEARN_AND_EARN_API_KEY')
+        self.admin_key = admin_key if admin_key is not None else os.environ.get('LEARN_AND_EARN_ADMIN_API_KEY')
+        self.server = None
+
+    def authorize(self, method, path, headers):
+        sent = headers.get('x-api-key')
+        if path.startswith(ADMIN_PREFIX):
+            if not key_matches(sent, self.admin_key):
+                raise HTTPError(403, "Admin API key required")
+        elif self.api_key:
+            if not (key_matches(sent, self.api_key) or key_matches(sent, self.admin_key)):
+                raise HTTPError(401, "Invalid or missing API key")
+        elif method != 'GET':
+            # Without a key anyone who can reach the port could write as any user
+            raise HTTPError(403, "Writes are disabled until LEARN_AND_EARN_API_KEY is set")
+
+    async def dispatch(self, method, target, headers, raw_body):
+        url = urlsplit(target)
+        self.authorize(method, url.path, headers)
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = {}
+        if raw_body:
+            try:
+                body = json.loads(raw_body)
+            except json.JSONDecodeError:
+                raise HTTPError(400, "Request body must be valid JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "Request body must be a JSON object")
+
+        handler, match = resolve(method, url.path)
+        status, payload = await handler(self.pool, match, params, body)
+        if isinstance(payload, BinaryResponse) and headers.get('if-none-match') == f'"{payload.etag}"':
+            return 304, dataclasses.replace(payload, body=b'')
+        return status, payload
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive so pollers can reuse one connection
+        try:
+            while True:
+                try:
+                    request_line = await read_line(reader, 400, "Request line too long")
+                    if not request_line:
+                        break
+                    try:
+                        method, target, version = request_line.decode('latin-1').split()
+                    except ValueError:
+                        raise HTTPError(400, "Malformed request line")
+
+                    headers = {}
+                    while True:
+                        line = await read_line(reader, 431, "Header line too long")
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                        name, _, value = line.decode('latin-1').partition(':')
+                        headers[name.strip().lower()] = value.strip()
+                except HTTPError as e:
+                    # The rest of the stream can't be framed; answer and drop the connection
+                    await self.write_response(writer, e.status, {'error': e.message}, keep_alive=False)
+                    break
+
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close') \
+                    or headers.get('connection', '').lower() == 'keep-alive'
+
+                try:
+                    length = body_length(headers)
+                except HTTPError as e:
+                    # The body was not read, so the next request can't be found; answer and close
+                    await self.write_response(writer, e.status, {'error': e.message}, keep_alive=False)
+                    break
+                raw_body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self.dispatch(method.upper(), target, headers, raw_body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': e.message}
+                except Exception:
+                    # Exception text can carry SQL and file paths; it goes to the log, not the client
+                    logger.exception("Unhandled error in %s %s", method, target)
+                    status, payload = 500, {'error': "Internal server error"}
+
+                await self.write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def write_response(self, writer, status, payload, keep_alive):
+        if isinstance(payload, BinaryResponse):
+            body = payload.body
+            content_headers = (f"Content-Type: {payload.content_type}\r\n"
+                               f"Cache-Control: {payload.cache_control}\r\n"
+                               f"ETag: \"{payload.etag}\"\r\n")
+        else:
+            body = json.dumps(payload).encode()
+            content_headers = "Content-Type: application/json\r\n"
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"{content_headers}"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    async def serve_forever(self, host='127.0.0.1', port=8080):
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Learn & Earn HTTP/JSON API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    parser.add_argument('--pool-size', type=int, default=4, help="Database connections / worker threads")
+    args = parser.parse_args(argv)
+
+    api = APIServer(args.db, args.pool_size)
+    shared_maintenance(args.db)
+    print(f"Learn & Earn API listening on http://{args.host}:{args.port}")
+    if not api.api_key:
+        print("LEARN_AND_EARN_API_KEY is not set: serving reads only, writes are refused")
+    try:
+        asyncio.run(api.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Hot/cold archival of finished per-user history.
+
+Completed enrollments (with their assignment submissions) and resolved job
+applications older than LEARN_AND_EARN_ARCHIVE_DAYS (default 180; 0 turns
+archival off) are moved out of user_courses, user_assignments and
+user_job_applications into archived_* tables in the same file, keeping
+their ids. The hot tables then hold only what is in progress or recent, so
+per-user queries that only care about active rows (deadlines, progress,
+exam eligibility) stay small however old the user base gets.
+
+History reads (enrolled-course lists, completed-course counts, duplicate
+checks, certificates, course analytics) go through the all_user_courses,
+all_user_assignments and all_user_job_applications views, which UNION ALL
+the hot and archived tables; SQLite pushes per-user filters into both
+halves, so each is an index lookup.
+
+Rows move in batches of BATCH_SIZE per transaction (BEGIN IMMEDIATE, one
+short write lock each), with a pause between batches so foreground writes
+get the lock. The idle-time maintenance pass (maintenance.py) archives
+before its other tasks; with sharded storage each shard archives its own
+rows.
+
+Archive now, or compare hot and archived row counts, with:
+    python -m learn_and_earn.archive run [--days 180]
+    python -m learn_and_earn.archive stats
+"""
+
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass
+
+from .db import DB_PATH, connect, initialize_database
+from .sharding import shared_storage
+
+BATCH_SIZE = 500
+BATCH_PAUSE_SECONDS = 0.05
+# Applications still waiting on the employer stay hot whatever their age
+ACTIVE_APPLICATION_STATUSES = ('Pending',)
+
+ENROLLMENT_COLUMNS = 'id, user_id, course_id, enrollment_date, completion_status, progress_percentage, completed_date'
+ASSIGNMENT_COLUMNS = 'id, user_id, course_id, module_id, submission_date'
+APPLICATION_COLUMNS = 'id, user_id, job_id, application_date, status'
+ARCHIVED_TABLES = (('user_courses', 'archived_user_courses'),
+                   ('user_assignments', 'archived_user_assignments'),
+                   ('user_job_applications', 'archived_user_job_applications'))
+
+
+def archive_after_days():
+    try:
+        return max(0.0, float(os.environ.get('LEARN_AND_EARN_ARCHIVE_DAYS', 180)))
+    except ValueError:
+        return 180.0
+
+
+@dataclass(frozen=True)
+class ArchiveStats:
+    enrollments: int = 0
+    assignments: int = 0
+    applications: int = 0
+    batches: int = 0
+
+    @property
+    def rows(self):
+        return self.enrollments + self.assignments + self.applications
+
+    def __add__(self, other):
+        return ArchiveStats(self.enrollments + other.enrollments, self.assignments + other.assignments,
+                            self.applications + other.applications, self.batches + other.batches)
+
+    def describe(self):
+        return (f"{self.enrollments:,} enrollments, {self.assignments:,} assignments, "
+                f"{self.applications:,} applications in {self.batches:,} batches")
+
+
+def archive_batch(conn, days, batch_size=BATCH_SIZE):
+    """Move one batch of finished rows to the archived tables in one transaction; returns ArchiveStats."""
+    cutoff = f"-{days:g} days"
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Completed enrollments by completion date (older rows may only have the enrollment date)
+        enrollment_ids = json.dumps([row[0] for row in conn.execute('''
+            SELECT id FROM user_courses
+            WHERE completion_status = 'Completed'
+              AND COALESCE(completed_date, enrollment_date) < datetime('now', ?)
+            ORDER BY id
+            LIMIT ?
+        ''', (cutoff, batch_size))])
+        assignments = 0
+        enrollments = conn.execute(f'''
+            INSERT INTO archived_user_courses ({ENROLLMENT_COLUMNS})
+            SELECT {ENROLLMENT_COLUMNS} FROM user_courses WHERE id IN (SELECT value FROM json_each(?))
+        ''', (enrollment_ids,)).rowcount
+        if enrollments:
+            # Submissions for those courses travel with their enrollment
+            of_archived = '''
+                EXISTS (SELECT 1 FROM user_courses uc
+                        WHERE uc.id IN (SELECT value FROM json_each(?))
+                          AND uc.user_id = user_assignments.user_id AND uc.course_id = user_assignments.course_id)
+            '''
+            conn.execute(f'''
+                INSERT INTO archived_user_assignments ({ASSIGNMENT_COLUMNS})
+                SELECT {ASSIGNMENT_COLUMNS} FROM user_assignments WHERE {of_archived}
+            ''', (enrollment_ids,))
+            assignments = conn.execute(f'DELETE FROM user_assignments WHERE {of_archived}',
+                                       (enrollment_ids,)).rowcount
+            conn.execute('DELETE FROM user_courses WHERE id IN (SELECT value FROM json_each(?))',
+                         (enrollment_ids,))
+
+        placeholders = ', '.join('?' * len(ACTIVE_APPLICATION_STATUSES))
+        application_ids = json.dumps([row[0] for row in conn.execute(f'''
+            SELECT id FROM user_job_applications
+            WHERE status NOT IN ({placeholders}) AND application_date < datetime('now', ?)
+            ORDER BY id
+            LIMIT ?
+        ''', ACTIVE_APPLICATION_STATUSES + (cutoff, batch_size))])
+        applications = conn.execute(f'''
+            INSERT INTO archived_user_job_applications ({APPLICATION_COLUMNS})
+            SELECT {APPLICATION_COLUMNS} FROM user_job_applications WHERE id IN (SELECT value FROM json_each(?))
+        ''', (application_ids,)).rowcount
+        if applications:
+            conn.execute('DELETE FROM user_job_applications WHERE id IN (SELECT value FROM json_each(?))',
+                         (application_ids,))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return ArchiveStats(enrollments, assignments, applications, 1 if enrollments or applications else 0)
+
+
+def archive_database(conn, days=None, batch_size=BATCH_SIZE, pause=BATCH_PAUSE_SECONDS):
+    """Archive batches until nothing old enough is left; returns the totals as ArchiveStats."""
+    days = archive_after_days() if days is None else days
+    total = ArchiveStats()
+    if not days:
+        return total
+    while True:
+        stats = archive_batch(conn, days, batch_size)
+        total += stats
+        if stats.enrollments < batch_size and stats.applications < batch_size:
+            return total
+        time.sleep(pause)
+
+
+def table_counts(conn):
+    """(hot table, hot rows, archived rows) for each archived table pair."""
+    return [(hot, conn.execute(f'SELECT COUNT(*) FROM {hot}').fetchone()[0],
+             conn.execute(f'SELECT COUNT(*) FROM {cold}').fetchone()[0])
+            for hot, cold in ARCHIVED_TABLES]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move finished enrollments and applications to archived tables")
+    parser.add_argument('command', choices=['run', 'stats'])
+    parser.add_argument('--days', type=float, default=archive_after_days(),
+                        help="Archive rows finished more than this many days ago")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    initialize_database(conn)
+    conn.close()
+    storage = shared_storage(args.db)
+    for path in [args.db] + (storage.shard_paths if storage is not None else []):
+        conn = connect(path)
+        try:
+            if args.command == 'run':
+                print(f"{path}: {archive_database(conn, args.days, args.batch_size).describe()}")
+            else:
+                for table, hot, archived in table_counts(conn):
+                    print(f"{path} {table}: {hot:,} hot, {archived:,} archived")
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
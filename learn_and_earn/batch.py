@@ -0,0 +1,306 @@
+"""
+Process-pool batch engine for nightly recomputation jobs.
+
+Per-user work that used to run inline on page views (badge assignment,
+skill experience rollups, recommendations, deadlines, notifications,
+certificate rendering) runs here over all users:
+
+1. Users are split into chunks of consecutive ids (per shard when sharded
+   storage is enabled) and the plan is stored in batch_chunks.
+2. Chunks are computed in a ProcessPoolExecutor; each worker process opens
+   its own connection(s) and never writes to the database. The one file
+   write in a worker is certificate rendering, whose PNGs go to the
+   content-addressed media store (written to a temp name and renamed, named
+   by digest), so a re-rendered certificate lands on the same file; the
+   certificates rows that point at them are written by the parent.
+3. The parent writes each chunk's results in one transaction that also
+   marks the chunk done, so a killed run resumes where it stopped
+   (--resume).
+
+With sharded storage the results land in a shard (or in the common
+database) and the checkpoint in batch_chunks in the common database, and a
+commit spanning two files is not atomic under WAL. A resumed run can
+therefore replay a chunk whose results already committed, so every writer
+is idempotent: upserts, INSERT OR IGNORE, rollups recomputed from current
+state, and badges that are only paid when their badge row is inserted.
+
+Run with:
+    python -m learn_and_earn.batch all --workers 4
+    python -m learn_and_earn.batch recommendations --resume
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from .certificates import compute_certificates, write_certificates
+from .db import DB_PATH, connect, initialize_database
+from .services import PlatformService, badge_for_difficulty, course_badge_condition, proficiency_for_points
+from .sharding import ShardedStorage, shard_count_from_env, shard_index
+
+DEFAULT_CHUNK_SIZE = 500
+# Pages use batch results younger than this (seconds) and compute inline otherwise
+PRECOMPUTED_MAX_AGE = float(os.environ.get('LEARN_AND_EARN_PRECOMPUTED_MAX_AGE', 24 * 60 * 60))
+
+
+@dataclass
+class BatchStats:
+    job: str
+    run_id: str
+    chunks: int = 0
+    skipped_chunks: int = 0
+    users: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rate(self):
+        return self.users / self.seconds if self.seconds else 0.0
+
+
+# ---- Jobs -------------------------------------------------------------------
+# compute(service, user_id) runs in a worker and returns a picklable result
+# (None to skip the user); write(service, results) runs in the parent inside
+# the chunk's transaction.
+
+def compute_badges(service, user_id):
+    # Completed courses that never had their badge recorded
+    rows = service.conn.execute(f'''
+        SELECT uc.course_id, c.difficulty
+        FROM all_user_courses uc
+        JOIN courses c ON c.id = uc.course_id
+        WHERE uc.user_id = ? AND uc.completion_status = 'Completed'
+          AND NOT EXISTS (
+              SELECT 1 FROM user_skills us
+              WHERE us.user_id = uc.user_id AND {course_badge_condition('us.skill_name', 'uc.course_id')}
+          )
+    ''', (user_id,)).fetchall()
+    return [(course_id, badge_for_difficulty(difficulty)) for course_id, difficulty in rows] or None
+
+
+def write_badges(service, results):
+    # Re-checks "no badge yet" as it inserts, so a replayed chunk never pays a badge twice
+    for user_id, badges in results:
+        for course_id, badge_type in badges:
+            service.award_missing_badge(user_id, course_id, badge_type)
+
+
+def compute_skill_rollup(service, user_id):
+    # Merge rows for the same skill (older spellings) and level skills by experience
+    rows = service.conn.execute('''
+        SELECT id, skill_id, proficiency_level, experience_points
+        FROM user_skills
+        WHERE user_id = ? AND skill_id IS NOT NULL
+        ORDER BY id
+    ''', (user_id,)).fetchall()
+    by_skill = {}
+    for row in rows:
+        by_skill.setdefault(row[1], []).append(row)
+
+    changes = []
+    for skill_rows in by_skill.values():
+        points = sum(row[3] or 0 for row in skill_rows)
+        level = proficiency_for_points(points)
+        keep_id, _, current_level, current_points = skill_rows[0]
+        if len(skill_rows) > 1 or level != current_level or points != current_points:
+            changes.append((keep_id, points, level, [row[0] for row in skill_rows[1:]]))
+    return changes or None
+
+
+def write_skill_rollup(service, results):
+    changes = [change for _, user_changes in results for change in user_changes]
+    service.conn.executemany('UPDATE user_skills SET experience_points = ?, proficiency_level = ? WHERE id = ?',
+                             ((points, level, keep_id) for keep_id, points, level, _ in changes))
+    service.conn.executemany('DELETE FROM user_skills WHERE id = ?',
+                             ((row_id,) for *_, drop_ids in changes for row_id in drop_ids))
+
+
+def compute_recommendations(service, user_id):
+    skills = [skill.skill_name for skill in service.get_user_skills(user_id)]
+    return [course['id'] for course in service.match_courses(skills)] if skills else []
+
+
+def compute_deadlines(service, user_id):
+    return [[deadline.task, deadline.due_date] for deadline in service.get_upcoming_deadlines(user_id)]
+
+
+def compute_notifications(service, user_id):
+    return service.get_notifications(user_id)
+
+
+def precomputed_writer(kind):
+    def write(service, results):
+        service.save_precomputed(kind, results)
+    return write
+
+
+JOBS = {
+    'badges': (compute_badges, write_badges),
+    'skill_rollup': (compute_skill_rollup, write_skill_rollup),
+    'recommendations': (compute_recommendations, precomputed_writer('recommendations')),
+    'deadlines': (compute_deadlines, precomputed_writer('deadlines')),
+    'notifications': (compute_notifications, precomputed_writer('notifications')),
+    'certificates': (compute_certificates, write_certificates),
+}
+
+
+# ---- Storage helpers --------------------------------------------------------
+
+def open_services(path, shard_count):
+    # One PlatformService per shard (a single one for the single-file layout)
+    if shard_count > 1:
+        storage = ShardedStorage(path, shard_count, fan_out_workers=1)
+        return [PlatformService(storage.connect_shard(index)) for index in range(shard_count)]
+    return [PlatformService(connect(path))]
+
+
+# ---- Worker process ---------------------------------------------------------
+
+_worker_services = None
+
+
+def _init_worker(path, shard_count):
+    global _worker_services
+    _worker_services = open_services(path, shard_count)
+
+
+def _compute_chunk(job, chunk_index, shard, first_user_id, last_user_id, shard_count):
+    compute, _ = JOBS[job]
+    service = _worker_services[shard]
+    user_ids = [row[0] for row in service.conn.execute(
+        'SELECT id FROM users WHERE id BETWEEN ? AND ? ORDER BY id', (first_user_id, last_user_id))]
+    if shard_count > 1:
+        user_ids = [user_id for user_id in user_ids if shard_index(user_id, shard_count) == shard]
+
+    results = []
+    for user_id in user_ids:
+        result = compute(service, user_id)
+        if result is not None:
+            results.append((user_id, result))
+    return chunk_index, shard, len(user_ids), results
+
+
+# ---- Runner -----------------------------------------------------------------
+
+def plan_chunks(conn, run_id, shard_count, chunk_size):
+    user_ids = [row[0] for row in conn.execute('SELECT id FROM users ORDER BY id')]
+    by_shard = [[] for _ in range(shard_count)]
+    for user_id in user_ids:
+        by_shard[shard_index(user_id, shard_count) if shard_count > 1 else 0].append(user_id)
+
+    chunks = []
+    for shard, shard_user_ids in enumerate(by_shard):
+        for start in range(0, len(shard_user_ids), chunk_size):
+            chunk = shard_user_ids[start:start + chunk_size]
+            chunks.append((run_id, len(chunks), shard, chunk[0], chunk[-1]))
+    with conn:
+        conn.executemany('''
+            INSERT INTO batch_chunks (run_id, chunk_index, shard, first_user_id, last_user_id)
+            VALUES (?, ?, ?, ?, ?)
+        ''', chunks)
+    return len(chunks)
+
+
+def start_run(conn, job, resume):
+    if resume:
+        row = conn.execute('''
+            SELECT id FROM batch_runs
+            WHERE job = ? AND status = 'running'
+            ORDER BY started_at DESC, rowid DESC LIMIT 1
+        ''', (job,)).fetchone()
+        if row:
+            return row[0], True
+    run_id = uuid.uuid4().hex
+    with conn:
+        conn.execute('INSERT INTO batch_runs (id, job) VALUES (?, ?)', (run_id, job))
+    return run_id, False
+
+
+def run_job(job, path=DB_PATH, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, resume=False, shard_count=None,
+            progress=None):
+    """Run one batch job over all users; returns BatchStats."""
+    if job not in JOBS:
+        raise ValueError(f"Unknown batch job '{job}'")
+    shard_count = shard_count or shard_count_from_env()
+    started = time.perf_counter()
+
+    conn = connect(path)
+    initialize_database(conn)
+    if shard_count > 1:
+        ShardedStorage(path, shard_count, fan_out_workers=1).initialize()
+    run_id, resumed = start_run(conn, job, resume)
+    if not resumed:
+        plan_chunks(conn, run_id, shard_count, chunk_size)
+
+    stats = BatchStats(job, run_id)
+    stats.skipped_chunks = conn.execute("SELECT COUNT(*) FROM batch_chunks WHERE run_id = ? AND status = 'done'",
+                                        (run_id,)).fetchone()[0]
+    pending = conn.execute('''
+        SELECT chunk_index, shard, first_user_id, last_user_id
+        FROM batch_chunks
+        WHERE run_id = ? AND status = 'pending'
+        ORDER BY chunk_index
+    ''', (run_id,)).fetchall()
+
+    _, write = JOBS[job]
+    writers = open_services(path, shard_count)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(path, shard_count)) as executor:
+            futures = [executor.submit(_compute_chunk, job, chunk_index, shard, first, last, shard_count)
+                       for chunk_index, shard, first, last in pending]
+            for future in as_completed(futures):
+                chunk_index, shard, users, results = future.result()
+                service = writers[shard]
+                # Results and the checkpoint commit together (one file only in the single-file
+                # layout; the writers are idempotent for the sharded case)
+                with service.transaction():
+                    if results:
+                        write(service, results)
+                    service.conn.execute('''
+                        UPDATE batch_chunks SET status = 'done', users_processed = ?
+                        WHERE run_id = ? AND chunk_index = ?
+                    ''', (users, run_id, chunk_index))
+                stats.chunks += 1
+                stats.users += users
+                if progress:
+                    progress(stats, len(pending))
+    finally:
+        for service in writers:
+            service.conn.close()
+
+    with conn:
+        conn.execute("UPDATE batch_runs SET status = 'finished', finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                     (run_id,))
+    conn.close()
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run per-user batch recomputation jobs")
+    parser.add_argument('jobs', nargs='+', choices=sorted(JOBS) + ['all'])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--resume', action='store_true', help="Continue the last unfinished run of each job")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    jobs = list(JOBS) if 'all' in args.jobs else args.jobs
+
+    def report(stats, total):
+        print(f"\r{stats.job}: {stats.chunks}/{total} chunks, {stats.users:,} users", end='', file=sys.stderr)
+
+    for job in jobs:
+        stats = run_job(job, args.db, args.workers, args.chunk_size, args.resume, progress=report)
+        print(file=sys.stderr)
+        resumed = f", {stats.skipped_chunks} chunks already done" if stats.skipped_chunks else ''
+        print(f"{job}: {stats.users:,} users in {stats.chunks} chunks, {stats.seconds:.1f}s "
+              f"({stats.rate:,.0f}/s){resumed}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Static catalogs used for recommendations and career guidance.
+"""
+
+COURSE_CATALOG = {
+    'Digital Marketing': [
+        {
+            'id': 'ds001',
+            'name': 'Advanced Digital Marketing Mastery',
+            'modules': [
+                {'title': 'SEO Fundamentals', 'video_url': '', 'assignment': 'SEO Audit Project'},
+                {'title': 'Social Media Strategy', 'video_url': '', 'assignment': 'Campaign Design'}
+            ],
+            'skills_gained': ['SEO', 'Social Media Marketing', 'Analytics'],
+            'certification_potential': True
+        }
+    ],
+    'Artificial Intelligence': [
+        {
+            'id': 'ai001',
+            'name': 'Professional Machine Learning Engineer',
+            'modules': [
+                {'title': 'Python for Machine Learning', 'video_url': '', 'assignment': 'ML Model Development'},
+                {'title': 'Deep Learning Techniques', 'video_url': '', 'assignment': 'Neural Network Project'}
+            ],
+            'skills_gained': ['Machine Learning', 'Python', 'Deep Learning'],
+            'certification_potential': True
+        }
+    ]
+}
+
+SKILL_ECOSYSTEM = {
+    'Digital Marketing': {
+        'entry_level_jobs': ['Social Media Coordinator', 'Digital Marketing Assistant'],
+        'mid_level_jobs': ['Digital Marketing Specialist', 'SEO Strategist'],
+        'advanced_jobs': ['Digital Marketing Manager', 'Head of Digital Strategy']
+    },
+    'Artificial Intelligence': {
+        'entry_level_jobs': ['AI Research Assistant', 'Machine Learning Intern'],
+        'mid_level_jobs': ['Machine Learning Engineer', 'AI Developer'],
+        'advanced_jobs': ['Senior AI Scientist', 'AI Research Lead']
+    }
+}
+
+
+def iter_catalog_courses(catalog=COURSE_CATALOG):
+    for courses in catalog.values():
+        for course in courses:
+            yield course
@@ -0,0 +1,160 @@
+"""
+Completion certificates rendered with PIL.
+
+The certificate template (background, borders, fixed headings) and the
+fonts are rasterized once per process; each certificate is a copy of the
+cached base image with the learner's name, course title, date and
+certificate id stamped on it. Output PNGs are stored content-addressed
+through MediaStore and recorded in the certificates table, so downloading a
+certificate again is a lookup plus a memoized file read.
+
+Cohorts are issued by the batch engine's process pool:
+    python -m learn_and_earn.batch certificates --workers 4
+
+A single certificate that was not issued in bulk yet is rendered on first
+download.
+"""
+
+import hashlib
+import io
+import os
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .catalog import iter_catalog_courses
+
+CONTENT_TYPE = 'image/png'
+SIZE = (1600, 1130)
+BACKGROUND = (253, 250, 240)
+INK = (40, 40, 60)
+ACCENT = (176, 141, 87)
+
+FONT_CANDIDATES = {
+    'serif': ('DejaVuSerif.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf',
+              '/Library/Fonts/Georgia.ttf', 'C:\\Windows\\Fonts\\georgia.ttf'),
+    'serif_bold': ('DejaVuSerif-Bold.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSerif-Bold.ttf',
+                   '/Library/Fonts/Georgia Bold.ttf', 'C:\\Windows\\Fonts\\georgiab.ttf'),
+}
+
+
+@dataclass(frozen=True)
+class Certificate:
+    certificate_id: str
+    user_id: int
+    course_id: str
+    digest: str
+    issued_on: str
+
+
+def certificate_id_for(user_id, course_id):
+    return hashlib.sha256(f"{user_id}:{course_id}".encode()).hexdigest()[:12].upper()
+
+
+@lru_cache(maxsize=None)
+def font(style, size):
+    # LEARN_AND_EARN_CERT_FONT overrides the regular face; Pillow's bundled font is the last resort
+    candidates = FONT_CANDIDATES[style]
+    if style == 'serif' and os.environ.get('LEARN_AND_EARN_CERT_FONT'):
+        candidates = (os.environ['LEARN_AND_EARN_CERT_FONT'],) + candidates
+    for candidate in candidates:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def _fitted(draw, text, style, size, max_width=SIZE[0] - 240):
+    # Long names and titles step down in size until they fit inside the border
+    while size > 24 and draw.textlength(text, font=font(style, size)) > max_width:
+        size -= 6
+    return font(style, size)
+
+
+def _centered(draw, y, text, text_font, fill=INK):
+    width = draw.textlength(text, font=text_font)
+    draw.text(((SIZE[0] - width) / 2, y), text, font=text_font, fill=fill)
+
+
+@lru_cache(maxsize=1)
+def template():
+    """Base certificate with everything that does not vary per learner; built once per process."""
+    image = Image.new('RGB', SIZE, BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    width, height = SIZE
+    draw.rectangle((30, 30, width - 30, height - 30), outline=ACCENT, width=8)
+    draw.rectangle((55, 55, width - 55, height - 55), outline=ACCENT, width=2)
+    _centered(draw, 150, "Learn & Earn AI", font('serif', 40), fill=ACCENT)
+    _centered(draw, 220, "Certificate of Completion", font('serif_bold', 76))
+    _centered(draw, 380, "This certifies that", font('serif', 36))
+    _centered(draw, 620, "has successfully completed", font('serif', 36))
+    draw.line((width / 2 - 300, 560, width / 2 + 300, 560), fill=ACCENT, width=2)
+    return image
+
+
+@lru_cache(maxsize=1)
+def palette():
+    # The template already holds every color a certificate uses (ink and accent antialiased
+    # on the background), so one 64-color palette built from it fits all stamped copies
+    return template().quantize(colors=64, method=Image.Quantize.FASTOCTREE)
+
+
+def render_certificate(name, course_title, issued_on, certificate_id):
+    image = template().copy()
+    draw = ImageDraw.Draw(image)
+    _centered(draw, 450, name, _fitted(draw, name, 'serif_bold', 72))
+    _centered(draw, 690, course_title, _fitted(draw, course_title, 'serif_bold', 54))
+    _centered(draw, 900, f"Issued {issued_on}", font('serif', 28))
+    _centered(draw, 945, f"Certificate ID {certificate_id}", font('serif', 24), fill=ACCENT)
+    buffer = io.BytesIO()
+    # Mapping onto the cached palette and a low zlib effort make encoding ~3x cheaper
+    # than a full-color PNG, at half the size
+    image.quantize(palette=palette(), dither=Image.Dither.NONE).save(buffer, 'PNG', compress_level=1)
+    return buffer.getvalue()
+
+
+def pending_certificates(conn, user_id):
+    # Completed courses of one user that have no certificate yet
+    return conn.execute('''
+        SELECT uc.course_id, c.title, u.username, uc.completed_date
+        FROM all_user_courses uc
+        LEFT JOIN courses c ON c.id = uc.course_id
+        JOIN users u ON u.id = uc.user_id
+        WHERE uc.user_id = ? AND uc.completion_status = 'Completed'
+          AND NOT EXISTS (
+              SELECT 1 FROM certificates ce WHERE ce.user_id = uc.user_id AND ce.course_id = uc.course_id
+          )
+    ''', (user_id,)).fetchall()
+
+
+def render_and_store(store, user_id, course_id, course_title, username, completed_date):
+    # Catalog courses (the ones with modules) have no row in courses
+    if course_title is None:
+        course_title = next((course['name'] for course in iter_catalog_courses() if course['id'] == course_id),
+                            course_id)
+    issued_on = (completed_date or date.today().isoformat())[:10]
+    certificate_id = certificate_id_for(user_id, course_id)
+    png = render_certificate(username, course_title, issued_on, certificate_id)
+    return Certificate(certificate_id, user_id, course_id, store.store(png, CONTENT_TYPE), issued_on)
+
+
+def record_certificates(conn, certificates):
+    # Callers commit
+    conn.executemany('''
+        INSERT OR IGNORE INTO certificates (id, user_id, course_id, digest, issued_on)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(c.certificate_id, c.user_id, c.course_id, c.digest, c.issued_on) for c in certificates])
+
+
+# ---- Batch job (see batch.JOBS) ---------------------------------------------
+
+def compute_certificates(service, user_id):
+    issued = [render_and_store(service.media, user_id, *row) for row in pending_certificates(service.conn, user_id)]
+    return issued or None
+
+
+def write_certificates(service, results):
+    record_certificates(service.conn, [certificate for _, certificates in results for certificate in certificates])
@@ -0,0 +1,221 @@
+"""
+Module content store: compressed module bodies kept out of course_modules.
+
+Module notes and assignment briefs are stored zlib-compressed in
+module_content, one row per module with the raw size and a digest of the
+body. course_modules keeps only the lightweight header columns (id, course,
+title, video URL, quiz), so listing a course's modules never reads a body:
+learn_course shows the headers and decompresses a module's body only when
+the learner opens that module.
+
+Decompressed bodies are kept in body_cache, a process-wide LRU bounded by
+the total size of the cached text (LEARN_AND_EARN_MODULE_CACHE_BYTES,
+default 8 MB). It is keyed by (module id, digest), so an edited body is a
+new key and never needs invalidating.
+
+Bodies written to course_modules.content / assignment_details (seed data,
+older databases, hand edits) are moved into module_content by
+initialize_database. Compare stored and raw sizes with:
+    python -m learn_and_earn.content stats
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from .db import DB_PATH, connect, initialize_database
+
+CODEC = 'zlib'
+COMPRESSION_LEVEL = 6
+BODY_CACHE_BYTES = int(os.environ.get('LEARN_AND_EARN_MODULE_CACHE_BYTES', 8 * 1024 * 1024))
+
+
+@dataclass(frozen=True)
+class ModuleHeader:
+    id: str
+    course_id: str
+    title: str
+    has_video: bool
+    has_assignment: bool
+    size_bytes: int
+    digest: Optional[str]  # None until the body has been moved into module_content
+
+
+@dataclass(frozen=True)
+class ModuleBody:
+    module_id: str
+    content: str
+    video_url: Optional[str]
+    assignment: Optional[str]
+
+    @property
+    def size_bytes(self):
+        return len(self.content or '') + len(self.assignment or '')
+
+
+def compress_text(text):
+    if text is None:
+        return None
+    return zlib.compress(text.encode(), COMPRESSION_LEVEL)
+
+
+def decompress_text(codec, blob):
+    if blob is None:
+        return None
+    if codec != CODEC:
+        raise ValueError(f"Unknown module content codec: {codec}")
+    return zlib.decompress(blob).decode()
+
+
+def body_digest(content, assignment):
+    return hashlib.sha256(f"{content or ''}\0{assignment or ''}".encode()).hexdigest()[:16]
+
+
+class BodyCache:
+    """Thread-safe LRU of decompressed ModuleBody objects, bounded by their text size."""
+
+    def __init__(self, max_bytes=BODY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if body.size_bytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = body
+            self.size += body.size_bytes
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size_bytes
+
+
+body_cache = BodyCache()
+
+
+def put_module_body(conn, module_id, content, assignment=None):
+    # Callers commit
+    conn.execute('''
+        INSERT OR REPLACE INTO module_content (module_id, codec, content, assignment, raw_bytes, digest)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (module_id, CODEC, compress_text(content), compress_text(assignment),
+          len(content or '') + len(assignment or ''), body_digest(content, assignment)))
+
+
+def sync_module_content(conn):
+    """Move bodies still stored inline in course_modules into module_content; returns the number moved."""
+    rows = conn.execute('''
+        SELECT id, content, assignment_details FROM course_modules
+        WHERE content IS NOT NULL OR assignment_details IS NOT NULL
+    ''').fetchall()
+    if not rows:
+        # The common case on every rerun: a read, no write lock
+        return 0
+    for module_id, content, assignment in rows:
+        put_module_body(conn, module_id, content, assignment)
+    conn.executemany('UPDATE course_modules SET content = NULL, assignment_details = NULL WHERE id = ?',
+                     [(row[0],) for row in rows])
+    conn.commit()
+    return len(rows)
+
+
+HEADER_QUERY = '''
+    SELECT m.id, m.course_id, m.title, m.video_lecture_url IS NOT NULL,
+           CASE WHEN c.module_id IS NULL THEN m.assignment_details IS NOT NULL
+                ELSE c.assignment IS NOT NULL END,
+           COALESCE(c.raw_bytes, LENGTH(m.content) + COALESCE(LENGTH(m.assignment_details), 0), 0),
+           c.digest
+    FROM course_modules m
+    LEFT JOIN module_content c ON c.module_id = m.id
+'''
+
+
+def _header(row):
+    module_id, course_id, title, has_video, has_assignment, size_bytes, digest = row
+    return ModuleHeader(module_id, course_id, title, bool(has_video), bool(has_assignment), size_bytes, digest)
+
+
+class ModuleContentStore:
+    def __init__(self, conn, cache=body_cache):
+        self.conn = conn
+        self.cache = cache
+
+    def headers(self, course_id=None):
+        """Module headers of one course (or all courses), in the order the modules were added."""
+        if course_id is None:
+            rows = self.conn.execute(HEADER_QUERY + ' ORDER BY m.rowid').fetchall()
+        else:
+            rows = self.conn.execute(HEADER_QUERY + ' WHERE m.course_id = ? ORDER BY m.rowid',
+                                     (course_id,)).fetchall()
+        return [_header(row) for row in rows]
+
+    def body(self, module):
+        """Decompressed body for a ModuleHeader or module id; None for an unknown module."""
+        if isinstance(module, ModuleHeader):
+            module_id, digest = module.id, module.digest
+        else:
+            module_id, digest = module, None
+        if digest is not None:
+            body = self.cache.get((module_id, digest))
+            if body is not None:
+                return body
+
+        row = self.conn.execute('''
+            SELECT m.video_lecture_url, m.content, m.assignment_details,
+                   c.codec, c.content, c.assignment, c.digest
+            FROM course_modules m
+            LEFT JOIN module_content c ON c.module_id = m.id
+            WHERE m.id = ?
+        ''', (module_id,)).fetchone()
+        if row is None:
+            return None
+        video_url, inline_content, inline_assignment, codec, content, assignment, digest = row
+        if codec is None:
+            # Not moved yet (written after the last initialize_database); nothing to cache by
+            return ModuleBody(module_id, inline_content or '', video_url, inline_assignment)
+        body = ModuleBody(module_id, decompress_text(codec, content) or '', video_url,
+                          decompress_text(codec, assignment))
+        self.cache.put((module_id, digest), body)
+        return body
+
+    def stats(self):
+        """(modules, raw bytes, stored bytes) over module_content."""
+        return self.conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0),
+                   COALESCE(SUM(LENGTH(content) + COALESCE(LENGTH(assignment), 0)), 0)
+            FROM module_content
+        ''').fetchone()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the compressed module content store")
+    parser.add_argument('command', choices=['stats'])
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    initialize_database(conn)
+    modules, raw_bytes, stored_bytes = ModuleContentStore(conn).stats()
+    ratio = raw_bytes / stored_bytes if stored_bytes else 0.0
+    print(f"{modules:,} module bodies: {raw_bytes / 1024:,.1f} KiB raw, {stored_bytes / 1024:,.1f} KiB stored "
+          f"({ratio:.1f}x)")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
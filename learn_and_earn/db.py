@@ -0,0 +1,575 @@
+"""
+Database schema, seed data and connection helpers shared by the Streamlit
+app and the headless service layer.
+
+Every connection gets the pragmas of one profile in DB_PROFILES, picked with
+LEARN_AND_EARN_DB_PROFILE (default 'tuned'); LEARN_AND_EARN_MMAP_SIZE (bytes)
+and LEARN_AND_EARN_CACHE_SIZE (KiB per connection) size the tuned profile.
+"""
+
+import os
+import sqlite3
+
+from . import instrumentation
+from .quizzes import encode_quiz
+
+DB_PATH = 'learn_and_earn_pro.db'
+
+# Expanded Database Schema
+TABLES = {
+    'users': '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            profile_image BLOB,
+            primary_skill TEXT,
+            total_earnings REAL DEFAULT 0,
+            skill_points INTEGER DEFAULT 0,
+            subscription_tier TEXT DEFAULT 'Basic',
+            learning_credits REAL DEFAULT 100.0,
+            account_created DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_login DATETIME
+        )
+    ''',
+    'courses': '''
+        CREATE TABLE IF NOT EXISTS courses (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            category TEXT,
+            difficulty TEXT,
+            price REAL,
+            duration_weeks INTEGER,
+            total_modules INTEGER,
+            skill_points_reward INTEGER
+        )
+    ''',
+    'user_courses': '''
+        CREATE TABLE IF NOT EXISTS user_courses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            course_id TEXT,
+            enrollment_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            completion_status TEXT DEFAULT 'In Progress',
+            progress_percentage REAL DEFAULT 0,
+            completed_date DATETIME,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (course_id) REFERENCES courses(id)
+        )
+    ''',
+    'course_modules': '''
+        CREATE TABLE IF NOT EXISTS course_modules (
+            id TEXT PRIMARY KEY,
+            course_id TEXT,
+            title TEXT,
+            content TEXT,
+            video_lecture_url TEXT,
+            assignment_details TEXT,
+            quiz_data TEXT,
+            FOREIGN KEY (course_id) REFERENCES courses(id)
+        )
+    ''',
+    'user_skills': '''
+        CREATE TABLE IF NOT EXISTS user_skills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            skill_name TEXT,
+            proficiency_level TEXT,
+            experience_points INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''',
+    'job_opportunities': '''
+        CREATE TABLE IF NOT EXISTS job_opportunities (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            company TEXT,
+            description TEXT,
+            required_skills TEXT,
+            salary_range TEXT,
+            location TEXT,
+            remote_friendly BOOLEAN
+        )
+    ''',
+    'user_job_applications': '''
+        CREATE TABLE IF NOT EXISTS user_job_applications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            job_id TEXT,
+            application_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'Pending',
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (job_id) REFERENCES job_opportunities(id)
+        )
+    ''',
+    'user_assignments': '''
+        CREATE TABLE IF NOT EXISTS user_assignments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            course_id TEXT,
+            module_id TEXT,
+            submission_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (course_id) REFERENCES courses(id),
+            FOREIGN KEY (module_id) REFERENCES course_modules(id)
+        )
+    ''',
+    'job_skills': '''
+        CREATE TABLE IF NOT EXISTS job_skills (
+            job_id TEXT NOT NULL,
+            skill_name TEXT NOT NULL,
+            PRIMARY KEY (job_id, skill_name),
+            FOREIGN KEY (job_id) REFERENCES job_opportunities(id)
+        )
+    ''',
+    'skills': '''
+        CREATE TABLE IF NOT EXISTS skills (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            normalized TEXT UNIQUE NOT NULL
+        )
+    ''',
+    'skill_synonyms': '''
+        CREATE TABLE IF NOT EXISTS skill_synonyms (
+            alias TEXT PRIMARY KEY,
+            skill_id INTEGER NOT NULL,
+            FOREIGN KEY (skill_id) REFERENCES skills(id)
+        )
+    ''',
+    'user_precomputed': '''
+        CREATE TABLE IF NOT EXISTS user_precomputed (
+            user_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            computed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, kind)
+        )
+    ''',
+    'batch_runs': '''
+        CREATE TABLE IF NOT EXISTS batch_runs (
+            id TEXT PRIMARY KEY,
+            job TEXT NOT NULL,
+            status TEXT DEFAULT 'running',
+            started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            finished_at DATETIME
+        )
+    ''',
+    'batch_chunks': '''
+        CREATE TABLE IF NOT EXISTS batch_chunks (
+            run_id TEXT NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            shard INTEGER NOT NULL,
+            first_user_id INTEGER NOT NULL,
+            last_user_id INTEGER NOT NULL,
+            status TEXT DEFAULT 'pending',
+            users_processed INTEGER DEFAULT 0,
+            PRIMARY KEY (run_id, chunk_index),
+            FOREIGN KEY (run_id) REFERENCES batch_runs(id)
+        )
+    ''',
+    'events': '''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            event_type TEXT NOT NULL,
+            subject_id TEXT,
+            payload TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    'materializer_state': '''
+        CREATE TABLE IF NOT EXISTS materializer_state (
+            name TEXT PRIMARY KEY,
+            last_event_id INTEGER NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    'user_course_state': '''
+        CREATE TABLE IF NOT EXISTS user_course_state (
+            user_id INTEGER NOT NULL,
+            course_id TEXT NOT NULL,
+            status TEXT,
+            progress REAL DEFAULT 0,
+            assignments_submitted INTEGER DEFAULT 0,
+            updated_at DATETIME,
+            PRIMARY KEY (user_id, course_id)
+        )
+    ''',
+    'user_progress_summary': '''
+        CREATE TABLE IF NOT EXISTS user_progress_summary (
+            user_id INTEGER PRIMARY KEY,
+            enrolled_courses INTEGER DEFAULT 0,
+            in_progress_courses INTEGER DEFAULT 0,
+            exam_registered_courses INTEGER DEFAULT 0,
+            completed_courses INTEGER DEFAULT 0,
+            assignments_submitted INTEGER DEFAULT 0,
+            applications INTEGER DEFAULT 0,
+            last_event_at DATETIME
+        )
+    ''',
+    'quiz_attempts': '''
+        CREATE TABLE IF NOT EXISTS quiz_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            course_id TEXT NOT NULL,
+            module_id TEXT NOT NULL,
+            answers BLOB NOT NULL,
+            correct INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            score REAL NOT NULL,
+            attempted_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    'media_variants': '''
+        CREATE TABLE IF NOT EXISTS media_variants (
+            source_digest TEXT NOT NULL,
+            variant TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            size_bytes INTEGER,
+            PRIMARY KEY (source_digest, variant)
+        )
+    ''',
+    'media_links': '''
+        CREATE TABLE IF NOT EXISTS media_links (
+            owner_type TEXT NOT NULL,
+            owner_id TEXT NOT NULL,
+            source_digest TEXT NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (owner_type, owner_id)
+        )
+    ''',
+    'certificates': '''
+        CREATE TABLE IF NOT EXISTS certificates (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            course_id TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            issued_on TEXT NOT NULL,
+            UNIQUE (user_id, course_id)
+        )
+    ''',
+    'credit_transactions': '''
+        CREATE TABLE IF NOT EXISTS credit_transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            reference TEXT,
+            idempotency_key TEXT,
+            balance_after INTEGER NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (user_id, idempotency_key)
+        )
+    ''',
+    'exam_submissions': '''
+        CREATE TABLE IF NOT EXISTS exam_submissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            course_id TEXT NOT NULL,
+            answers BLOB NOT NULL,
+            submitted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            score REAL,
+            badge_type TEXT,
+            graded_at DATETIME,
+            UNIQUE (user_id, course_id)
+        )
+    ''',
+    'module_content': '''
+        CREATE TABLE IF NOT EXISTS module_content (
+            module_id TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            content BLOB,
+            assignment BLOB,
+            raw_bytes INTEGER NOT NULL,
+            digest TEXT NOT NULL,
+            FOREIGN KEY (module_id) REFERENCES course_modules(id)
+        )
+    ''',
+    # Cold copies of finished rows moved out of the hot tables by archive.py; ids are kept
+    'archived_user_courses': '''
+        CREATE TABLE IF NOT EXISTS archived_user_courses (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            course_id TEXT,
+            enrollment_date DATETIME,
+            completion_status TEXT,
+            progress_percentage REAL,
+            completed_date DATETIME,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    'archived_user_assignments': '''
+        CREATE TABLE IF NOT EXISTS archived_user_assignments (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            course_id TEXT,
+            module_id TEXT,
+            submission_date DATETIME,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    'archived_user_job_applications': '''
+        CREATE TABLE IF NOT EXISTS archived_user_job_applications (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            job_id TEXT,
+            application_date DATETIME,
+            status TEXT,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Unified read views (hot + archived) for history queries; created after the tables they read
+    'all_user_courses': '''
+        CREATE VIEW IF NOT EXISTS all_user_courses AS
+        SELECT id, user_id, course_id, enrollment_date, completion_status, progress_percentage, completed_date
+        FROM user_courses
+        UNION ALL
+        SELECT id, user_id, course_id, enrollment_date, completion_status, progress_percentage, completed_date
+        FROM archived_user_courses
+    ''',
+    'all_user_assignments': '''
+        CREATE VIEW IF NOT EXISTS all_user_assignments AS
+        SELECT id, user_id, course_id, module_id, submission_date FROM user_assignments
+        UNION ALL
+        SELECT id, user_id, course_id, module_id, submission_date FROM archived_user_assignments
+    ''',
+    'all_user_job_applications': '''
+        CREATE VIEW IF NOT EXISTS all_user_job_applications AS
+        SELECT id, user_id, job_id, application_date, status FROM user_job_applications
+        UNION ALL
+        SELECT id, user_id, job_id, application_date, status FROM archived_user_job_applications
+    '''
+}
+
+# Columns added after the original schema shipped: (table, column, declaration)
+ADDED_COLUMNS = [
+    ('job_opportunities', 'content_hash', 'TEXT'),
+    ('job_skills', 'skill_id', 'INTEGER REFERENCES skills(id)'),
+    ('user_skills', 'skill_id', 'INTEGER REFERENCES skills(id)'),
+]
+
+# (table, statement)
+INDEXES = [
+    ('job_opportunities',
+     'CREATE UNIQUE INDEX IF NOT EXISTS idx_job_opportunities_content_hash ON job_opportunities(content_hash)'),
+    ('job_skills', 'CREATE INDEX IF NOT EXISTS idx_job_skills_skill_name ON job_skills(skill_name)'),
+    ('job_skills', 'CREATE INDEX IF NOT EXISTS idx_job_skills_skill_id ON job_skills(skill_id, job_id)'),
+    ('user_skills', 'CREATE INDEX IF NOT EXISTS idx_user_skills_user ON user_skills(user_id, skill_id)'),
+    ('events', 'CREATE INDEX IF NOT EXISTS idx_events_user ON events(user_id, id)'),
+    ('credit_transactions',
+     'CREATE INDEX IF NOT EXISTS idx_credit_transactions_user ON credit_transactions(user_id, id)'),
+    ('media_variants', 'CREATE INDEX IF NOT EXISTS idx_media_variants_digest ON media_variants(digest)'),
+    ('quiz_attempts', 'CREATE INDEX IF NOT EXISTS idx_quiz_attempts_user ON quiz_attempts(user_id, module_id, id)'),
+    ('exam_submissions',
+     'CREATE INDEX IF NOT EXISTS idx_exam_submissions_pending ON exam_submissions(course_id, graded_at, id)'),
+    # Per-user lookups on the hot tables and their archived copies (the views push filters into both)
+    ('user_courses', 'CREATE INDEX IF NOT EXISTS idx_user_courses_user ON user_courses(user_id, course_id)'),
+    ('user_assignments',
+     'CREATE INDEX IF NOT EXISTS idx_user_assignments_user ON user_assignments(user_id, course_id, module_id)'),
+    ('user_job_applications',
+     'CREATE INDEX IF NOT EXISTS idx_user_job_applications_user ON user_job_applications(user_id, job_id)'),
+    ('archived_user_courses',
+     'CREATE INDEX IF NOT EXISTS idx_archived_user_courses_user ON archived_user_courses(user_id, course_id)'),
+    ('archived_user_assignments',
+     'CREATE INDEX IF NOT EXISTS idx_archived_user_assignments_user '
+     'ON archived_user_assignments(user_id, course_id, module_id)'),
+    ('archived_user_job_applications',
+     'CREATE INDEX IF NOT EXISTS idx_archived_user_job_applications_user '
+     'ON archived_user_job_applications(user_id, job_id)'),
+]
+
+COURSES_DATA = [
+    # Technology
+    ('cloud001', 'Cloud Computing Essentials', 'Technology', 'Intermediate', 299.99, 10, 15, 400),
+    ('cyber001', 'Cybersecurity Fundamentals', 'Technology', 'Beginner', 199.99, 8, 12, 300),
+    ('block001', 'Blockchain Basics', 'Technology', 'Advanced', 399.99, 12, 20, 500),
+
+    # Business
+    ('fin001', 'Finance for Non-Finance Professionals', 'Business', 'Beginner', 149.99, 6, 10, 200),
+    ('ent001', 'Entrepreneurship 101', 'Business', 'Intermediate', 249.99, 8, 12, 300),
+
+    # Creative
+    ('design001', 'Graphic Design Mastery', 'Creative', 'Advanced', 349.99, 10, 15, 400),
+    ('video001', 'Video Editing for Beginners', 'Creative', 'Beginner', 199.99, 6, 10, 200),
+
+    # Personal Development
+    ('speak001', 'Public Speaking Confidence', 'Personal Development', 'Beginner', 99.99, 4, 8, 150),
+    ('lead001', 'Leadership Skills for Managers', 'Personal Development', 'Intermediate', 249.99, 8, 12, 300)
+]
+
+MODULES_DATA = [
+    # Modules for "Advanced Digital Marketing Mastery"
+    ('mod001', 'ds001', 'SEO Fundamentals', 'Learn the basics of SEO, including on-page and off-page optimization.', 'https://example.com/seo-video', 'Perform an SEO audit for a website.'),
+    ('mod002', 'ds001', 'Social Media Strategy', 'Understand how to create effective social media campaigns.', 'https://example.com/social-media-video', 'Design a social media campaign for a product.'),
+
+    # Modules for "Professional Machine Learning Engineer"
+    ('mod003', 'ai001', 'Python for Machine Learning', 'Learn Python libraries like NumPy, Pandas, and Scikit-learn for ML.', 'https://example.com/python-ml-video', 'Build a simple machine learning model.'),
+    ('mod004', 'ai001', 'Deep Learning Techniques', 'Explore neural networks and deep learning frameworks.', 'https://example.com/deep-learning-video', 'Implement a neural network for image classification.')
+]
+
+# Module quizzes; "answer" is the index of the correct option
+QUIZ_DATA = {
+    'mod001': {'questions': [
+        {'prompt': 'Which of these is an on-page SEO factor?',
+         'options': ['Backlinks', 'Title tags', 'Social shares', 'Domain age'], 'answer': 1},
+        {'prompt': 'What does a robots.txt file control?',
+         'options': ['Page speed', 'Crawler access', 'Ad placement', 'Image size'], 'answer': 1},
+    ]},
+    'mod002': {'questions': [
+        {'prompt': 'Which metric best measures campaign engagement?',
+         'options': ['Follower count', 'Engagement rate', 'Post length', 'Posting time'], 'answer': 1},
+        {'prompt': 'What should a content calendar define first?',
+         'options': ['Hashtags', 'Audience and goals', 'Fonts', 'Budget codes'], 'answer': 1},
+    ]},
+    'mod003': {'questions': [
+        {'prompt': 'Which library provides n-dimensional arrays?',
+         'options': ['NumPy', 'Requests', 'Flask', 'Pillow'], 'answer': 0},
+        {'prompt': 'What does train_test_split help prevent?',
+         'options': ['Slow imports', 'Overestimating accuracy', 'Missing values', 'Large files'], 'answer': 1},
+    ]},
+    'mod004': {'questions': [
+        {'prompt': 'Which layer type is typical for image classification?',
+         'options': ['Convolutional', 'Recurrent', 'Embedding', 'Pooling only'], 'answer': 0},
+        {'prompt': 'What does backpropagation compute?',
+         'options': ['Gradients', 'Dataset splits', 'Learning rate schedules', 'Batch sizes'], 'answer': 0},
+        {'prompt': 'Which activation is most common in hidden layers?',
+         'options': ['ReLU', 'Softmax', 'Step', 'Identity'], 'answer': 0, 'points': 2},
+    ]},
+}
+
+JOBS_DATA = [
+    ('job001', 'Senior AI Engineer', 'TechCorp',
+    'Develop advanced AI solutions and machine learning models',
+    'Machine Learning,Python,AI', '$120,000 - $180,000', 'San Francisco, CA', True),
+    ('job002', 'Digital Marketing Specialist', 'MarketingPro',
+    'Create and manage digital marketing campaigns',
+    'Digital Marketing,SEO,Social Media', '$70,000 - $100,000', 'New York, NY', True),
+    ('job003', 'Full Stack Web Developer', 'WebInnovate',
+    'Build scalable web applications',
+    'JavaScript,React,Node.js,Python', '$90,000 - $140,000', 'Remote', True)
+]
+
+
+MMAP_SIZE = int(os.environ.get('LEARN_AND_EARN_MMAP_SIZE', 256 * 1024 * 1024))
+CACHE_SIZE_KIB = int(os.environ.get('LEARN_AND_EARN_CACHE_SIZE', 32 * 1024))
+
+# Profile name -> (pragma, value) pairs applied to every new connection
+DB_PROFILES = {
+    # WAL lets dashboard reads run alongside a writer; synchronous=NORMAL is safe in WAL mode
+    # (an OS crash can lose the last commits but never corrupts); mmap and a larger page cache
+    # cut read syscalls; auto_vacuum only takes effect on a new file or after a full VACUUM, and
+    # comes first because switching to WAL writes the header of a new file
+    'tuned': (
+        ('auto_vacuum', 'INCREMENTAL'),
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('mmap_size', MMAP_SIZE),
+        ('cache_size', -CACHE_SIZE_KIB),
+        ('temp_store', 'MEMORY'),
+    ),
+    # Tuned, but still fsyncing on every commit
+    'durable': (
+        ('auto_vacuum', 'INCREMENTAL'),
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'FULL'),
+        ('mmap_size', MMAP_SIZE),
+        ('cache_size', -CACHE_SIZE_KIB),
+        ('temp_store', 'MEMORY'),
+    ),
+    # Read-only copies (snapshot replicas) keep their rollback journal: no -wal/-shm files to swap
+    'readonly': (
+        ('mmap_size', MMAP_SIZE),
+        ('cache_size', -CACHE_SIZE_KIB),
+        ('temp_store', 'MEMORY'),
+    ),
+    # SQLite defaults
+    'legacy': (),
+}
+DB_PROFILE = os.environ.get('LEARN_AND_EARN_DB_PROFILE', 'tuned')
+
+
+def apply_profile(conn, profile=None, schema=None):
+    # With schema, tune an attached database (e.g. the common database of sharded storage)
+    prefix = f"{schema}." if schema else ''
+    for pragma, value in DB_PROFILES[profile or DB_PROFILE]:
+        conn.execute(f'PRAGMA {prefix}{pragma} = {value}').fetchall()
+    return conn
+
+
+def connect(path=DB_PATH, profile=None):
+    # Connections are shared between Streamlit reruns, so allow cross-thread use
+    if instrumentation.enabled():
+        conn = sqlite3.connect(path, check_same_thread=False, factory=instrumentation.InstrumentedConnection)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=False)
+    return apply_profile(conn, profile)
+
+
+def create_schema(conn, tables=None):
+    # Create Tables (all, or just the named ones), returning (table_name, error) pairs for any that failed
+    errors = []
+    for table_name, table_schema in TABLES.items():
+        if tables is not None and table_name not in tables:
+            continue
+        try:
+            conn.execute(table_schema.strip())
+        except sqlite3.OperationalError as e:
+            errors.append((table_name, e))
+    conn.commit()
+    return errors
+
+
+def add_missing_columns(conn, tables=None):
+    # CREATE TABLE IF NOT EXISTS leaves older databases untouched, so add new columns here
+    for table, column, declaration in ADDED_COLUMNS:
+        if tables is not None and table not in tables:
+            continue
+        existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if column not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+    conn.commit()
+
+
+def create_indexes(conn, tables=None):
+    for table, statement in INDEXES:
+        if tables is None or table in tables:
+            conn.execute(statement)
+    conn.commit()
+
+
+def populate_initial_data(conn):
+    # Insert courses, modules and job opportunities if they don't already exist
+    conn.executemany('''
+        INSERT OR IGNORE INTO courses
+        (id, title, category, difficulty, price, duration_weeks, total_modules, skill_points_reward)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', COURSES_DATA)
+    conn.executemany('''
+        INSERT OR IGNORE INTO course_modules
+        (id, course_id, title, content, video_lecture_url, assignment_details)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', MODULES_DATA)
+    # Only fill quizzes that are missing, so edited quizzes are kept
+    conn.executemany('UPDATE course_modules SET quiz_data = ? WHERE id = ? AND quiz_data IS NULL',
+                     [(encode_quiz(quiz['questions']), module_id) for module_id, quiz in QUIZ_DATA.items()])
+    conn.executemany('''
+        INSERT OR IGNORE INTO job_opportunities
+        (id, title, company, description, required_skills, salary_range, location, remote_friendly)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', JOBS_DATA)
+    conn.commit()
+
+
+def initialize_database(conn):
+    errors = create_schema(conn)
+    add_missing_columns(conn)
+    create_indexes(conn)
+    populate_initial_data(conn)
+    # Seeded (and hand-edited) module bodies go to the compressed store; content imports this module
+    from .content import sync_module_content
+    sync_module_content(conn)
+    return errors
@@ -0,0 +1,265 @@
+"""
+Compact in-memory cache of enrollment state for course-level reads.
+
+All enrollments (user_courses plus archived ones, read through the
+all_user_courses view) are held as three parallel NumPy arrays sorted by
+(course, user): int32 user ids, float32 progress and uint8 status codes,
+plus the start offset of each course. That is 9 bytes per enrollment instead
+of a Python tuple per row, and progress distributions, "users near
+completion" and per-course stats become vectorized slices over a course's
+range.
+
+The cache reloads when the event log has grown (every enrollment and progress
+write appends an event) and at most once per min_reload_interval seconds,
+so hot reads never touch SQLite.
+"""
+
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from .db import DB_PATH, connect
+from .sharding import shared_storage
+
+STATUS_NAMES = ('In Progress', 'Exam Registered', 'Completed')
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+IN_PROGRESS, EXAM_REGISTERED, COMPLETED = range(3)
+UNKNOWN_STATUS = 255
+
+PROGRESS_BINS = (0, 20, 40, 60, 80, 100)
+FETCH_SIZE = 10000
+
+
+@dataclass(frozen=True)
+class CourseStats:
+    course_id: str
+    enrolled: int
+    in_progress: int
+    exam_registered: int
+    completed: int
+    mean_progress: float
+    median_progress: float
+
+
+@dataclass(frozen=True)
+class ProgressDistribution:
+    bins: Tuple[float, ...]
+    counts: Tuple[int, ...]
+
+
+def _load_rows(conn):
+    # Stream rows into typed arrays; never materialize a list of tuples
+    course_ids = []
+    # 'q' is 8 bytes everywhere; 'l' is 4 bytes on Windows
+    course_starts = array('q')
+    user_ids = array('i')
+    progress = array('f')
+    status = array('B')
+    cursor = conn.execute('''
+        SELECT course_id, user_id, progress_percentage, completion_status
+        FROM all_user_courses
+        WHERE user_id IS NOT NULL
+        ORDER BY course_id, user_id
+    ''')
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        for course_id, user_id, percentage, completion_status in rows:
+            if not course_ids or course_ids[-1] != course_id:
+                course_ids.append(course_id)
+                course_starts.append(len(user_ids))
+            user_ids.append(user_id)
+            progress.append(percentage or 0.0)
+            status.append(STATUS_CODES.get(completion_status, UNKNOWN_STATUS))
+    return course_ids, course_starts, user_ids, progress, status
+
+
+class EnrollmentCache:
+    def __init__(self, path=DB_PATH, min_reload_interval=5.0):
+        self.path = path
+        self.min_reload_interval = min_reload_interval
+        self.storage = shared_storage(path)
+        self.loaded_at = 0.0
+        self._version = None
+        self._course_index = {}
+        self._course_ids = ()
+        self._starts = np.zeros(1, dtype=np.int64)
+        self._user_ids = np.zeros(0, dtype=np.int32)
+        self._progress = np.zeros(0, dtype=np.float32)
+        self._status = np.zeros(0, dtype=np.uint8)
+        self._lock = threading.Lock()
+
+    # ---- Loading -----------------------------------------------------------
+
+    def _connections(self):
+        if self.storage is not None:
+            return [self.storage.connect_shard(index) for index in range(self.storage.shard_count)]
+        return [connect(self.path)]
+
+    @staticmethod
+    def _event_version(conn):
+        return conn.execute('SELECT MAX(id) FROM main.events').fetchone()[0]
+
+    def reload(self):
+        connections = self._connections()
+        try:
+            version = tuple(self._event_version(conn) for conn in connections)
+            parts = [_load_rows(conn) for conn in connections]
+        finally:
+            for conn in connections:
+                conn.close()
+
+        if len(parts) == 1:
+            course_ids, course_starts, user_ids, progress, status = parts[0]
+            starts = np.append(np.frombuffer(course_starts, dtype=np.int64), len(user_ids))
+            user_ids = np.frombuffer(user_ids, dtype=np.int32)
+            progress = np.frombuffer(progress, dtype=np.float32)
+            status = np.frombuffer(status, dtype=np.uint8)
+        else:
+            course_ids, starts, user_ids, progress, status = self._merge_shards(parts)
+
+        with self._lock:
+            self._course_ids = tuple(course_ids)
+            self._course_index = {course_id: index for index, course_id in enumerate(course_ids)}
+            self._starts = starts
+            self._user_ids = user_ids
+            self._progress = progress
+            self._status = status
+            self._version = version
+            self.loaded_at = time.monotonic()
+        return self
+
+    @staticmethod
+    def _merge_shards(parts):
+        # Tag each shard's rows with a global course code, then one stable sort by (course, user)
+        course_ids = sorted({course_id for part in parts for course_id in part[0]})
+        code_of = {course_id: code for code, course_id in enumerate(course_ids)}
+        codes, user_ids, progress, status = [], [], [], []
+        for part_course_ids, part_starts, part_user_ids, part_progress, part_status in parts:
+            bounds = list(part_starts) + [len(part_user_ids)]
+            lengths = np.diff(np.asarray(bounds, dtype=np.int64))
+            codes.append(np.repeat(np.asarray([code_of[c] for c in part_course_ids], dtype=np.int32), lengths))
+            user_ids.append(np.frombuffer(part_user_ids, dtype=np.int32))
+            progress.append(np.frombuffer(part_progress, dtype=np.float32))
+            status.append(np.frombuffer(part_status, dtype=np.uint8))
+
+        codes = np.concatenate(codes) if codes else np.zeros(0, dtype=np.int32)
+        user_ids = np.concatenate(user_ids) if user_ids else np.zeros(0, dtype=np.int32)
+        order = np.lexsort((user_ids, codes))
+        counts = np.bincount(codes, minlength=len(course_ids))
+        starts = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return (course_ids, starts, user_ids[order],
+                np.concatenate(progress)[order], np.concatenate(status)[order])
+
+    def refresh(self):
+        # Reload when writes have appended events since the last load, but not more often than the interval
+        with self._lock:
+            loaded_version, loaded_at = self._version, self.loaded_at
+        if loaded_version is not None and time.monotonic() - loaded_at < self.min_reload_interval:
+            return self
+        if loaded_version is not None:
+            connections = self._connections()
+            try:
+                version = tuple(self._event_version(conn) for conn in connections)
+            finally:
+                for conn in connections:
+                    conn.close()
+            with self._lock:
+                # Unchanged, and no other thread swapped in a different load meanwhile
+                if version == loaded_version == self._version:
+                    self.loaded_at = time.monotonic()
+                    return self
+        return self.reload()
+
+    # ---- Queries -----------------------------------------------------------
+
+    def _slice(self, course_id):
+        # (user_ids, progress, status) views for one course, or the whole table for None
+        with self._lock:
+            if course_id is None:
+                return self._user_ids, self._progress, self._status
+            index = self._course_index.get(course_id)
+            if index is None:
+                span = slice(0, 0)
+            else:
+                span = slice(int(self._starts[index]), int(self._starts[index + 1]))
+            return self._user_ids[span], self._progress[span], self._status[span]
+
+    @property
+    def enrollments(self):
+        return len(self._user_ids)
+
+    @property
+    def nbytes(self):
+        return self._user_ids.nbytes + self._progress.nbytes + self._status.nbytes + self._starts.nbytes
+
+    def course_stats(self, course_id):
+        self.refresh()
+        _, progress, status = self._slice(course_id)
+        return self._stats(course_id, progress, status)
+
+    def all_course_stats(self):
+        self.refresh()
+        with self._lock:
+            course_ids, starts, progress, status = self._course_ids, self._starts, self._progress, self._status
+        if not course_ids:
+            return []
+
+        # One pass over the whole table: per-course sums via reduceat, status counts via one bincount
+        lengths = np.diff(starts)
+        codes = np.repeat(np.arange(len(course_ids)), lengths)
+        known = status < 3
+        status_counts = np.bincount(codes[known] * 3 + status[known],
+                                    minlength=len(course_ids) * 3).reshape(len(course_ids), 3)
+        sums = np.add.reduceat(progress.astype(np.float64), starts[:-1]) if len(progress) else np.zeros(0)
+        stats = []
+        for index, course_id in enumerate(course_ids):
+            course_progress = progress[starts[index]:starts[index + 1]]
+            stats.append(CourseStats(
+                course_id, int(lengths[index]),
+                int(status_counts[index, IN_PROGRESS]), int(status_counts[index, EXAM_REGISTERED]),
+                int(status_counts[index, COMPLETED]),
+                round(float(sums[index] / lengths[index]), 2),
+                round(float(np.median(course_progress)), 2),
+            ))
+        return stats
+
+    @staticmethod
+    def _stats(course_id, progress, status):
+        if not len(progress):
+            return CourseStats(course_id, 0, 0, 0, 0, 0.0, 0.0)
+        counts = np.bincount(status[status < 3], minlength=3)
+        return CourseStats(course_id, len(progress), int(counts[IN_PROGRESS]), int(counts[EXAM_REGISTERED]),
+                           int(counts[COMPLETED]), round(float(progress.mean()), 2),
+                           round(float(np.median(progress)), 2))
+
+    def progress_distribution(self, course_id=None, bins=PROGRESS_BINS):
+        self.refresh()
+        _, progress, _ = self._slice(course_id)
+        counts, edges = np.histogram(progress, bins=bins)
+        return ProgressDistribution(tuple(float(edge) for edge in edges), tuple(int(count) for count in counts))
+
+    def near_completion(self, course_id=None, threshold=80.0, limit=None):
+        """User ids at or above the progress threshold that have not completed the course."""
+        self.refresh()
+        user_ids, progress, status = self._slice(course_id)
+        mask = (progress >= threshold) & (status != COMPLETED)
+        matches = np.unique(user_ids[mask]) if course_id is None else user_ids[mask]
+        return matches[:limit].tolist() if limit else matches.tolist()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def shared_enrollment_cache(path=DB_PATH):
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = EnrollmentCache(path)
+        return cache
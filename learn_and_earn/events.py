@@ -0,0 +1,329 @@
+"""
+Append-only event log and incremental materialization of progress state.
+
+Every write path in PlatformService appends an event in the same transaction
+as its mutation: enrolled, progress_updated, assignment_submitted,
+exam_registered, completed, applied. The log is never updated in place, so
+it is the audit trail and the source for rebuilding derived state.
+
+ProgressMaterializer folds new events into user_course_state and
+user_progress_summary. It stores the id of the last event it folded
+(materializer_state), so each pass only reads events above that high-water
+mark; rebuild() resets the mark and replays the whole history, e.g. after a
+schema change. Databases that predate the log are backfilled with
+synthesized events from user_courses, user_assignments and
+user_job_applications.
+
+Folding happens on the write side: PlatformService folds the events it
+emitted inside the same transaction (fold_pending), storage initialization
+runs one catch_up per process (backfilling legacy databases), and the
+maintenance pass catches up anything written outside the service layer.
+Reads of the summary never take a write lock. On a shard connection only
+the shard file is locked, never the attached common database.
+
+Run with:
+    python -m learn_and_earn.events materialize
+    python -m learn_and_earn.events rebuild
+"""
+
+import argparse
+import json
+from dataclasses import dataclass
+
+from .db import DB_PATH, connect, initialize_database
+from .sharding import begin_shard_write, is_shard_connection, shared_storage
+
+ENROLLED = 'enrolled'
+PROGRESS_UPDATED = 'progress_updated'
+ASSIGNMENT_SUBMITTED = 'assignment_submitted'
+EXAM_REGISTERED = 'exam_registered'
+COMPLETED = 'completed'
+APPLIED = 'applied'
+EVENT_TYPES = (ENROLLED, PROGRESS_UPDATED, ASSIGNMENT_SUBMITTED, EXAM_REGISTERED, COMPLETED, APPLIED)
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    user_id: int
+    event_type: str
+    subject_id: str
+    payload: dict
+    created_at: str
+
+
+def emit(conn, user_id, event_type, subject_id=None, payload=None):
+    # Callers commit, so the event lands atomically with the mutation it describes
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type '{event_type}'")
+    conn.execute('INSERT INTO events (user_id, event_type, subject_id, payload) VALUES (?, ?, ?, ?)',
+                 (user_id, event_type, subject_id, json.dumps(payload) if payload else None))
+
+
+def list_events(conn, user_id, after_id=0, limit=100):
+    rows = conn.execute('''
+        SELECT id, user_id, event_type, subject_id, payload, created_at
+        FROM events
+        WHERE user_id = ? AND id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (user_id, after_id, limit)).fetchall()
+    return [Event(*row[:4], json.loads(row[4]) if row[4] else {}, row[5]) for row in rows]
+
+
+def backfill_events(conn):
+    """
+    Synthesize events for rows written before the log existed; returns the count.
+
+    Rows that already have their event (enrollment, assignment, application)
+    are skipped, so this is safe to run after the write paths started emitting.
+    """
+    no_enrollment_event = f'''NOT EXISTS (
+        SELECT 1 FROM events e
+        WHERE e.user_id = uc.user_id AND e.event_type = '{ENROLLED}' AND e.subject_id = uc.course_id
+    )'''
+    statements = [
+        # Enrollment, then progress, assignments and the status the course reached
+        f'''SELECT user_id, '{ENROLLED}', course_id, NULL, enrollment_date, 0
+            FROM user_courses uc WHERE {no_enrollment_event}''',
+        f'''SELECT user_id, '{PROGRESS_UPDATED}', course_id, json_object('progress', progress_percentage),
+                   enrollment_date, 1
+            FROM user_courses uc WHERE progress_percentage > 0 AND {no_enrollment_event}''',
+        f'''SELECT user_id, '{EXAM_REGISTERED}', course_id, NULL, enrollment_date, 3
+            FROM user_courses uc WHERE completion_status = 'Exam Registered' AND {no_enrollment_event}''',
+        f'''SELECT user_id, '{COMPLETED}', course_id, NULL, COALESCE(completed_date, enrollment_date), 4
+            FROM user_courses uc WHERE completion_status = 'Completed' AND {no_enrollment_event}''',
+        f'''SELECT user_id, '{ASSIGNMENT_SUBMITTED}', course_id, json_object('module_id', module_id),
+                   submission_date, 2
+            FROM user_assignments ua
+            WHERE NOT EXISTS (
+                SELECT 1 FROM events e
+                WHERE e.user_id = ua.user_id AND e.event_type = '{ASSIGNMENT_SUBMITTED}'
+                  AND e.subject_id = ua.course_id AND json_extract(e.payload, '$.module_id') = ua.module_id
+            )''',
+        f'''SELECT user_id, '{APPLIED}', job_id, NULL, application_date, 0
+            FROM user_job_applications uja
+            WHERE NOT EXISTS (
+                SELECT 1 FROM events e
+                WHERE e.user_id = uja.user_id AND e.event_type = '{APPLIED}' AND e.subject_id = uja.job_id
+            )''',
+    ]
+    cursor = conn.execute(f'''
+        WITH history (user_id, event_type, subject_id, payload, created_at, step) AS (
+            {' UNION ALL '.join(statements)}
+        )
+        INSERT INTO events (user_id, event_type, subject_id, payload, created_at)
+        SELECT user_id, event_type, subject_id, payload, created_at
+        FROM history
+        WHERE user_id IS NOT NULL
+        ORDER BY created_at, step
+    ''')
+    return cursor.rowcount
+
+
+class ProgressMaterializer:
+    """Folds events into user_course_state and user_progress_summary."""
+
+    name = 'progress'
+    backfill_marker = 'progress_backfill'
+
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE):
+        self.conn = conn
+        self.batch_size = batch_size
+        self._shard = is_shard_connection(conn)
+
+    def _begin(self):
+        # Write lock before reading the mark, so two connections cannot fold the same events
+        # twice; BEGIN IMMEDIATE on a shard connection would also lock the attached common file
+        if self._shard:
+            begin_shard_write(self.conn)
+        else:
+            self.conn.execute('BEGIN IMMEDIATE')
+
+    def high_water_mark(self):
+        row = self.conn.execute('SELECT last_event_id FROM materializer_state WHERE name = ?',
+                                (self.name,)).fetchone()
+        return row[0] if row else None
+
+    def has_pending(self):
+        mark = self.high_water_mark()
+        if mark is None:
+            return True
+        return self.conn.execute('SELECT 1 FROM events WHERE id > ? LIMIT 1', (mark,)).fetchone() is not None
+
+    def _backfill_once(self):
+        # Legacy rows get their synthesized history the first time any materializer runs
+        self._begin()
+        try:
+            done = self.conn.execute('SELECT 1 FROM materializer_state WHERE name = ?',
+                                     (self.backfill_marker,)).fetchone()
+            if not done:
+                backfill_events(self.conn)
+                self.conn.execute('INSERT INTO materializer_state (name, last_event_id) VALUES (?, 0)',
+                                  (self.backfill_marker,))
+            # From here on writers fold their own events (fold_pending)
+            self.conn.execute('INSERT OR IGNORE INTO materializer_state (name, last_event_id) VALUES (?, 0)',
+                              (self.name,))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+    def catch_up(self):
+        """Fold every event above the high-water mark, one transaction per batch; returns the number folded."""
+        if self.high_water_mark() is None:
+            self._backfill_once()
+
+        folded = 0
+        while True:
+            self._begin()
+            try:
+                count = self._fold_next()
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+            folded += count
+            if count < self.batch_size:
+                return folded
+
+    def fold_pending(self):
+        """
+        Fold new events inside the caller's write transaction; returns the number folded.
+
+        For writers that just emitted events: they already hold the write lock
+        and commit the fold together with their mutation. Before the first
+        catch_up (no mark yet, legacy rows not backfilled) this does nothing.
+        """
+        if self.high_water_mark() is None:
+            return 0
+        folded = 0
+        while True:
+            count = self._fold_next()
+            folded += count
+            if count < self.batch_size:
+                return folded
+
+    def _fold_next(self):
+        # One batch above the mark; callers hold the write lock
+        mark = self.high_water_mark() or 0
+        events = self.conn.execute('''
+            SELECT id, user_id, event_type, subject_id, payload, created_at
+            FROM events WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (mark, self.batch_size)).fetchall()
+        if not events:
+            return 0
+        self._fold(events)
+        self.conn.execute('''
+            INSERT INTO materializer_state (name, last_event_id, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(name) DO UPDATE SET
+                last_event_id = excluded.last_event_id,
+                updated_at = excluded.updated_at
+        ''', (self.name, events[-1][0]))
+        return len(events)
+
+    def rebuild(self):
+        # Replay the whole log from scratch
+        with self.conn:
+            self.conn.execute('DELETE FROM user_course_state')
+            self.conn.execute('DELETE FROM user_progress_summary')
+            self.conn.execute('INSERT OR REPLACE INTO materializer_state (name, last_event_id) VALUES (?, 0)',
+                              (self.name,))
+        return self.catch_up()
+
+    def _fold(self, events):
+        user_ids = sorted({event[1] for event in events})
+        courses = {}
+        summaries = {}
+        for chunk_start in range(0, len(user_ids), 500):
+            chunk = user_ids[chunk_start:chunk_start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for user_id, course_id, status, progress, assignments, updated_at in self.conn.execute(f'''
+                SELECT user_id, course_id, status, progress, assignments_submitted, updated_at
+                FROM user_course_state WHERE user_id IN ({placeholders})
+            ''', chunk):
+                courses[(user_id, course_id)] = [status, progress, assignments, updated_at]
+            for user_id, applications, last_event_at in self.conn.execute(f'''
+                SELECT user_id, applications, last_event_at
+                FROM user_progress_summary WHERE user_id IN ({placeholders})
+            ''', chunk):
+                summaries[user_id] = [applications, last_event_at]
+
+        for _, user_id, event_type, subject_id, payload, created_at in events:
+            payload = json.loads(payload) if payload else {}
+            summary = summaries.setdefault(user_id, [0, None])
+            summary[1] = created_at
+            if event_type == APPLIED:
+                summary[0] += 1
+                continue
+
+            state = courses.get((user_id, subject_id))
+            if state is None:
+                state = courses[(user_id, subject_id)] = ['In Progress', 0, 0, created_at]
+            state[3] = created_at
+            if event_type == PROGRESS_UPDATED:
+                state[1] = payload.get('progress', state[1])
+            elif event_type == ASSIGNMENT_SUBMITTED:
+                state[2] += 1
+            elif event_type == EXAM_REGISTERED:
+                state[0] = 'Exam Registered'
+            elif event_type == COMPLETED:
+                state[0] = 'Completed'
+                state[1] = 100
+
+        self.conn.executemany('''
+            INSERT OR REPLACE INTO user_course_state
+            (user_id, course_id, status, progress, assignments_submitted, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ((user_id, course_id, *state) for (user_id, course_id), state in courses.items()))
+
+        # Summaries are derived from the full per-course state of each touched user
+        totals = {user_id: [0, 0, 0, 0, 0] for user_id in summaries}
+        for (user_id, _), (status, _, assignments, _) in courses.items():
+            if user_id not in totals:
+                continue
+            counts = totals[user_id]
+            counts[0] += 1
+            counts[1] += status == 'In Progress'
+            counts[2] += status == 'Exam Registered'
+            counts[3] += status == 'Completed'
+            counts[4] += assignments
+        self.conn.executemany('''
+            INSERT OR REPLACE INTO user_progress_summary
+            (user_id, enrolled_courses, in_progress_courses, exam_registered_courses, completed_courses,
+             assignments_submitted, applications, last_event_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', ((user_id, *totals[user_id], applications, last_event_at)
+              for user_id, (applications, last_event_at) in summaries.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fold the event log into progress summaries")
+    parser.add_argument('command', choices=['materialize', 'rebuild'])
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    # With sharded storage every shard has its own log and high-water mark
+    storage = shared_storage(args.db)
+    if storage is not None:
+        connections = [storage.connect_shard(index) for index in range(storage.shard_count)]
+    else:
+        conn = connect(args.db)
+        initialize_database(conn)
+        connections = [conn]
+
+    for index, conn in enumerate(connections):
+        materializer = ProgressMaterializer(conn)
+        folded = materializer.rebuild() if args.command == 'rebuild' else materializer.catch_up()
+        label = f"shard {index}: " if storage is not None else ''
+        print(f"{label}folded {folded:,} events; high-water mark {materializer.high_water_mark()}")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
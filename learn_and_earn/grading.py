@@ -0,0 +1,230 @@
+"""
+Deterministic exam grading from the module quizzes in course_modules.quiz_data.
+
+A course's answer key is the concatenation of its modules' quiz questions
+(modules in id order). Exam submissions store one byte per question: the
+chosen option index, or BLANK for an unanswered question. Grading stacks
+submissions into a (submissions x questions) uint8 matrix and scores the
+whole batch with one comparison against the key and one weighted sum; badges
+are assigned in bulk the same way.
+
+When an exam window closes, grade the pending submissions with:
+    python -m learn_and_earn.grading close --course ai001
+
+Set LEARN_AND_EARN_GRADING_SEED to grade users without a submission from a
+simulated answer sheet. The sheet depends only on the seed, user and course,
+so scores are reproducible for tests and demos regardless of batch order.
+"""
+
+import argparse
+import os
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from .db import DB_PATH, connect, initialize_database
+from .quizzes import BLANK, encode_answers, quiz_cache
+from .sharding import shared_storage
+
+GOLD_SCORE = 90
+SILVER_SCORE = 75
+DEFAULT_BATCH_SIZE = 5000
+# Chance that a simulated answer is correct
+SIMULATED_ACCURACY = 0.85
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    course_id: str
+    answers: np.ndarray  # uint8, correct option per question
+    options: np.ndarray  # uint8, option count per question
+    weights: np.ndarray  # float64, points per question
+
+    @property
+    def questions(self):
+        return len(self.answers)
+
+
+@dataclass(frozen=True)
+class GradingStats:
+    course_id: str
+    graded: int
+    seconds: float
+
+    @property
+    def rate(self):
+        return self.graded / self.seconds if self.seconds else 0.0
+
+
+def grading_seed_from_env():
+    seed = os.environ.get('LEARN_AND_EARN_GRADING_SEED')
+    return int(seed) if seed not in (None, '') else None
+
+
+def load_answer_key(conn, course_id):
+    questions = [question for quiz in quiz_cache.for_course(conn, course_id) for question in quiz.questions]
+    if not questions:
+        return None
+    return AnswerKey(course_id,
+                     np.asarray([question.answer for question in questions], dtype=np.uint8),
+                     np.asarray([len(question.options) for question in questions], dtype=np.uint8),
+                     np.asarray([question.points for question in questions], dtype=np.float64))
+
+
+def decode_sheets(blobs, questions):
+    # Pad or truncate each sheet to the key's length, then view them all as one matrix
+    blank = bytes([BLANK])
+    joined = b''.join(bytes(blob[:questions]).ljust(questions, blank) for blob in blobs)
+    return np.frombuffer(joined, dtype=np.uint8).reshape(len(blobs), questions)
+
+
+def score_sheets(key, sheets):
+    """Percentage scores (0-100, one decimal) for a (submissions x questions) uint8 matrix."""
+    correct = sheets == key.answers
+    total = key.weights.sum()
+    if not total:
+        # A quiz worth no points scores 0, like submit_quiz
+        return np.zeros(len(sheets))
+    scores = correct @ key.weights / total * 100
+    return np.round(scores, 1)
+
+
+def badges_for_scores(scores):
+    return np.select([scores >= GOLD_SCORE, scores >= SILVER_SCORE], ['Gold', 'Silver'], 'Bronze')
+
+
+class GradingEngine:
+    def __init__(self, service, seed=None):
+        self.service = service
+        self.seed = seed
+        self._keys = {}
+
+    def answer_key(self, course_id):
+        # Answer keys are parsed once per engine; quizzes change far less often than exams close
+        if course_id not in self._keys:
+            self._keys[course_id] = load_answer_key(self.service.conn, course_id)
+        return self._keys[course_id]
+
+    def simulate_sheet(self, key, user_id):
+        rng = np.random.default_rng([self.seed, int(user_id), zlib.crc32(key.course_id.encode())])
+        guesses = (rng.random(key.questions) * key.options).astype(np.uint8)
+        knows = rng.random(key.questions) < SIMULATED_ACCURACY
+        return np.where(knows, key.answers, guesses).astype(np.uint8)
+
+    def submit(self, user_id, course_id, answers):
+        # Resubmitting before grading replaces the sheet; graded sheets are final
+        cursor = self.service.conn.execute('''
+            INSERT INTO exam_submissions (user_id, course_id, answers)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id, course_id) DO UPDATE SET
+                answers = excluded.answers,
+                submitted_at = CURRENT_TIMESTAMP
+            WHERE graded_at IS NULL
+        ''', (user_id, course_id, encode_answers(answers)))
+        return cursor.rowcount > 0
+
+    def grade(self, user_id, course_id):
+        """Grade one user's sheet; returns (score, badge_type), or None without a sheet or quiz."""
+        key = self.answer_key(course_id)
+        if key is None:
+            return None
+        row = self._submission(user_id, course_id)
+        if row is not None and row[2] is not None:
+            return row[2], row[3]
+
+        # Write lock up front; the sheet is re-read under it, since another grader may have
+        # finished it since the check above
+        with self.service.write_transaction():
+            row = self._submission(user_id, course_id)
+            if row is not None and row[2] is not None:
+                return row[2], row[3]
+            if row is None:
+                if self.seed is None:
+                    return None
+                # Store the simulated sheet so regrading returns the same result without a second badge
+                sheet = self.simulate_sheet(key, user_id).tobytes()
+                self.submit(user_id, course_id, sheet)
+                row = self._submission(user_id, course_id)
+            score = float(score_sheets(key, decode_sheets([row[1]], key.questions))[0])
+            badge_type = str(badges_for_scores(np.asarray([score]))[0])
+            # Only the grader whose update marked the sheet graded pays the badge
+            if self._record([(score, badge_type, row[0])]):
+                self.service.award_badges([(user_id, course_id, badge_type)])
+        return score, badge_type
+
+    def _submission(self, user_id, course_id):
+        return self.service.conn.execute('''
+            SELECT id, answers, score, badge_type FROM exam_submissions
+            WHERE user_id = ? AND course_id = ?
+        ''', (user_id, course_id)).fetchone()
+
+    def grade_pending(self, course_id, batch_size=DEFAULT_BATCH_SIZE):
+        """Grade every ungraded submission for a course in batches; returns GradingStats."""
+        started = time.perf_counter()
+        key = self.answer_key(course_id)
+        graded = 0
+        while key is not None:
+            rows = self.service.conn.execute('''
+                SELECT id, user_id, answers FROM exam_submissions
+                WHERE course_id = ? AND graded_at IS NULL
+                ORDER BY id
+                LIMIT ?
+            ''', (course_id, batch_size)).fetchall()
+            if not rows:
+                break
+            scores = score_sheets(key, decode_sheets([row[2] for row in rows], key.questions))
+            badges = badges_for_scores(scores)
+            # Scores, badges and earnings for the batch commit together; sheets another
+            # grader recorded in the meantime are skipped, so their badges are not paid twice
+            with self.service.write_transaction():
+                recorded = set(self._record(zip(scores.tolist(), badges.tolist(), (row[0] for row in rows))))
+                self.service.award_badges((row[1], course_id, badge) for row, badge in zip(rows, badges.tolist())
+                                          if row[0] in recorded)
+            graded += len(recorded)
+        return GradingStats(course_id, graded, time.perf_counter() - started)
+
+    def _record(self, results):
+        # (score, badge_type, submission id) rows; returns the ids this call graded
+        recorded = []
+        for score, badge_type, submission_id in results:
+            cursor = self.service.conn.execute('''
+                UPDATE exam_submissions
+                SET score = ?, badge_type = ?, graded_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND graded_at IS NULL
+            ''', (score, badge_type, submission_id))
+            if cursor.rowcount == 1:
+                recorded.append(submission_id)
+        return recorded
+
+
+def main(argv=None):
+    from .services import PlatformService
+
+    parser = argparse.ArgumentParser(description="Grade exam submissions")
+    parser.add_argument('command', choices=['close'])
+    parser.add_argument('--course', required=True, help="Course whose exam window closed")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    # Submissions live with their users, so each shard grades its own
+    storage = shared_storage(args.db)
+    if storage is not None:
+        connections = [storage.connect_shard(index) for index in range(storage.shard_count)]
+    else:
+        conn = connect(args.db)
+        initialize_database(conn)
+        connections = [conn]
+
+    for index, conn in enumerate(connections):
+        stats = GradingEngine(PlatformService(conn)).grade_pending(args.course, args.batch_size)
+        label = f"shard {index}: " if storage is not None else ''
+        print(f"{label}graded {stats.graded:,} submissions for {args.course} in {stats.seconds:.2f}s "
+              f"({stats.rate:,.0f}/s)")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
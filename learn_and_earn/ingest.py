@@ -0,0 +1,314 @@
+"""
+Streaming ingestion of job-posting feeds into job_opportunities.
+
+Feeds are read record by record (JSONL or CSV) and written in fixed-size
+chunks, so memory stays flat no matter how large the feed is. Each chunk is
+one transaction:
+
+1. normalize the postings and hash their content,
+2. stage them in a temp table with executemany,
+3. drop postings whose content hash is already stored (duplicates),
+4. upsert the rest into job_opportunities and rewrite their job_skills rows.
+
+Skills are canonicalized through the skill vocabulary ("ML" and "machine
+learning" both become "Machine Learning") before hashing, so synonyms do not
+defeat deduplication, and job_skills rows carry the interned skill id.
+
+Run with:
+    python -m learn_and_earn.ingest feed.jsonl [--batch-size 5000]
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass
+from itertools import islice
+
+from .db import DB_PATH, connect, initialize_database
+from .skills import SkillVocabulary
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Keys accepted for each job_opportunities column, in priority order
+FIELD_ALIASES = {
+    'id': ('id', 'job_id'),
+    'title': ('title', 'job_title'),
+    'company': ('company', 'company_name'),
+    'description': ('description',),
+    'required_skills': ('required_skills', 'skills_required', 'skills'),
+    'salary_range': ('salary_range', 'salary'),
+    'location': ('location',),
+    'remote_friendly': ('remote_friendly', 'remote'),
+}
+
+SKILL_SEPARATORS = re.compile(r'[,;|]')
+WHITESPACE = re.compile(r'\s+')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+@dataclass
+class IngestStats:
+    read: int = 0
+    upserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rate(self):
+        return self.read / self.seconds if self.seconds else 0.0
+
+
+def normalize_skill_name(skill):
+    return WHITESPACE.sub(' ', str(skill)).strip()
+
+
+def normalize_skills(raw):
+    # Accept a list or a delimited string; dedupe case-insensitively, keeping first spelling
+    if raw is None:
+        return []
+    items = raw if isinstance(raw, (list, tuple)) else SKILL_SEPARATORS.split(str(raw))
+    seen = set()
+    skills = []
+    for item in items:
+        name = normalize_skill_name(item)
+        if name and name.casefold() not in seen:
+            seen.add(name.casefold())
+            skills.append(name)
+    return skills
+
+
+def _field(record, column):
+    for key in FIELD_ALIASES[column]:
+        value = record.get(key)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _text(value):
+    return WHITESPACE.sub(' ', str(value)).strip() if value is not None else ''
+
+
+def content_hash(title, company, description, skills, salary_range, location, remote):
+    canonical = json.dumps([
+        title.casefold(), company.casefold(), description.casefold(),
+        sorted(skill.casefold() for skill in skills),
+        salary_range, location.casefold(), remote,
+    ], separators=(',', ':'))
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def normalize_posting(record, vocabulary=None):
+    # Returns (job_id, title, company, description, skills, salary, location, remote, hash) or None
+    title = _text(_field(record, 'title'))
+    if not title:
+        return None
+    company = _text(_field(record, 'company'))
+    description = _text(_field(record, 'description'))
+    skills = normalize_skills(_field(record, 'required_skills'))
+    if vocabulary is not None:
+        skills = vocabulary.canonicalize(skills)
+    salary_range = _text(_field(record, 'salary_range'))
+    location = _text(_field(record, 'location'))
+    remote = _field(record, 'remote_friendly')
+    remote = remote if isinstance(remote, bool) else str(remote or '').strip().lower() in TRUE_VALUES
+
+    digest = content_hash(title, company, description, skills, salary_range, location, remote)
+    job_id = _text(_field(record, 'id')) or f"job_{digest[:16]}"
+    return (job_id, title, company, description, skills, salary_range, location, remote, digest)
+
+
+def iter_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield None
+            continue
+        yield record if isinstance(record, dict) else None
+
+
+def iter_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _write_chunk(conn, postings, stats, vocabulary):
+    # Dedupe within the chunk first (last posting for an id wins, identical content collapses)
+    by_id = {}
+    by_hash = {}
+    for posting in postings:
+        job_id, digest = posting[0], posting[-1]
+        previous = by_hash.get(digest)
+        if previous is not None and previous != job_id:
+            stats.duplicates += 1
+            continue
+        if job_id in by_id:
+            stats.duplicates += 1
+            del by_hash[by_id[job_id][-1]]
+        by_id[job_id] = posting
+        by_hash[digest] = job_id
+
+    with conn:
+        conn.execute('DELETE FROM temp.ingest_batch')
+        conn.executemany('''
+            INSERT INTO temp.ingest_batch
+            (id, title, company, description, required_skills, salary_range, location, remote_friendly, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', ((job_id, title, company, description, ','.join(skills), salary, location, remote, digest)
+              for job_id, title, company, description, skills, salary, location, remote, digest in by_id.values()))
+
+        # Content already stored (under any id) is a duplicate
+        stats.duplicates += conn.execute('''
+            DELETE FROM temp.ingest_batch
+            WHERE EXISTS (SELECT 1 FROM main.job_opportunities j WHERE j.content_hash = ingest_batch.content_hash)
+        ''').rowcount
+
+        fresh_ids = [row[0] for row in conn.execute('SELECT id FROM temp.ingest_batch')]
+        if not fresh_ids:
+            return
+
+        conn.execute('''
+            INSERT INTO main.job_opportunities
+            (id, title, company, description, required_skills, salary_range, location, remote_friendly, content_hash)
+            SELECT id, title, company, description, required_skills, salary_range, location, remote_friendly, content_hash
+            FROM temp.ingest_batch WHERE true
+            ON CONFLICT(id) DO UPDATE SET
+                title = excluded.title,
+                company = excluded.company,
+                description = excluded.description,
+                required_skills = excluded.required_skills,
+                salary_range = excluded.salary_range,
+                location = excluded.location,
+                remote_friendly = excluded.remote_friendly,
+                content_hash = excluded.content_hash
+        ''')
+        conn.execute('DELETE FROM main.job_skills WHERE job_id IN (SELECT id FROM temp.ingest_batch)')
+        conn.executemany('INSERT OR IGNORE INTO main.job_skills (job_id, skill_name, skill_id) VALUES (?, ?, ?)',
+                         ((job_id, skill, vocabulary.intern(skill, persist=True))
+                          for job_id in fresh_ids for skill in by_id[job_id][4]))
+        stats.upserted += len(fresh_ids)
+
+
+def _create_staging_table(conn):
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS ingest_batch (
+            id TEXT PRIMARY KEY,
+            title TEXT,
+            company TEXT,
+            description TEXT,
+            required_skills TEXT,
+            salary_range TEXT,
+            location TEXT,
+            remote_friendly BOOLEAN,
+            content_hash TEXT
+        )
+    ''')
+
+
+def backfill_job_skills(conn, vocabulary):
+    # Give postings inserted outside the pipeline (e.g. seed data) a hash and job_skills rows
+    rows = conn.execute('''
+        SELECT id, title, company, description, required_skills, salary_range, location, remote_friendly
+        FROM job_opportunities WHERE content_hash IS NULL
+    ''').fetchall()
+    with conn:
+        for job_id, title, company, description, required_skills, salary, location, remote in rows:
+            skills = vocabulary.canonicalize(normalize_skills(required_skills))
+            digest = content_hash(_text(title), _text(company), _text(description), skills,
+                                  _text(salary), _text(location), bool(remote))
+            clash = conn.execute('SELECT 1 FROM job_opportunities WHERE content_hash = ?', (digest,)).fetchone()
+            conn.execute('UPDATE job_opportunities SET content_hash = ? WHERE id = ?',
+                         (None if clash else digest, job_id))
+            conn.executemany('INSERT OR IGNORE INTO job_skills (job_id, skill_name, skill_id) VALUES (?, ?, ?)',
+                             ((job_id, skill, vocabulary.intern(skill, persist=True)) for skill in skills))
+
+        # job_skills rows written before skill ids existed
+        names = [row[0] for row in conn.execute('SELECT DISTINCT skill_name FROM job_skills WHERE skill_id IS NULL')]
+        conn.executemany('UPDATE job_skills SET skill_id = ? WHERE skill_name = ? AND skill_id IS NULL',
+                         ((vocabulary.intern(name, persist=True), name) for name in names))
+    return len(rows)
+
+
+def ingest_jobs(conn, records, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Ingest an iterable of posting dicts; returns IngestStats."""
+    stats = IngestStats()
+    started = time.perf_counter()
+    vocabulary = SkillVocabulary(conn)
+    _create_staging_table(conn)
+    backfill_job_skills(conn, vocabulary)
+
+    for chunk in chunked(records, batch_size):
+        postings = []
+        for record in chunk:
+            stats.read += 1
+            posting = normalize_posting(record, vocabulary) if record else None
+            if posting is None:
+                stats.invalid += 1
+            else:
+                postings.append(posting)
+        if postings:
+            _write_chunk(conn, postings, stats, vocabulary)
+        stats.batches += 1
+        if progress:
+            progress(stats)
+
+    conn.execute('DROP TABLE IF EXISTS temp.ingest_batch')
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def ingest_file(conn, path, fmt=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    fmt = fmt or ('csv' if str(path).lower().endswith('.csv') else 'jsonl')
+    if path == '-':
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        return ingest_jobs(conn, iter_csv(stream) if fmt == 'csv' else iter_jsonl(stream), batch_size, progress)
+    with open(path, encoding='utf-8', newline='') as stream:
+        return ingest_jobs(conn, iter_csv(stream) if fmt == 'csv' else iter_jsonl(stream), batch_size, progress)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a JSONL/CSV job-posting feed")
+    parser.add_argument('path', help="Feed file, or - for stdin")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="Defaults to the file extension")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    initialize_database(conn)
+
+    def report(stats):
+        print(f"\r{stats.read:,} read, {stats.upserted:,} upserted, {stats.duplicates:,} duplicates",
+              end='', file=sys.stderr)
+
+    stats = ingest_file(conn, args.path, args.format, args.batch_size, report)
+    print(file=sys.stderr)
+    # Re-embed only the new and edited postings in the semantic job index
+    from .semantic import shared_job_index
+    shared_job_index(conn).refresh(conn, force=True)
+    print(f"Ingested {stats.read:,} postings in {stats.seconds:.1f}s ({stats.rate:,.0f}/s): "
+          f"{stats.upserted:,} upserted, {stats.duplicates:,} duplicates, {stats.invalid:,} invalid")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+Query instrumentation and slow-query log.
+
+connect() builds connections with InstrumentedConnection as the sqlite3
+factory, so every execute/executemany, whether it goes through the
+connection or a cursor, is timed and attributed to a statement fingerprint
+(whitespace collapsed, literals replaced by ?). Per fingerprint we keep the
+call count, total and p99 latency (execute plus fetch) and rows returned.
+Statements slower than the threshold get their EXPLAIN QUERY PLAN captured
+once and are added to a bounded slow-query log.
+
+The Python-level cursor wrapper costs roughly 2-3x on point queries and row
+iteration, so it is opt-in: set LEARN_AND_EARN_QUERY_STATS=1 to enable it
+and LEARN_AND_EARN_SLOW_QUERY_MS to change the threshold (default 50 ms).
+When it is off, connect() returns plain sqlite3 connections and cursors.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+SLOW_QUERY_MS = float(os.environ.get('LEARN_AND_EARN_SLOW_QUERY_MS', 50))
+LATENCY_SAMPLES = 2048
+SLOW_LOG_ENTRIES = 200
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PARAM_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+WHITESPACE = re.compile(r'\s+')
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def enabled():
+    return os.environ.get('LEARN_AND_EARN_QUERY_STATS', '0') in ('1', 'true', 'yes')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    text = WHITESPACE.sub(' ', sql).strip()
+    text = STRING_LITERAL.sub('?', text)
+    text = NUMBER_LITERAL.sub('?', text)
+    return PARAM_LIST.sub('(?, ...)', text)
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StatementStats:
+    __slots__ = ('fingerprint', 'calls', 'total_ms', 'max_ms', 'rows', 'samples', 'plan')
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+        self.plan = None
+
+    def as_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'calls': self.calls,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'p99_ms': round(percentile(self.samples, 0.99), 3),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'plan': self.plan,
+        }
+
+
+class QueryRecorder:
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self.started = time.time()
+        self._stats = {}
+        self._slow_log = deque(maxlen=SLOW_LOG_ENTRIES)
+        self._lock = threading.Lock()
+
+    def record(self, sql, elapsed_ms, rows, conn=None, params=None):
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StatementStats(key)
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.rows += rows
+            stats.samples.append(elapsed_ms)
+            if elapsed_ms > stats.max_ms:
+                stats.max_ms = elapsed_ms
+            needs_plan = elapsed_ms >= self.slow_query_ms and stats.plan is None
+
+        if elapsed_ms < self.slow_query_ms:
+            return
+        plan = explain(conn, sql, params) if needs_plan and conn is not None else None
+        with self._lock:
+            if plan is not None:
+                stats.plan = plan
+            self._slow_log.append({
+                'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'fingerprint': key,
+                'elapsed_ms': round(elapsed_ms, 3),
+                'rows': rows,
+                'plan': stats.plan,
+            })
+
+    def snapshot(self, order_by='total_ms'):
+        with self._lock:
+            statements = [stats.as_dict() for stats in self._stats.values()]
+            slow_log = list(self._slow_log)
+        statements.sort(key=lambda item: item[order_by], reverse=True)
+        return {
+            'since': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'slow_query_ms': self.slow_query_ms,
+            'statements': statements,
+            'slow_log': slow_log,
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow_log.clear()
+            self.started = time.time()
+
+
+recorder = QueryRecorder()
+
+
+def explain(conn, sql, params=None):
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    try:
+        # A plain sqlite3.Cursor keeps the EXPLAIN itself out of the stats
+        rows = sqlite3.Cursor(conn).execute('EXPLAIN QUERY PLAN ' + sql, params or ()).fetchall()
+    except sqlite3.Error:
+        return None
+    return [row[-1] for row in rows]
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times each statement from execute until its rows are consumed."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = None
+
+    def _begin(self, sql, params):
+        self._finish()
+        self._pending = [sql, params, 0.0, 0]
+
+    def _finish(self):
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        sql, params, elapsed, rows = pending
+        if rows == 0 and self.rowcount > 0:
+            rows = self.rowcount  # rows written by DML
+        recorder.record(sql, elapsed * 1000, rows, self.connection, params)
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            if self._pending is not None:
+                self._pending[2] += time.perf_counter() - started
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql, parameters)
+        self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._begin(sql, None)
+        self._timed(super().executemany, sql, seq_of_parameters)
+        self._finish()
+        return self
+
+    def executescript(self, sql_script):
+        self._finish()
+        return super().executescript(sql_script)
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._pending is not None:
+            self._pending[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if self._pending is not None:
+            self._pending[3] += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._pending is not None:
+            self._pending[3] += len(rows)
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
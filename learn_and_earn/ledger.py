@@ -0,0 +1,225 @@
+"""
+Learning-credits ledger.
+
+Every change to a user's credits is an append-only row in
+credit_transactions (amounts in integer hundredths of a credit, so sums never
+drift), and each row carries the balance after it, so the current balance is
+one index lookup on the user's latest posting. Users created before the
+ledger get an 'opening' row holding their users.learning_credits balance the
+first time they are charged.
+
+In the single-file layout users.learning_credits is also kept as a cached
+balance, updated in the same transaction as each posting. With sharded
+storage credit_transactions lives in the user's shard next to user_courses,
+so a charge and its enrollment commit in one file; users (in the common
+database) is not written, and the ledger is the balance of record.
+
+Postings take the database write lock up front (PlatformService.write_transaction
+issues BEGIN IMMEDIATE), so the balance check, the debit and the enrollment
+cannot interleave with a concurrent click. An optional idempotency key per
+user and operation kind makes retried submits return the original posting
+instead of charging twice; the same key used for a grant and an enrollment
+are two different keys.
+
+Course prices are converted to credits with LEARN_AND_EARN_CREDIT_RATE
+(credits per unit of courses.price, default 0.1).
+
+Check (and optionally repair) cached balances against the ledger with:
+    python -m learn_and_earn.ledger verify [--repair]
+"""
+
+import argparse
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from .db import DB_PATH, connect, initialize_database
+from .sharding import is_shard_connection, shared_storage
+
+CREDIT_RATE = float(os.environ.get('LEARN_AND_EARN_CREDIT_RATE', 0.1))
+
+OPENING = 'opening'
+GRANT = 'grant'
+ENROLLMENT = 'enrollment'
+
+
+class InsufficientCredits(Exception):
+    def __init__(self, balance, amount):
+        super().__init__(f"Not enough learning credits: {-amount:g} needed, {balance:g} available")
+        self.balance = balance
+        self.amount = amount
+
+
+@dataclass(frozen=True)
+class CreditTransaction:
+    id: int
+    user_id: int
+    amount: float
+    kind: str
+    reference: Optional[str]
+    idempotency_key: Optional[str]
+    balance_after: float
+    created_at: str
+
+
+def to_cents(credits):
+    return int(round(float(credits) * 100))
+
+
+def from_cents(cents):
+    return cents / 100
+
+
+def scoped_key(kind, idempotency_key):
+    # Stored as "<kind>:<key>", so a key can only ever replay the kind of posting it was made for
+    return None if idempotency_key is None else f"{kind}:{idempotency_key}"
+
+
+def credits_for_price(price):
+    # Rounded to the hundredth, like every ledger amount
+    return from_cents(to_cents((price or 0) * CREDIT_RATE))
+
+
+def _transaction(row):
+    transaction_id, user_id, amount, kind, reference, key, balance_after, created_at = row
+    # Callers see the key they sent, without the kind scope
+    key = key.split(':', 1)[-1] if key else key
+    return CreditTransaction(transaction_id, user_id, from_cents(amount), kind, reference, key,
+                             from_cents(balance_after), created_at)
+
+
+TRANSACTION_COLUMNS = 'id, user_id, amount, kind, reference, idempotency_key, balance_after, created_at'
+
+
+class CreditLedger:
+    """Postings and balances; callers hold the write transaction (see PlatformService.write_transaction)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        # users sits in another file on a shard connection; don't write it there
+        self.caches_balance = not is_shard_connection(conn)
+
+    def balance(self, user_id):
+        ledger = self._last_balance_cents(user_id)
+        if ledger is not None:
+            return from_cents(ledger)
+        row = self.conn.execute('SELECT learning_credits FROM users WHERE id = ?', (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def find(self, user_id, kind, idempotency_key):
+        """The posting of this kind made with idempotency_key, or None."""
+        row = self.conn.execute(f'''
+            SELECT {TRANSACTION_COLUMNS} FROM credit_transactions
+            WHERE user_id = ? AND idempotency_key = ?
+        ''', (user_id, scoped_key(kind, idempotency_key))).fetchone()
+        return _transaction(row) if row else None
+
+    def history(self, user_id, limit=-1, offset=0):
+        rows = self.conn.execute(f'''
+            SELECT {TRANSACTION_COLUMNS} FROM credit_transactions
+            WHERE user_id = ?
+            ORDER BY id DESC
+            LIMIT ? OFFSET ?
+        ''', (user_id, limit, offset)).fetchall()
+        return [_transaction(row) for row in rows]
+
+    def _last_balance_cents(self, user_id):
+        row = self.conn.execute('''
+            SELECT balance_after FROM credit_transactions
+            WHERE user_id = ? ORDER BY id DESC LIMIT 1
+        ''', (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def post(self, user_id, amount, kind, reference=None, idempotency_key=None):
+        """
+        Append a posting of amount credits (negative for debits) and update the
+        cached balance. Raises InsufficientCredits if a debit would overdraw;
+        returns the CreditTransaction, or None for an unknown user.
+        """
+        balance = self._last_balance_cents(user_id)
+        if balance is None:
+            cached = self.conn.execute('SELECT learning_credits FROM users WHERE id = ?', (user_id,)).fetchone()
+            if cached is None:
+                return None
+            # First posting for a pre-ledger user: carry the cached balance over
+            balance = to_cents(cached[0])
+            self.conn.execute('''
+                INSERT INTO credit_transactions (user_id, amount, kind, balance_after)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, balance, OPENING, balance))
+
+        amount = to_cents(amount)
+        if balance + amount < 0:
+            raise InsufficientCredits(from_cents(balance), from_cents(amount))
+        cursor = self.conn.execute('''
+            INSERT INTO credit_transactions (user_id, amount, kind, reference, idempotency_key, balance_after)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, amount, kind, reference, scoped_key(kind, idempotency_key), balance + amount))
+        if self.caches_balance:
+            self.conn.execute('UPDATE users SET learning_credits = ? WHERE id = ?',
+                              (from_cents(balance + amount), user_id))
+        row = self.conn.execute(f'SELECT {TRANSACTION_COLUMNS} FROM credit_transactions WHERE id = ?',
+                                (cursor.lastrowid,)).fetchone()
+        return _transaction(row)
+
+    def mismatches(self):
+        """(user_id, cached balance, ledger balance) for users whose cache disagrees with the ledger."""
+        if not self.caches_balance:
+            # No cache on a shard; check each user's latest balance_after against the sum instead
+            return self.conn.execute('''
+                SELECT t.user_id, t.balance_after / 100.0, SUM(a.amount) / 100.0
+                FROM credit_transactions t
+                JOIN credit_transactions a ON a.user_id = t.user_id
+                WHERE t.id = (SELECT MAX(id) FROM credit_transactions WHERE user_id = t.user_id)
+                GROUP BY t.user_id
+                HAVING t.balance_after != SUM(a.amount)
+            ''').fetchall()
+        return self.conn.execute('''
+            SELECT u.id, u.learning_credits, t.total / 100.0
+            FROM users u
+            JOIN (SELECT user_id, SUM(amount) AS total FROM credit_transactions GROUP BY user_id) t
+              ON t.user_id = u.id
+            WHERE CAST(ROUND(u.learning_credits * 100) AS INTEGER) != t.total
+        ''').fetchall()
+
+    def repair(self):
+        # Reset cached balances to the ledger sums; callers commit
+        if not self.caches_balance:
+            return 0
+        mismatches = self.mismatches()
+        self.conn.executemany('UPDATE users SET learning_credits = ? WHERE id = ?',
+                              [(ledger_balance, user_id) for user_id, _, ledger_balance in mismatches])
+        return len(mismatches)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cached credit balances against the ledger")
+    parser.add_argument('command', choices=['verify'])
+    parser.add_argument('--repair', action='store_true', help="Reset mismatched balances to the ledger sum")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    initialize_database(conn)
+    connections = [conn]
+    storage = shared_storage(args.db)
+    if storage is not None:
+        # Sharded: each shard's ledger is checked against its own balance_after chain
+        connections += [storage.connect_shard(index) for index in range(storage.shard_count)]
+    found = 0
+    for conn in connections:
+        ledger = CreditLedger(conn)
+        mismatches = ledger.mismatches()
+        found += len(mismatches)
+        for user_id, cached, ledger_balance in mismatches:
+            print(f"user {user_id}: cached {cached:g}, ledger {ledger_balance:g}")
+        if args.repair and mismatches and ledger.caches_balance:
+            with conn:
+                ledger.repair()
+            print(f"Repaired {len(mismatches):,} balances")
+        conn.close()
+    if not found:
+        print("All cached balances match the ledger")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,401 @@
+"""
+Concurrent-session load test over the pages of the Streamlit app.
+
+Every simulated session runs on its own thread, like a Streamlit session,
+and walks the app's main flow: login, dashboard, course search, enrolling,
+the enrolled-courses list, a course's modules, an assignment submission and
+the dashboard again. Each page view pays what a Streamlit rerun pays
+(AdvancedLearnAndEarnPlatform.__init__ builds a PlatformService over the
+session's connection, which is opened once per session and reopened when
+the logged-in user's shard changes) and then makes the same service calls
+as the page. Widgets and st.cache_data are not involved, so the dashboard loaders
+run on their cache-miss path.
+
+Sessions run against a scratch copy of the database (taken with the backup
+API, so committed WAL frames are included), never the live file. The report
+lists latency percentiles per page, errors per page with 'database is
+locked' counted separately (raised, or surfaced in a result message), and
+page views per second. The connection profile follows
+LEARN_AND_EARN_DB_PROFILE, and LEARN_AND_EARN_SNAPSHOT applies as in the app.
+
+--max-locked and --max-p95-ms turn the run into a regression check: the
+command exits non-zero when either threshold is exceeded.
+
+Run with:
+    python -m learn_and_earn.loadtest --sessions 100 --iterations 3
+    python -m learn_and_earn.loadtest --sessions 200 --duration 60 --shards 4 --max-locked 0
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from typing import Tuple
+
+from .catalog import iter_catalog_courses
+from .db import DB_PATH, connect, initialize_database
+from .replica import shared_replica
+from .services import ERROR, PlatformService
+from .sharding import ShardedStorage
+
+PASSWORD = 'loadtest-password'
+RERUN = 'Rerun setup'
+SEARCH_TERMS = ('', '', 'data', 'cloud', 'design', 'leader', 'security', 'finance')
+CATEGORIES = ('All', 'All', 'Technology', 'Business', 'Creative', 'Personal Development')
+DIFFICULTIES = ('All', 'All', 'Beginner', 'Intermediate', 'Advanced')
+# The dashboard's recommendation section queries these skills for everyone
+DASHBOARD_SKILLS = ['Digital Marketing', 'SEO']
+MAX_ERROR_SAMPLES = 10  # distinct error messages kept for the report
+
+
+def is_locked(message):
+    # 'database is locked' and 'database table is locked' both mean lock contention
+    return 'is locked' in str(message)
+
+
+@dataclass(frozen=True)
+class PageReport:
+    page: str
+    count: int
+    errors: int
+    locked: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+@dataclass(frozen=True)
+class LoadTestReport:
+    sessions: int
+    elapsed_seconds: float
+    page_views: int
+    pages: Tuple[PageReport, ...]
+    error_samples: Tuple[str, ...]
+
+    @property
+    def throughput(self):
+        return self.page_views / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def errors(self):
+        return sum(page.errors for page in self.pages if page.page != RERUN)
+
+    @property
+    def locked(self):
+        return sum(page.locked for page in self.pages if page.page != RERUN)
+
+    def page(self, name):
+        return next((page for page in self.pages if page.page == name), None)
+
+    def lines(self):
+        lines = [f"{self.sessions} sessions, {self.page_views:,} page views in {self.elapsed_seconds:.1f} s "
+                 f"({self.throughput:,.1f} pages/s), {self.errors:,} errors, {self.locked:,} 'database is locked'",
+                 f"  {'page':<20} {'views':>7} {'errors':>7} {'locked':>7} {'p50 ms':>9} {'p95 ms':>9} "
+                 f"{'p99 ms':>9} {'max ms':>9}"]
+        for page in self.pages:
+            lines.append(f"  {page.page:<20} {page.count:7,} {page.errors:7,} {page.locked:7,} {page.p50_ms:9.1f} "
+                         f"{page.p95_ms:9.1f} {page.p99_ms:9.1f} {page.max_ms:9.1f}")
+        if self.error_samples:
+            lines.append("  errors:")
+            lines.extend(f"    {sample}" for sample in self.error_samples)
+        return lines
+
+    def as_dict(self):
+        report = asdict(self)
+        report.update(throughput=round(self.throughput, 3), errors=self.errors, locked=self.locked)
+        return report
+
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    """Latencies and errors per page, shared by all session threads."""
+
+    def __init__(self):
+        self._latencies = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._locked = defaultdict(int)
+        self._samples = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, page, elapsed_ms, error=None):
+        with self._lock:
+            self._latencies[page].append(elapsed_ms)
+            if error is not None:
+                self._errors[page] += 1
+                if is_locked(error):
+                    self._locked[page] += 1
+                sample = f"{page}: {error}"
+                if sample in self._samples or len(self._samples) < MAX_ERROR_SAMPLES:
+                    self._samples[sample] += 1
+
+    def report(self, sessions, elapsed_seconds):
+        pages = []
+        with self._lock:
+            for page, latencies in self._latencies.items():
+                ordered = sorted(latencies)
+                pages.append(PageReport(page, len(ordered), self._errors[page], self._locked[page],
+                                        round(percentile(ordered, 0.5), 3), round(percentile(ordered, 0.95), 3),
+                                        round(percentile(ordered, 0.99), 3), round(ordered[-1], 3)))
+            samples = tuple(f"{count:,}x {sample}" for sample, count in self._samples.most_common())
+        page_views = sum(page.count for page in pages if page.page != RERUN)
+        return LoadTestReport(sessions, elapsed_seconds, page_views, tuple(pages), samples)
+
+
+class LoadSession:
+    """One simulated browser session; pages are methods named after the app's pages."""
+
+    def __init__(self, harness, username, seed):
+        self.harness = harness
+        self.username = username
+        self.user_id = None
+        self.random = random.Random(seed)
+        self.enrolled = set()
+        self.conn = None
+        self.shard = None
+
+    def connection(self):
+        # Kept across page views like the app's session connection; reopened when the shard changes
+        shard = self.harness.shard_for(self.user_id)
+        if self.conn is not None and self.shard != shard:
+            self.close()
+        if self.conn is None:
+            self.conn = self.harness.open_connection(shard)
+            self.shard = shard
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def view(self, page, fn):
+        # A page view is a Streamlit rerun: a service over the session's connection, then the page
+        started = time.perf_counter()
+        error = None
+        try:
+            service = self.harness.open_service(self.connection())
+            self.harness.recorder.record(RERUN, (time.perf_counter() - started) * 1000)
+            result = fn(service)
+            # Services turn some sqlite3 errors into ERROR results instead of raising
+            if getattr(result, 'outcome', None) == ERROR:
+                error = result.message
+        except sqlite3.Error as e:
+            error = f"{type(e).__name__}: {e}"
+        self.harness.recorder.record(page, (time.perf_counter() - started) * 1000, error)
+
+    def think(self):
+        if self.harness.think_seconds:
+            time.sleep(self.random.uniform(0, self.harness.think_seconds))
+
+    def login(self, service):
+        user = service.authenticate(self.username, PASSWORD)
+        if user is not None:
+            self.user_id = user.id
+        return user
+
+    def dashboard(self, service):
+        # main_dashboard's sections: metrics, progress, achievements, leaderboard, recommendations, deadlines
+        service.get_user_metrics(self.user_id)
+        service.get_progress_summary(self.user_id)
+        service.get_course_progress(self.user_id)
+        service.get_user_skills(self.user_id)
+        service.get_leaderboard(limit=10)
+        service.match_courses(DASHBOARD_SKILLS)
+        return service.get_upcoming_deadlines(self.user_id)
+
+    def search_courses(self, service):
+        return service.search_courses(self.random.choice(SEARCH_TERMS), self.random.choice(CATEGORIES),
+                                      self.random.choice(DIFFICULTIES))
+
+    def enroll(self, service):
+        course_id = self.random.choice(self.harness.course_ids)
+        result = service.enroll_in_course(self.user_id, course_id)
+        if result.ok:
+            self.enrolled.add(course_id)
+        return result
+
+    def enrolled_courses(self, service):
+        return service.list_enrolled_courses(self.user_id)
+
+    def learn_course(self, service):
+        course_id = self._module_course()
+        modules = service.list_course_modules(course_id)
+        service.list_course_quizzes(course_id)
+        if modules:
+            # The learner opens one module, which decompresses its body
+            service.get_module_body(self.random.choice(modules))
+        return service.count_remaining_modules(self.user_id, course_id)
+
+    def submit_assignment(self, service):
+        course_id = self._module_course()
+        modules = service.list_course_modules(course_id)
+        if not modules:
+            return None
+        return service.submit_assignment(self.user_id, course_id, self.random.choice(modules).id)
+
+    def _module_course(self):
+        # Catalog courses are the ones with modules; prefer one this session is enrolled in
+        enrolled = sorted(self.enrolled.intersection(self.harness.module_course_ids))
+        return self.random.choice(enrolled or self.harness.module_course_ids)
+
+    def run(self, iterations, deadline):
+        self.view('Login', self.login)
+        if self.user_id is None:
+            return
+        flow = (('Dashboard', self.dashboard), ('Search Courses', self.search_courses),
+                ('Enroll', self.enroll), ('Enrolled Courses', self.enrolled_courses),
+                ('Learn Course', self.learn_course), ('Submit Assignment', self.submit_assignment),
+                ('Dashboard', self.dashboard))
+        iteration = 0
+        while (iterations is None or iteration < iterations) and (deadline is None or time.monotonic() < deadline):
+            for page, fn in flow:
+                self.think()
+                self.view(page, fn)
+            iteration += 1
+
+
+class LoadTest:
+    def __init__(self, path, shard_count=1, think_seconds=0.0):
+        self.path = path
+        self.think_seconds = think_seconds
+        self.storage = ShardedStorage(path, shard_count) if shard_count > 1 else None
+        self.replica = shared_replica(path) if self.storage is None else None
+        self.recorder = Recorder()
+        self.module_course_ids = sorted({course['id'] for course in iter_catalog_courses()})
+        self.course_ids = []
+
+    def shard_for(self, user_id):
+        return self.storage.shard_for(user_id) if self.storage is not None else None
+
+    def open_connection(self, shard):
+        # Same connection setup as the app's session_connection; the schema was created
+        # once in prepare(), as the app does once per process
+        return self.storage.connect_shard(shard) if self.storage is not None else connect(self.path)
+
+    def open_service(self, conn):
+        if self.storage is not None:
+            return PlatformService(conn)
+        return PlatformService(conn, replica=self.replica)
+
+    def prepare(self, sessions):
+        """Create the schema (and shards) and register one user per session; returns the usernames."""
+        if self.storage is not None:
+            self.storage.migrate_from_common()
+        conn = connect(self.path)
+        try:
+            initialize_database(conn)
+            service = PlatformService(conn)
+            run_id = int(time.time())
+            usernames = []
+            for index in range(sessions):
+                username = f"loadtest_{run_id}_{index}"
+                service.register_user(username, f"{username}@example.com", PASSWORD, 'Data Science')
+                usernames.append(username)
+            course_ids = [row[0] for row in conn.execute('SELECT id FROM courses ORDER BY id')]
+        finally:
+            conn.close()
+        self.course_ids = sorted(set(course_ids) | set(self.module_course_ids))
+        return usernames
+
+    def run(self, sessions, iterations=1, duration=None, seed=0):
+        usernames = self.prepare(sessions)
+        deadline_box = []
+        # All sessions start together, so the first page views contend like a traffic spike
+        barrier = threading.Barrier(sessions, action=lambda: deadline_box.append(
+            time.monotonic() + duration if duration else None))
+
+        def session(index):
+            load_session = LoadSession(self, usernames[index], seed * 100003 + index)
+            barrier.wait()
+            try:
+                load_session.run(None if duration else iterations, deadline_box[0])
+            finally:
+                load_session.close()
+
+        threads = [threading.Thread(target=session, args=(index,), name=f"loadtest-session-{index}", daemon=True)
+                   for index in range(sessions)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.recorder.report(sessions, time.perf_counter() - started)
+
+    def close(self):
+        if self.storage is not None:
+            self.storage.close()
+        if self.replica is not None:
+            self.replica.close()
+
+
+def scratch_copy(source_path, directory):
+    # The backup API includes frames still in the source's -wal file; copying the file would not
+    copy_path = os.path.join(directory, 'loadtest.db')
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(copy_path)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    return copy_path
+
+
+def run_load_test(path=DB_PATH, sessions=50, iterations=1, duration=None, shard_count=1, think_seconds=0.0,
+                  seed=0):
+    """Run the session flow on a scratch copy of path; returns a LoadTestReport."""
+    with tempfile.TemporaryDirectory() as scratch:
+        load_test = LoadTest(scratch_copy(path, scratch), shard_count, think_seconds)
+        try:
+            return load_test.run(sessions, iterations, duration, seed)
+        finally:
+            load_test.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test on a scratch copy of the database")
+    parser.add_argument('--sessions', type=int, default=50, help="Simulated sessions (one thread each)")
+    parser.add_argument('--iterations', type=int, default=1, help="Passes through the page flow per session")
+    parser.add_argument('--duration', type=float, help="Run for this many seconds instead of --iterations")
+    parser.add_argument('--shards', type=int, default=1, help="Use sharded storage with this many shards")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="Random pause of up to this long before each page")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-locked', type=int, help="Fail if more page views hit 'database is locked'")
+    parser.add_argument('--max-p95-ms', type=float, help="Fail if any page's p95 latency is higher")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database to copy")
+    args = parser.parse_args(argv)
+    if args.sessions < 1:
+        parser.error("--sessions must be at least 1")
+
+    report = run_load_test(args.db, args.sessions, args.iterations, args.duration, args.shards,
+                           args.think_ms / 1000, args.seed)
+    print(json.dumps(report.as_dict(), indent=2) if args.json else '\n'.join(report.lines()))
+
+    failures = []
+    if args.max_locked is not None and report.locked > args.max_locked:
+        failures.append(f"{report.locked:,} page views hit 'database is locked' (allowed {args.max_locked:,})")
+    if args.max_p95_ms is not None:
+        failures.extend(f"{page.page} p95 {page.p95_ms:.1f} ms exceeds {args.max_p95_ms:g} ms"
+                        for page in report.pages if page.p95_ms > args.max_p95_ms)
+    if failures:
+        raise SystemExit("Load test failed: " + "; ".join(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+SQLite maintenance: planner statistics, WAL checkpoints and free-page reclaim.
+
+A maintenance pass on one database file runs:
+
+- events.ProgressMaterializer.catch_up, folding events that were written
+  outside the service layer into the progress summaries;
+- archive.archive_database, moving finished enrollments and applications
+  to the archived tables in small batches (unless LEARN_AND_EARN_ARCHIVE_DAYS=0);
+- ANALYZE the first time (no sqlite_stat1 yet), PRAGMA optimize afterwards,
+  so the planner has statistics for the indexes it chooses between;
+- PRAGMA wal_checkpoint(TRUNCATE) in WAL mode, folding the write-ahead log
+  back into the database and resetting the -wal file;
+- PRAGMA incremental_vacuum when the file uses auto_vacuum=INCREMENTAL and
+  has free pages (existing files are converted once with the vacuum command).
+
+Each pass returns a MaintenanceReport with DatabaseStats taken before and
+after (file, free-page and WAL sizes, journal mode, analyzed tables).
+
+MaintenanceScheduler runs passes on a background thread when the files have
+been idle (no commits from other connections, tracked with PRAGMA
+data_version) for idle_seconds, at most once per interval. The app and the
+API server start it through shared_maintenance(); set
+LEARN_AND_EARN_MAINTENANCE=0 to turn it off.
+
+Run a pass now, convert a file to incremental vacuum, or compare connection
+profiles on a scratch copy with:
+    python -m learn_and_earn.maintenance run
+    python -m learn_and_earn.maintenance vacuum
+    python -m learn_and_earn.maintenance compare --profiles legacy tuned
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Tuple
+
+from .archive import archive_after_days, archive_database
+from .db import DB_PATH, DB_PROFILES, connect, initialize_database
+from .events import ProgressMaterializer
+from .sharding import shared_storage
+
+IDLE_SECONDS = 30.0
+INTERVAL_SECONDS = 15 * 60.0
+# Pages released per incremental_vacuum call, so one pass never holds the write lock for long
+VACUUM_PAGES = 2000
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+
+def enabled():
+    return os.environ.get('LEARN_AND_EARN_MAINTENANCE', '1') not in ('0', 'false', 'no')
+
+
+@dataclass(frozen=True)
+class DatabaseStats:
+    path: str
+    journal_mode: str
+    auto_vacuum: str
+    page_size: int
+    page_count: int
+    freelist_count: int
+    wal_bytes: int
+    analyzed_tables: int
+
+    @property
+    def file_bytes(self):
+        return self.page_size * self.page_count
+
+    @property
+    def free_bytes(self):
+        return self.page_size * self.freelist_count
+
+
+@dataclass(frozen=True)
+class MaintenanceReport:
+    before: DatabaseStats
+    after: DatabaseStats
+    tasks: Tuple[Tuple[str, float, str], ...]  # (task, milliseconds, detail)
+
+    def lines(self):
+        before, after = self.before, self.after
+        lines = [f"{before.path} ({after.journal_mode}, auto_vacuum={after.auto_vacuum})"]
+        for task, elapsed_ms, detail in self.tasks:
+            lines.append(f"  {task:<20} {elapsed_ms:8.1f} ms  {detail}")
+        for label, old, new in (('file', before.file_bytes, after.file_bytes),
+                                ('free pages', before.free_bytes, after.free_bytes),
+                                ('wal', before.wal_bytes, after.wal_bytes)):
+            lines.append(f"  {label:<20} {old / 1024:10,.0f} KiB -> {new / 1024:,.0f} KiB")
+        lines.append(f"  {'analyzed tables':<20} {before.analyzed_tables:10,} -> {after.analyzed_tables:,}")
+        return lines
+
+
+def database_stats(conn, path):
+    def pragma(name):
+        return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+    analyzed = 0
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        analyzed = conn.execute('SELECT COUNT(DISTINCT tbl) FROM sqlite_stat1').fetchone()[0]
+    wal_path = f"{path}-wal"
+    return DatabaseStats(path, pragma('journal_mode'), AUTO_VACUUM_MODES.get(pragma('auto_vacuum'), '?'),
+                         pragma('page_size'), pragma('page_count'), pragma('freelist_count'),
+                         os.path.getsize(wal_path) if os.path.exists(wal_path) else 0, analyzed)
+
+
+def _timed(tasks, name, fn):
+    started = time.perf_counter()
+    detail = fn()
+    tasks.append((name, (time.perf_counter() - started) * 1000, detail))
+
+
+def run_maintenance(path, vacuum_pages=VACUUM_PAGES):
+    """One maintenance pass over a database file; returns a MaintenanceReport."""
+    conn = connect(path)
+    try:
+        before = database_stats(conn, path)
+        tasks = []
+        materializer = ProgressMaterializer(conn)
+        if materializer.has_pending():
+            _timed(tasks, 'events', lambda: f"{materializer.catch_up():,} events folded")
+        if archive_after_days():
+            # First, so the pages it frees are reclaimed and the statistics see the smaller hot tables
+            _timed(tasks, 'archive', lambda: archive_database(conn).describe())
+
+        def analyze():
+            # PRAGMA optimize only refreshes statistics that exist, so the first pass analyzes everything
+            if before.analyzed_tables == 0:
+                conn.execute('ANALYZE')
+                return 'full ANALYZE'
+            conn.execute('PRAGMA optimize').fetchall()
+            return 'PRAGMA optimize'
+        _timed(tasks, 'analyze', analyze)
+        conn.commit()
+
+        if before.auto_vacuum == 'incremental' and before.freelist_count:
+            def vacuum():
+                # Each step of this pragma frees one page and execute() steps it only once or twice;
+                # executescript runs it to completion (and commits)
+                conn.executescript(f'PRAGMA incremental_vacuum({int(vacuum_pages)});')
+                return f"{before.freelist_count - conn.execute('PRAGMA freelist_count').fetchone()[0]:,} pages"
+            _timed(tasks, 'incremental_vacuum', vacuum)
+
+        if before.journal_mode == 'wal':
+            def checkpoint():
+                busy, log_frames, checkpointed = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+                return f"{checkpointed} of {log_frames} frames" + (' (busy, retried next pass)' if busy else '')
+            _timed(tasks, 'wal_checkpoint', checkpoint)
+
+        return MaintenanceReport(before, database_stats(conn, path), tuple(tasks))
+    finally:
+        conn.close()
+
+
+def full_vacuum(path):
+    """Rewrite the file with auto_vacuum=INCREMENTAL and fresh statistics; blocks writers while it runs."""
+    conn = connect(path)
+    try:
+        before = database_stats(conn, path)
+        tasks = []
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
+        def vacuum():
+            conn.execute('VACUUM')
+            return f"{before.freelist_count:,} free pages dropped"
+
+        def analyze():
+            conn.execute('ANALYZE')
+            conn.commit()
+            return 'full ANALYZE'
+        _timed(tasks, 'vacuum', vacuum)
+        _timed(tasks, 'analyze', analyze)
+        if before.journal_mode == 'wal':
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+        return MaintenanceReport(before, database_stats(conn, path), tuple(tasks))
+    finally:
+        conn.close()
+
+
+class MaintenanceScheduler:
+    def __init__(self, paths, idle_seconds=IDLE_SECONDS, interval=INTERVAL_SECONDS):
+        self.paths = list(paths)
+        self.idle_seconds = idle_seconds
+        self.interval = interval
+        self.reports = {}  # path -> last MaintenanceReport
+        self.errors = {}   # path -> last sqlite3.Error message
+        self._watchers = {}
+        self._versions = {}
+        self._changed_at = {}
+        self._last_run = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _poll(self):
+        # data_version moves whenever another connection commits to the file
+        now = time.monotonic()
+        for path in self.paths:
+            conn = self._watchers.get(path)
+            if conn is None:
+                conn = self._watchers[path] = sqlite3.connect(path, check_same_thread=False)
+            version = conn.execute('PRAGMA data_version').fetchone()[0]
+            if self._versions.get(path) != version:
+                self._versions[path] = version
+                self._changed_at[path] = now
+
+    def idle(self):
+        now = time.monotonic()
+        return all(now - self._changed_at.get(path, now) >= self.idle_seconds for path in self.paths)
+
+    def run_once(self):
+        for path in self.paths:
+            try:
+                self.reports[path] = run_maintenance(path)
+                self.errors.pop(path, None)
+            except sqlite3.Error as e:
+                # Usually "database is locked": a writer showed up; the next idle window retries
+                self.errors[path] = str(e)
+        self._last_run = time.monotonic()
+        return [self.reports[path] for path in self.paths if path in self.reports]
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='learn-and-earn-maintenance', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        for conn in self._watchers.values():
+            conn.close()
+
+    def _run(self):
+        while not self._stop.wait(min(self.idle_seconds, self.interval) / 3):
+            try:
+                self._poll()
+            except sqlite3.Error:
+                continue
+            if time.monotonic() - self._last_run >= self.interval and self.idle():
+                self.run_once()
+                # Our own pass commits; do not count it as activity
+                self._poll()
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def database_paths(path=DB_PATH):
+    storage = shared_storage(path)
+    return [path] + (storage.shard_paths if storage is not None else [])
+
+
+def shared_maintenance(path=DB_PATH):
+    """The process-wide scheduler for a database (and its shards), started on first use; None if disabled."""
+    if not enabled():
+        return None
+    with _schedulers_lock:
+        scheduler = _schedulers.get(path)
+        if scheduler is None:
+            scheduler = _schedulers[path] = MaintenanceScheduler(database_paths(path)).start()
+        return scheduler
+
+
+# ---- Profile comparison -----------------------------------------------------
+
+def _workload(path, profile, users, reads):
+    from .services import PlatformService
+
+    service = PlatformService(connect(path, profile))
+    timings = {}
+    started = time.perf_counter()
+    # Autocommitted writes, like clicks from many sessions
+    user_ids = [service.register_user(f"maintenance_{profile}_{i}", f"maintenance_{profile}_{i}@example.com",
+                                      'password', 'Data Science').user_id for i in range(users)]
+    for user_id in user_ids:
+        service.enroll_in_course(user_id, 'ai001')
+        service.update_course_progress(user_id, 'ai001', 20)
+    timings['writes'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(reads):
+        user_id = user_ids[i % len(user_ids)]
+        service.get_user_metrics(user_id)
+        service.get_course_progress(user_id)
+        service.get_leaderboard()
+    timings['reads'] = time.perf_counter() - started
+    service.conn.close()
+    return timings
+
+
+def compare_profiles(path, profiles, users=200, reads=2000):
+    """Run the same write/read workload on a scratch copy of path under each profile."""
+    results = {}
+    for profile in profiles:
+        with tempfile.TemporaryDirectory() as scratch:
+            copy = os.path.join(scratch, 'compare.db')
+            shutil.copyfile(path, copy)
+            conn = connect(copy, profile)
+            initialize_database(conn)
+            conn.close()
+            results[profile] = _workload(copy, profile, users, reads)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite maintenance and profile comparison")
+    parser.add_argument('command', choices=['run', 'vacuum', 'compare'])
+    parser.add_argument('--profiles', nargs='+', default=['legacy', 'tuned'], choices=sorted(DB_PROFILES))
+    parser.add_argument('--users', type=int, default=200, help="Users written by the compare workload")
+    parser.add_argument('--reads', type=int, default=2000, help="Dashboard reads in the compare workload")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        results = compare_profiles(args.db, args.profiles, args.users, args.reads)
+        writes = args.users * 3
+        for profile, timings in results.items():
+            print(f"{profile:<10} writes {writes / timings['writes']:8,.0f}/s   "
+                  f"reads {args.reads * 3 / timings['reads']:8,.0f}/s")
+        return
+
+    conn = connect(args.db)
+    initialize_database(conn)
+    conn.close()
+    for path in database_paths(args.db):
+        report = full_vacuum(path) if args.command == 'vacuum' else run_maintenance(path)
+        print('\n'.join(report.lines()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+Image pipeline for profile pictures and course artwork.
+
+An upload is size-capped, hashed and decoded once; every variant in VARIANTS
+(thumbnails and WebP renditions, plus a JPEG fallback) is generated at
+upload time and written to content-addressed files under MEDIA_ROOT
+(<root>/<aa>/<sha256>.<ext>). The database only keeps small metadata rows:
+
+- media_variants: source digest + variant -> file digest, size, dimensions
+- media_links: (owner_type, owner_id) -> source digest
+
+so SELECTs on users never drag image bytes through the page cache, and the
+same picture uploaded twice is stored once. Reads never resize: they look up
+the variant's digest and return the file bytes, memoized in a byte-bounded
+LRU. Digests are immutable, so the API serves them with long-lived cache
+headers and an ETag.
+
+Profile pictures are attached by users (owner type PROFILE); course
+artwork (owner type COURSE) is attached by admins from the command line and
+shown on the course cards and by GET /courses/{id}/image.
+
+Files live in a media/ directory next to the database file unless
+LEARN_AND_EARN_MEDIA_DIR is set.
+
+Move images out of the legacy users.profile_image column, or attach course
+artwork, with:
+    python -m learn_and_earn.media migrate
+    python -m learn_and_earn.media course ai001 artwork.png
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .db import DB_PATH, connect, initialize_database
+from .uploads import UploadError, iter_chunks
+
+MEDIA_ROOT = os.environ.get('LEARN_AND_EARN_MEDIA_DIR')
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+# Decompression-bomb guard: refuse anything larger than this many pixels
+MAX_IMAGE_PIXELS = 40_000_000
+BYTE_CACHE_BYTES = 32 * 1024 * 1024
+
+PROFILE = 'user'
+COURSE = 'course'
+
+# name -> (longest side in pixels, format)
+VARIANTS = {
+    'thumb': (64, 'WEBP'),
+    'small': (160, 'WEBP'),
+    'large': (640, 'WEBP'),
+    'large_jpeg': (640, 'JPEG'),
+}
+CONTENT_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg', 'PNG': 'image/png'}
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+
+@dataclass(frozen=True)
+class MediaVariant:
+    variant: str
+    digest: str
+    content_type: str
+    width: int
+    height: int
+    size_bytes: int
+
+
+@dataclass(frozen=True)
+class MediaResult:
+    source_digest: str
+    variants: tuple
+    reused: bool = False
+
+
+class ByteCache:
+    """Thread-safe LRU of file bytes keyed by digest, bounded by total size."""
+
+    def __init__(self, max_bytes=BYTE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+byte_cache = ByteCache()
+
+
+def render_variants(data):
+    """Decode an image once and encode every variant; returns [(variant, format, width, height, bytes)]."""
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise UploadError("Image dimensions are too large")
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise UploadError("Not a valid image file") from e
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    rendered = []
+    # Largest first, so each smaller size resamples the previous reduced copy instead of the original
+    for variant, (size, fmt) in sorted(VARIANTS.items(), key=lambda item: -item[1][0]):
+        image = image.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        output = image.convert('RGB') if fmt == 'JPEG' and image.mode != 'RGB' else image
+        buffer = io.BytesIO()
+        output.save(buffer, fmt, quality=82, **({'method': 4} if fmt == 'WEBP' else {'optimize': True}))
+        rendered.append((variant, fmt, output.width, output.height, buffer.getvalue()))
+    return rendered
+
+
+def default_root(conn):
+    # media/ next to the database file (the shard file on a shard connection), not the working directory
+    if MEDIA_ROOT:
+        return MEDIA_ROOT
+    path = next((path for _, name, path in conn.execute('PRAGMA database_list') if name == 'main'), '')
+    return os.path.join(os.path.dirname(os.path.abspath(path)), 'media') if path else 'media'
+
+
+class MediaStore:
+    def __init__(self, conn, root=None, cache=byte_cache):
+        self.conn = conn
+        self.root = root or default_root(conn)
+        self.cache = cache
+
+    def path_for(self, digest, content_type):
+        ext = next((EXTENSIONS[fmt] for fmt, ctype in CONTENT_TYPES.items() if ctype == content_type), 'bin')
+        return os.path.join(self.root, digest[:2], f"{digest}.{ext}")
+
+    def store(self, data, content_type):
+        """Write bytes to their content-addressed file (once); returns the digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, content_type)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so a reader never sees a partial file
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        return digest
+
+    def variants_for_source(self, source_digest):
+        rows = self.conn.execute('''
+            SELECT variant, digest, content_type, width, height, size_bytes
+            FROM media_variants WHERE source_digest = ?
+        ''', (source_digest,)).fetchall()
+        return tuple(MediaVariant(*row) for row in rows)
+
+    def ingest(self, fileobj, max_bytes=MAX_IMAGE_BYTES):
+        """Store an uploaded image and all its variants; returns MediaResult. Callers commit."""
+        data = b''.join(iter_chunks(fileobj, max_bytes))
+        source_digest = hashlib.sha256(data).hexdigest()
+        existing = self.variants_for_source(source_digest)
+        if len(existing) == len(VARIANTS):
+            return MediaResult(source_digest, existing, reused=True)
+
+        variants = []
+        for variant, fmt, width, height, encoded in render_variants(data):
+            digest = self.store(encoded, CONTENT_TYPES[fmt])
+            variants.append(MediaVariant(variant, digest, CONTENT_TYPES[fmt], width, height, len(encoded)))
+        self.conn.executemany('''
+            INSERT OR REPLACE INTO media_variants
+            (source_digest, variant, digest, content_type, width, height, size_bytes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(source_digest, v.variant, v.digest, v.content_type, v.width, v.height, v.size_bytes)
+              for v in variants])
+        return MediaResult(source_digest, tuple(variants))
+
+    def attach(self, owner_type, owner_id, fileobj):
+        result = self.ingest(fileobj)
+        self.conn.execute('''
+            INSERT INTO media_links (owner_type, owner_id, source_digest, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(owner_type, owner_id) DO UPDATE SET
+                source_digest = excluded.source_digest,
+                updated_at = excluded.updated_at
+        ''', (owner_type, str(owner_id), result.source_digest))
+        return result
+
+    def variant(self, owner_type, owner_id, variant='small'):
+        row = self.conn.execute('''
+            SELECT mv.variant, mv.digest, mv.content_type, mv.width, mv.height, mv.size_bytes
+            FROM media_links ml
+            JOIN media_variants mv ON mv.source_digest = ml.source_digest
+            WHERE ml.owner_type = ? AND ml.owner_id = ? AND mv.variant = ?
+        ''', (owner_type, str(owner_id), variant)).fetchone()
+        return MediaVariant(*row) if row else None
+
+    def content_type_for(self, digest):
+        row = self.conn.execute('SELECT content_type FROM media_variants WHERE digest = ? LIMIT 1',
+                                (digest,)).fetchone()
+        return row[0] if row else None
+
+    def read(self, digest, content_type):
+        data = self.cache.get(digest)
+        if data is None:
+            try:
+                with open(self.path_for(digest, content_type), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+            self.cache.put(digest, data)
+        return data
+
+    def read_variant(self, owner_type, owner_id, variant='small'):
+        media = self.variant(owner_type, owner_id, variant)
+        return self.read(media.digest, media.content_type) if media else None
+
+    def migrate_profile_blobs(self, batch_size=100):
+        """Move users.profile_image BLOBs into the pipeline and clear the column; returns the count."""
+        moved = 0
+        while True:
+            rows = self.conn.execute('''
+                SELECT id, profile_image FROM users
+                WHERE profile_image IS NOT NULL
+                ORDER BY id LIMIT ?
+            ''', (batch_size,)).fetchall()
+            if not rows:
+                return moved
+            with self.conn:
+                for user_id, blob in rows:
+                    try:
+                        self.attach(PROFILE, user_id, io.BytesIO(blob))
+                    except UploadError:
+                        pass  # unreadable legacy data is dropped rather than retried forever
+                    self.conn.execute('UPDATE users SET profile_image = NULL WHERE id = ?', (user_id,))
+            moved += len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage stored images")
+    parser.add_argument('command', choices=['migrate', 'course'])
+    parser.add_argument('course_id', nargs='?', help="Course to attach artwork to (course command)")
+    parser.add_argument('image', nargs='?', help="Image file (course command)")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    parser.add_argument('--root', default=None, help="Directory for image files (default: media/ next to --db)")
+    args = parser.parse_args(argv)
+    if args.command == 'course' and not (args.course_id and args.image):
+        parser.error("course needs a course id and an image file")
+
+    conn = connect(args.db)
+    initialize_database(conn)
+    store = MediaStore(conn, args.root)
+    if args.command == 'migrate':
+        moved = store.migrate_profile_blobs()
+        print(f"Moved {moved:,} profile images to {store.root}")
+    else:
+        try:
+            with open(args.image, 'rb') as f, conn:
+                result = store.attach(COURSE, args.course_id, f)
+        except UploadError as e:
+            parser.exit(1, f"{args.image}: {e}\n")
+        print(f"Attached {args.image} to {args.course_id} ({len(result.variants)} variants in {store.root})")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
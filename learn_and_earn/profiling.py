@@ -0,0 +1,213 @@
+"""
+Opt-in render profiling for the Streamlit pages.
+
+run() wraps each page render in profiler.page(name); inside a page,
+profiler.phase('data' | 'dataframe' | 'figure') marks the expensive steps.
+Time not covered by a phase is booked as 'widgets' (Streamlit element
+emission and everything else). Every render is added to a per-page
+histogram of total and per-phase latency, and a configurable fraction of
+renders also runs under cProfile, aggregated per page.
+
+Enable with LEARN_AND_EARN_PROFILE=1; LEARN_AND_EARN_PROFILE_SAMPLE sets the
+cProfile sampling fraction (default 0.05).
+"""
+
+import bisect
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+PHASES = ('data', 'dataframe', 'figure', 'widgets')
+# Histogram bucket upper bounds in ms; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+TOP_FUNCTIONS = 25
+
+
+def enabled():
+    return os.environ.get('LEARN_AND_EARN_PROFILE', '0') in ('1', 'true', 'yes')
+
+
+def sample_rate():
+    try:
+        return min(1.0, max(0.0, float(os.environ.get('LEARN_AND_EARN_PROFILE_SAMPLE', 0.05))))
+    except ValueError:
+        return 0.05
+
+
+def bucket_label(index):
+    if index == 0:
+        return f"<{BUCKETS_MS[0]} ms"
+    if index == len(BUCKETS_MS):
+        return f">={BUCKETS_MS[-1]} ms"
+    return f"{BUCKETS_MS[index - 1]}-{BUCKETS_MS[index]} ms"
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms):
+        self.counts[bisect.bisect_right(BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def quantile(self, fraction):
+        # Upper bound of the bucket holding the quantile (an upper estimate, capped at the max)
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return round(min(BUCKETS_MS[index], self.max_ms) if index < len(BUCKETS_MS) else self.max_ms, 3)
+        return round(self.max_ms, 3)
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'max_ms': round(self.max_ms, 3),
+            'buckets': {bucket_label(i): count for i, count in enumerate(self.counts) if count},
+        }
+
+
+class PageStats:
+    def __init__(self):
+        self.total = Histogram()
+        self.phases = {phase: Histogram() for phase in PHASES}
+        self.profile = None  # pstats.Stats aggregated over sampled renders
+        self.profiled_renders = 0
+
+
+class RenderProfiler:
+    def __init__(self, sample_rate=0.05, enabled=False):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.started = time.time()
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Streamlit renders each session on its own thread
+
+    @contextmanager
+    def page(self, name):
+        if not self.enabled or getattr(self._local, 'phases', None) is not None:
+            yield
+            return
+
+        self._local.phases = dict.fromkeys(PHASES, 0.0)
+        profile = self._start_profile() if random.random() < self.sample_rate else None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+            phases = self._local.phases
+            self._local.phases = None
+            phases['widgets'] = max(0.0, elapsed - sum(phases.values()))
+            self._record(name, elapsed, phases, profile)
+
+    @contextmanager
+    def phase(self, name):
+        phases = getattr(self._local, 'phases', None)
+        if phases is None or getattr(self._local, 'phase', None) is not None:
+            # Not rendering a page, or nested inside another phase
+            yield
+            return
+
+        self._local.phase = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - started
+            self._local.phase = None
+
+    def _start_profile(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another render is already being profiled
+            return None
+        return profile
+
+    def _record(self, name, elapsed, phases, profile):
+        stats = pstats.Stats(profile, stream=io.StringIO()) if profile is not None else None
+        with self._lock:
+            page = self._pages.get(name)
+            if page is None:
+                page = self._pages[name] = PageStats()
+            page.total.add(elapsed * 1000)
+            for phase, seconds in phases.items():
+                page.phases.setdefault(phase, Histogram()).add(seconds * 1000)
+            if stats is not None:
+                if page.profile is None:
+                    page.profile = stats
+                else:
+                    page.profile.add(stats)
+                page.profiled_renders += 1
+
+    def snapshot(self):
+        with self._lock:
+            pages = {
+                name: {
+                    'total': page.total.as_dict(),
+                    'phases': {phase: hist.as_dict() for phase, hist in page.phases.items()},
+                    'profiled_renders': page.profiled_renders,
+                }
+                for name, page in self._pages.items()
+            }
+        return {
+            'since': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'sample_rate': self.sample_rate,
+            'pages': dict(sorted(pages.items(), key=lambda item: item[1]['total']['mean_ms'] * item[1]['total']['count'],
+                                 reverse=True)),
+        }
+
+    def top_functions(self, name, limit=TOP_FUNCTIONS, sort='cumulative'):
+        # Text report of the aggregated cProfile samples for one page
+        with self._lock:
+            page = self._pages.get(name)
+            if page is None or page.profile is None:
+                return ''
+            stream = io.StringIO()
+            page.profile.stream = stream
+            page.profile.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def dump_profile(self, name, path):
+        with self._lock:
+            page = self._pages.get(name)
+            if page is None or page.profile is None:
+                return False
+            page.profile.dump_stats(path)
+        return True
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def reset(self):
+        with self._lock:
+            self._pages.clear()
+            self.started = time.time()
+
+
+profiler = RenderProfiler(sample_rate(), enabled())
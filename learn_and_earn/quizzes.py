@@ -0,0 +1,132 @@
+"""
+Module quizzes stored in course_modules.quiz_data.
+
+Quizzes are stored in a compact JSON form,
+    {"v": 1, "q": [[prompt, [option, ...], answer_index, points], ...]}
+with points omitted when it is 1. The older verbose form
+({"questions": [{"prompt", "options", "answer", "points"}]}) is still read.
+
+Parsing happens once per module per process: quiz_cache keeps the parsed
+Quiz objects, so Streamlit reruns and exam-day grading only pay for a dict
+lookup. Each Quiz carries its answer key as bytes (one option index per
+question, the same encoding as submitted answer sheets), so checking an
+attempt is a byte-wise comparison with no JSON involved.
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from typing import Tuple
+
+QUIZ_FORMAT_VERSION = 1
+BLANK = 255
+
+
+@dataclass(frozen=True)
+class Question:
+    prompt: str
+    options: Tuple[str, ...]
+    answer: int
+    points: float = 1
+
+
+@dataclass(frozen=True)
+class Quiz:
+    module_id: str
+    questions: Tuple[Question, ...]
+    answer_key: bytes
+    total_points: float
+
+    def check(self, sheet):
+        """Per-question correctness and points earned for an encoded answer sheet."""
+        correct = tuple(given == expected for given, expected in zip(sheet, self.answer_key))
+        correct += (False,) * (len(self.answer_key) - len(correct))
+        points = sum(question.points for question, ok in zip(self.questions, correct) if ok)
+        return correct, points
+
+
+def encode_answers(answers):
+    # One byte per question; None (or anything out of range) means unanswered
+    return bytes(answer if isinstance(answer, int) and 0 <= answer < BLANK else BLANK for answer in answers)
+
+
+def encode_quiz(questions):
+    """Compact stored form for a list of Question objects or verbose question dicts."""
+    rows = []
+    for question in questions:
+        if isinstance(question, dict):
+            question = Question(question['prompt'], tuple(question['options']), question['answer'],
+                                question.get('points', 1))
+        row = [question.prompt, list(question.options), question.answer]
+        if question.points != 1:
+            row.append(question.points)
+        rows.append(row)
+    return json.dumps({'v': QUIZ_FORMAT_VERSION, 'q': rows}, separators=(',', ':'))
+
+
+def parse_quiz(module_id, quiz_data):
+    data = json.loads(quiz_data)
+    if 'v' in data:
+        questions = tuple(Question(row[0], tuple(row[1]), row[2], row[3] if len(row) > 3 else 1)
+                          for row in data['q'])
+    else:
+        questions = tuple(Question(item['prompt'], tuple(item['options']), item['answer'], item.get('points', 1))
+                          for item in data.get('questions', []))
+    return Quiz(module_id, questions, bytes(question.answer for question in questions),
+                sum(question.points for question in questions))
+
+
+class QuizCache:
+    def __init__(self):
+        self._quizzes = {}
+        self._courses = {}  # course_id -> module ids with a quiz, in id order
+        self._lock = threading.Lock()
+
+    def for_course(self, conn, course_id):
+        """Parsed quizzes of a course's modules, in module id order."""
+        module_ids = self._courses.get(course_id)
+        if module_ids is None:
+            rows = conn.execute('''
+                SELECT id, quiz_data FROM course_modules
+                WHERE course_id = ? AND quiz_data IS NOT NULL
+                ORDER BY id
+            ''', (course_id,)).fetchall()
+            quizzes = [parse_quiz(module_id, quiz_data) for module_id, quiz_data in rows]
+            with self._lock:
+                for quiz in quizzes:
+                    self._quizzes[quiz.module_id] = quiz
+                module_ids = self._courses[course_id] = tuple(quiz.module_id for quiz in quizzes)
+        return [self._quizzes[module_id] for module_id in module_ids]
+
+    def get(self, conn, module_id):
+        quiz = self._quizzes.get(module_id)
+        if quiz is None:
+            row = conn.execute('SELECT quiz_data FROM course_modules WHERE id = ? AND quiz_data IS NOT NULL',
+                               (module_id,)).fetchone()
+            if row is None:
+                return None
+            quiz = parse_quiz(module_id, row[0])
+            with self._lock:
+                self._quizzes[module_id] = quiz
+        return quiz
+
+    def invalidate(self, module_id=None):
+        with self._lock:
+            if module_id is None:
+                self._quizzes.clear()
+            else:
+                self._quizzes.pop(module_id, None)
+            # Course listings are cheap to rebuild, so drop them all
+            self._courses.clear()
+
+
+# Process-wide, like the query recorder: Streamlit recreates services on every rerun
+quiz_cache = QuizCache()
+
+
+def save_quiz(conn, module_id, questions):
+    # Callers commit
+    updated = conn.execute('UPDATE course_modules SET quiz_data = ? WHERE id = ?',
+                           (encode_quiz(questions), module_id)).rowcount
+    quiz_cache.invalidate(module_id)
+    return bool(updated)
@@ -0,0 +1,246 @@
+"""
+Read-replica snapshot mode for dashboard reads.
+
+Dashboard queries (metrics, course progress, deadlines, leaderboard) can be
+served from a snapshot copy of the primary database instead of the primary
+itself, so they never wait on writers. The snapshot is rebuilt with the
+SQLite backup API into a new generation file (<db>.snapshot.<n>.db), never
+over a file that is open (Windows cannot replace or delete an open file):
+
+- when it is older than max_staleness seconds (checked by a background
+  scheduler and on every read),
+- or after refresh_after_writes commits on the primary.
+
+Refreshes run on a background thread while readers keep using the previous
+snapshot, so read latency stays flat during write bursts. Each reading
+thread has its own connection and moves to the newest generation on its
+next read, closing its old connection itself; an old generation's file is
+deleted once its last reader has moved on. Writes, and reads that must see
+their own writes, always go to the primary.
+
+Enable with LEARN_AND_EARN_SNAPSHOT=1; LEARN_AND_EARN_SNAPSHOT_STALENESS
+(seconds, default 30) and LEARN_AND_EARN_SNAPSHOT_WRITES (default 100)
+tune the refresh triggers.
+"""
+
+import glob
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import Counter
+
+from .db import DB_PATH, connect
+
+DEFAULT_MAX_STALENESS = 30.0
+DEFAULT_REFRESH_AFTER_WRITES = 100
+
+
+def enabled():
+    return os.environ.get('LEARN_AND_EARN_SNAPSHOT', '0') in ('1', 'true', 'yes')
+
+
+def snapshot_path_for(primary_path):
+    root, ext = os.path.splitext(primary_path)
+    return f"{root}.snapshot{ext or '.db'}"
+
+
+def _close_reader(replica, conn, generation):
+    conn.close()
+    replica._release(generation)
+
+
+class _Reader:
+    """One thread's connection to one snapshot generation."""
+
+    def __init__(self, replica, generation, path):
+        self.generation = generation
+        self.conn = connect(path, profile='readonly')
+        self.conn.execute('PRAGMA query_only = 1')
+        # Runs when the owning thread moves to a newer generation, when the thread exits
+        # (its thread-local reader is collected) or on replica.close()
+        self.close = weakref.finalize(self, _close_reader, replica, self.conn, generation)
+
+
+class SnapshotReplica:
+    def __init__(self, primary_path=DB_PATH, snapshot_path=None, max_staleness=DEFAULT_MAX_STALENESS,
+                 refresh_after_writes=DEFAULT_REFRESH_AFTER_WRITES):
+        self.primary_path = primary_path
+        # Base name; each refresh writes <root>.<generation><ext> next to it
+        self.snapshot_path = snapshot_path or snapshot_path_for(primary_path)
+        self.max_staleness = max_staleness
+        self.refresh_after_writes = refresh_after_writes
+        self.refreshes = 0
+        self.last_refresh_ms = 0.0
+        self.generation = 0  # 0 until the first snapshot exists
+        self._next_generation = 1
+        self._open = Counter()  # generation -> open reader connections
+        self._readers = weakref.WeakSet()
+        self._local = threading.local()
+        self._refreshed_at = 0.0
+        self._writes = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._scheduler = None
+        # Generations left behind by an earlier process
+        self._remove_generations()
+
+    @property
+    def age(self):
+        return time.monotonic() - self._refreshed_at if self._refreshed_at else None
+
+    def generation_path(self, generation):
+        root, ext = os.path.splitext(self.snapshot_path)
+        return f"{root}.{generation}{ext}"
+
+    def _stale(self):
+        return self.max_staleness is not None and time.monotonic() - self._refreshed_at >= self.max_staleness
+
+    def connection(self):
+        """This thread's connection to the current snapshot; the first call builds it synchronously."""
+        if not self.generation:
+            self.refresh()
+        elif self._stale():
+            self.refresh_async()
+        reader = getattr(self._local, 'reader', None)
+        with self._lock:
+            generation = self.generation
+            if reader is None or reader.generation != generation:
+                self._open[generation] += 1
+            else:
+                return reader.conn
+        if reader is not None:
+            # Our own previous connection: this thread is not mid-query on it
+            reader.close()
+        try:
+            reader = _Reader(self, generation, self.generation_path(generation))
+        except BaseException:
+            self._release(generation)
+            raise
+        self._local.reader = reader
+        self._readers.add(reader)
+        return reader.conn
+
+    def _release(self, generation):
+        with self._lock:
+            self._open[generation] -= 1
+            if self._open[generation]:
+                return
+            del self._open[generation]
+            retired = generation != self.generation
+        if retired:
+            self._remove(generation)
+
+    def _remove(self, generation):
+        path = self.generation_path(generation)
+        for suffix in ('', '-journal'):
+            try:
+                os.remove(path + suffix)
+            except OSError:
+                pass  # already gone, or still open elsewhere on Windows; close() sweeps again
+
+    def _remove_generations(self):
+        root, ext = os.path.splitext(self.snapshot_path)
+        for path in glob.glob(glob.escape(root) + '.[0-9]*' + ext):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def note_write(self, count=1):
+        # Called by the service after each commit on the primary
+        with self._lock:
+            self._writes += count
+            due = self.refresh_after_writes and self._writes >= self.refresh_after_writes
+        if due:
+            self.refresh_async()
+
+    def refresh(self):
+        with self._refresh_lock:
+            started = time.perf_counter()
+            with self._lock:
+                # Writes committed from here on may miss this snapshot; count them toward the next
+                self._writes = 0
+                generation = self._next_generation
+                self._next_generation += 1
+
+            path = self.generation_path(generation)
+            source = sqlite3.connect(self.primary_path)
+            target = sqlite3.connect(path)
+            try:
+                source.backup(target)
+                # The copy inherits WAL mode from the primary; a read-only snapshot needs no -wal/-shm
+                target.execute('PRAGMA journal_mode = DELETE')
+            finally:
+                target.close()
+                source.close()
+
+            with self._lock:
+                previous, self.generation = self.generation, generation
+                self._refreshed_at = time.monotonic()
+                self.refreshes += 1
+                self.last_refresh_ms = (time.perf_counter() - started) * 1000
+                # Readers still on the previous generation delete it when the last one moves on
+                orphaned = previous and not self._open[previous]
+            if orphaned:
+                self._remove(previous)
+
+    def refresh_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name='learn-and-earn-snapshot', daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except sqlite3.Error:
+            pass  # keep serving the previous snapshot; the next trigger retries
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def start(self):
+        # Refresh on a schedule even when nobody is reading
+        if self._scheduler is None and self.max_staleness:
+            self._scheduler = threading.Thread(target=self._run_scheduler, name='learn-and-earn-snapshot-scheduler',
+                                               daemon=True)
+            self._scheduler.start()
+        return self
+
+    def _run_scheduler(self):
+        while not self._stop.wait(self.max_staleness):
+            if self._stale():
+                self.refresh_async()
+
+    def close(self):
+        self._stop.set()
+        with self._refresh_lock:
+            for reader in list(self._readers):
+                reader.close()
+            self.generation = 0
+            self._remove_generations()
+
+
+_replicas = {}
+_replicas_lock = threading.Lock()
+
+
+def shared_replica(primary_path=DB_PATH):
+    """Process-wide replica for a primary database, or None unless snapshot mode is enabled."""
+    if not enabled():
+        return None
+    with _replicas_lock:
+        replica = _replicas.get(primary_path)
+        if replica is None:
+            replica = _replicas[primary_path] = SnapshotReplica(
+                primary_path,
+                max_staleness=float(os.environ.get('LEARN_AND_EARN_SNAPSHOT_STALENESS', DEFAULT_MAX_STALENESS)),
+                refresh_after_writes=int(os.environ.get('LEARN_AND_EARN_SNAPSHOT_WRITES',
+                                                        DEFAULT_REFRESH_AFTER_WRITES)),
+            ).start()
+        return replica
@@ -0,0 +1,484 @@
+"""
+Offline semantic matching for jobs and courses.
+
+Texts are embedded locally, with no network and no model download:
+
+- every word, the character trigrams of every word (so "engineering" and
+  "engineer" overlap) and every known skill phrase (resolved through the
+  skill vocabulary, so "ML" and "Machine Learning" produce the same feature)
+  are hashed with CRC32;
+- feature weights are sublinear term frequency times inverse document
+  frequency over the indexed corpus (document frequencies are counted in a
+  2**20-bucket table);
+- the weighted features are folded into a DIM-dimensional float32 vector with
+  signed feature hashing and L2-normalized.
+
+A VectorIndex keeps one row per item in a NumPy matrix, so a top-k query is a
+single matrix-vector product plus argpartition (a few milliseconds for 100k
+postings). The job index is persisted in a vector_index/ directory next to
+the database file (LEARN_AND_EARN_INDEX_DIR overrides it) as .npy files
+opened with memory mapping, plus a JSON sidecar holding ids and content hashes. When
+postings change, only new and edited rows are re-embedded in place (with the
+document frequencies of the last full build); removed postings are zeroed.
+Once changes since the last full build pass REBUILD_FRACTION of the corpus,
+the index is rebuilt from scratch.
+
+Build or rebuild the job index with:
+    python -m learn_and_earn.semantic build --db learn_and_earn_pro.db
+and try a query with:
+    python -m learn_and_earn.semantic query "ML engineering"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from .catalog import COURSE_CATALOG, iter_catalog_courses
+from .content import ModuleContentStore, body_digest
+from .db import DB_PATH, connect, initialize_database
+from .skills import SkillVocabulary
+
+INDEX_DIR = os.environ.get('LEARN_AND_EARN_INDEX_DIR')
+DIM = 256
+HASH_BITS = 20
+DEFAULT_TOP_K = 20
+# Cosine similarity below this is hashing noise rather than a match
+MIN_SCORE = 0.1
+REBUILD_FRACTION = 0.25
+MIN_REFRESH_INTERVAL = 30.0
+INITIAL_CAPACITY = 1024
+
+WORD_WEIGHT = 1.0
+TRIGRAM_WEIGHT = 0.3
+SKILL_WEIGHT = 3.0
+# Longest skill phrase looked up in the vocabulary, in words
+MAX_SKILL_PHRASE = 3
+# Token and phrase memo tables are dropped when they grow past this many entries
+MAX_MEMO_ENTRIES = 200_000
+
+# Keeps "c++", "c#" and "node.js" as single tokens
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+@dataclass(frozen=True)
+class SemanticMatch:
+    item_id: str
+    score: float
+
+
+def tokenize(text):
+    return [token.rstrip('.') for token in TOKEN.findall(str(text).casefold())]
+
+
+def content_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class TextEncoder:
+    """Hashed word / trigram / skill features weighted by TF-IDF and folded into DIM dimensions."""
+
+    def __init__(self, vocabulary=None, df=None, documents=0):
+        self.vocabulary = vocabulary
+        self.df = df if df is not None else np.zeros(1 << HASH_BITS, dtype=np.int32)
+        self.documents = documents
+        self._idf = None
+        self._token_features = {}
+        self._skill_features = {}
+        self._skill_starts = None
+
+    def _features_for_token(self, token):
+        # Words repeat across postings, so each token's hashes are computed once
+        features = self._token_features.get(token)
+        if features is None:
+            if len(self._token_features) >= MAX_MEMO_ENTRIES:
+                self._token_features.clear()
+            padded = f"<{token}>"
+            hashes = [zlib.crc32(f"w:{token}".encode())]
+            hashes.extend(zlib.crc32(f"t:{padded[i:i + 3]}".encode()) for i in range(len(padded) - 2))
+            features = self._token_features[token] = (hashes, [WORD_WEIGHT] + [TRIGRAM_WEIGHT] * (len(hashes) - 1))
+        return features
+
+    def _skill_feature(self, phrase):
+        # Memoized vocabulary lookup: the feature hash of a skill phrase, or None
+        try:
+            return self._skill_features[phrase]
+        except KeyError:
+            if len(self._skill_features) >= MAX_MEMO_ENTRIES:
+                self._skill_features.clear()
+            skill_id = self.vocabulary.resolve(phrase)
+            feature = self._skill_features[phrase] = (
+                zlib.crc32(f"s:{skill_id}".encode()) if skill_id is not None else None)
+            return feature
+
+    def features(self, text):
+        """Unique feature hashes (uint32) and their summed raw weights for one text."""
+        tokens = tokenize(text)
+        hashes = []
+        weights = []
+        for token in tokens:
+            token_hashes, token_weights = self._features_for_token(token)
+            hashes.extend(token_hashes)
+            weights.extend(token_weights)
+        if self.vocabulary is not None:
+            if self._skill_starts is None:
+                # Only phrases starting with the first word of some known skill are looked up
+                self._skill_starts = {tokens[0] for tokens in map(tokenize, self.vocabulary.keys()) if tokens}
+            for start in range(len(tokens)):
+                if tokens[start] not in self._skill_starts:
+                    continue
+                for length in range(1, min(MAX_SKILL_PHRASE, len(tokens) - start) + 1):
+                    feature = self._skill_feature(' '.join(tokens[start:start + length]))
+                    if feature is not None:
+                        hashes.append(feature)
+                        weights.append(SKILL_WEIGHT)
+        if not hashes:
+            return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.float32)
+        unique, inverse = np.unique(np.asarray(hashes, dtype=np.uint32), return_inverse=True)
+        return unique, np.bincount(inverse, weights=weights).astype(np.float32)
+
+    def fit(self, feature_sets):
+        # Document frequency per hash bucket; idf is recomputed lazily
+        df = np.zeros(1 << HASH_BITS, dtype=np.int32)
+        for hashes, _ in feature_sets:
+            df[hashes & ((1 << HASH_BITS) - 1)] += 1  # hashes are unique per text
+        self.df = df
+        self.documents = len(feature_sets)
+        self._idf = None
+        return self
+
+    @property
+    def idf(self):
+        if self._idf is None:
+            self._idf = (np.log((1 + self.documents) / (1 + self.df)) + 1).astype(np.float32)
+        return self._idf
+
+    def embed(self, hashes, weights):
+        vector = np.zeros(DIM, dtype=np.float32)
+        if len(hashes):
+            values = np.log1p(weights) * self.idf[hashes & ((1 << HASH_BITS) - 1)]
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            vector = np.bincount((hashes >> HASH_BITS) % DIM, weights=signs * values,
+                                 minlength=DIM).astype(np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def encode(self, text):
+        return self.embed(*self.features(text))
+
+
+class VectorIndex:
+    """
+    Unit vectors, one row per item, searched by cosine similarity.
+
+    With a root directory the matrix lives in <root>/<name>.vectors.npy (memory
+    mapped, over-allocated so appends rarely resize the file), the document
+    frequencies in <name>.df.npy and ids / content hashes in <name>.json.
+    """
+
+    def __init__(self, name, root=None, vocabulary=None):
+        self.name = name
+        self.root = root
+        self.encoder = TextEncoder(vocabulary)
+        self.ids = []
+        self.hashes = []
+        self.positions = {}
+        self.vectors = np.zeros((0, DIM), dtype=np.float32)
+        self.count = 0
+        self.changes_since_build = 0
+        self.signature = None
+        self.refreshed_at = 0.0
+        self._lock = threading.RLock()
+
+    # ---- Persistence -------------------------------------------------------
+
+    def _path(self, suffix):
+        return os.path.join(self.root, f"{self.name}{suffix}")
+
+    def load(self):
+        """Open a persisted index; returns False when there is none."""
+        if self.root is None or not os.path.exists(self._path('.json')):
+            return False
+        with open(self._path('.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('dim') != DIM or meta.get('hash_bits') != HASH_BITS:
+            return False
+        with self._lock:
+            self.vectors = np.load(self._path('.vectors.npy'), mmap_mode='r+')
+            self.encoder.df = np.load(self._path('.df.npy'), mmap_mode='r')
+            self.encoder.documents = meta['documents']
+            self.encoder._idf = None
+            self.ids = meta['ids']
+            self.hashes = meta['hashes']
+            self.count = len(self.ids)
+            self.positions = {item_id: row for row, item_id in enumerate(self.ids) if item_id is not None}
+            self.changes_since_build = meta['changes_since_build']
+            self.signature = meta['signature']
+        return True
+
+    def _write_meta(self):
+        meta = {'dim': DIM, 'hash_bits': HASH_BITS, 'documents': self.encoder.documents,
+                'changes_since_build': self.changes_since_build, 'signature': self.signature,
+                'ids': self.ids, 'hashes': self.hashes}
+        # Write then rename, so a reader never sees a partial sidecar
+        temp_path = f"{self._path('.json')}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, separators=(',', ':'))
+        os.replace(temp_path, self._path('.json'))
+
+    def _allocate(self, capacity, rows=None):
+        # A fresh (capacity x DIM) matrix: a memory-mapped file when persisted, else in memory
+        if self.root is None:
+            vectors = np.zeros((capacity, DIM), dtype=np.float32)
+        else:
+            os.makedirs(self.root, exist_ok=True)
+            temp_path = f"{self._path('.vectors.npy')}.{os.getpid()}.tmp"
+            vectors = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.float32, shape=(capacity, DIM))
+        if rows is not None:
+            vectors[:len(rows)] = rows
+        if self.root is not None:
+            vectors.flush()
+            del vectors
+            os.replace(temp_path, self._path('.vectors.npy'))
+            vectors = np.load(self._path('.vectors.npy'), mmap_mode='r+')
+        return vectors
+
+    def _save(self):
+        if self.root is None:
+            return
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+        self._write_meta()
+
+    # ---- Building ----------------------------------------------------------
+
+    def rebuild(self, items):
+        """Embed every (item_id, text) from scratch, refitting document frequencies."""
+        items = list(items)
+        features = [self.encoder.features(text) for _, text in items]
+        self.encoder.fit(features)
+        rows = np.stack([self.encoder.embed(*feature) for feature in features]) if items else None
+        with self._lock:
+            self.vectors = self._allocate(max(INITIAL_CAPACITY, len(items) + len(items) // 4), rows)
+            self.ids = [item_id for item_id, _ in items]
+            self.hashes = [content_digest(text) for _, text in items]
+            self.positions = {item_id: row for row, item_id in enumerate(self.ids)}
+            self.count = len(items)
+            self.changes_since_build = 0
+            if self.root is not None:
+                np.save(self._path('.df.npy'), self.encoder.df)
+            self._save()
+        return len(items)
+
+    def sync(self, items, force_rebuild=False):
+        """Bring the index in line with (item_id, text) pairs; returns the number of rows changed."""
+        items = list(items)
+        digests = {item_id: content_digest(text) for item_id, text in items}
+        changed = [(item_id, text) for item_id, text in items
+                   if self.positions.get(item_id) is None or self.hashes[self.positions[item_id]] != digests[item_id]]
+        removed = [item_id for item_id in self.positions if item_id not in digests]
+        if not changed and not removed and not force_rebuild:
+            return 0
+        if (force_rebuild or not self.encoder.documents
+                or self.changes_since_build + len(changed) + len(removed) > REBUILD_FRACTION * self.encoder.documents):
+            self.rebuild(items)
+            return len(items)
+
+        with self._lock:
+            appended = sum(1 for item_id, _ in changed if item_id not in self.positions)
+            if self.count + appended > len(self.vectors):
+                grown = max(INITIAL_CAPACITY, (self.count + appended) * 2)
+                self.vectors = self._allocate(grown, np.asarray(self.vectors[:self.count]))
+            for item_id in removed:
+                row = self.positions.pop(item_id)
+                self.vectors[row] = 0
+                self.ids[row] = None
+                self.hashes[row] = None
+            for item_id, text in changed:
+                row = self.positions.get(item_id)
+                if row is None:
+                    row = self.positions[item_id] = self.count
+                    self.ids.append(item_id)
+                    self.hashes.append(None)
+                    self.count += 1
+                self.vectors[row] = self.encoder.encode(text)
+                self.hashes[row] = digests[item_id]
+            self.changes_since_build += len(changed) + len(removed)
+            self._save()
+        return len(changed) + len(removed)
+
+    # ---- Queries -----------------------------------------------------------
+
+    def search_vector(self, vector, k=DEFAULT_TOP_K, min_score=MIN_SCORE):
+        with self._lock:
+            vectors, ids, count = self.vectors, self.ids, self.count
+        if not count or not vector.any():
+            return []
+        scores = vectors[:count] @ vector
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [SemanticMatch(ids[row], float(scores[row])) for row in top
+                if scores[row] >= min_score and ids[row] is not None]
+
+    def search(self, text, k=DEFAULT_TOP_K, min_score=MIN_SCORE):
+        return self.search_vector(self.encoder.encode(text), k, min_score)
+
+
+# ---- Jobs -------------------------------------------------------------------
+
+def job_text(title, description, required_skills):
+    # The title is repeated so it outweighs boilerplate in long descriptions
+    return f"{title}. {title}. {required_skills or ''}. {description or ''}"
+
+
+def iter_job_texts(conn):
+    cursor = conn.execute('SELECT id, title, description, required_skills FROM job_opportunities ORDER BY rowid')
+    for job_id, title, description, required_skills in cursor:
+        yield job_id, job_text(title, description, required_skills)
+
+
+def jobs_signature(conn):
+    # Cheap change detector: any insert, delete or edit to the text columns moves one of these
+    row = conn.execute('''
+        SELECT COUNT(*), MAX(rowid),
+               TOTAL(length(title)) + TOTAL(length(description)) + TOTAL(length(required_skills))
+        FROM job_opportunities
+    ''').fetchone()
+    return list(row)
+
+
+def jobs_database_file(conn):
+    # With sharded storage the postings live in the attached common database
+    files = {name: file for _, name, file in conn.execute('PRAGMA database_list')}
+    return files.get('common') or files.get('main') or ''
+
+
+class JobIndex(VectorIndex):
+    def refresh(self, conn, force=False, force_rebuild=False):
+        """Sync with job_opportunities when its signature moved; at most once per MIN_REFRESH_INTERVAL."""
+        if not (force or force_rebuild) and time.monotonic() - self.refreshed_at < MIN_REFRESH_INTERVAL:
+            return self
+        with self._lock:
+            if self.encoder.vocabulary is None:
+                self.encoder.vocabulary = SkillVocabulary(conn)
+            signature = jobs_signature(conn)
+            if force_rebuild or signature != self.signature or not self.encoder.documents:
+                self.signature = signature
+                self.sync(iter_job_texts(conn), force_rebuild)
+                self._save()
+            self.refreshed_at = time.monotonic()
+        return self
+
+
+_job_indexes = {}
+_job_indexes_lock = threading.Lock()
+
+
+def default_index_root(path):
+    # vector_index/ next to the database file, not the working directory
+    return INDEX_DIR or os.path.join(os.path.dirname(os.path.abspath(path)), 'vector_index')
+
+
+def shared_job_index(conn, root=None):
+    """The process-wide job index for the database behind conn, loaded from disk if present."""
+    path = jobs_database_file(conn)
+    if not path:
+        # In-memory databases get a private, unpersisted index
+        return JobIndex('jobs').refresh(conn)
+    root = root or default_index_root(path)
+    with _job_indexes_lock:
+        index = _job_indexes.get(path)
+        if index is None:
+            name = 'jobs-' + os.path.splitext(os.path.basename(path))[0]
+            index = _job_indexes[path] = JobIndex(name, root)
+            index.load()
+    return index.refresh(conn)
+
+
+# ---- Courses ----------------------------------------------------------------
+
+def course_text(course, modules):
+    parts = [course['name'], course['name'], ', '.join(course.get('skills_gained', ()))]
+    for module in course.get('modules', ()):
+        parts.extend((module.get('title', ''), module.get('assignment', '')))
+    # Stored module notes and assignments for the course
+    for title, content, assignment in modules:
+        parts.extend((title or '', content or '', assignment or ''))
+    return '. '.join(part for part in parts if part)
+
+
+_course_indexes = {}
+_course_indexes_lock = threading.Lock()
+
+
+def course_index(conn, catalog=COURSE_CATALOG):
+    """In-memory index over catalog courses and their stored modules; rebuilt only when their text changes."""
+    # Module headers carry a digest of the compressed body, so a warm call decompresses nothing;
+    # bodies not moved into module_content yet (digest None) are keyed by their text instead
+    store = ModuleContentStore(conn)
+    headers = store.headers()
+    courses = list(iter_catalog_courses(catalog))
+
+    def digest(header):
+        if header.digest is not None:
+            return header.digest
+        body = store.body(header)
+        return body_digest(body.content, body.assignment)
+
+    key = (tuple((course['id'], content_digest(course_text(course, ()))) for course in courses),
+           tuple((header.id, header.course_id, header.title, digest(header)) for header in headers))
+    with _course_indexes_lock:
+        index = _course_indexes.get(key)
+        if index is None:
+            modules = {}
+            for header in headers:
+                body = store.body(header)
+                modules.setdefault(header.course_id, []).append((header.title, body.content, body.assignment))
+            items = [(course['id'], course_text(course, modules.get(course['id'], ()))) for course in courses]
+            # The catalog is tiny, so a full rebuild is cheaper than tracking edits
+            index = VectorIndex('courses', vocabulary=SkillVocabulary(conn))
+            index.rebuild(items)
+            _course_indexes.clear()
+            _course_indexes[key] = index
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the offline job index")
+    parser.add_argument('command', choices=['build', 'query'])
+    parser.add_argument('text', nargs='?', default='', help="Query text (query)")
+    parser.add_argument('--rebuild', action='store_true', help="Re-embed everything and refit frequencies")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    parser.add_argument('--root', default=None, help="Directory for index files (default: vector_index/ next to --db)")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    initialize_database(conn)
+    started = time.perf_counter()
+    index = shared_job_index(conn, args.root)
+    if args.command == 'build':
+        index.refresh(conn, force=True, force_rebuild=args.rebuild)
+        print(f"Indexed {len(index.positions):,} postings in {time.perf_counter() - started:.1f}s "
+              f"({index.changes_since_build:,} changes since the last full build)")
+    else:
+        started = time.perf_counter()
+        matches = index.search(args.text, args.top)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        titles = dict(conn.execute('SELECT id, title FROM job_opportunities'))
+        for match in matches:
+            print(f"{match.score:.3f}  {match.item_id}  {titles.get(match.item_id, '')}")
+        print(f"{len(matches)} matches in {elapsed_ms:.1f} ms")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
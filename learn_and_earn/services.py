@@ -0,0 +1,987 @@
+"""
+Headless service layer for the Learn & Earn platform.
+
+Every method here talks only to SQLite and returns plain dataclasses, so the
+same logic can be driven by the Streamlit UI, batch jobs, benchmarks or a
+second frontend without a Streamlit runtime.
+"""
+
+import hashlib
+import json
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import FrozenSet, Optional, Tuple
+
+from .catalog import COURSE_CATALOG, iter_catalog_courses
+from . import events
+from .db import DB_PATH, connect, initialize_database
+from .events import ProgressMaterializer
+from .quizzes import encode_answers, quiz_cache
+from . import certificates, media, semantic
+from .content import ModuleContentStore
+from .grading import GOLD_SCORE, SILVER_SCORE, GradingEngine, grading_seed_from_env
+from .ledger import ENROLLMENT, GRANT, CreditLedger, InsufficientCredits, credits_for_price
+from .sharding import begin_shard_write, is_shard_connection
+from .skills import SkillVocabulary
+
+# Outcome codes shared by all write operations
+OK = 'ok'
+ALREADY_EXISTS = 'already_exists'
+NOT_FOUND = 'not_found'
+NOT_ELIGIBLE = 'not_eligible'
+CONFLICT = 'conflict'
+ERROR = 'error'
+
+# Completing every module of a course is worth this much progress
+MODULES_COMPLETE_PROGRESS = 20
+EXAM_MIN_PROGRESS = 20
+
+BADGE_EARNINGS = {
+    'Gold': 500,
+    'Silver': 300,
+    'Bronze': 100
+}
+
+
+@dataclass(frozen=True)
+class Result:
+    outcome: str
+    message: str = ''
+
+    @property
+    def ok(self):
+        return self.outcome == OK
+
+
+@dataclass(frozen=True)
+class RegistrationResult(Result):
+    user_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class EnrollmentResult(Result):
+    user_id: Optional[int] = None
+    course_id: Optional[str] = None
+    credits_charged: float = 0
+    balance: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class CreditResult(Result):
+    transaction_id: Optional[int] = None
+    balance: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class ProgressResult(Result):
+    progress: float = 0
+    status: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class AssignmentResult(Result):
+    remaining_modules: Optional[int] = None
+    progress: Optional[ProgressResult] = None
+
+
+@dataclass(frozen=True)
+class ExamRegistrationResult(Result):
+    progress: float = 0
+
+
+@dataclass(frozen=True)
+class EvaluationResult(Result):
+    score: float = 0
+    badge_type: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class QuizAttemptResult(Result):
+    correct: int = 0
+    total: int = 0
+    score: float = 0
+    question_results: Tuple[bool, ...] = ()
+
+
+@dataclass(frozen=True)
+class QuizAttempt:
+    id: int
+    module_id: str
+    correct: int
+    total: int
+    score: float
+    attempted_at: str
+
+
+@dataclass(frozen=True)
+class ApplicationResult(Result):
+    job_id: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class User:
+    id: int
+    username: str
+
+
+@dataclass(frozen=True)
+class UserMetrics:
+    learning_credits: float
+    skill_points: int
+    total_earnings: float
+    completed_courses: int
+    in_progress_courses: int
+
+
+@dataclass(frozen=True)
+class ProgressSummary:
+    enrolled_courses: int = 0
+    in_progress_courses: int = 0
+    exam_registered_courses: int = 0
+    completed_courses: int = 0
+    assignments_submitted: int = 0
+    applications: int = 0
+    last_event_at: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class UserSkill:
+    skill_name: str
+    proficiency_level: str
+    experience_points: int
+
+
+@dataclass(frozen=True)
+class CourseSummary:
+    id: str
+    title: str
+    category: str
+    difficulty: str
+    price: float
+
+
+@dataclass(frozen=True)
+class EnrolledCourse:
+    course_id: str
+    title: str
+    category: str
+    difficulty: str
+    progress: float
+    status: str
+    duration_weeks: int
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    rank: int
+    username: str
+    skill_points: int
+
+
+@dataclass(frozen=True)
+class Deadline:
+    task: str
+    due_date: str
+
+
+@dataclass(frozen=True)
+class JobApplication:
+    job_id: str
+    title: str
+    company: str
+    application_date: str
+    status: str
+
+
+@dataclass(frozen=True)
+class JobPosting:
+    id: str
+    title: str
+    company: str
+    description: str
+    skills_required: Tuple[str, ...]
+    salary_range: str
+    location: str
+    remote: bool
+    skill_ids: FrozenSet[int] = field(default=frozenset(), repr=False, compare=False)
+
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def badge_for_score(score):
+    # Assign achievements based on performance
+    if score >= GOLD_SCORE:
+        return 'Gold'
+    elif score >= SILVER_SCORE:
+        return 'Silver'
+    return 'Bronze'
+
+
+def badge_for_difficulty(difficulty):
+    return 'Gold' if difficulty == 'Advanced' else 'Silver' if difficulty == 'Intermediate' else 'Bronze'
+
+
+def course_badge_condition(skill_name, course_id):
+    """SQL condition: the skill_name column is one of the badge rows for the course_id expression."""
+    # Exact names: LIKE would treat _ and % in course ids as wildcards and ignore case
+    names = ', '.join(f"'{badge_type} Badge for ' || {course_id}" for badge_type in BADGE_EARNINGS)
+    return f"{skill_name} IN ({names})"
+
+
+def proficiency_for_points(experience_points):
+    if experience_points >= 150:
+        return 'Advanced'
+    if experience_points >= 50:
+        return 'Intermediate'
+    return 'Beginner'
+
+
+def split_skills(required_skills):
+    return tuple(skill.strip() for skill in (required_skills or '').split(',') if skill.strip())
+
+
+def page_params(limit=None, offset=0):
+    # SQLite treats a negative LIMIT as "no limit"
+    return (-1 if limit is None else int(limit), int(offset or 0))
+
+
+class PlatformService:
+    def __init__(self, conn=None, path=DB_PATH, replica=None):
+        self.conn = conn if conn is not None else connect(path)
+        # Optional SnapshotReplica serving the dashboard reads
+        self.replica = replica
+        self.skills = SkillVocabulary(self.conn)
+        self.progress_view = ProgressMaterializer(self.conn)
+        self.grading = GradingEngine(self, seed=grading_seed_from_env())
+        self.media = media.MediaStore(self.conn)
+        self.ledger = CreditLedger(self.conn)
+        self.modules = ModuleContentStore(self.conn)
+        self._transaction_depth = 0
+        # Events emitted since the last commit; folded into the progress views before it
+        self._events_pending = False
+        self._catalog_skill_ids = {}
+        self._shard = is_shard_connection(self.conn)
+
+    @classmethod
+    def open(cls, path=DB_PATH):
+        # Connect and make sure the schema and seed data exist
+        conn = connect(path)
+        initialize_database(conn)
+        return cls(conn)
+
+    @contextmanager
+    def transaction(self):
+        # Group several operations into one commit (bulk imports, batch jobs, load tests)
+        self._transaction_depth += 1
+        try:
+            yield self
+        except Exception:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self._events_pending = False
+                self.conn.rollback()
+            raise
+        self._transaction_depth -= 1
+        if self._transaction_depth == 0:
+            self._fold_events()
+            self.conn.commit()
+            self._note_write()
+
+    @contextmanager
+    def write_transaction(self):
+        # BEGIN IMMEDIATE takes the write lock before the first read, so check-then-write
+        # sequences (balance checks, duplicate checks) cannot interleave across connections.
+        # Inside a caller's transaction this simply joins it. On a shard connection only the
+        # shard is locked, so users on different shards still write in parallel.
+        if self._transaction_depth == 0 and not self.conn.in_transaction:
+            if self._shard:
+                begin_shard_write(self.conn)
+            else:
+                self.conn.execute('BEGIN IMMEDIATE')
+        with self.transaction():
+            yield self
+
+    def _commit(self):
+        if self._transaction_depth == 0:
+            self._fold_events()
+            self.conn.commit()
+            self._note_write()
+
+    def _fold_events(self):
+        # The writer folds its own events under the lock it already holds, so summary
+        # reads never have to take the write lock
+        if self._events_pending:
+            self._events_pending = False
+            self.progress_view.fold_pending()
+
+    def _note_write(self):
+        if self.replica is not None:
+            self.replica.note_write()
+
+    def _emit(self, user_id, event_type, subject_id=None, payload=None):
+        # Appended before the caller's commit, so the event and the mutation land together
+        events.emit(self.conn, user_id, event_type, subject_id, payload)
+        self._events_pending = True
+
+    def _read_conn(self):
+        # Dashboard reads go to the snapshot when one is configured; inside a
+        # transaction they must see uncommitted writes, so they stay on the primary
+        if self.replica is None or self._transaction_depth:
+            return self.conn
+        return self.replica.connection()
+
+    # ---- Users -------------------------------------------------------------
+
+    def register_user(self, username, email, password, primary_skill):
+        try:
+            cursor = self.conn.execute('''
+                INSERT INTO users
+                (username, email, password, primary_skill, learning_credits, skill_points, total_earnings)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (username, email, hash_password(password), primary_skill, 100.0, 0, 0.0))
+            self._commit()
+        except sqlite3.IntegrityError:
+            return RegistrationResult(ALREADY_EXISTS, "Username or Email already exists")
+        return RegistrationResult(OK, "Registration Successful!", user_id=cursor.lastrowid)
+
+    def authenticate(self, username, password):
+        row = self.conn.execute('''
+            SELECT id, username FROM users
+            WHERE username = ? AND password = ?
+        ''', (username, hash_password(password))).fetchone()
+        return User(*row) if row else None
+
+    def get_user_metrics(self, user_id):
+        row = self._read_conn().execute('''
+            SELECT COALESCE((SELECT balance_after / 100.0 FROM credit_transactions
+                             WHERE user_id = users.id ORDER BY id DESC LIMIT 1), learning_credits),
+                   skill_points, total_earnings,
+                (SELECT COUNT(*) FROM all_user_courses WHERE user_id = ? AND completion_status = 'Completed') AS completed_courses,
+                (SELECT COUNT(*) FROM user_courses WHERE user_id = ? AND completion_status = 'In Progress') AS in_progress_courses
+            FROM users WHERE id = ?
+        ''', (user_id, user_id, user_id)).fetchone()
+        return UserMetrics(*row) if row else None
+
+    def get_progress_summary(self, user_id):
+        # Read-only: writers fold their events as they commit (see _fold_events)
+        row = self.conn.execute('''
+            SELECT enrolled_courses, in_progress_courses, exam_registered_courses, completed_courses,
+                   assignments_submitted, applications, last_event_at
+            FROM user_progress_summary WHERE user_id = ?
+        ''', (user_id,)).fetchone()
+        return ProgressSummary(*row) if row else ProgressSummary()
+
+    def list_events(self, user_id, after_id=0, limit=100):
+        return events.list_events(self.conn, user_id, after_id, limit)
+
+    def get_user_skills(self, user_id):
+        rows = self.conn.execute('''
+            SELECT skill_name, proficiency_level, experience_points
+            FROM user_skills
+            WHERE user_id = ?
+        ''', (user_id,)).fetchall()
+        return [UserSkill(*row) for row in rows]
+
+    def set_profile_image(self, user_id, fileobj):
+        # Variants are rendered once here; users.profile_image stays empty
+        try:
+            self.media.attach(media.PROFILE, user_id, fileobj)
+        except media.UploadError as e:
+            return Result(ERROR, str(e))
+        self.conn.execute('UPDATE users SET profile_image = NULL WHERE id = ? AND profile_image IS NOT NULL',
+                          (user_id,))
+        self._commit()
+        return Result(OK, "Profile picture updated.")
+
+    def get_profile_image(self, user_id, variant='small'):
+        return self.media.read_variant(media.PROFILE, user_id, variant)
+
+    def set_course_image(self, course_id, fileobj):
+        # Course artwork (admin side); priced courses and catalog-only courses both qualify
+        known = self.conn.execute('SELECT 1 FROM courses WHERE id = ?', (course_id,)).fetchone() \
+            or any(course['id'] == course_id for course in iter_catalog_courses())
+        if not known:
+            return Result(NOT_FOUND, "Course not found.")
+        try:
+            self.media.attach(media.COURSE, course_id, fileobj)
+        except media.UploadError as e:
+            return Result(ERROR, str(e))
+        self._commit()
+        return Result(OK, "Course image updated.")
+
+    def get_course_image(self, course_id, variant='small'):
+        return self.media.read_variant(media.COURSE, course_id, variant)
+
+    def update_user_skills(self, user_id, skills_gained):
+        for skill in self.skills.canonicalize(skills_gained):
+            # Update experience points for an existing skill (any spelling), otherwise insert it
+            skill_id = self.skills.intern(skill, persist=True)
+            updated = self.conn.execute('''
+                UPDATE user_skills
+                SET experience_points = experience_points + 10, skill_id = ?
+                WHERE user_id = ? AND (skill_id = ? OR skill_name = ?)
+            ''', (skill_id, user_id, skill_id, skill)).rowcount
+            if not updated:
+                self.conn.execute('''
+                    INSERT INTO user_skills (user_id, skill_name, proficiency_level, experience_points, skill_id)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (user_id, skill, 'Beginner', 10, skill_id))
+        self._commit()
+
+    def update_user_metrics(self, user_id, skill_points=0, earnings=0.0, course_id=None):
+        # Update skill points and earnings
+        self.conn.execute('''
+            UPDATE users
+            SET skill_points = skill_points + ?,
+                total_earnings = total_earnings + ?
+            WHERE id = ?
+        ''', (skill_points, earnings, user_id))
+
+        # Mark course as completed and assign a badge based on course difficulty
+        badge_type = None
+        if course_id:
+            completed = self.conn.execute('''
+                UPDATE user_courses
+                SET completion_status = 'Completed', progress_percentage = 100, completed_date = CURRENT_TIMESTAMP
+                WHERE user_id = ? AND course_id = ?
+            ''', (user_id, course_id)).rowcount
+            if completed:
+                self._emit(user_id, events.COMPLETED, course_id)
+            row = self.conn.execute('SELECT difficulty FROM courses WHERE id = ?', (course_id,)).fetchone()
+            if row:
+                badge_type = badge_for_difficulty(row[0])
+                self.update_user_achievements(user_id, course_id, badge_type)
+
+        self._commit()
+        return badge_type
+
+    def update_user_achievements(self, user_id, course_id, badge_type):
+        earnings = BADGE_EARNINGS.get(badge_type, 0)
+
+        # Update user earnings and record the badge
+        self.conn.execute('''
+            UPDATE users
+            SET total_earnings = total_earnings + ?
+            WHERE id = ?
+        ''', (earnings, user_id))
+        self.conn.execute('''
+            INSERT INTO user_skills (user_id, skill_name, proficiency_level, experience_points)
+            VALUES (?, ?, ?, ?)
+        ''', (user_id, f"{badge_type} Badge for {course_id}", badge_type, earnings))
+
+        self._commit()
+        return earnings
+
+    def award_missing_badge(self, user_id, course_id, badge_type):
+        """Record the course badge and pay its earnings unless the course already has a badge; returns the earnings paid."""
+        earnings = BADGE_EARNINGS.get(badge_type, 0)
+        # The existence check and the insert are one statement, so a replayed award is a no-op
+        inserted = self.conn.execute(f'''
+            INSERT INTO user_skills (user_id, skill_name, proficiency_level, experience_points)
+            SELECT ?, ?, ?, ?
+            WHERE NOT EXISTS (
+                SELECT 1 FROM user_skills
+                WHERE user_id = ? AND {course_badge_condition('skill_name', '?')}
+            )
+        ''', (user_id, f"{badge_type} Badge for {course_id}", badge_type, earnings, user_id)
+            + (course_id,) * len(BADGE_EARNINGS)).rowcount
+        if not inserted:
+            return 0
+        self.conn.execute('''
+            UPDATE users
+            SET total_earnings = total_earnings + ?
+            WHERE id = ?
+        ''', (earnings, user_id))
+        self._commit()
+        return earnings
+
+    def grant_credits(self, user_id, amount, reason=GRANT, idempotency_key=None):
+        """Add learning credits (top-ups, rewards); a repeated idempotency key is a no-op."""
+        if amount <= 0:
+            return CreditResult(ERROR, "Amount must be positive.")
+        with self.write_transaction():
+            if idempotency_key is not None:
+                previous = self.ledger.find(user_id, GRANT, idempotency_key)
+                if previous is not None:
+                    return CreditResult(ALREADY_EXISTS, "Credits already granted.", transaction_id=previous.id,
+                                        balance=self.ledger.balance(user_id))
+            transaction = self.ledger.post(user_id, amount, GRANT, reason, idempotency_key)
+        if transaction is None:
+            return CreditResult(NOT_FOUND, "User not found.")
+        return CreditResult(OK, f"{amount:g} learning credits added.", transaction_id=transaction.id,
+                            balance=transaction.balance_after)
+
+    def list_credit_transactions(self, user_id, limit=None, offset=0):
+        return self.ledger.history(user_id, *page_params(limit, offset))
+
+    def award_badges(self, awards):
+        # Bulk form of update_user_achievements for (user_id, course_id, badge_type) rows
+        awards = list(awards)
+        self.conn.executemany('''
+            UPDATE users
+            SET total_earnings = total_earnings + ?
+            WHERE id = ?
+        ''', ((BADGE_EARNINGS.get(badge_type, 0), user_id) for user_id, _, badge_type in awards))
+        self.conn.executemany('''
+            INSERT INTO user_skills (user_id, skill_name, proficiency_level, experience_points)
+            VALUES (?, ?, ?, ?)
+        ''', ((user_id, f"{badge_type} Badge for {course_id}", badge_type, BADGE_EARNINGS.get(badge_type, 0))
+              for user_id, course_id, badge_type in awards))
+        self._commit()
+        return len(awards)
+
+    # ---- Courses -----------------------------------------------------------
+
+    def search_courses(self, query='', category='All', difficulty='All', limit=None, offset=0):
+        rows = self.conn.execute('''
+            SELECT id, title, category, difficulty, price
+            FROM courses
+            WHERE title LIKE ? AND (category = ? OR ? = 'All') AND (difficulty = ? OR ? = 'All')
+            ORDER BY rowid
+            LIMIT ? OFFSET ?
+        ''', (f"%{query}%", category, category, difficulty, difficulty) + page_params(limit, offset)).fetchall()
+        return [CourseSummary(*row) for row in rows]
+
+    def list_enrolled_courses(self, user_id, limit=None, offset=0):
+        rows = self.conn.execute('''
+            SELECT c.id, c.title, c.category, c.difficulty, uc.progress_percentage, uc.completion_status, c.duration_weeks
+            FROM all_user_courses uc
+            JOIN courses c ON uc.course_id = c.id
+            WHERE uc.user_id = ?
+            ORDER BY uc.id
+            LIMIT ? OFFSET ?
+        ''', (user_id,) + page_params(limit, offset)).fetchall()
+        return [EnrolledCourse(*row) for row in rows]
+
+    def list_course_modules(self, course_id):
+        # Headers only; bodies stay compressed until get_module_body
+        return self.modules.headers(course_id)
+
+    def get_module_body(self, module):
+        # module is a ModuleHeader (cache hit without a query) or a module id
+        return self.modules.body(module)
+
+    def list_course_quizzes(self, course_id):
+        # Parsed once per process; reruns only pay for the cache lookup
+        return {quiz.module_id: quiz for quiz in quiz_cache.for_course(self.conn, course_id)}
+
+    def submit_quiz(self, user_id, course_id, module_id, answers):
+        quiz = quiz_cache.get(self.conn, module_id)
+        if quiz is None:
+            return QuizAttemptResult(NOT_FOUND, "This module has no quiz.")
+        sheet = encode_answers(answers)
+        question_results, points = quiz.check(sheet)
+        correct = sum(question_results)
+        score = round(points / quiz.total_points * 100, 1) if quiz.total_points else 0.0
+        self.conn.execute('''
+            INSERT INTO quiz_attempts (user_id, course_id, module_id, answers, correct, total, score)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, course_id, module_id, sheet, correct, len(question_results), score))
+        self._commit()
+        return QuizAttemptResult(OK, f"You answered {correct} of {len(question_results)} questions correctly.",
+                                 correct=correct, total=len(question_results), score=score,
+                                 question_results=question_results)
+
+    def list_quiz_attempts(self, user_id, module_id=None, limit=None, offset=0):
+        rows = self.conn.execute('''
+            SELECT id, module_id, correct, total, score, attempted_at
+            FROM quiz_attempts
+            WHERE user_id = ? AND (module_id = ? OR ? IS NULL)
+            ORDER BY id DESC
+            LIMIT ? OFFSET ?
+        ''', (user_id, module_id, module_id) + page_params(limit, offset)).fetchall()
+        return [QuizAttempt(*row) for row in rows]
+
+    def count_remaining_modules(self, user_id, course_id):
+        return self.conn.execute('''
+            SELECT COUNT(*) FROM course_modules
+            WHERE course_id = ? AND id NOT IN (
+                SELECT module_id FROM user_assignments WHERE user_id = ? AND course_id = ?
+            )
+        ''', (course_id, user_id, course_id)).fetchone()[0]
+
+    def count_completed_courses(self, user_id):
+        return self.conn.execute('''
+            SELECT COUNT(*) FROM all_user_courses
+            WHERE user_id = ? AND completion_status = 'Completed'
+        ''', (user_id,)).fetchone()[0]
+
+    def get_course_progress(self, user_id, limit=None, offset=0):
+        return self._read_conn().execute('''
+            SELECT c.title AS Course, uc.progress_percentage AS Progress
+            FROM all_user_courses uc
+            JOIN courses c ON uc.course_id = c.id
+            WHERE uc.user_id = ?
+            ORDER BY uc.id
+            LIMIT ? OFFSET ?
+        ''', (user_id,) + page_params(limit, offset)).fetchall()
+
+    def enroll_in_course(self, user_id, course_id, idempotency_key=None):
+        # Debit and enrollment commit together under the write lock; a retried submit with
+        # the same idempotency key returns the original enrollment without charging again
+        with self.write_transaction():
+            if idempotency_key is not None:
+                previous = self.ledger.find(user_id, ENROLLMENT, idempotency_key)
+                if previous is not None and previous.reference != course_id:
+                    return EnrollmentResult(CONFLICT, "Idempotency key was already used for another course.",
+                                            user_id=user_id, course_id=course_id)
+                if previous is not None:
+                    return EnrollmentResult(OK, "Enrollment already processed.", user_id=user_id,
+                                            course_id=course_id, credits_charged=-previous.amount,
+                                            balance=self.ledger.balance(user_id))
+
+            # Check if the user is already enrolled (archived enrollments count too)
+            existing = self.conn.execute('''
+                SELECT 1 FROM all_user_courses WHERE user_id = ? AND course_id = ?
+            ''', (user_id, course_id)).fetchone()
+            if existing:
+                return EnrollmentResult(ALREADY_EXISTS, "You are already enrolled in this course!",
+                                        user_id=user_id, course_id=course_id)
+
+            # Catalog-only courses have no price row and are free
+            row = self.conn.execute('SELECT price FROM courses WHERE id = ?', (course_id,)).fetchone()
+            cost = credits_for_price(row[0] if row else 0)
+            if cost:
+                try:
+                    transaction = self.ledger.post(user_id, -cost, ENROLLMENT, course_id, idempotency_key)
+                except InsufficientCredits as e:
+                    return EnrollmentResult(NOT_ELIGIBLE, str(e), user_id=user_id, course_id=course_id,
+                                            balance=e.balance)
+                balance = transaction.balance_after if transaction is not None else None
+            else:
+                # Nothing to post for a free course; a retry is caught by the enrollment check above
+                balance = self.ledger.balance(user_id)
+            if balance is None:
+                return EnrollmentResult(NOT_FOUND, "User not found.", user_id=user_id, course_id=course_id)
+
+            self.conn.execute('''
+                INSERT INTO user_courses (user_id, course_id, enrollment_date, completion_status, progress_percentage)
+                VALUES (?, ?, CURRENT_TIMESTAMP, 'In Progress', 0)
+            ''', (user_id, course_id))
+            self._emit(user_id, events.ENROLLED, course_id)
+        message = "Successfully enrolled in the course!"
+        if cost:
+            message += f" {cost:g} learning credits charged."
+        return EnrollmentResult(OK, message, user_id=user_id, course_id=course_id, credits_charged=cost,
+                                balance=balance)
+
+    def update_course_progress(self, user_id, course_id, progress_increment):
+        row = self.conn.execute('''
+            SELECT progress_percentage, completion_status FROM user_courses
+            WHERE user_id = ? AND course_id = ?
+        ''', (user_id, course_id)).fetchone()
+        if row is None:
+            return ProgressResult(NOT_FOUND, "You are not enrolled in this course.")
+        current_progress, current_status = row
+
+        new_progress = min(current_progress + progress_increment, 100)  # Cap progress at 100%
+        if current_status == "Exam Registered":
+            new_status = "Exam Registered"
+        else:
+            new_status = 'Completed' if new_progress == 100 else 'In Progress'
+
+        self.conn.execute('''
+            UPDATE user_courses
+            SET progress_percentage = ?, completion_status = ?
+            WHERE user_id = ? AND course_id = ?
+        ''', (new_progress, new_status, user_id, course_id))
+        self._emit(user_id, events.PROGRESS_UPDATED, course_id, {'progress': new_progress})
+        if new_status == 'Completed' and current_status != 'Completed':
+            self._emit(user_id, events.COMPLETED, course_id)
+        self._commit()
+        return ProgressResult(OK, f"Progress updated to {new_progress}%!", progress=new_progress, status=new_status)
+
+    def submit_assignment(self, user_id, course_id, module_id):
+        # Check if the assignment is already submitted, including archived submissions
+        existing = self.conn.execute('''
+            SELECT 1 FROM all_user_assignments
+            WHERE user_id = ? AND course_id = ? AND module_id = ?
+        ''', (user_id, course_id, module_id)).fetchone()
+        if existing:
+            return AssignmentResult(ALREADY_EXISTS, "You have already submitted this assignment.")
+
+        try:
+            self.conn.execute('''
+                INSERT INTO user_assignments (user_id, course_id, module_id, submission_date)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (user_id, course_id, module_id))
+            self._emit(user_id, events.ASSIGNMENT_SUBMITTED, course_id, {'module_id': module_id})
+            self._commit()
+        except sqlite3.Error as e:
+            return AssignmentResult(ERROR, f"Error submitting assignment: {e}")
+
+        remaining_modules = self.count_remaining_modules(user_id, course_id)
+        progress = None
+        if remaining_modules == 0:
+            progress = self.update_course_progress(user_id, course_id, MODULES_COMPLETE_PROGRESS)
+        return AssignmentResult(OK, f"Assignment for module '{module_id}' submitted successfully!",
+                                remaining_modules=remaining_modules, progress=progress)
+
+    def check_exam_eligibility(self, user_id, course_id):
+        row = self.conn.execute('''
+            SELECT progress_percentage FROM user_courses
+            WHERE user_id = ? AND course_id = ?
+        ''', (user_id, course_id)).fetchone()
+        if row is None:
+            return ExamRegistrationResult(NOT_FOUND, "You are not enrolled in this course.")
+        if row[0] < EXAM_MIN_PROGRESS:
+            return ExamRegistrationResult(NOT_ELIGIBLE,
+                                          "You must complete all modules and assignments to register for the exam.",
+                                          progress=row[0])
+        return ExamRegistrationResult(OK, progress=row[0])
+
+    def register_for_exam(self, user_id, course_id):
+        eligibility = self.check_exam_eligibility(user_id, course_id)
+        if not eligibility.ok:
+            return eligibility
+
+        # Register the user for the exam without updating the progress further
+        self.conn.execute('''
+            UPDATE user_courses
+            SET completion_status = 'Exam Registered'
+            WHERE user_id = ? AND course_id = ?
+        ''', (user_id, course_id))
+        self._emit(user_id, events.EXAM_REGISTERED, course_id)
+        self._commit()
+        return ExamRegistrationResult(OK, "You have successfully registered for the exam!",
+                                      progress=eligibility.progress)
+
+    def submit_exam(self, user_id, course_id, answers):
+        # answers: chosen option index per quiz question (None when unanswered)
+        row = self.conn.execute('SELECT completion_status FROM user_courses WHERE user_id = ? AND course_id = ?',
+                                (user_id, course_id)).fetchone()
+        if row is None or row[0] != 'Exam Registered':
+            return Result(NOT_ELIGIBLE, "Register for the exam before submitting answers.")
+        if not self.grading.submit(user_id, course_id, answers):
+            return Result(ALREADY_EXISTS, "Your exam has already been graded.")
+        self._commit()
+        return Result(OK, "Your exam answers have been submitted.")
+
+    def evaluate_performance(self, user_id, course_id, score=None):
+        # Grade the user's exam submission against the course quizzes unless a score is given
+        if score is None:
+            graded = self.grading.grade(user_id, course_id)
+            if graded is None:
+                return EvaluationResult(NOT_FOUND, "No exam submission to grade for this course.")
+            score, badge_type = graded
+            return EvaluationResult(OK, f"You scored {score:g}% and earned a {badge_type} badge for this course.",
+                                    score=score, badge_type=badge_type)
+        badge_type = badge_for_score(score)
+        self.update_user_achievements(user_id, course_id, badge_type)
+        return EvaluationResult(OK, f"Congratulations! You earned a {badge_type} badge for this course.",
+                                score=score, badge_type=badge_type)
+
+    def _course_skill_ids(self, course):
+        skill_ids = self._catalog_skill_ids.get(course['id'])
+        if skill_ids is None:
+            skill_ids = self._catalog_skill_ids[course['id']] = self.skills.ids(course['skills_gained'])
+        return skill_ids
+
+    def recommend_courses(self, user_skills, catalog=COURSE_CATALOG):
+        # Match catalog courses based on overlapping skill ids
+        user_skill_ids = self.skills.ids(user_skills)
+        return [course for course in iter_catalog_courses(catalog)
+                if self._course_skill_ids(course) & user_skill_ids]
+
+    def match_courses(self, query, catalog=COURSE_CATALOG, limit=semantic.DEFAULT_TOP_K):
+        # Semantic ranking over course names, skills and module content; query is text or a list of skills
+        text = query if isinstance(query, str) else ', '.join(query)
+        courses = {course['id']: course for course in iter_catalog_courses(catalog)}
+        return [courses[match.item_id] for match in semantic.course_index(self.conn, catalog).search(text, limit)]
+
+    def get_certificate(self, user_id, course_id):
+        """The user's issued certificate for a course, or None; never renders or writes."""
+        row = self.conn.execute('''
+            SELECT id, user_id, course_id, digest, issued_on FROM certificates
+            WHERE user_id = ? AND course_id = ?
+        ''', (user_id, course_id)).fetchone()
+        return certificates.Certificate(*row) if row else None
+
+    def issue_certificate(self, user_id, course_id):
+        """The user's certificate for a completed course, rendering it now if the batch has not."""
+        certificate = self.get_certificate(user_id, course_id)
+        if certificate is not None:
+            return certificate
+        pending = [row for row in certificates.pending_certificates(self.conn, user_id) if row[0] == course_id]
+        if not pending:
+            return None
+        certificate = certificates.render_and_store(self.media, user_id, *pending[0])
+        certificates.record_certificates(self.conn, [certificate])
+        self._commit()
+        return certificate
+
+    def get_certificate_bytes(self, certificate):
+        return self.media.read(certificate.digest, certificates.CONTENT_TYPE)
+
+    def get_leaderboard(self, limit=10):
+        rows = self._read_conn().execute('''
+            SELECT username, skill_points FROM users
+            ORDER BY skill_points DESC, id
+            LIMIT ?
+        ''', (limit,)).fetchall()
+        return [LeaderboardEntry(rank, username, points) for rank, (username, points) in enumerate(rows, 1)]
+
+    # ---- Deadlines & notifications -----------------------------------------
+
+    def get_upcoming_deadlines(self, user_id):
+        conn = self._read_conn()
+
+        # Course deadlines fall duration_weeks after enrollment
+        course_rows = conn.execute('''
+            SELECT c.title AS Task, datetime(uc.enrollment_date, '+' || (c.duration_weeks * 7) || ' days') AS DueDate
+            FROM user_courses uc
+            JOIN courses c ON uc.course_id = c.id
+            WHERE uc.user_id = ? AND uc.completion_status = 'In Progress'
+        ''', (user_id,)).fetchall()
+
+        # Pending job applications expect a follow-up after a week
+        job_rows = conn.execute('''
+            SELECT j.title AS Task, datetime(uja.application_date, '+7 days') AS DueDate
+            FROM user_job_applications uja
+            JOIN job_opportunities j ON uja.job_id = j.id
+            WHERE uja.user_id = ? AND uja.status = 'Pending'
+        ''', (user_id,)).fetchall()
+
+        return [Deadline(*row) for row in course_rows + job_rows]
+
+    def get_notifications(self, user_id, now=None):
+        now = now or datetime.now()
+        notifications = []
+
+        # Notify if a deadline is within 3 days
+        for deadline in self.get_upcoming_deadlines(user_id):
+            if deadline.due_date is None:
+                continue
+            days_left = (datetime.fromisoformat(deadline.due_date) - now).days
+            if days_left <= 3:
+                notifications.append(f"⏳ Reminder: '{deadline.task}' is due in {days_left} days!")
+
+        notifications.append("🎉 You earned 50 skill points for completing a module!")
+        notifications.append("💼 New job opportunity: Senior AI Engineer at TechCorp")
+        return notifications
+
+    # ---- Precomputed results (written by batch jobs) ------------------------
+
+    def save_precomputed(self, kind, items):
+        # items: (user_id, payload) pairs; payloads are stored as JSON
+        self.conn.executemany('''
+            INSERT INTO user_precomputed (user_id, kind, payload, computed_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id, kind) DO UPDATE SET
+                payload = excluded.payload,
+                computed_at = excluded.computed_at
+        ''', ((user_id, kind, json.dumps(payload)) for user_id, payload in items))
+        self._commit()
+
+    def get_precomputed(self, user_id, kind, max_age_seconds=None):
+        # Returns the stored payload, or None if missing or older than max_age_seconds
+        row = self.conn.execute('''
+            SELECT payload, (julianday('now') - julianday(computed_at)) * 86400
+            FROM user_precomputed
+            WHERE user_id = ? AND kind = ?
+        ''', (user_id, kind)).fetchone()
+        if row is None or (max_age_seconds is not None and row[1] > max_age_seconds):
+            return None
+        return json.loads(row[0])
+
+    # ---- Jobs --------------------------------------------------------------
+
+    def list_jobs(self, limit=None, offset=0):
+        rows = self.conn.execute('''
+            SELECT id, title, company, description, required_skills, salary_range, location, remote_friendly
+            FROM job_opportunities
+            ORDER BY rowid
+            LIMIT ? OFFSET ?
+        ''', page_params(limit, offset)).fetchall()
+        jobs = []
+        for job_id, title, company, description, skills, salary, location, remote in rows:
+            skills = split_skills(skills)
+            jobs.append(JobPosting(job_id, title, company, description, skills, salary, location, bool(remote),
+                                   skill_ids=self.skills.ids(skills)))
+        return jobs
+
+    def match_jobs(self, skills, jobs=None):
+        # Match jobs based on overlapping skill ids, so synonyms and casing still match
+        skill_ids = self.skills.ids(skills)
+        jobs = self.list_jobs() if jobs is None else jobs
+        return [job for job in jobs if skill_ids & job.skill_ids]
+
+    def match_jobs_batch(self, skill_id_sets, jobs=None):
+        # Match many candidates in one pass: build skill id -> job positions once, then union per candidate
+        jobs = self.list_jobs() if jobs is None else jobs
+        jobs_by_skill = {}
+        for position, job in enumerate(jobs):
+            for skill_id in job.skill_ids:
+                jobs_by_skill.setdefault(skill_id, []).append(position)
+
+        matches = []
+        for skill_ids in skill_id_sets:
+            positions = set()
+            for skill_id in skill_ids:
+                positions.update(jobs_by_skill.get(skill_id, ()))
+            matches.append([jobs[position] for position in sorted(positions)])
+        return matches
+
+    def match_jobs_for_user(self, user_id, jobs=None):
+        # Match on each skill the user holds, and on its leading word as before
+        names = set()
+        for skill in self.get_user_skills(user_id):
+            names.add(skill.skill_name)
+            names.add(skill.skill_name.split(' ')[0])
+        return self.match_jobs(names, jobs)
+
+    def get_jobs(self, job_ids):
+        # Postings in the order given; unknown ids are skipped
+        job_ids = list(job_ids)
+        rows = self.conn.execute(f'''
+            SELECT id, title, company, description, required_skills, salary_range, location, remote_friendly
+            FROM job_opportunities
+            WHERE id IN ({', '.join('?' * len(job_ids))})
+        ''', job_ids).fetchall() if job_ids else []
+        jobs = {}
+        for job_id, title, company, description, skills, salary, location, remote in rows:
+            skills = split_skills(skills)
+            jobs[job_id] = JobPosting(job_id, title, company, description, skills, salary, location, bool(remote),
+                                      skill_ids=self.skills.ids(skills))
+        return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
+    def search_jobs(self, query, limit=semantic.DEFAULT_TOP_K):
+        # Semantic ranking from the local vector index, so "ML engineering" finds "Machine Learning" roles;
+        # query is free text or a list of skills
+        text = query if isinstance(query, str) else ', '.join(query)
+        matches = semantic.shared_job_index(self.conn).search(text, limit)
+        return self.get_jobs(match.item_id for match in matches)
+
+    def search_jobs_for_user(self, user_id, limit=semantic.DEFAULT_TOP_K):
+        names = dict.fromkeys(skill.skill_name for skill in self.get_user_skills(user_id))
+        return self.search_jobs(list(names), limit) if names else []
+
+    def list_applications(self, user_id, limit=None, offset=0):
+        rows = self.conn.execute('''
+            SELECT uja.job_id, j.title, j.company, uja.application_date, uja.status
+            FROM all_user_job_applications uja
+            JOIN job_opportunities j ON uja.job_id = j.id
+            WHERE uja.user_id = ?
+            ORDER BY uja.id
+            LIMIT ? OFFSET ?
+        ''', (user_id,) + page_params(limit, offset)).fetchall()
+        return [JobApplication(*row) for row in rows]
+
+    def apply_to_job(self, user_id, job_id):
+        existing = self.conn.execute('''
+            SELECT 1 FROM all_user_job_applications WHERE user_id = ? AND job_id = ?
+        ''', (user_id, job_id)).fetchone()
+        if existing:
+            return ApplicationResult(ALREADY_EXISTS, "You have already applied for this job.", job_id=job_id)
+
+        self.conn.execute('''
+            INSERT INTO user_job_applications (user_id, job_id, application_date, status)
+            VALUES (?, ?, CURRENT_TIMESTAMP, 'Pending')
+        ''', (user_id, job_id))
+        self._emit(user_id, events.APPLIED, job_id)
+        self._commit()
+        return ApplicationResult(OK, "Application submitted!", job_id=job_id)
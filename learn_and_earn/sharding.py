@@ -0,0 +1,323 @@
+"""
+Sharded storage: per-user tables spread across several SQLite files.
+
+The per-user tables (SHARDED_TABLES) live in N shard files chosen by a
+stable hash of user_id, so enrollments, assignments, skills and applications
+of different users no longer contend for one file's write lock. Users, the
+course and job catalogs and the skill vocabulary stay in the common database
+(DB_PATH), which every shard connection ATTACHes as `common`.
+
+SQLite resolves unqualified table names in main first and then in attached
+databases, and shard files only contain the per-user tables, so the
+existing PlatformService queries run unchanged on a shard connection.
+
+A commit that writes both files is atomic per file but not across the pair
+in WAL mode, so anything that must change together lives in one file: a
+user's credit ledger sits in their shard next to their enrollments (see
+ledger.py), and shard writes lock only the shard (begin_shard_write).
+
+Cross-shard aggregates fan out over a thread pool, one connection per shard,
+and merge the partial results.
+
+Enable with LEARN_AND_EARN_SHARDS=N (N > 1). Existing single-file data is
+moved into the shards with:
+    python -m learn_and_earn.sharding migrate --shards 4
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from .db import (DB_PATH, add_missing_columns, apply_profile, connect, create_indexes, create_schema,
+                 initialize_database)
+
+SHARDED_TABLES = ('user_courses', 'user_assignments', 'user_skills', 'user_job_applications', 'events',
+                  'exam_submissions', 'quiz_attempts', 'certificates', 'credit_transactions',
+                  'archived_user_courses', 'archived_user_assignments', 'archived_user_job_applications')
+# Per-shard derived state: created on every shard but rebuilt from events rather than migrated
+SHARD_LOCAL_TABLES = ('materializer_state', 'user_course_state', 'user_progress_summary')
+# Hot + archived views; a view reads the tables of its own file, so every shard needs its own
+SHARD_VIEWS = ('all_user_courses', 'all_user_assignments', 'all_user_job_applications')
+COMMON_SCHEMA = 'common'
+MIGRATE_BATCH_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class CompletionEntry:
+    rank: int
+    user_id: int
+    username: str
+    completed_courses: int
+
+
+@dataclass(frozen=True)
+class CourseActivity:
+    course_id: str
+    enrolled: int
+    completed: int
+
+
+def shard_index(user_id, shard_count):
+    # crc32 rather than hash() so a user maps to the same file in every process
+    return zlib.crc32(str(int(user_id)).encode()) % shard_count
+
+
+def is_shard_connection(conn):
+    """True for a connection from connect_shard (the common database attached)."""
+    return any(row[1] == COMMON_SCHEMA for row in conn.execute('PRAGMA database_list'))
+
+
+def begin_shard_write(conn):
+    # BEGIN IMMEDIATE reserves every attached file, which would queue all shards on the
+    # common database's lock. A deferred BEGIN plus a no-op write to main takes the shard's
+    # write lock only; common tables are read without one
+    conn.execute('BEGIN')
+    conn.execute('DELETE FROM main.materializer_state WHERE 0')
+
+
+def shard_path_for(common_path, index):
+    root, ext = os.path.splitext(common_path)
+    return f"{root}.shard{index}{ext or '.db'}"
+
+
+class ShardedStorage:
+    def __init__(self, common_path=DB_PATH, shard_count=4, fan_out_workers=None):
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        self.common_path = common_path
+        self.shard_count = shard_count
+        self.shard_paths = [shard_path_for(common_path, index) for index in range(shard_count)]
+        self._executor = ThreadPoolExecutor(max_workers=fan_out_workers or shard_count,
+                                            thread_name_prefix='learn-and-earn-shard')
+        # Errors from the last initialize(); shared_storage() runs it once per process
+        self.initialize_errors = []
+
+    def initialize(self):
+        # Common database gets the full schema and seed data; shards only the per-user tables
+        conn = connect(self.common_path)
+        errors = initialize_database(conn)
+        conn.close()
+        shard_tables = SHARDED_TABLES + SHARD_LOCAL_TABLES + SHARD_VIEWS
+        for path in self.shard_paths:
+            conn = connect(path)
+            errors += create_schema(conn, shard_tables)
+            add_missing_columns(conn, shard_tables)
+            create_indexes(conn, shard_tables)
+            catch_up_progress(conn)
+            conn.close()
+        self.initialize_errors = errors
+        return errors
+
+    def shard_for(self, user_id):
+        # Anonymous work (registration, login, catalog reads) only touches common tables
+        return shard_index(user_id, self.shard_count) if user_id is not None else 0
+
+    def connect_shard(self, index):
+        conn = connect(self.shard_paths[index])
+        conn.execute(f'ATTACH DATABASE ? AS {COMMON_SCHEMA}', (self.common_path,))
+        # In WAL mode a commit touching both files is atomic per file, not across the pair
+        apply_profile(conn, schema=COMMON_SCHEMA)
+        return conn
+
+    def connect_for_user(self, user_id):
+        return self.connect_shard(self.shard_for(user_id))
+
+    # ---- Fan-out -----------------------------------------------------------
+
+    def _run_on_shard(self, index, fn):
+        conn = self.connect_shard(index)
+        try:
+            return fn(conn)
+        finally:
+            conn.close()
+
+    def fan_out(self, fn):
+        """Run fn(conn) on every shard in parallel; returns the results in shard order."""
+        futures = [self._executor.submit(self._run_on_shard, index, fn) for index in range(self.shard_count)]
+        return [future.result() for future in futures]
+
+    def completion_leaderboard(self, limit=10):
+        # Each shard returns its own top `limit`; the global top is among them
+        def top(conn):
+            return conn.execute(f'''
+                SELECT uc.user_id, u.username, COUNT(*) AS completed
+                FROM main.all_user_courses uc
+                JOIN {COMMON_SCHEMA}.users u ON u.id = uc.user_id
+                WHERE uc.completion_status = 'Completed'
+                GROUP BY uc.user_id
+                ORDER BY completed DESC, uc.user_id
+                LIMIT ?
+            ''', (limit,)).fetchall()
+
+        rows = [row for shard_rows in self.fan_out(top) for row in shard_rows]
+        rows.sort(key=lambda row: (-row[2], row[0]))
+        return [CompletionEntry(rank, user_id, username, completed)
+                for rank, (user_id, username, completed) in enumerate(rows[:limit], 1)]
+
+    def course_activity(self):
+        def counts(conn):
+            return conn.execute('''
+                SELECT course_id, COUNT(*), SUM(completion_status = 'Completed')
+                FROM main.all_user_courses
+                GROUP BY course_id
+            ''').fetchall()
+
+        enrolled = Counter()
+        completed = Counter()
+        for shard_rows in self.fan_out(counts):
+            for course_id, enrolled_count, completed_count in shard_rows:
+                enrolled[course_id] += enrolled_count
+                completed[course_id] += completed_count or 0
+        return [CourseActivity(course_id, count, completed[course_id])
+                for course_id, count in enrolled.most_common()]
+
+    def table_counts(self):
+        def counts(conn):
+            return {table: conn.execute(f'SELECT COUNT(*) FROM main.{table}').fetchone()[0]
+                    for table in SHARDED_TABLES}
+
+        per_shard = self.fan_out(counts)
+        totals = Counter()
+        for shard_counts in per_shard:
+            totals.update(shard_counts)
+        return dict(totals), per_shard
+
+    # ---- Migration ---------------------------------------------------------
+
+    def migrate_from_common(self, batch_size=MIGRATE_BATCH_SIZE, progress=None):
+        """Move per-user rows out of the single-file layout into their shards."""
+        self.initialize()
+        source = connect(self.common_path)
+        shards = [connect(path) for path in self.shard_paths]
+        moved = Counter()
+        try:
+            for table in SHARDED_TABLES:
+                columns = [row[1] for row in source.execute(f'PRAGMA table_info({table})')]
+                column_list = ', '.join(columns)
+                placeholders = ', '.join('?' * len(columns))
+                user_column = columns.index('user_id')
+                cursor = source.execute(f'SELECT {column_list} FROM {table} ORDER BY id')
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    by_shard = {}
+                    for row in rows:
+                        by_shard.setdefault(shard_index(row[user_column] or 0, self.shard_count), []).append(row)
+                    for index, shard_rows in by_shard.items():
+                        with shards[index]:
+                            shards[index].executemany(
+                                f'INSERT OR IGNORE INTO {table} ({column_list}) VALUES ({placeholders})', shard_rows)
+                    moved[table] += len(rows)
+                    if progress:
+                        progress(table, moved[table])
+                # Only clear the common copy once every row is in a shard
+                with source:
+                    source.execute(f'DELETE FROM {table}')
+            # Shard summaries were built before the events moved in; fold them now, not at next startup
+            for conn in shards:
+                catch_up_progress(conn)
+        finally:
+            source.close()
+            for conn in shards:
+                conn.close()
+        return dict(moved)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+_storages = {}
+_storages_lock = threading.Lock()
+_initialized = {}
+_initialized_lock = threading.Lock()
+
+
+def catch_up_progress(conn):
+    # Backfill legacy history and fold events once at startup; writers keep it current afterwards.
+    # events imports this module, hence the local import
+    from .events import ProgressMaterializer
+    return ProgressMaterializer(conn).catch_up()
+
+
+def shard_count_from_env():
+    try:
+        return int(os.environ.get('LEARN_AND_EARN_SHARDS', 1))
+    except ValueError:
+        return 1
+
+
+def shared_storage(common_path=DB_PATH):
+    """Process-wide ShardedStorage, or None when LEARN_AND_EARN_SHARDS is unset or 1."""
+    shard_count = shard_count_from_env()
+    if shard_count <= 1:
+        return None
+    with _storages_lock:
+        storage = _storages.get(common_path)
+        if storage is None:
+            storage = _storages[common_path] = ShardedStorage(common_path, shard_count)
+            storage.initialize()
+        return storage
+
+
+def initialize_storage(common_path=DB_PATH):
+    """
+    Create the schema and seed data once per process; returns the errors of that run.
+
+    Initialization opens the common database and every shard, runs DDL and
+    the seed upserts, folds pending events into the progress summaries
+    (backfilling databases that predate the event log), and so takes each
+    file's write lock. Streamlit reruns
+    and API requests call this on every page view, so only the first call
+    does the work and later ones just return its errors.
+    """
+    storage = shared_storage(common_path)
+    if storage is not None:
+        return list(storage.initialize_errors)
+    with _initialized_lock:
+        if common_path not in _initialized:
+            conn = connect(common_path)
+            try:
+                _initialized[common_path] = initialize_database(conn)
+                catch_up_progress(conn)
+            finally:
+                conn.close()
+        return list(_initialized[common_path])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the sharded per-user storage layout")
+    parser.add_argument('command', choices=['init', 'migrate', 'stats'])
+    parser.add_argument('--shards', type=int, default=max(shard_count_from_env(), 2))
+    parser.add_argument('--db', default=DB_PATH, help="Common SQLite database path")
+    args = parser.parse_args(argv)
+
+    storage = ShardedStorage(args.db, args.shards)
+    try:
+        if args.command == 'init':
+            for table, error in storage.initialize():
+                print(f"Error creating table {table}: {error}")
+            print(f"Initialized {args.shards} shards next to {args.db}")
+        elif args.command == 'migrate':
+            moved = storage.migrate_from_common(progress=lambda table, count: print(f"\r{table}: {count:,}", end=''))
+            print()
+            for table, count in moved.items():
+                print(f"Moved {count:,} {table} rows")
+        else:
+            totals, per_shard = storage.table_counts()
+            for table in SHARDED_TABLES:
+                split = ' / '.join(f"{counts[table]:,}" for counts in per_shard)
+                print(f"{table}: {totals.get(table, 0):,} ({split})")
+    except sqlite3.Error as e:
+        raise SystemExit(f"Sharding {args.command} failed: {e}")
+    finally:
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Skill vocabulary: integer skill ids with case and synonym normalization.
+
+Skills arrive as free strings from user_skills, course catalogs, job feeds and
+uploaded files. SkillVocabulary maps every spelling ("ML", "machine-learning",
+"Machine Learning") to one canonical skill id, so matching compares small int
+sets instead of strings.
+
+Ids live in the `skills` table and aliases in `skill_synonyms`; lookups are
+served from an in-memory interning table shared by every connection to the
+same database in the process, so a page rerun does not reload the skills
+table. Each SkillVocabulary checks the table against the database once (max
+skill id and alias count, one small query) and reloads only if another
+process has added skills; inserts through the vocabulary invalidate it, like
+quiz_cache.
+"""
+
+import re
+import threading
+
+# Canonical name -> aliases seeded into skill_synonyms
+SYNONYMS = {
+    'Machine Learning': ['ML', 'Machine-Learning'],
+    'Artificial Intelligence': ['AI', 'A.I.'],
+    'Deep Learning': ['DL'],
+    'Natural Language Processing': ['NLP'],
+    'Data Science': ['DS'],
+    'Python': ['Python3', 'Python 3', 'Py'],
+    'JavaScript': ['JS', 'ECMAScript'],
+    'TypeScript': ['TS'],
+    'Node.js': ['Node', 'NodeJS', 'Node JS'],
+    'React': ['ReactJS', 'React.js'],
+    'SQL': ['Structured Query Language'],
+    'Amazon Web Services': ['AWS'],
+    'Google Cloud Platform': ['GCP'],
+    'Kubernetes': ['K8s'],
+    'SEO': ['Search Engine Optimization', 'Search Engine Optimisation'],
+    'Social Media Marketing': ['SMM'],
+    'Digital Marketing': ['Online Marketing'],
+    'User Experience Design': ['UX', 'UX Design'],
+}
+
+KEY_SEPARATORS = re.compile(r'[\s_\-]+')
+
+
+def skill_key(name):
+    # Case- and separator-insensitive lookup key
+    return KEY_SEPARATORS.sub(' ', str(name).casefold()).strip()
+
+
+def display_name(name):
+    return re.sub(r'\s+', ' ', str(name)).strip()
+
+
+class InterningTable:
+    """Process-wide skill lookups for one database; SkillVocabulary objects share it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids_by_key = {}
+        self.names_by_id = {}
+        # Transient ids are never reused in the process, even across reloads
+        self.next_transient_id = -1
+        self.version = None  # (max skill id, alias count) the table was loaded at; None = reload
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def shared_table(conn):
+    """The interning table for the database holding conn's skills table (common, on a shard connection)."""
+    files = {name: path for _, name, path in conn.execute('PRAGMA database_list')}
+    path = files.get('common') or files.get('main')
+    if not path:
+        # In-memory databases are private to their connection
+        return InterningTable()
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None:
+            table = _tables[path] = InterningTable()
+        return table
+
+
+class SkillVocabulary:
+    """Interning view over the skills / skill_synonyms tables through one connection."""
+
+    def __init__(self, conn, table=None):
+        self.conn = conn
+        self.table = table if table is not None else shared_table(conn)
+        self._checked = False
+
+    def _database_version(self):
+        return tuple(self.conn.execute(
+            'SELECT COALESCE(MAX(id), 0), (SELECT COUNT(*) FROM skill_synonyms) FROM skills').fetchone())
+
+    def load(self):
+        table = self.table
+        with table.lock:
+            self._seed()
+            # Build new dicts and swap them in, so readers never see a half-loaded table
+            ids_by_key = {}
+            names_by_id = {}
+            for skill_id, name, key in self.conn.execute('SELECT id, name, normalized FROM skills'):
+                ids_by_key[key] = skill_id
+                names_by_id[skill_id] = name
+            for alias, skill_id in self.conn.execute('SELECT alias, skill_id FROM skill_synonyms'):
+                ids_by_key[alias] = skill_id
+            table.ids_by_key, table.names_by_id = ids_by_key, names_by_id
+            table.version = self._database_version()
+            self._checked = True
+        return self
+
+    def invalidate(self):
+        # The next SkillVocabulary to use the table reloads it
+        self.table.version = None
+
+    def _seed(self):
+        if self.conn.execute('SELECT 1 FROM skill_synonyms LIMIT 1').fetchone():
+            return
+        # A savepoint, not `with conn`: the first load can happen inside a caller's transaction
+        # (ingest_jobs, a service write), which must not be committed or rolled back here
+        self.conn.execute('SAVEPOINT skill_seed')
+        try:
+            for canonical, aliases in SYNONYMS.items():
+                skill_id = self._insert(canonical)
+                self.conn.executemany('INSERT OR IGNORE INTO skill_synonyms (alias, skill_id) VALUES (?, ?)',
+                                      [(skill_key(alias), skill_id) for alias in aliases])
+        except BaseException:
+            self.conn.execute('ROLLBACK TO skill_seed')
+            self.conn.execute('RELEASE skill_seed')
+            raise
+        self.conn.execute('RELEASE skill_seed')
+
+    def _insert(self, name):
+        key = skill_key(name)
+        self.conn.execute('INSERT OR IGNORE INTO skills (name, normalized) VALUES (?, ?)', (display_name(name), key))
+        return self.conn.execute('SELECT id FROM skills WHERE normalized = ?', (key,)).fetchone()[0]
+
+    def _ensure_loaded(self):
+        # Once per vocabulary object (i.e. per service / rerun): one small query, no reload
+        # unless the table is invalidated or the database gained skills elsewhere
+        if not self._checked:
+            if self.table.version is None or self.table.version != self._database_version():
+                self.load()
+            self._checked = True
+
+    def resolve(self, name):
+        """Skill id for a name or alias, or None if the vocabulary has never seen it."""
+        self._ensure_loaded()
+        return self.table.ids_by_key.get(skill_key(name))
+
+    def intern(self, name, persist=False):
+        """
+        Skill id for a name, assigning one if needed.
+
+        With persist=True new skills are written to the skills table (callers
+        commit); otherwise they get a process-local negative id, which is
+        enough for comparisons without writing on read paths.
+        """
+        self._ensure_loaded()
+        key = skill_key(name)
+        if not key:
+            return None
+        table = self.table
+        skill_id = table.ids_by_key.get(key)
+        if skill_id is not None and (skill_id > 0 or not persist):
+            return skill_id
+
+        with table.lock:
+            if persist:
+                skill_id = self._insert(name)
+                # Other processes see the new row on their next check; here the table is
+                # updated in place and marked for a reload that picks up its real version
+                table.version = None
+            else:
+                skill_id = table.ids_by_key.get(key)
+                if skill_id is not None:
+                    return skill_id
+                skill_id = table.next_transient_id
+                table.next_transient_id -= 1
+            table.ids_by_key[key] = skill_id
+            table.names_by_id[skill_id] = display_name(name)
+        return skill_id
+
+    def ids(self, names, persist=False):
+        ids = set()
+        for name in names:
+            skill_id = self.intern(name, persist)
+            if skill_id is not None:
+                ids.add(skill_id)
+        return frozenset(ids)
+
+    def keys(self):
+        """Every normalized name and alias the vocabulary knows."""
+        self._ensure_loaded()
+        table = self.table
+        # intern() adds keys in place under the lock; iterate a snapshot taken under it
+        with table.lock:
+            return list(table.ids_by_key)
+
+    def name(self, skill_id):
+        self._ensure_loaded()
+        return self.table.names_by_id.get(skill_id)
+
+    def canonical(self, name):
+        """Canonical display name for a skill ("ml" -> "Machine Learning")."""
+        skill_id = self.resolve(name)
+        return self.table.names_by_id.get(skill_id, display_name(name)) if skill_id is not None else display_name(name)
+
+    def canonicalize(self, names):
+        # Canonical names in first-seen order, duplicates and synonyms collapsed
+        seen = set()
+        result = []
+        for name in names:
+            canonical = self.canonical(name)
+            key = skill_key(canonical)
+            if key and key not in seen:
+                seen.add(key)
+                result.append(canonical)
+        return result
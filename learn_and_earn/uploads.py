@@ -0,0 +1,321 @@
+"""
+Upload processing for skills / résumé files used by AI job matching.
+
+Uploads are read in fixed-size chunks with a hard size cap, hashed, and
+parsed incrementally:
+
+- JSONL: one candidate per line.
+- JSON array: candidates are decoded one element at a time, so a recruiter's
+  batch file never becomes one giant Python object.
+- JSON object: a single candidate ({"skills": [...]}, JSON Resume style
+  {"skills": [{"name": ..., "keywords": [...]}]}) or {"candidates": [...]}.
+
+Parsed records (candidate names and raw skill strings) are cached by file
+format and content hash, so re-uploading the same file costs one hash pass.
+Skills are normalized and mapped to ids through the caller's skill
+vocabulary on every call, never cached: transient ids of unknown skills are
+only meaningful to the vocabulary that handed them out.
+
+Parsing runs on the calling thread: the page needs the candidates to render
+the same run, so a worker would only leave the session thread waiting. It is
+streamed and bounded by MAX_UPLOAD_BYTES.
+"""
+
+import codecs
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import FrozenSet, Tuple
+
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+CACHE_ENTRIES = 64
+
+# Keys that may hold a candidate's skills
+SKILL_KEYS = ('skills', 'technical_skills', 'skill_set', 'skillset')
+NAME_KEYS = ('name', 'candidate', 'full_name', 'email')
+
+WHITESPACE = re.compile(r'\s*')
+
+
+class UploadError(ValueError):
+    pass
+
+
+class UploadTooLarge(UploadError):
+    pass
+
+
+@dataclass(frozen=True)
+class Candidate:
+    name: str
+    skills: Tuple[str, ...]
+    skill_ids: FrozenSet[int] = field(default=frozenset(), repr=False, compare=False)
+
+
+@dataclass(frozen=True)
+class ParsedUpload:
+    # What the cache holds: (name, raw skills) per candidate, independent of any vocabulary
+    records: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    invalid_records: int = 0
+
+
+@dataclass(frozen=True)
+class UploadResult:
+    file_hash: str
+    candidates: Tuple[Candidate, ...]
+    invalid_records: int = 0
+    cached: bool = False
+
+    @property
+    def skills(self):
+        # All skills across candidates, first-seen order
+        seen = {}
+        for candidate in self.candidates:
+            for skill in candidate.skills:
+                seen.setdefault(skill, None)
+        return list(seen)
+
+
+class UploadCache:
+    """Small thread-safe LRU of parsed uploads keyed by (format, content hash)."""
+
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+upload_cache = UploadCache()
+
+
+def iter_chunks(fileobj, max_bytes=MAX_UPLOAD_BYTES, chunk_size=CHUNK_SIZE):
+    total = 0
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {max_bytes / (1024 * 1024):g} MB limit")
+        yield chunk
+
+
+def hash_upload(fileobj, max_bytes=MAX_UPLOAD_BYTES):
+    digest = hashlib.sha256()
+    for chunk in iter_chunks(fileobj, max_bytes):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_text(chunks):
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_jsonl_records(texts):
+    buffer = ''
+    for text in texts:
+        buffer += text
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            yield from _decode_line(line)
+    yield from _decode_line(buffer)
+
+
+def _decode_line(line):
+    line = line.strip()
+    if not line:
+        return
+    try:
+        yield json.loads(line)
+    except json.JSONDecodeError:
+        yield None
+
+
+def iter_json_records(texts):
+    """Yield top-level array elements one at a time, or the single top-level value."""
+    decoder = json.JSONDecoder()
+    texts = iter(texts)
+    buffer = ''
+    pos = 0
+    exhausted = False
+
+    def fill():
+        # Drop consumed text and append the next chunk
+        nonlocal buffer, pos, exhausted
+        try:
+            buffer = buffer[pos:] + next(texts)
+        except StopIteration:
+            buffer = buffer[pos:]
+            exhausted = True
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            pos = WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or exhausted:
+                return
+            fill()
+
+    skip_whitespace()
+    if pos >= len(buffer):
+        return
+    if buffer[pos] != '[':
+        # Single top-level value: needs the whole (size-capped) document
+        while not exhausted:
+            fill()
+        try:
+            yield json.loads(buffer)
+        except json.JSONDecodeError as e:
+            raise UploadError(f"Invalid JSON file: {e.msg}") from e
+        return
+
+    pos += 1
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise UploadError("Invalid JSON file: unterminated array")
+        if buffer[pos] == ']':
+            return
+        if buffer[pos] == ',':
+            pos += 1
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            # Most likely the element is split across chunks; read more and retry
+            if exhausted:
+                raise UploadError(f"Invalid JSON file: {e.msg}") from e
+            fill()
+            continue
+        if end == len(buffer) and not exhausted and isinstance(value, (int, float)):
+            # A number at the end of the buffer may continue in the next chunk
+            fill()
+            continue
+        pos = end
+        yield value
+
+
+def extract_skills(value):
+    """Flatten skills from strings, lists and JSON Resume style {"name", "keywords"} entries."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part for part in (piece.strip() for piece in value.split(',')) if part]
+    if isinstance(value, dict):
+        skills = []
+        if isinstance(value.get('name'), str):
+            skills.append(value['name'])
+        for keyword in value.get('keywords') or []:
+            skills.extend(extract_skills(keyword))
+        return skills
+    if isinstance(value, (list, tuple)):
+        skills = []
+        for item in value:
+            skills.extend(extract_skills(item))
+        return skills
+    return []
+
+
+def candidate_skills(record):
+    skills = []
+    for key in SKILL_KEYS:
+        skills.extend(extract_skills(record.get(key)))
+    return skills
+
+
+def candidate_name(record, index):
+    basics = record.get('basics') if isinstance(record.get('basics'), dict) else {}
+    for source in (record, basics):
+        for key in NAME_KEYS:
+            if isinstance(source.get(key), str) and source[key].strip():
+                return source[key].strip()
+    return f"Candidate {index}"
+
+
+def iter_candidate_records(records):
+    # Expand {"candidates": [...]} wrappers; everything else is one candidate per record
+    for record in records:
+        if isinstance(record, dict) and isinstance(record.get('candidates'), list):
+            yield from record['candidates']
+        else:
+            yield record
+
+
+def parse_records(records):
+    """Candidate names and raw skills from decoded records; returns a ParsedUpload."""
+    parsed = []
+    invalid = 0
+    for index, record in enumerate(iter_candidate_records(records), 1):
+        if not isinstance(record, dict):
+            invalid += 1
+            continue
+        skills = candidate_skills(record)
+        if not skills:
+            invalid += 1
+            continue
+        parsed.append((candidate_name(record, index), tuple(skills)))
+    return ParsedUpload(tuple(parsed), invalid)
+
+
+def parse_candidates(parsed, vocabulary):
+    # Canonical names and ids come from the caller's vocabulary on every call
+    candidates = []
+    invalid = parsed.invalid_records
+    for name, raw_skills in parsed.records:
+        skills = vocabulary.canonicalize(raw_skills)
+        if not skills:
+            invalid += 1
+            continue
+        candidates.append(Candidate(name, tuple(skills), vocabulary.ids(skills)))
+    return candidates, invalid
+
+
+def upload_format(filename):
+    return 'jsonl' if filename.lower().endswith('.jsonl') else 'json'
+
+
+def process_upload(fileobj, vocabulary, filename='', max_bytes=MAX_UPLOAD_BYTES, cache=upload_cache):
+    """Parse an uploaded skills file into candidates, using the hash cache when possible."""
+    file_hash = hash_upload(fileobj, max_bytes)
+    # The same bytes parse differently as JSON and as JSONL
+    key = (upload_format(filename), file_hash)
+    parsed = cache.get(key) if cache is not None else None
+    cached = parsed is not None
+    if not cached:
+        fileobj.seek(0)
+        texts = iter_text(iter_chunks(fileobj, max_bytes))
+        records = iter_jsonl_records(texts) if key[0] == 'jsonl' else iter_json_records(texts)
+        parsed = parse_records(records)
+        if cache is not None:
+            cache.put(key, parsed)
+
+    candidates, invalid = parse_candidates(parsed, vocabulary)
+    return UploadResult(file_hash, tuple(candidates), invalid, cached=cached)
@@ -0,0 +1,38 @@
+"""
+Shared fixtures: every test gets its own freshly initialized database file.
+
+Run with:
+    python -m pytest -q
+"""
+
+import pytest
+
+from learn_and_earn import PlatformService, connect
+from learn_and_earn.sharding import initialize_storage
+
+# Seeded courses used across the tests
+PAID_COURSE = 'cyber001'    # Beginner, 199.99 -> 20 credits
+OTHER_COURSE = 'fin001'     # Beginner, 149.99 -> 15 credits
+QUIZ_COURSE = 'ai001'       # catalog-only (free), has module quizzes
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # Single-file layout, no query stats, whatever the developer's shell exports
+    for name in ('LEARN_AND_EARN_SHARDS', 'LEARN_AND_EARN_QUERY_STATS', 'LEARN_AND_EARN_GRADING_SEED'):
+        monkeypatch.delenv(name, raising=False)
+    path = str(tmp_path / 'learn_and_earn.db')
+    assert initialize_storage(path) == []
+    return path
+
+
+@pytest.fixture
+def service(db_path):
+    service = PlatformService(connect(db_path))
+    yield service
+    service.conn.close()
+
+
+@pytest.fixture
+def user_id(service):
+    return service.register_user('ada', 'ada@example.com', 'secret', 'Python').user_id
@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+import pytest
+
+from learn_and_earn.api import MAX_BODY_BYTES, APIServer
+from learn_and_earn.services import PlatformService
+
+from .conftest import PAID_COURSE
+
+API_KEY = 'test-key'
+ADMIN_KEY = 'admin-key'
+
+
+async def read_response(reader):
+    """(status, headers, body) of one response, or None when the server closed the connection."""
+    status_line = await reader.readline()
+    if not status_line:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return int(status_line.split()[1]), headers, body
+
+
+def exchange(db_path, raw_requests, api_key=API_KEY, admin_key=ADMIN_KEY):
+    """Send raw request bytes over one connection; returns every response until the server closes."""
+    async def run():
+        api = APIServer(db_path, pool_size=1, api_key=api_key, admin_key=admin_key)
+        server = await api.start('127.0.0.1', 0)
+        try:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(b''.join(raw_requests))
+            await writer.drain()
+            responses = []
+            while True:
+                response = await asyncio.wait_for(read_response(reader), 10)
+                if response is None:
+                    break
+                responses.append(response)
+                if response[1].get('connection') == 'close' or len(responses) == len(raw_requests):
+                    break
+            writer.close()
+            # Let the server see EOF and finish its connection handler before the loop closes
+            handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            if handlers:
+                await asyncio.wait(handlers, timeout=5)
+            return responses
+        finally:
+            api.close()
+    return asyncio.run(run())
+
+
+def request(method, path, body=None, key=API_KEY, headers=()):
+    data = json.dumps(body).encode() if body is not None else b''
+    lines = [f"{method} {path} HTTP/1.1", "Host: test", f"Content-Length: {len(data)}"]
+    if key is not None:
+        lines.append(f"X-API-Key: {key}")
+    lines.extend(headers)
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + data
+
+
+def statuses(responses):
+    return [status for status, _, _ in responses]
+
+
+def test_keep_alive_serves_several_requests(db_path):
+    responses = exchange(db_path, [request('GET', '/health'), request('GET', '/courses?limit=2')])
+    assert statuses(responses) == [200, 200]
+    assert len(json.loads(responses[1][2])['items']) == 2
+
+
+def test_writes_need_a_configured_key(db_path, user_id):
+    enroll = {'course_id': PAID_COURSE}
+    assert statuses(exchange(db_path, [request('POST', f'/users/{user_id}/enrollments', enroll)],
+                             api_key='')) == [403]
+    assert statuses(exchange(db_path, [request('GET', '/health', key=None)])) == [401]
+    assert statuses(exchange(db_path, [request('GET', '/health', key='wrong')])) == [401]
+    responses = exchange(db_path, [request('POST', f'/users/{user_id}/enrollments', enroll)])
+    assert statuses(responses) == [201]
+    assert json.loads(responses[0][2])['credits_charged'] == 20.0
+
+
+def test_admin_endpoints_need_the_admin_key(db_path):
+    assert statuses(exchange(db_path, [request('GET', '/admin/query-stats')])) == [403]
+    assert statuses(exchange(db_path, [request('GET', '/admin/query-stats', key=ADMIN_KEY)])) == [200]
+    assert statuses(exchange(db_path, [request('GET', '/admin/query-stats')], admin_key='')) == [403]
+
+
+@pytest.mark.parametrize('increment', [0, -5, 21, 'lots'])
+def test_progress_increment_is_validated(db_path, user_id, increment):
+    body = {'course_id': PAID_COURSE, 'increment': increment}
+    assert statuses(exchange(db_path, [request('POST', f'/users/{user_id}/progress', body)])) == [422]
+
+
+def test_certificate_get_does_not_issue(db_path, user_id):
+    assert statuses(exchange(db_path, [request('GET', f'/users/{user_id}/certificates/{PAID_COURSE}')])) == [404]
+
+
+def test_oversized_body_closes_the_connection(db_path):
+    oversized = request('POST', '/users/1/progress', headers=()).replace(
+        b'Content-Length: 0', f'Content-Length: {MAX_BODY_BYTES + 1}'.encode())
+    responses = exchange(db_path, [oversized, request('GET', '/health')])
+    assert statuses(responses) == [413]
+    assert responses[0][1]['connection'] == 'close'
+
+
+@pytest.mark.parametrize('length', ['-1', 'abc', '1e3'])
+def test_invalid_content_length_closes_the_connection(db_path, length):
+    # A keep-alive reply here would parse the unread body as the next request
+    bad = request('POST', '/users/1/progress').replace(b'Content-Length: 0', f'Content-Length: {length}'.encode())
+    responses = exchange(db_path, [bad + b'GET /health HTTP/1.1\r\n\r\n', request('GET', '/health')])
+    assert statuses(responses) == [400]
+    assert responses[0][1]['connection'] == 'close'
+
+
+def test_chunked_bodies_are_refused(db_path):
+    chunked = (b"POST /users/1/progress HTTP/1.1\r\nX-API-Key: test-key\r\nTransfer-Encoding: chunked\r\n\r\n"
+               b"5\r\nhello\r\n0\r\n\r\n")
+    responses = exchange(db_path, [chunked, request('GET', '/health')])
+    assert statuses(responses) == [411]
+    assert responses[0][1]['connection'] == 'close'
+
+
+def test_overlong_header_is_431(db_path):
+    long_header = request('GET', '/health', headers=[f"X-Padding: {'a' * 70000}"])
+    assert statuses(exchange(db_path, [long_header])) == [431]
+
+
+def test_internal_errors_are_not_sent_to_clients(db_path, monkeypatch):
+    def broken(service, limit=10):
+        raise RuntimeError(f"no such table: secret_table in {db_path}")
+    monkeypatch.setattr(PlatformService, 'get_leaderboard', broken)
+    responses = exchange(db_path, [request('GET', '/leaderboard'), request('GET', '/health')])
+    assert statuses(responses) == [500, 200]
+    assert json.loads(responses[0][2]) == {'error': "Internal server error"}
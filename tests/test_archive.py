@@ -0,0 +1,63 @@
+from learn_and_earn import ALREADY_EXISTS
+from learn_and_earn.archive import archive_database, table_counts
+
+from .conftest import OTHER_COURSE, PAID_COURSE, QUIZ_COURSE
+
+
+def enroll(service, user_id, course_id, status, finished_days_ago):
+    service.conn.execute('''
+        INSERT INTO user_courses (user_id, course_id, enrollment_date, completion_status, progress_percentage,
+                                  completed_date)
+        VALUES (?, ?, datetime('now', '-400 days'), ?, 100, datetime('now', ?))
+    ''', (user_id, course_id, status, f"-{finished_days_ago} days"))
+    service.conn.execute('''
+        INSERT INTO user_assignments (user_id, course_id, module_id, submission_date)
+        VALUES (?, ?, 'm1', datetime('now', '-390 days'))
+    ''', (user_id, course_id))
+    service.conn.commit()
+
+
+def counts(service):
+    return {table: (hot, archived) for table, hot, archived in table_counts(service.conn)}
+
+
+def test_old_completed_enrollments_move_with_their_submissions(service, user_id):
+    enroll(service, user_id, PAID_COURSE, 'Completed', 365)
+    enroll(service, user_id, OTHER_COURSE, 'Completed', 10)
+    enroll(service, user_id, QUIZ_COURSE, 'In Progress', 365)
+
+    stats = archive_database(service.conn, days=180, pause=0)
+    assert (stats.enrollments, stats.assignments, stats.applications) == (1, 1, 0)
+    assert counts(service)['user_courses'] == (2, 1)
+    assert counts(service)['user_assignments'] == (2, 1)
+
+    # History reads still see the archived enrollment
+    assert service.count_completed_courses(user_id) == 2
+    enrolled = {row[0] for row in service.conn.execute('SELECT course_id FROM all_user_courses WHERE user_id = ?',
+                                                       (user_id,))}
+    assert enrolled == {PAID_COURSE, OTHER_COURSE, QUIZ_COURSE}
+    # and an archived course still counts as enrolled
+    assert service.enroll_in_course(user_id, PAID_COURSE).outcome == ALREADY_EXISTS
+
+
+def test_archiving_is_batched_and_repeatable(service, user_id):
+    for course_id in (PAID_COURSE, OTHER_COURSE, QUIZ_COURSE):
+        enroll(service, user_id, course_id, 'Completed', 365)
+    stats = archive_database(service.conn, days=180, batch_size=2, pause=0)
+    assert (stats.enrollments, stats.batches) == (3, 2)
+    assert archive_database(service.conn, days=180, pause=0).rows == 0
+
+
+def test_resolved_applications_archive_pending_stay(service, user_id):
+    service.conn.executemany('''
+        INSERT INTO user_job_applications (user_id, job_id, application_date, status)
+        VALUES (?, ?, datetime('now', '-365 days'), ?)
+    ''', [(user_id, 'job_a', 'Rejected'), (user_id, 'job_b', 'Pending')])
+    service.conn.commit()
+    assert archive_database(service.conn, days=180, pause=0).applications == 1
+    assert counts(service)['user_job_applications'] == (1, 1)
+
+
+def test_zero_days_turns_archival_off(service, user_id):
+    enroll(service, user_id, PAID_COURSE, 'Completed', 365)
+    assert archive_database(service.conn, days=0).rows == 0
@@ -0,0 +1,70 @@
+from learn_and_earn.batch import compute_badges, plan_chunks, run_job, start_run, write_badges
+
+from .conftest import OTHER_COURSE, PAID_COURSE
+
+
+def complete(service, user_id, course_id):
+    service.conn.execute('''
+        INSERT INTO user_courses (user_id, course_id, completion_status, progress_percentage, completed_date)
+        VALUES (?, ?, 'Completed', 100, CURRENT_TIMESTAMP)
+    ''', (user_id, course_id))
+    service.conn.commit()
+
+
+def earnings(service, user_id):
+    return service.conn.execute('SELECT total_earnings FROM users WHERE id = ?', (user_id,)).fetchone()[0]
+
+
+def badge_rows(service, user_id):
+    return service.conn.execute("SELECT skill_name FROM user_skills WHERE user_id = ? AND skill_name LIKE '% Badge for %'",
+                                (user_id,)).fetchall()
+
+
+def test_replayed_badge_chunk_pays_once(service, user_id):
+    results = [(user_id, [(PAID_COURSE, 'Bronze')])]
+    with service.transaction():
+        write_badges(service, results)
+    with service.transaction():
+        write_badges(service, results)
+    assert badge_rows(service, user_id) == [(f"Bronze Badge for {PAID_COURSE}",)]
+    assert earnings(service, user_id) == 100
+
+
+def test_badges_job_awards_completed_courses(db_path, service, user_id):
+    complete(service, user_id, PAID_COURSE)
+    complete(service, user_id, OTHER_COURSE)
+    stats = run_job('badges', db_path, workers=1, chunk_size=1)
+    assert (stats.chunks, stats.users) == (1, 1)
+    assert len(badge_rows(service, user_id)) == 2
+    # Nothing left to award on the next run
+    run_job('badges', db_path, workers=1)
+    assert earnings(service, user_id) == 200
+
+
+def test_resume_skips_finished_chunks(db_path, service, user_id):
+    other = service.register_user('bob', 'bob@example.com', 'pw', 'SQL').user_id
+    complete(service, user_id, PAID_COURSE)
+    complete(service, other, PAID_COURSE)
+
+    # An interrupted run: planned, first chunk checkpointed, then killed
+    run_id, resumed = start_run(service.conn, 'badges', resume=False)
+    assert not resumed
+    assert plan_chunks(service.conn, run_id, 1, chunk_size=1) == 2
+    with service.conn:
+        service.conn.execute("UPDATE batch_chunks SET status = 'done' WHERE run_id = ? AND chunk_index = 0",
+                             (run_id,))
+
+    stats = run_job('badges', db_path, workers=1, chunk_size=1, resume=True)
+    assert stats.run_id == run_id
+    assert (stats.skipped_chunks, stats.chunks) == (1, 1)
+    assert (len(badge_rows(service, user_id)), len(badge_rows(service, other))) == (0, 1)
+    status = service.conn.execute('SELECT status FROM batch_runs WHERE id = ?', (run_id,)).fetchone()[0]
+    assert status == 'finished'
+
+
+def test_badge_of_a_similar_course_id_does_not_count(service, user_id):
+    # LIKE ignores case, so a badge for CYBER001 used to hide the missing cyber001 badge
+    with service.transaction():
+        service.award_missing_badge(user_id, PAID_COURSE.upper(), 'Gold')
+    complete(service, user_id, PAID_COURSE)
+    assert compute_badges(service, user_id) == [(PAID_COURSE, 'Bronze')]
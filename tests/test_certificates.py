@@ -0,0 +1,73 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from learn_and_earn import media
+from learn_and_earn.batch import run_job
+from learn_and_earn.certificates import SIZE, certificate_id_for, render_certificate
+
+from .conftest import PAID_COURSE, QUIZ_COURSE
+from .test_batch import complete
+
+
+@pytest.fixture(autouse=True)
+def media_next_to_db(monkeypatch):
+    monkeypatch.setattr(media, 'MEDIA_ROOT', None)
+
+
+def certificate_rows(service, user_id):
+    return service.conn.execute('SELECT id, course_id, digest FROM certificates WHERE user_id = ? ORDER BY course_id',
+                                (user_id,)).fetchall()
+
+
+def test_rendering_is_deterministic_per_learner():
+    png = render_certificate("Ada Lovelace", "Cyber Security", "2026-10-01", "ABC123")
+    image = Image.open(io.BytesIO(png))
+    assert (image.format, image.size, image.mode) == ('PNG', SIZE, 'P')
+    assert render_certificate("Ada Lovelace", "Cyber Security", "2026-10-01", "ABC123") == png
+    assert render_certificate("Grace Hopper", "Cyber Security", "2026-10-01", "ABC123") != png
+    # Long titles are shrunk to fit rather than failing
+    assert render_certificate("Ada", "A" * 300, "2026-10-01", "ABC123")
+
+
+def test_certificates_are_issued_once_for_completed_courses(service, user_id):
+    assert service.issue_certificate(user_id, PAID_COURSE) is None
+    complete(service, user_id, PAID_COURSE)
+    assert service.get_certificate(user_id, PAID_COURSE) is None
+
+    certificate = service.issue_certificate(user_id, PAID_COURSE)
+    assert certificate.certificate_id == certificate_id_for(user_id, PAID_COURSE)
+    assert service.get_certificate(user_id, PAID_COURSE) == certificate
+    png = service.get_certificate_bytes(certificate)
+    assert Image.open(io.BytesIO(png)).size == SIZE
+    assert os.path.exists(service.media.path_for(certificate.digest, 'image/png'))
+
+    assert service.issue_certificate(user_id, PAID_COURSE) == certificate
+    assert len(certificate_rows(service, user_id)) == 1
+
+
+def test_catalog_courses_get_their_catalog_title(service, user_id):
+    complete(service, user_id, QUIZ_COURSE)
+    certificate = service.issue_certificate(user_id, QUIZ_COURSE)
+    assert certificate is not None and certificate.course_id == QUIZ_COURSE
+
+
+def test_batch_job_issues_the_cohort_and_is_idempotent(db_path, service, user_id):
+    other = service.register_user('grace', 'grace@example.com', 'secret', 'SQL').user_id
+    complete(service, user_id, PAID_COURSE)
+    complete(service, user_id, QUIZ_COURSE)
+    complete(service, other, PAID_COURSE)
+
+    stats = run_job('certificates', db_path, workers=1)
+    assert stats.users == 2
+    issued = certificate_rows(service, user_id)
+    assert [course_id for _, course_id, _ in issued] == sorted([PAID_COURSE, QUIZ_COURSE])
+    assert len(certificate_rows(service, other)) == 1
+    # Workers wrote the PNGs next to the database; the parent only recorded the rows
+    for _, _, digest in issued:
+        assert os.path.exists(service.media.path_for(digest, 'image/png'))
+
+    run_job('certificates', db_path, workers=1)
+    assert certificate_rows(service, user_id) == issued
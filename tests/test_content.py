@@ -0,0 +1,54 @@
+from learn_and_earn.content import BodyCache, ModuleBody, ModuleContentStore, body_digest, sync_module_content
+
+from .conftest import QUIZ_COURSE
+
+
+def test_seeded_bodies_live_compressed_outside_course_modules(service):
+    inline = service.conn.execute('''
+        SELECT COUNT(*) FROM course_modules WHERE content IS NOT NULL OR assignment_details IS NOT NULL
+    ''').fetchone()[0]
+    assert inline == 0
+    modules, raw_bytes, stored_bytes = ModuleContentStore(service.conn).stats()
+    assert modules and raw_bytes > 0 and stored_bytes > 0
+
+
+def test_headers_list_without_bodies_and_bodies_decompress_on_open(service):
+    store = ModuleContentStore(service.conn, cache=BodyCache())
+    headers = store.headers(QUIZ_COURSE)
+    assert [header.id for header in headers] == ['mod003', 'mod004']
+    assert all(header.digest for header in headers)
+
+    body = store.body(headers[0])
+    assert body.content and body.size_bytes == headers[0].size_bytes
+    assert body_digest(body.content, body.assignment) == headers[0].digest
+    # The second open is served from the cache, keyed by (module id, digest)
+    assert store.body(headers[0]) is body
+    assert store.body('mod003') == body
+    assert store.body('no-such-module') is None
+
+
+def test_hand_edited_bodies_are_moved_and_get_a_new_cache_key(service):
+    store = ModuleContentStore(service.conn, cache=BodyCache())
+    before = store.headers(QUIZ_COURSE)[0]
+    store.body(before)
+    service.conn.execute("UPDATE course_modules SET content = 'Rewritten notes' WHERE id = ?", (before.id,))
+    service.conn.commit()
+
+    # initialize_database runs this on startup
+    assert sync_module_content(service.conn) == 1
+    after = store.headers(QUIZ_COURSE)[0]
+    assert after.digest != before.digest
+    assert store.body(after).content == 'Rewritten notes'
+    assert sync_module_content(service.conn) == 0
+
+
+def test_body_cache_is_bounded_by_text_size():
+    cache = BodyCache(max_bytes=10)
+    cache.put('a', ModuleBody('a', 'x' * 4, None, None))
+    cache.put('b', ModuleBody('b', 'x' * 4, None, None))
+    cache.get('a')
+    cache.put('c', ModuleBody('c', 'x' * 4, None, None))
+    assert (cache.get('a') is not None, cache.get('b'), cache.get('c') is not None) == (True, None, True)
+    assert cache.size == 8
+    cache.put('huge', ModuleBody('huge', 'x' * 11, None, None))
+    assert cache.get('huge') is None
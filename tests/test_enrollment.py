@@ -0,0 +1,57 @@
+from learn_and_earn import ALREADY_EXISTS, CONFLICT, NOT_ELIGIBLE, NOT_FOUND, OK
+
+from .conftest import OTHER_COURSE, PAID_COURSE
+
+
+def enrollments(service, user_id):
+    return service.conn.execute('SELECT COUNT(*) FROM user_courses WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+
+def test_enrollment_charges_once(service, user_id):
+    result = service.enroll_in_course(user_id, PAID_COURSE, idempotency_key='submit-1')
+    assert result.outcome == OK
+    assert (result.credits_charged, result.balance) == (20.0, 80.0)
+    assert service.enroll_in_course(user_id, PAID_COURSE).outcome == ALREADY_EXISTS
+    assert service.ledger.balance(user_id) == 80.0
+
+
+def test_retried_submit_replays_original_enrollment(service, user_id):
+    first = service.enroll_in_course(user_id, PAID_COURSE, idempotency_key='submit-1')
+    retry = service.enroll_in_course(user_id, PAID_COURSE, idempotency_key='submit-1')
+    assert retry.outcome == OK
+    assert (retry.credits_charged, retry.balance) == (first.credits_charged, first.balance)
+    assert enrollments(service, user_id) == 1
+    assert len(service.list_credit_transactions(user_id)) == 2  # opening + one debit
+
+
+def test_reused_key_for_another_course_conflicts(service, user_id):
+    service.enroll_in_course(user_id, PAID_COURSE, idempotency_key='submit-1')
+    result = service.enroll_in_course(user_id, OTHER_COURSE, idempotency_key='submit-1')
+    assert result.outcome == CONFLICT
+    assert enrollments(service, user_id) == 1
+    assert service.ledger.balance(user_id) == 80.0
+
+
+def test_grant_key_does_not_replay_an_enrollment(service, user_id):
+    service.grant_credits(user_id, 5, idempotency_key='same')
+    result = service.enroll_in_course(user_id, PAID_COURSE, idempotency_key='same')
+    assert (result.outcome, result.credits_charged) == (OK, 20.0)
+
+
+def test_free_course_posts_nothing(service, user_id):
+    result = service.enroll_in_course(user_id, 'catalog-only', idempotency_key='free-1')
+    assert (result.outcome, result.credits_charged, result.balance) == (OK, 0, 100.0)
+    assert service.list_credit_transactions(user_id) == []
+    assert service.enroll_in_course(user_id, 'catalog-only', idempotency_key='free-1').outcome == ALREADY_EXISTS
+
+
+def test_insufficient_credits_enrolls_nothing(service, user_id):
+    service.conn.execute('UPDATE users SET learning_credits = 5 WHERE id = ?', (user_id,))
+    service.conn.commit()
+    result = service.enroll_in_course(user_id, PAID_COURSE)
+    assert (result.outcome, result.balance) == (NOT_ELIGIBLE, 5.0)
+    assert enrollments(service, user_id) == 0
+
+
+def test_unknown_user(service):
+    assert service.enroll_in_course(999, PAID_COURSE).outcome == NOT_FOUND
@@ -0,0 +1,100 @@
+import random
+import statistics
+
+import pytest
+
+from learn_and_earn import connect
+from learn_and_earn.enrollment_cache import EnrollmentCache
+from learn_and_earn.sharding import ShardedStorage, shard_index
+
+from .conftest import OTHER_COURSE, PAID_COURSE
+
+STATUSES = ('In Progress', 'Exam Registered', 'Completed')
+
+
+def random_enrollments(count=300, seed=7):
+    rng = random.Random(seed)
+    return [(user_id, course_id, round(rng.uniform(0, 100), 1), rng.choice(STATUSES))
+            for user_id in range(1, count + 1)
+            for course_id in rng.sample([PAID_COURSE, OTHER_COURSE, 'ds001'], rng.randint(1, 3))]
+
+
+def insert(conn, rows):
+    with conn:
+        conn.executemany('''
+            INSERT INTO user_courses (user_id, course_id, progress_percentage, completion_status)
+            VALUES (?, ?, ?, ?)
+        ''', rows)
+
+
+def expected_stats(rows, course_id):
+    progress = [row[2] for row in rows if row[1] == course_id]
+    statuses = [row[3] for row in rows if row[1] == course_id]
+    return (len(progress), statuses.count('In Progress'), statuses.count('Exam Registered'),
+            statuses.count('Completed'), round(statistics.fmean(progress), 2), round(statistics.median(progress), 2))
+
+
+def observed(stats):
+    return (stats.enrolled, stats.in_progress, stats.exam_registered, stats.completed,
+            stats.mean_progress, stats.median_progress)
+
+
+def expected_near_completion(rows, course_id, threshold=80):
+    return sorted(row[0] for row in rows if row[1] == course_id and row[2] >= threshold and row[3] != 'Completed')
+
+
+def test_course_reads_match_the_table(db_path):
+    rows = random_enrollments()
+    conn = connect(db_path)
+    insert(conn, rows)
+    conn.close()
+
+    cache = EnrollmentCache(db_path).reload()
+    assert cache.enrollments == len(rows)
+    for course_id in (PAID_COURSE, OTHER_COURSE, 'ds001'):
+        assert observed(cache.course_stats(course_id)) == pytest.approx(expected_stats(rows, course_id), abs=0.01)
+        assert cache.near_completion(course_id) == expected_near_completion(rows, course_id)
+    all_stats = cache.all_course_stats()
+    assert sorted(stats.course_id for stats in all_stats) == sorted([PAID_COURSE, OTHER_COURSE, 'ds001'])
+    for stats in all_stats:
+        assert observed(stats) == pytest.approx(expected_stats(rows, stats.course_id), abs=0.01)
+    distribution = cache.progress_distribution(PAID_COURSE)
+    assert sum(distribution.counts) == expected_stats(rows, PAID_COURSE)[0]
+    assert cache.course_stats('nope001').enrolled == 0
+    assert cache.near_completion(limit=5) == sorted({
+        user_id for user_id, _, progress, status in rows if progress >= 80 and status != 'Completed'})[:5]
+
+
+def test_writes_reload_the_cache_after_the_interval(db_path, service, user_id):
+    cache = EnrollmentCache(db_path, min_reload_interval=0)
+    assert cache.course_stats(PAID_COURSE).enrolled == 0
+    service.enroll_in_course(user_id, PAID_COURSE)
+    assert cache.course_stats(PAID_COURSE).enrolled == 1
+
+    # Within the interval the loaded arrays are served as they are
+    cache.min_reload_interval = 3600
+    service.enroll_in_course(user_id, OTHER_COURSE)
+    assert cache.course_stats(OTHER_COURSE).enrolled == 0
+    cache.reload()
+    assert cache.course_stats(OTHER_COURSE).enrolled == 1
+
+
+def test_shards_merge_into_one_sorted_table(tmp_path):
+    rows = random_enrollments(count=200, seed=11)
+    storage = ShardedStorage(str(tmp_path / 'common.db'), 3, fan_out_workers=1)
+    try:
+        storage.initialize()
+        for shard in range(storage.shard_count):
+            conn = storage.connect_shard(shard)
+            insert(conn, [row for row in rows if shard_index(row[0], storage.shard_count) == shard])
+            conn.close()
+        cache = EnrollmentCache(storage.common_path)
+        cache.storage = storage
+        cache.reload()
+        assert cache.enrollments == len(rows)
+        for course_id in (PAID_COURSE, OTHER_COURSE, 'ds001'):
+            assert observed(cache.course_stats(course_id)) == pytest.approx(expected_stats(rows, course_id), abs=0.01)
+            # Users come back in id order even though they were spread over the shards
+            assert cache.near_completion(course_id) == expected_near_completion(rows, course_id)
+    finally:
+        storage.close()
@@ -0,0 +1,100 @@
+from learn_and_earn import PlatformService, connect
+from learn_and_earn.events import ProgressMaterializer, list_events
+from learn_and_earn.sharding import ShardedStorage
+
+from .conftest import OTHER_COURSE, PAID_COURSE, QUIZ_COURSE
+
+
+def state(conn):
+    return (conn.execute('SELECT * FROM user_course_state ORDER BY user_id, course_id').fetchall(),
+            conn.execute('SELECT * FROM user_progress_summary ORDER BY user_id').fetchall())
+
+
+def activity(service, user_id):
+    service.enroll_in_course(user_id, QUIZ_COURSE)
+    service.enroll_in_course(user_id, PAID_COURSE)
+    service.submit_assignment(user_id, QUIZ_COURSE, 'mod003')
+    service.submit_assignment(user_id, QUIZ_COURSE, 'mod004')
+    service.register_for_exam(user_id, QUIZ_COURSE)
+    service.update_course_progress(user_id, PAID_COURSE, 20)
+    service.apply_to_job(user_id, 'job_001')
+
+
+def test_writers_fold_their_own_events(service, user_id):
+    activity(service, user_id)
+    summary = service.get_progress_summary(user_id)
+    assert (summary.enrolled_courses, summary.in_progress_courses, summary.exam_registered_courses,
+            summary.assignments_submitted, summary.applications) == (2, 1, 1, 2, 1)
+    assert not ProgressMaterializer(service.conn).has_pending()
+
+
+def test_incremental_fold_matches_a_full_rebuild(service, user_id):
+    other = service.register_user('bob', 'bob@example.com', 'pw', 'SQL').user_id
+    activity(service, user_id)
+    service.enroll_in_course(other, OTHER_COURSE)
+    service.update_course_progress(other, OTHER_COURSE, 100)
+    incremental = state(service.conn)
+    assert ProgressMaterializer(service.conn, batch_size=2).rebuild() == len(list_events(service.conn, user_id)) \
+        + len(list_events(service.conn, other))
+    assert state(service.conn) == incremental
+
+
+def test_backfill_synthesizes_history_for_legacy_rows(service, user_id):
+    # Rows written before the event log existed, and a database that was never materialized
+    service.conn.executescript(f'''
+        INSERT INTO user_courses (user_id, course_id, completion_status, progress_percentage)
+        VALUES ({user_id}, '{PAID_COURSE}', 'Completed', 100), ({user_id}, '{OTHER_COURSE}', 'In Progress', 40);
+        INSERT INTO user_assignments (user_id, course_id, module_id) VALUES ({user_id}, '{OTHER_COURSE}', 'm1');
+        DELETE FROM materializer_state;
+    ''')
+    assert ProgressMaterializer(service.conn).catch_up() == 6
+    summary = service.get_progress_summary(user_id)
+    assert (summary.enrolled_courses, summary.completed_courses, summary.assignments_submitted) == (2, 1, 1)
+    # Backfill runs once; later writes are folded by their writer
+    service.enroll_in_course(user_id, QUIZ_COURSE)
+    assert service.get_progress_summary(user_id).enrolled_courses == 3
+    assert ProgressMaterializer(service.conn).catch_up() == 0
+
+
+def test_summary_reads_take_no_write_lock(db_path, service, user_id):
+    service.enroll_in_course(user_id, QUIZ_COURSE)
+    writer = connect(db_path)
+    writer.execute('BEGIN IMMEDIATE')
+    try:
+        service.conn.execute('PRAGMA busy_timeout = 0')
+        assert service.get_progress_summary(user_id).enrolled_courses == 1
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_rolled_back_events_are_not_folded(service, user_id):
+    try:
+        with service.transaction():
+            service.enroll_in_course(user_id, QUIZ_COURSE)
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    service.enroll_in_course(user_id, PAID_COURSE)
+    assert service.get_progress_summary(user_id).enrolled_courses == 1
+
+
+def test_shard_catch_up_leaves_the_common_file_unlocked(tmp_path):
+    storage = ShardedStorage(str(tmp_path / 'common.db'), 2, fan_out_workers=1)
+    try:
+        storage.initialize()
+        service = PlatformService(storage.connect_shard(0))
+        service.conn.execute("INSERT INTO events (user_id, event_type, subject_id) VALUES (2, 'enrolled', 'x')")
+        service.conn.commit()
+
+        common_writer = connect(storage.common_path)
+        common_writer.execute('BEGIN IMMEDIATE')
+        try:
+            service.conn.execute('PRAGMA busy_timeout = 0')
+            assert service.progress_view.catch_up() == 1
+        finally:
+            common_writer.rollback()
+            common_writer.close()
+        service.conn.close()
+    finally:
+        storage.close()
@@ -0,0 +1,80 @@
+import numpy as np
+
+from learn_and_earn import PlatformService, connect
+from learn_and_earn.grading import AnswerKey, GradingEngine, score_sheets
+from learn_and_earn.quizzes import BLANK
+
+from .conftest import QUIZ_COURSE
+
+
+def earnings(service, user_id):
+    return service.conn.execute('SELECT total_earnings FROM users WHERE id = ?', (user_id,)).fetchone()[0]
+
+
+def badges(service, user_id):
+    return service.conn.execute("SELECT COUNT(*) FROM user_skills WHERE user_id = ? AND skill_name LIKE '% Badge for %'",
+                                (user_id,)).fetchone()[0]
+
+
+def test_score_sheets_weights_and_blanks():
+    key = AnswerKey('c', np.array([0, 1, 2], dtype=np.uint8), np.array([3, 3, 3], dtype=np.uint8),
+                    np.array([1.0, 1.0, 2.0]))
+    sheets = np.array([[0, 1, 2], [0, 1, BLANK], [2, 2, 2]], dtype=np.uint8)
+    assert score_sheets(key, sheets).tolist() == [100.0, 50.0, 50.0]
+
+
+def test_zero_weight_key_scores_zero():
+    key = AnswerKey('c', np.array([0, 1], dtype=np.uint8), np.array([2, 2], dtype=np.uint8), np.zeros(2))
+    scores = score_sheets(key, np.array([[0, 1]], dtype=np.uint8))
+    assert scores.tolist() == [0.0]
+
+
+def test_perfect_sheet_earns_gold_once(service, user_id):
+    key = service.grading.answer_key(QUIZ_COURSE)
+    assert service.grading.submit(user_id, QUIZ_COURSE, key.answers.tolist())
+    assert service.grading.grade(user_id, QUIZ_COURSE) == (100.0, 'Gold')
+    assert service.grading.grade(user_id, QUIZ_COURSE) == (100.0, 'Gold')
+    assert (badges(service, user_id), earnings(service, user_id)) == (1, 500)
+    # Graded sheets are final
+    assert not service.grading.submit(user_id, QUIZ_COURSE, [BLANK] * key.questions)
+
+
+def test_record_only_grades_ungraded_sheets(service, user_id):
+    service.grading.submit(user_id, QUIZ_COURSE, [0])
+    submission_id = service.grading._submission(user_id, QUIZ_COURSE)[0]
+    assert service.grading._record([(80.0, 'Silver', submission_id)]) == [submission_id]
+    assert service.grading._record([(10.0, 'Bronze', submission_id)]) == []
+    assert service.grading._submission(user_id, QUIZ_COURSE)[2:] == (80.0, 'Silver')
+
+
+def test_grade_pending_skips_sheets_already_graded(db_path, service, user_id):
+    other = service.register_user('bob', 'bob@example.com', 'pw', 'SQL').user_id
+    key = service.grading.answer_key(QUIZ_COURSE)
+    service.grading.submit(user_id, QUIZ_COURSE, key.answers.tolist())
+    service.grading.submit(other, QUIZ_COURSE, [BLANK] * key.questions)
+    service.conn.commit()
+
+    # A second grader (its own connection) closes the window first
+    rival = GradingEngine(PlatformService(connect(db_path)))
+    assert rival.grade_pending(QUIZ_COURSE).graded == 2
+    assert service.grading.grade_pending(QUIZ_COURSE).graded == 0
+    assert (earnings(service, user_id), earnings(service, other)) == (500, 100)
+    rival.service.conn.close()
+
+
+def test_simulated_sheets_are_reproducible(service, user_id):
+    first = GradingEngine(service, seed=7)
+    sheet = first.simulate_sheet(first.answer_key(QUIZ_COURSE), user_id)
+    again = GradingEngine(service, seed=7).simulate_sheet(first.answer_key(QUIZ_COURSE), user_id)
+    assert sheet.tobytes() == again.tobytes()
+    assert first.grade(user_id, QUIZ_COURSE) is not None
+    assert GradingEngine(service, seed=None).grade(999, QUIZ_COURSE) is None
+
+
+def test_badge_check_matches_the_exact_course_id(service, user_id):
+    # _ and % are LIKE wildcards and LIKE ignores case: a badge for 'aix01' must not count for 'ai_01'
+    assert service.award_missing_badge(user_id, 'aix01', 'Silver') == 300
+    assert service.award_missing_badge(user_id, 'ai_01', 'Gold') == 500
+    assert service.award_missing_badge(user_id, 'AI_01', 'Bronze') == 100
+    assert service.award_missing_badge(user_id, 'ai_01', 'Bronze') == 0
+    assert (badges(service, user_id), earnings(service, user_id)) == (3, 900)
@@ -0,0 +1,57 @@
+import pytest
+
+from learn_and_earn.ingest import ingest_jobs
+
+POSTING = {
+    'title': 'ML Engineer',
+    'company': 'Acme',
+    'description': 'Build models',
+    'required_skills': 'Python, ML',
+    'salary_range': '$100k',
+    'location': 'Remote',
+    'remote': 'yes',
+}
+
+
+@pytest.fixture
+def conn(service):
+    return service.conn
+
+
+def job_count(conn):
+    return conn.execute('SELECT COUNT(*) FROM job_opportunities').fetchone()[0]
+
+
+def test_reingesting_a_feed_adds_nothing(conn):
+    before = job_count(conn)
+    first = ingest_jobs(conn, [POSTING, {**POSTING, 'title': 'Data Engineer'}])
+    second = ingest_jobs(conn, [POSTING, {**POSTING, 'title': 'Data Engineer'}])
+    assert (first.upserted, first.duplicates) == (2, 0)
+    assert (second.upserted, second.duplicates) == (0, 2)
+    assert job_count(conn) == before + 2
+
+
+def test_synonyms_and_spelling_do_not_defeat_dedup(conn):
+    ingest_jobs(conn, [POSTING])
+    respelled = {**POSTING, 'required_skills': ['machine learning', 'python'], 'company': '  ACME '}
+    stats = ingest_jobs(conn, [respelled])
+    assert (stats.upserted, stats.duplicates) == (0, 1)
+
+
+def test_duplicates_within_one_chunk(conn):
+    stats = ingest_jobs(conn, [POSTING, dict(POSTING), {**POSTING, 'id': 'job-1'}])
+    assert (stats.upserted, stats.duplicates) == (1, 2)
+
+
+def test_invalid_records_are_counted(conn):
+    stats = ingest_jobs(conn, [{'company': 'No title'}, None, POSTING])
+    assert (stats.read, stats.invalid, stats.upserted) == (3, 1 + 1, 1)
+
+
+def test_job_skills_carry_canonical_ids(conn, service):
+    ingest_jobs(conn, [{**POSTING, 'id': 'job-1'}])
+    rows = conn.execute('SELECT skill_name, skill_id FROM job_skills WHERE job_id = ? ORDER BY skill_name',
+                        ('job-1',)).fetchall()
+    assert [name for name, _ in rows] == ['Machine Learning', 'Python']
+    assert all(skill_id > 0 for _, skill_id in rows)
+    assert service.skills.resolve('ml') == dict(rows)['Machine Learning']
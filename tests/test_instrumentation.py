@@ -0,0 +1,88 @@
+import json
+import sqlite3
+
+import pytest
+
+from learn_and_earn import connect, instrumentation
+from learn_and_earn.instrumentation import InstrumentedConnection, QueryRecorder, fingerprint, percentile
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    recorder = QueryRecorder(slow_query_ms=1000)
+    monkeypatch.setattr(instrumentation, 'recorder', recorder)
+    monkeypatch.setenv('LEARN_AND_EARN_QUERY_STATS', '1')
+    return recorder
+
+
+def stats_for(recorder, sql):
+    return next(item for item in recorder.snapshot()['statements'] if item['fingerprint'] == fingerprint(sql))
+
+
+def test_fingerprints_collapse_literals_and_parameter_lists():
+    assert fingerprint("SELECT *\n  FROM users WHERE id = 42 AND name = 'it''s'") == \
+        "SELECT * FROM users WHERE id = ? AND name = ?"
+    assert fingerprint("SELECT 1 FROM t WHERE id IN (?, ?, ?)") == fingerprint("SELECT 2 FROM t WHERE id IN (?,?)")
+    assert percentile([5, 1, 3, 2, 4], 0.99) == 5 and percentile([], 0.99) == 0.0
+
+
+def test_plain_connections_unless_enabled(db_path, monkeypatch):
+    conn = connect(db_path)
+    assert type(conn) is sqlite3.Connection
+    conn.close()
+    monkeypatch.setenv('LEARN_AND_EARN_QUERY_STATS', '1')
+    conn = connect(db_path)
+    assert isinstance(conn, InstrumentedConnection)
+    conn.close()
+
+
+def test_statements_are_counted_with_their_rows(db_path, recorder):
+    conn = connect(db_path)
+    try:
+        query = 'SELECT id FROM courses WHERE price > ?'
+        expected = len(conn.execute(query, (0,)).fetchall())
+        assert sum(1 for _ in conn.execute(query, (0,))) == expected
+        cursor = conn.cursor()
+        cursor.execute(query, (0,))
+        cursor.fetchmany(2)
+        cursor.close()  # abandoned half-way: counts what was read
+        with conn:
+            conn.execute("UPDATE courses SET price = price WHERE price > 0")
+            conn.executemany('UPDATE courses SET price = price WHERE id = ?', [('fin001',), ('cyber001',)])
+    finally:
+        conn.close()
+
+    select = stats_for(recorder, query)
+    assert (select['calls'], select['rows']) == (3, 2 * expected + 2)
+    assert stats_for(recorder, "UPDATE courses SET price = price WHERE price > 0")['rows'] == expected
+    assert stats_for(recorder, 'UPDATE courses SET price = price WHERE id = ?')['calls'] == 1
+    order = [item['calls'] for item in recorder.snapshot(order_by='calls')['statements']]
+    assert order == sorted(order, reverse=True)
+
+
+def test_slow_statements_are_logged_with_their_plan_once(db_path, recorder):
+    recorder.slow_query_ms = 0
+    conn = connect(db_path)
+    try:
+        for course_id in ('fin001', 'cyber001'):
+            conn.execute('SELECT title FROM courses WHERE id = ?', (course_id,)).fetchone()
+        conn.execute('PRAGMA user_version').fetchone()
+    finally:
+        conn.close()
+
+    stats = stats_for(recorder, 'SELECT title FROM courses WHERE id = ?')
+    assert stats['plan'] and any('courses' in step for step in stats['plan'])
+    slow = [entry for entry in recorder.snapshot()['slow_log'] if entry['fingerprint'] == stats['fingerprint']]
+    assert len(slow) == 2 and slow[0]['plan'] == stats['plan']
+    # Only statements EXPLAIN accepts get a plan; the EXPLAIN itself is not recorded
+    assert stats_for(recorder, 'PRAGMA user_version')['plan'] is None
+    assert not any(item['fingerprint'].startswith('EXPLAIN') for item in recorder.snapshot()['statements'])
+
+
+def test_dump_and_reset(tmp_path, recorder):
+    recorder.record('SELECT 1', 2.5, 1)
+    path = tmp_path / 'stats.json'
+    recorder.dump(str(path))
+    assert json.loads(path.read_text())['statements'][0]['calls'] == 1
+    recorder.reset()
+    assert recorder.snapshot()['statements'] == []
@@ -0,0 +1,58 @@
+import pytest
+
+from learn_and_earn import ALREADY_EXISTS, NOT_FOUND, OK
+from learn_and_earn.ledger import ENROLLMENT, GRANT, OPENING, CreditLedger, InsufficientCredits, credits_for_price
+
+
+def test_first_posting_opens_from_cached_balance(service, user_id):
+    with service.write_transaction():
+        transaction = service.ledger.post(user_id, -12.5, ENROLLMENT, 'x')
+    assert transaction.balance_after == 87.5
+    kinds = [t.kind for t in service.list_credit_transactions(user_id)]
+    assert kinds == [ENROLLMENT, OPENING]
+    assert service.ledger.balance(user_id) == 87.5
+    assert service.get_user_metrics(user_id).learning_credits == 87.5
+
+
+def test_overdraft_raises_and_posts_nothing(service, user_id):
+    with pytest.raises(InsufficientCredits) as error:
+        with service.write_transaction():
+            service.ledger.post(user_id, -100.01, ENROLLMENT, 'x')
+    assert error.value.balance == 100.0
+    assert service.list_credit_transactions(user_id) == []
+    assert service.ledger.balance(user_id) == 100.0
+
+
+def test_unknown_user_posts_nothing(service):
+    with service.write_transaction():
+        assert service.ledger.post(999, 10, GRANT) is None
+    assert service.grant_credits(999, 10).outcome == NOT_FOUND
+
+
+def test_grant_replay_is_a_no_op(service, user_id):
+    first = service.grant_credits(user_id, 25, idempotency_key='topup-1')
+    again = service.grant_credits(user_id, 25, idempotency_key='topup-1')
+    assert (first.outcome, again.outcome) == (OK, ALREADY_EXISTS)
+    assert again.transaction_id == first.transaction_id
+    assert service.ledger.balance(user_id) == 125.0
+
+
+def test_idempotency_keys_are_scoped_by_kind(service, user_id):
+    service.grant_credits(user_id, 25, idempotency_key='k')
+    assert service.ledger.find(user_id, ENROLLMENT, 'k') is None
+    found = service.ledger.find(user_id, GRANT, 'k')
+    assert found.idempotency_key == 'k'
+
+
+def test_amounts_are_rounded_to_cents():
+    assert credits_for_price(199.99) == 20.0
+    assert credits_for_price(None) == 0
+
+
+def test_verify_finds_and_repairs_drifted_cache(service, user_id):
+    service.grant_credits(user_id, 10)
+    service.conn.execute('UPDATE users SET learning_credits = 1 WHERE id = ?', (user_id,))
+    ledger = CreditLedger(service.conn)
+    assert ledger.mismatches() == [(user_id, 1.0, 110.0)]
+    assert ledger.repair() == 1
+    assert ledger.mismatches() == []
@@ -0,0 +1,52 @@
+import pytest
+
+from learn_and_earn.loadtest import RERUN, LoadTest, Recorder, main, percentile, run_load_test
+
+# Page views in one pass through the flow; login comes once, before the first pass
+VIEWS_PER_PASS = 7
+
+
+def test_percentiles_and_locked_errors_are_counted_per_page():
+    assert percentile([], 0.95) == 0.0
+    assert percentile(list(range(1, 101)), 0.5) == 50
+    assert percentile(list(range(1, 101)), 0.95) == 95
+    assert percentile(list(range(1, 101)), 0.99) == 99
+    assert percentile([7], 0.99) == 7
+    recorder = Recorder()
+    recorder.record('Enroll', 5.0, "OperationalError: database is locked")
+    recorder.record('Enroll', 1.0, "Insufficient credits")
+    recorder.record('Enroll', 2.0)
+    recorder.record(RERUN, 1.0)
+    report = recorder.report(sessions=1, elapsed_seconds=2.0)
+    assert (report.page_views, report.errors, report.locked) == (3, 2, 1)
+    assert report.page('Enroll').max_ms == 5.0 and report.throughput == 1.5
+    assert len(report.error_samples) == 2
+
+
+@pytest.mark.parametrize('shard_count', [1, 2])
+def test_sessions_walk_the_flow_without_errors(db_path, shard_count):
+    report = run_load_test(db_path, sessions=4, iterations=2, shard_count=shard_count)
+    assert report.page_views == 4 * (1 + 2 * VIEWS_PER_PASS)
+    assert (report.errors, report.locked) == (0, 0), report.error_samples
+    assert report.page('Dashboard').count == 4 * 2 * 2
+    assert 'pages/s' in report.lines()[0]
+
+
+def test_sessions_reuse_one_connection_like_the_app(db_path, monkeypatch):
+    load_test = LoadTest(db_path, shard_count=2)
+    opened = []
+    open_connection = load_test.open_connection
+    monkeypatch.setattr(load_test, 'open_connection', lambda shard: opened.append(shard) or open_connection(shard))
+    try:
+        load_test.run(sessions=3, iterations=2)
+    finally:
+        load_test.close()
+    # Shard 0 for the login page, then at most one reconnect to the user's own shard
+    assert 3 <= len(opened) <= 6
+
+
+def test_thresholds_fail_the_command(db_path, capsys):
+    main(['--db', db_path, '--sessions', '2', '--max-locked', '0'])
+    assert "0 'database is locked'" in capsys.readouterr().out
+    with pytest.raises(SystemExit, match='exceeds 0 ms'):
+        main(['--db', db_path, '--sessions', '2', '--max-p95-ms', '0'])
@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from learn_and_earn import connect
+from learn_and_earn.maintenance import MaintenanceScheduler, database_stats, full_vacuum, run_maintenance
+
+
+@pytest.fixture(autouse=True)
+def no_archiving(monkeypatch):
+    monkeypatch.setenv('LEARN_AND_EARN_ARCHIVE_DAYS', '0')
+
+
+def pragma(conn, name):
+    return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+def fill_and_drop(path, rows=2000):
+    # Leaves free pages behind, and a WAL full of frames
+    conn = connect(path)
+    with conn:
+        conn.execute('CREATE TABLE scratch (payload TEXT)')
+        conn.executemany('INSERT INTO scratch VALUES (?)', [('x' * 500,)] * rows)
+    with conn:
+        conn.execute('DROP TABLE scratch')
+    conn.close()
+
+
+def task_names(report):
+    return [task for task, _, _ in report.tasks]
+
+
+def test_connections_use_the_tuned_profile(db_path, tmp_path):
+    conn = connect(db_path)
+    assert (pragma(conn, 'journal_mode'), pragma(conn, 'synchronous'), pragma(conn, 'auto_vacuum')) == ('wal', 1, 2)
+    conn.close()
+    legacy = connect(str(tmp_path / 'legacy.db'), 'legacy')
+    assert (pragma(legacy, 'journal_mode'), pragma(legacy, 'auto_vacuum')) == ('delete', 0)
+    legacy.close()
+
+
+def test_first_pass_analyzes_and_later_passes_optimize(db_path):
+    first = run_maintenance(db_path)
+    assert first.before.analyzed_tables == 0 and first.after.analyzed_tables > 0
+    assert dict((task, detail) for task, _, detail in first.tasks)['analyze'] == 'full ANALYZE'
+    second = run_maintenance(db_path)
+    assert dict((task, detail) for task, _, detail in second.tasks)['analyze'] == 'PRAGMA optimize'
+    assert any('analyzed tables' in line for line in second.lines())
+
+
+def test_pass_reclaims_free_pages_and_truncates_the_wal(db_path):
+    fill_and_drop(db_path)
+    report = run_maintenance(db_path, vacuum_pages=100_000)
+    assert report.before.freelist_count > 0 and report.after.freelist_count == 0
+    assert report.after.file_bytes < report.before.file_bytes
+    assert report.before.wal_bytes > 0 and report.after.wal_bytes == 0
+    assert task_names(report) == ['analyze', 'incremental_vacuum', 'wal_checkpoint']
+
+
+def test_pass_folds_events_written_outside_the_services(service, db_path, user_id):
+    service.conn.execute("INSERT INTO events (user_id, event_type, subject_id) VALUES (?, 'applied', 'job001')",
+                         (user_id,))
+    service.conn.commit()
+    report = run_maintenance(db_path)
+    assert task_names(report)[0] == 'events'
+    assert service.get_progress_summary(user_id).applications == 1
+    assert 'events' not in task_names(run_maintenance(db_path))
+
+
+def test_full_vacuum_converts_a_legacy_file(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    conn = connect(path, 'legacy')
+    with conn:
+        # A non-empty file keeps its auto_vacuum mode whatever the next connection asks for
+        conn.execute('CREATE TABLE keep (id INTEGER)')
+    conn.close()
+    fill_and_drop(path)
+    conn = connect(path, 'legacy')
+    assert database_stats(conn, path).auto_vacuum == 'none'
+    conn.close()
+
+    report = full_vacuum(path)
+    assert (report.before.auto_vacuum, report.after.auto_vacuum) == ('none', 'incremental')
+    assert report.after.freelist_count == 0
+
+
+def test_scheduler_waits_for_idle_files(db_path):
+    scheduler = MaintenanceScheduler([db_path], idle_seconds=3600, interval=0)
+    try:
+        scheduler._poll()
+        assert not scheduler.idle()
+        scheduler.idle_seconds = 0
+        assert scheduler.idle()
+        reports = scheduler.run_once()
+        assert [report.before.path for report in reports] == [db_path] and not scheduler.errors
+    finally:
+        scheduler.stop()
+    assert not os.path.exists(f"{db_path}-wal") or os.path.getsize(f"{db_path}-wal") == 0
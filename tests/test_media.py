@@ -0,0 +1,89 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from learn_and_earn import connect, media
+from learn_and_earn.media import COURSE, PROFILE, VARIANTS, MediaStore, UploadError
+from learn_and_earn.services import ERROR, NOT_FOUND, OK
+
+from .conftest import QUIZ_COURSE
+from .test_api import exchange, request, statuses
+
+
+@pytest.fixture(autouse=True)
+def media_next_to_db(monkeypatch):
+    monkeypatch.setattr(media, 'MEDIA_ROOT', None)
+
+
+def png(width=640, height=480, color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    buffer.seek(0)
+    return buffer
+
+
+def test_media_lives_next_to_the_database(service, db_path):
+    assert service.media.root == os.path.join(os.path.dirname(db_path), 'media')
+
+
+def test_upload_renders_every_variant_once(service, user_id):
+    assert service.set_profile_image(user_id, png()).outcome == OK
+    for variant, (size, _) in VARIANTS.items():
+        stored = service.media.variant(PROFILE, user_id, variant)
+        assert max(stored.width, stored.height) <= size
+        assert os.path.exists(service.media.path_for(stored.digest, stored.content_type))
+    small = service.get_profile_image(user_id, 'small')
+    assert Image.open(io.BytesIO(small)).format == 'WEBP'
+
+
+def test_same_picture_is_stored_once(service, user_id):
+    first = service.media.ingest(png())
+    second = service.media.ingest(png())
+    assert second.reused and second.source_digest == first.source_digest
+    rows = service.conn.execute('SELECT COUNT(*) FROM media_variants').fetchone()[0]
+    assert rows == len(VARIANTS)
+
+
+def test_invalid_upload_is_rejected(service, user_id):
+    with pytest.raises(UploadError):
+        service.media.ingest(io.BytesIO(b'not an image'))
+    result = service.set_profile_image(user_id, io.BytesIO(b'not an image'))
+    assert result.outcome == ERROR
+    assert service.get_profile_image(user_id) is None
+
+
+def test_course_artwork_is_kept_apart_from_profiles(service, user_id):
+    assert service.set_course_image(QUIZ_COURSE, png(color=(0, 0, 255))).outcome == OK
+    assert service.get_course_image(QUIZ_COURSE, 'thumb') is not None
+    # Same owner id under the other owner type has no image
+    assert service.media.variant(PROFILE, QUIZ_COURSE) is None
+    assert service.get_course_image('nope001') is None
+    assert service.set_course_image('nope001', png()).outcome == NOT_FOUND
+
+
+def test_api_serves_course_images(db_path, service):
+    service.set_course_image(QUIZ_COURSE, png())
+    responses = exchange(db_path, [
+        request('GET', f'/courses/{QUIZ_COURSE}/image?variant=thumb'),
+        request('GET', '/courses/fin001/image'),
+        request('GET', f'/courses/{QUIZ_COURSE}/image?variant=huge'),
+    ])
+    assert statuses(responses) == [200, 404, 400]
+    status, headers, body = responses[0]
+    assert headers['content-type'] == 'image/webp'
+    assert body == service.get_course_image(QUIZ_COURSE, 'thumb')
+
+
+def test_cli_attaches_course_artwork(db_path, tmp_path):
+    image_path = tmp_path / 'artwork.png'
+    image_path.write_bytes(png().getvalue())
+    media.main(['course', QUIZ_COURSE, str(image_path), '--db', db_path])
+    conn = connect(db_path)
+    try:
+        assert MediaStore(conn).read_variant(COURSE, QUIZ_COURSE, 'large') is not None
+    finally:
+        conn.close()
+    with pytest.raises(SystemExit):
+        media.main(['course', QUIZ_COURSE, '--db', db_path])
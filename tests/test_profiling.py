@@ -0,0 +1,94 @@
+import json
+import pstats
+
+import pytest
+
+from learn_and_earn import profiling
+from learn_and_earn.profiling import BUCKETS_MS, Histogram, RenderProfiler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms / 1000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(profiling.time, 'perf_counter', clock)
+    return clock
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram()
+    for elapsed_ms in (0.5, 3, 3, 4, 40, 9000):
+        histogram.add(elapsed_ms)
+    stats = histogram.as_dict()
+    assert stats['count'] == 6 and stats['max_ms'] == 9000
+    assert stats['buckets'] == {'<1 ms': 1, '2-5 ms': 3, '20-50 ms': 1, f'>={BUCKETS_MS[-1]} ms': 1}
+    # Quantiles report the upper bound of their bucket, and the max in the open-ended one
+    assert (stats['p50_ms'], stats['p95_ms']) == (5, 9000)
+    assert Histogram().as_dict()['p95_ms'] == 0.0
+
+
+def test_phases_split_the_render_and_the_rest_is_widgets(clock):
+    profiler = RenderProfiler(sample_rate=0, enabled=True)
+    with profiler.page('dashboard'):
+        with profiler.phase('data'):
+            clock.advance(30)
+            # Nested phases and pages are booked to the outer one
+            with profiler.phase('figure'), profiler.page('inner'):
+                clock.advance(10)
+        with profiler.phase('figure'):
+            clock.advance(5)
+        clock.advance(15)
+
+    page = profiler.snapshot()['pages']['dashboard']
+    assert list(profiler.snapshot()['pages']) == ['dashboard']
+    assert page['total']['mean_ms'] == pytest.approx(60)
+    assert {phase: stats['mean_ms'] for phase, stats in page['phases'].items()} == pytest.approx(
+        {'data': 40, 'dataframe': 0, 'figure': 5, 'widgets': 15})
+    assert page['profiled_renders'] == 0
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = RenderProfiler(sample_rate=1, enabled=False)
+    with profiler.page('dashboard'), profiler.phase('data'):
+        pass
+    assert profiler.snapshot()['pages'] == {}
+    assert profiler.top_functions('dashboard') == ''
+
+
+def test_sampled_renders_aggregate_cprofile_stats(tmp_path):
+    profiler = RenderProfiler(sample_rate=1, enabled=True)
+    for _ in range(2):
+        with profiler.page('leaderboard'):
+            sorted(range(1000), key=lambda n: -n)
+    with profiler.page('profile'):
+        pass
+
+    snapshot = json.loads(profiler.to_json())
+    assert snapshot['pages']['leaderboard']['profiled_renders'] == 2
+    assert 'function calls' in profiler.top_functions('leaderboard')
+    path = tmp_path / 'leaderboard.prof'
+    assert profiler.dump_profile('leaderboard', str(path))
+    assert pstats.Stats(str(path)).total_calls > 0
+    assert not profiler.dump_profile('missing', str(path))
+
+    profiler.reset()
+    assert profiler.snapshot()['pages'] == {}
+
+
+def test_sample_rate_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv('LEARN_AND_EARN_PROFILE_SAMPLE', '0.5')
+    assert profiling.sample_rate() == 0.5
+    monkeypatch.setenv('LEARN_AND_EARN_PROFILE_SAMPLE', '7')
+    assert profiling.sample_rate() == 1.0
+    monkeypatch.setenv('LEARN_AND_EARN_PROFILE_SAMPLE', 'often')
+    assert profiling.sample_rate() == 0.05
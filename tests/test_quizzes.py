@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from learn_and_earn.quizzes import BLANK, Question, encode_answers, encode_quiz, parse_quiz, quiz_cache, save_quiz
+from learn_and_earn.services import NOT_FOUND, OK
+
+from .conftest import QUIZ_COURSE
+
+QUESTIONS = [
+    Question("2 + 2?", ('3', '4'), 1),
+    Question("Capital of France?", ('Paris', 'Rome', 'Oslo'), 0, points=2),
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_quiz_cache():
+    # The cache is process-wide and keyed by module id, which every test database shares
+    quiz_cache.invalidate()
+    yield
+    quiz_cache.invalidate()
+
+
+def test_compact_and_verbose_forms_parse_alike():
+    compact = parse_quiz('m', encode_quiz(QUESTIONS))
+    verbose = parse_quiz('m', json.dumps({'questions': [
+        {'prompt': q.prompt, 'options': list(q.options), 'answer': q.answer, 'points': q.points}
+        for q in QUESTIONS
+    ]}))
+    assert compact == verbose
+    assert compact.answer_key == bytes([1, 0]) and compact.total_points == 3
+    # Default points are left out of the stored form
+    assert json.loads(encode_quiz(QUESTIONS))['q'][0] == ["2 + 2?", ['3', '4'], 1]
+
+
+def test_answer_sheets_mark_blanks_and_short_sheets_wrong():
+    quiz = parse_quiz('m', encode_quiz(QUESTIONS))
+    assert encode_answers([1, None, -1, 999]) == bytes([1, BLANK, BLANK, BLANK])
+    assert quiz.check(encode_answers([1, 0])) == ((True, True), 3)
+    assert quiz.check(encode_answers([1])) == ((True, False), 1)
+    assert quiz.check(encode_answers([None, 0])) == ((False, True), 2)
+
+
+def test_quizzes_are_parsed_once_per_process(service):
+    first = service.list_course_quizzes(QUIZ_COURSE)
+    assert first
+    again = service.list_course_quizzes(QUIZ_COURSE)
+    assert all(again[module_id] is quiz for module_id, quiz in first.items())
+
+
+def test_saving_a_quiz_invalidates_the_cache(service):
+    module_id = next(iter(service.list_course_quizzes(QUIZ_COURSE)))
+    assert save_quiz(service.conn, module_id, QUESTIONS)
+    service.conn.commit()
+    assert service.list_course_quizzes(QUIZ_COURSE)[module_id].questions == tuple(QUESTIONS)
+    assert not save_quiz(service.conn, 'no-such-module', QUESTIONS)
+
+
+def test_attempts_are_scored_by_points_and_recorded(service, user_id):
+    module_id = next(iter(service.list_course_quizzes(QUIZ_COURSE)))
+    save_quiz(service.conn, module_id, QUESTIONS)
+    service.conn.commit()
+
+    result = service.submit_quiz(user_id, QUIZ_COURSE, module_id, [0, 0])
+    assert result.outcome == OK
+    assert (result.correct, result.total, result.score) == (1, 2, 66.7)
+    assert result.question_results == (False, True)
+    service.submit_quiz(user_id, QUIZ_COURSE, module_id, [1, 0])
+
+    attempts = service.list_quiz_attempts(user_id, module_id)
+    assert [attempt.score for attempt in attempts] == [100.0, 66.7]
+    assert service.list_quiz_attempts(user_id, module_id, limit=1)[0].correct == 2
+    assert service.submit_quiz(user_id, QUIZ_COURSE, 'no-such-module', [0]).outcome == NOT_FOUND
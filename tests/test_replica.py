@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from learn_and_earn import PlatformService, connect
+from learn_and_earn.replica import SnapshotReplica
+
+
+@pytest.fixture
+def replica(db_path):
+    # No staleness trigger: refreshes happen only when a test asks for them
+    replica = SnapshotReplica(db_path, max_staleness=None, refresh_after_writes=2)
+    yield replica
+    replica.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def usernames(conn):
+    return [row[0] for row in conn.execute('SELECT username FROM users ORDER BY id')]
+
+
+def test_snapshot_is_read_only_and_lags_the_primary(db_path, replica, service, user_id):
+    snapshot = replica.connection()
+    assert replica.generation == 1 and usernames(snapshot) == ['ada']
+    with pytest.raises(sqlite3.OperationalError):
+        snapshot.execute("UPDATE users SET username = 'eve'")
+
+    service.register_user('bob', 'bob@example.com', 'secret', 'SQL')
+    assert usernames(replica.connection()) == ['ada']
+    replica.refresh()
+    assert usernames(replica.connection()) == ['ada', 'bob']
+
+
+def test_writes_trigger_a_background_refresh(replica):
+    replica.connection()
+    replica.note_write()
+    assert replica.refreshes == 1
+    replica.note_write()
+    wait_for(lambda: replica.refreshes == 2)
+
+
+def test_old_generations_are_deleted_when_their_last_reader_moves_on(replica):
+    replica.connection()
+    first = replica.generation_path(1)
+    # Another thread still reads generation 1 while this one moves to generation 2
+    other_ready, other_done = threading.Event(), threading.Event()
+
+    def other_reader():
+        replica.connection()
+        other_ready.set()
+        other_done.wait(5)
+        replica.connection()
+
+    thread = threading.Thread(target=other_reader)
+    thread.start()
+    other_ready.wait(5)
+    replica.refresh()
+    replica.connection()
+    assert os.path.exists(first)
+    other_done.set()
+    thread.join()
+    assert not os.path.exists(first)
+
+    replica.close()
+    assert not os.path.exists(replica.generation_path(2))
+
+
+def test_leftover_generations_are_removed_on_start(db_path, replica):
+    replica.connection()
+    leftover = replica.generation_path(1)
+    assert os.path.exists(leftover)
+    SnapshotReplica(db_path, max_staleness=None)
+    assert not os.path.exists(leftover)
+
+
+def test_service_reads_own_writes_inside_transactions(db_path, replica, user_id):
+    service = PlatformService(connect(db_path), replica=replica)
+    try:
+        assert service.get_user_metrics(user_id) is not None
+        assert replica.refreshes == 1
+        with service.transaction():
+            service.conn.execute('UPDATE users SET skill_points = 7 WHERE id = ?', (user_id,))
+            assert service.get_user_metrics(user_id).skill_points == 7
+        # Outside the transaction the dashboard reads the (older) snapshot
+        assert service.get_user_metrics(user_id).skill_points == 0
+    finally:
+        service.conn.close()
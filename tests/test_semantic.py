@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pytest
+
+from learn_and_earn import semantic
+from learn_and_earn.semantic import TextEncoder, VectorIndex, shared_job_index
+from learn_and_earn.skills import SkillVocabulary
+
+ITEMS = [
+    ('ml', "Machine Learning Engineer. Python, Machine Learning, model training"),
+    ('web', "Frontend Developer. JavaScript, React, CSS"),
+    ('mkt', "Digital Marketing Specialist. SEO, Social Media Marketing"),
+    ('data', "Data Analyst. SQL, dashboards, reporting"),
+]
+
+
+@pytest.fixture(autouse=True)
+def index_next_to_db(monkeypatch):
+    monkeypatch.setattr(semantic, 'INDEX_DIR', None)
+    monkeypatch.setattr(semantic, '_job_indexes', {})
+
+
+def top_ids(index, text, k=2):
+    return [match.item_id for match in index.search(text, k)]
+
+
+def test_skill_aliases_share_a_feature(service):
+    encoder = TextEncoder(SkillVocabulary(service.conn))
+    ml, _ = encoder.features("ML")
+    machine_learning, _ = encoder.features("machine learning")
+    assert set(ml.tolist()) & set(machine_learning.tolist())
+    vector = encoder.encode("Machine Learning")
+    assert vector.dtype == np.float32 and np.linalg.norm(vector) == pytest.approx(1.0)
+    assert not encoder.encode("").any()
+
+
+def test_search_ranks_the_closest_item_first(service):
+    index = VectorIndex('test', vocabulary=SkillVocabulary(service.conn))
+    assert index.rebuild(ITEMS) == len(ITEMS)
+    assert top_ids(index, "ML engineering")[0] == 'ml'
+    assert top_ids(index, "react developer")[0] == 'web'
+    assert top_ids(index, "search engine optimization")[0] == 'mkt'
+    assert index.search("zzzz qqqq") == []
+
+
+def test_sync_re_embeds_only_what_changed():
+    corpus = [(f"{item_id}{n}", text) for n in range(3) for item_id, text in ITEMS]
+    index = VectorIndex('test')
+    index.rebuild(corpus)
+    documents = index.encoder.documents
+    untouched = np.array(index.vectors[index.positions['web0']])
+
+    # One edit and one removal: 2 of 12 rows, under REBUILD_FRACTION
+    edited = [(item_id, text) for item_id, text in corpus if item_id != 'data2']
+    edited[0] = ('ml0', "Pastry chef. Baking, desserts")
+    assert index.sync(edited) == 2
+    # Incremental: frequencies from the last full build, other rows untouched
+    assert index.encoder.documents == documents and index.changes_since_build == 2
+    assert np.array_equal(index.vectors[index.positions['web0']], untouched)
+    assert top_ids(index, "baking desserts", 1) == ['ml0']
+    assert 'data2' not in {match.item_id for match in index.search("SQL dashboards", 10)}
+    assert index.sync(edited) == 0
+
+    # Past REBUILD_FRACTION of the corpus the index is rebuilt from scratch
+    rewritten = [(item_id, text + " remote") for item_id, text in edited]
+    assert index.sync(rewritten) == len(rewritten)
+    assert index.changes_since_build == 0 and index.encoder.documents == len(rewritten)
+
+
+def test_persisted_index_reloads_with_the_same_results(tmp_path):
+    index = VectorIndex('test', root=str(tmp_path))
+    index.rebuild(ITEMS)
+    index.sync(ITEMS + [('ops', "Site Reliability Engineer. Kubernetes, AWS")])
+
+    reloaded = VectorIndex('test', root=str(tmp_path))
+    assert reloaded.load()
+    assert isinstance(reloaded.vectors, np.memmap)
+    assert reloaded.search("kubernetes on aws") == index.search("kubernetes on aws")
+    assert not VectorIndex('missing', root=str(tmp_path)).load()
+
+
+def test_job_index_lives_next_to_the_database_and_follows_postings(db_path, service):
+    index = shared_job_index(service.conn)
+    assert index.root == os.path.join(os.path.dirname(db_path), 'vector_index')
+    assert os.path.exists(os.path.join(index.root, f"{index.name}.json"))
+    assert shared_job_index(service.conn) is index
+
+    service.conn.execute('''
+        INSERT INTO job_opportunities (id, title, company, description, required_skills)
+        VALUES ('job_quant', 'Quantitative Researcher', 'Acme', 'Stochastic calculus and options pricing', 'Statistics')
+    ''')
+    service.conn.commit()
+    index.refresh(service.conn, force=True)
+    assert [job.id for job in service.search_jobs("options pricing quant", limit=1)] == ['job_quant']
+
+
+def test_course_matching_uses_course_text(service):
+    matches = service.match_courses("ML", limit=3)
+    assert matches and 'Machine Learning' in matches[0]['skills_gained'] + [matches[0]['name']]
@@ -0,0 +1,41 @@
+from learn_and_earn import ALREADY_EXISTS, NOT_ELIGIBLE, NOT_FOUND, OK
+
+from .conftest import QUIZ_COURSE
+
+
+def test_register_and_authenticate(service, user_id):
+    assert service.authenticate('ada', 'secret').id == user_id
+    assert service.authenticate('ada', 'wrong') is None
+    assert service.register_user('ada', 'other@example.com', 'pw', 'SQL').outcome == ALREADY_EXISTS
+    metrics = service.get_user_metrics(user_id)
+    assert (metrics.learning_credits, metrics.skill_points, metrics.completed_courses) == (100.0, 0, 0)
+
+
+def test_assignments_unlock_the_exam(service, user_id):
+    service.enroll_in_course(user_id, QUIZ_COURSE)
+    assert service.register_for_exam(user_id, QUIZ_COURSE).outcome == NOT_ELIGIBLE
+
+    first = service.submit_assignment(user_id, QUIZ_COURSE, 'mod003')
+    assert (first.outcome, first.remaining_modules, first.progress) == (OK, 1, None)
+    assert service.submit_assignment(user_id, QUIZ_COURSE, 'mod003').outcome == ALREADY_EXISTS
+    last = service.submit_assignment(user_id, QUIZ_COURSE, 'mod004')
+    assert (last.remaining_modules, last.progress.progress) == (0, 20)
+
+    assert service.register_for_exam(user_id, QUIZ_COURSE).outcome == OK
+    assert service.get_user_metrics(user_id).in_progress_courses == 0
+
+
+def test_progress_is_capped_and_completes_the_course(service, user_id):
+    assert service.update_course_progress(user_id, QUIZ_COURSE, 10).outcome == NOT_FOUND
+    service.enroll_in_course(user_id, QUIZ_COURSE)
+    service.update_course_progress(user_id, QUIZ_COURSE, 90)
+    result = service.update_course_progress(user_id, QUIZ_COURSE, 20)
+    assert (result.progress, result.status) == (100, 'Completed')
+    assert service.count_completed_courses(user_id) == 1
+
+
+def test_skills_merge_across_spellings(service, user_id):
+    service.update_user_skills(user_id, ['ML', 'Python'])
+    service.update_user_skills(user_id, ['machine learning'])
+    skills = {skill.skill_name: skill.experience_points for skill in service.get_user_skills(user_id)}
+    assert skills == {'Machine Learning': 20, 'Python': 10}
@@ -0,0 +1,126 @@
+import zlib
+
+import pytest
+
+from learn_and_earn import PlatformService, connect
+from learn_and_earn.sharding import SHARDED_TABLES, ShardedStorage, shard_index, shard_path_for
+
+from .conftest import OTHER_COURSE, PAID_COURSE
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = ShardedStorage(str(tmp_path / 'common.db'), 2, fan_out_workers=2)
+    assert storage.initialize() == []
+    yield storage
+    storage.close()
+
+
+def register_until_every_shard_has_a_user(service, shard_count):
+    # Ids come from the common users table; keep registering until each shard owns one
+    by_shard = {}
+    n = 0
+    while len(by_shard) < shard_count:
+        user_id = service.register_user(f'user{n}', f'user{n}@example.com', 'secret', 'Python').user_id
+        by_shard.setdefault(shard_index(user_id, shard_count), user_id)
+        n += 1
+    return by_shard
+
+
+def rows_for(conn, table, user_id):
+    return conn.execute(f'SELECT id FROM main.{table} WHERE user_id = ? ORDER BY id', (user_id,)).fetchall()
+
+
+def test_users_map_to_a_stable_shard():
+    assert shard_index(42, 4) == zlib.crc32(b'42') % 4
+    assert {shard_index(user_id, 4) for user_id in range(1, 101)} == {0, 1, 2, 3}
+    assert shard_path_for('/data/app.db', 3) == '/data/app.shard3.db'
+    storage = ShardedStorage('/data/app.db', 4)
+    try:
+        assert storage.shard_for(None) == 0
+        assert storage.shard_for('42') == storage.shard_for(42) == shard_index(42, 4)
+    finally:
+        storage.close()
+
+
+def test_user_rows_live_in_their_own_shard(storage):
+    anonymous = PlatformService(storage.connect_for_user(None))
+    users = register_until_every_shard_has_a_user(anonymous, storage.shard_count)
+    anonymous.conn.close()
+
+    services = {shard: PlatformService(storage.connect_shard(shard)) for shard in users}
+    try:
+        for shard, user_id in users.items():
+            assert services[shard].enroll_in_course(user_id, PAID_COURSE).ok
+            assert [course.course_id for course in services[shard].list_enrolled_courses(user_id)] == [PAID_COURSE]
+            assert services[shard].get_progress_summary(user_id).enrolled_courses == 1
+        # The enrollment, its ledger charge and its event never reach the other shard
+        for shard, user_id in users.items():
+            other = services[1 - shard]
+            for table in ('user_courses', 'events', 'credit_transactions'):
+                assert rows_for(other.conn, table, user_id) == []
+            assert other.list_enrolled_courses(user_id) == []
+    finally:
+        for service in services.values():
+            service.conn.close()
+
+
+def test_fan_out_merges_every_shard(storage):
+    service = PlatformService(storage.connect_for_user(None))
+    users = register_until_every_shard_has_a_user(service, storage.shard_count)
+    service.conn.close()
+    for shard, user_id in users.items():
+        conn = storage.connect_shard(shard)
+        with conn:
+            conn.execute("INSERT INTO user_courses (user_id, course_id, completion_status) VALUES (?, ?, 'Completed')",
+                         (user_id, PAID_COURSE))
+            if shard == 1:
+                conn.execute('INSERT INTO user_courses (user_id, course_id) VALUES (?, ?)', (user_id, OTHER_COURSE))
+        conn.close()
+
+    leaderboard = storage.completion_leaderboard(limit=10)
+    assert sorted(entry.user_id for entry in leaderboard) == sorted(users.values())
+    assert [entry.rank for entry in leaderboard] == [1, 2]
+    activity = {entry.course_id: entry for entry in storage.course_activity()}
+    assert (activity[PAID_COURSE].enrolled, activity[PAID_COURSE].completed) == (2, 2)
+    assert (activity[OTHER_COURSE].enrolled, activity[OTHER_COURSE].completed) == (1, 0)
+    totals, per_shard = storage.table_counts()
+    assert totals['user_courses'] == 3 and [counts['user_courses'] for counts in per_shard] == [1, 2]
+
+
+def test_migrate_moves_rows_with_their_ids(db_path, service):
+    users = register_until_every_shard_has_a_user(service, 2)
+    for user_id in users.values():
+        assert service.enroll_in_course(user_id, PAID_COURSE).ok
+        assert service.enroll_in_course(user_id, OTHER_COURSE).ok
+    before = {user_id: {table: rows_for(service.conn, table, user_id) for table in ('user_courses', 'events')}
+              for user_id in users.values()}
+    user_count = service.conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    storage = ShardedStorage(db_path, 2, fan_out_workers=1)
+    try:
+        moved = storage.migrate_from_common()
+        assert moved['user_courses'] == 4
+        for table in SHARDED_TABLES:
+            assert service.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] == 0
+
+        for shard, user_id in users.items():
+            shard_service = PlatformService(storage.connect_shard(shard))
+            try:
+                for table, ids in before[user_id].items():
+                    assert rows_for(shard_service.conn, table, user_id) == ids
+                # Progress summaries are rebuilt from the moved events
+                assert shard_service.get_progress_summary(user_id).enrolled_courses == 2
+                # New rows continue after the migrated ids in that shard
+                shard_service.apply_to_job(user_id, 'job_001')
+                last_event = shard_service.conn.execute('SELECT MAX(id) FROM events').fetchone()[0]
+                assert last_event > max(event_id for event_id, in before[user_id]['events'])
+                assert shard_service.get_progress_summary(user_id).applications == 1
+            finally:
+                shard_service.conn.close()
+    finally:
+        storage.close()
+    # Users and catalogs stay in the common file
+    conn = connect(db_path)
+    assert conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == user_count
+    conn.close()
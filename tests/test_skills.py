@@ -0,0 +1,75 @@
+import threading
+
+from learn_and_earn import connect
+from learn_and_earn.skills import SkillVocabulary, skill_key
+
+
+def test_spellings_resolve_to_one_id(service):
+    skills = service.skills
+    assert skills.resolve('ML') == skills.resolve('machine-learning') == skills.resolve('Machine  Learning')
+    assert skills.canonical('k8s') == 'Kubernetes'
+    assert skills.canonicalize(['py', 'Python 3', 'SQL']) == ['Python', 'SQL']
+    assert skill_key('Node_JS') == 'node js'
+
+
+def test_unknown_skills_get_stable_transient_ids(service):
+    first = service.skills.intern('Basket Weaving')
+    assert first < 0
+    assert service.skills.intern('basket-weaving') == first
+    assert SkillVocabulary(service.conn).intern('Basket Weaving') == first
+    persisted = service.skills.intern('Basket Weaving', persist=True)
+    assert persisted > 0
+    assert service.skills.resolve('basket weaving') == persisted
+
+
+def test_connections_share_one_table(db_path, service, monkeypatch):
+    service.skills.resolve('python')
+    other = connect(db_path)
+    try:
+        loads = []
+        original = SkillVocabulary.load
+        monkeypatch.setattr(SkillVocabulary, 'load', lambda self: loads.append(1) or original(self))
+        vocabulary = SkillVocabulary(other)
+        assert vocabulary.table is service.skills.table
+        assert vocabulary.resolve('python') == service.skills.resolve('python')
+        assert loads == []
+
+        # A skill added by another process is picked up by the next vocabulary
+        other.execute("INSERT INTO skills (name, normalized) VALUES ('Zig', 'zig')")
+        other.commit()
+        assert SkillVocabulary(service.conn).resolve('zig') is not None
+        assert loads == [1]
+    finally:
+        other.close()
+
+
+def test_seeding_does_not_commit_the_callers_transaction(service):
+    service.conn.execute("INSERT INTO users (username, email, password) VALUES ('tmp', 'tmp@example.com', 'x')")
+    vocabulary = SkillVocabulary(service.conn)
+    vocabulary.load()
+    assert vocabulary.resolve('ml') is not None
+    service.conn.rollback()
+    assert service.conn.execute("SELECT COUNT(*) FROM users WHERE username = 'tmp'").fetchone()[0] == 0
+
+
+def test_keys_can_be_read_while_other_threads_intern(service):
+    vocabulary = service.skills
+    vocabulary.keys()
+    errors = []
+
+    def intern_many():
+        try:
+            for index in range(3000):
+                vocabulary.intern(f"transient skill {index}")
+        except Exception as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=intern_many)
+    worker.start()
+    try:
+        while worker.is_alive():
+            vocabulary.keys()
+    except RuntimeError as e:
+        errors.append(e)
+    worker.join()
+    assert errors == []
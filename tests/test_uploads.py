@@ -0,0 +1,63 @@
+import io
+import json
+
+import pytest
+
+from learn_and_earn.skills import SkillVocabulary
+from learn_and_earn.uploads import UploadCache, UploadError, UploadTooLarge, process_upload
+
+CANDIDATES = [{'name': 'Ada', 'skills': ['ML', 'python']}, {'name': 'Bob', 'skills': 'SQL; Docker'}]
+
+
+def upload(data):
+    return io.BytesIO(data.encode())
+
+
+def test_json_array_and_jsonl(service):
+    cache = UploadCache()
+    array = process_upload(upload(json.dumps(CANDIDATES)), service.skills, 'team.json', cache=cache)
+    lines = process_upload(upload('\n'.join(map(json.dumps, CANDIDATES))), service.skills, 'team.jsonl', cache=cache)
+    for result in (array, lines):
+        assert [c.name for c in result.candidates] == ['Ada', 'Bob']
+        assert result.candidates[0].skills == ('Machine Learning', 'Python')
+
+
+def test_same_bytes_hit_the_cache(service):
+    cache = UploadCache()
+    data = json.dumps(CANDIDATES)
+    first = process_upload(upload(data), service.skills, 'team.json', cache=cache)
+    second = process_upload(upload(data), service.skills, 'team.json', cache=cache)
+    assert (first.cached, second.cached) == (False, True)
+    assert second.candidates == first.candidates
+
+
+def test_cache_key_includes_the_format(service):
+    # One JSON object per line is valid JSONL but not a valid JSON document
+    cache = UploadCache()
+    data = '\n'.join(map(json.dumps, CANDIDATES))
+    as_jsonl = process_upload(upload(data), service.skills, 'team.jsonl', cache=cache)
+    assert len(as_jsonl.candidates) == 2
+    with pytest.raises(UploadError):
+        process_upload(upload(data), service.skills, 'team.json', cache=cache)
+
+
+def test_ids_come_from_the_callers_vocabulary(service):
+    # The cache holds raw skills only, so a vocabulary that has since persisted a skill gets its real id
+    cache = UploadCache()
+    data = json.dumps([{'skills': ['Quantum Knitting']}])
+    before = process_upload(upload(data), service.skills, 'x.json', cache=cache)
+    assert all(skill_id < 0 for skill_id in before.candidates[0].skill_ids)
+
+    skill_id = service.skills.intern('Quantum Knitting', persist=True)
+    service.conn.commit()
+    after = process_upload(upload(data), SkillVocabulary(service.conn), 'x.json', cache=cache)
+    assert after.cached
+    assert after.candidates[0].skill_ids == frozenset({skill_id})
+
+
+def test_invalid_records_and_size_cap(service):
+    result = process_upload(upload(json.dumps([{'skills': []}, 3, CANDIDATES[0]])), service.skills, 'x.json',
+                            cache=None)
+    assert (len(result.candidates), result.invalid_records) == (1, 2)
+    with pytest.raises(UploadTooLarge):
+        process_upload(upload(json.dumps(CANDIDATES)), service.skills, 'x.json', max_bytes=10, cache=None)